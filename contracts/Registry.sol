@@ -9,6 +9,9 @@ import "OpenZeppelin/openzeppelin-contracts@4.3.0/contracts/token/ERC721/utils/E
 import "OpenZeppelin/openzeppelin-contracts@4.3.0/contracts/token/ERC1155/IERC1155.sol";
 import "OpenZeppelin/openzeppelin-contracts@4.3.0/contracts/token/ERC1155/utils/ERC1155Holder.sol";
 import "OpenZeppelin/openzeppelin-contracts@4.3.0/contracts/token/ERC1155/utils/ERC1155Receiver.sol";
+import "OpenZeppelin/openzeppelin-contracts@4.3.0/contracts/utils/structs/EnumerableSet.sol";
+import "OpenZeppelin/openzeppelin-contracts@4.3.0/contracts/utils/cryptography/ECDSA.sol";
+import "OpenZeppelin/openzeppelin-contracts@4.3.0/contracts/utils/cryptography/draft-EIP712.sol";
 
 import "./interfaces/IRegistry.sol";
 
@@ -32,8 +35,9 @@ import "./interfaces/IRegistry.sol";
 //                   @@@@@@@@@@@@@@@@&        @@@@@@@@@@@@@@@@
 //                   @@@@@@@@@@@@@@@@&        @@@@@@@@@@@@@@@@
 
-contract Registry is IRegistry, ERC721Holder, ERC1155Receiver, ERC1155Holder {
+contract Registry is IRegistry, ERC721Holder, ERC1155Receiver, ERC1155Holder, EIP712 {
     using SafeERC20 for ERC20;
+    using EnumerableSet for EnumerableSet.UintSet;
 
     IResolver private resolver;
     address private admin;
@@ -45,6 +49,25 @@ contract Registry is IRegistry, ERC721Holder, ERC1155Receiver, ERC1155Holder {
     uint256 private constant SECONDS_IN_DAY = 86400;
     mapping(bytes32 => Lending) private lendings;
     mapping(bytes32 => Renting) private rentings;
+    // optional enumeration of the active lendings, by lender and by nft address. Off by default,
+    // since it adds to the gas of every lend and of every lending that is stopped
+    bool public enumerable = false;
+    mapping(address => EnumerableSet.UintSet) private lenderLendings;
+    mapping(address => EnumerableSet.UintSet) private nftLendings;
+    mapping(uint256 => LendingKey) private lendingKeys;
+    // fees taken by stopRent and claimRent, by payment token, until the beneficiary withdraws them
+    mapping(uint8 => uint256) public accruedFees;
+    // lenders that opted into pull payments have their rent credited here, by payment token,
+    // instead of sent on every settlement
+    mapping(address => bool) public pullPayments;
+    mapping(address => mapping(uint8 => uint256)) public credits;
+    bytes32 private constant LEND_OFFER_TYPEHASH = keccak256(
+        "LendOffer(address lenderAddress,uint8 nftStandard,address nftAddress,uint256 tokenID,uint16 lendAmount,"
+        "uint8 maxRentDuration,bytes4 dailyRentPrice,uint8 paymentToken,bool willAutoRenew,uint256 nonce,"
+        "uint256 deadline)"
+    );
+    // offer nonces filled or cancelled, by lender
+    mapping(address => mapping(uint256 => bool)) public usedOfferNonces;
 
     modifier onlyAdmin() {
         require(msg.sender == admin, "ReNFT::not admin");
@@ -56,7 +79,7 @@ contract Registry is IRegistry, ERC721Holder, ERC1155Receiver, ERC1155Holder {
         _;
     }
 
-    constructor(address newResolver, address payable newBeneficiary, address newAdmin) {
+    constructor(address newResolver, address payable newBeneficiary, address newAdmin) EIP712("ReNFT", "1") {
         ensureIsNotZeroAddr(newResolver);
         ensureIsNotZeroAddr(newBeneficiary);
         ensureIsNotZeroAddr(newAdmin);
@@ -132,21 +155,96 @@ contract Registry is IRegistry, ERC721Holder, ERC1155Receiver, ERC1155Holder {
         bundleCall(handleClaimRent, createActionCallData(nftStandard, nftAddress, tokenID, _lendingID, _rentingID));
     }
 
+    function tryClaimRent(
+        IRegistry.NFTStandard[] memory nftStandard,
+        address[] memory nftAddress,
+        uint256[] memory tokenID,
+        uint256[] memory _lendingID,
+        uint256[] memory _rentingID
+    ) external override notPaused {
+        bundleCall(handleTryClaimRent, createActionCallData(nftStandard, nftAddress, tokenID, _lendingID, _rentingID));
+    }
+
+    function withdrawFees(uint8[] memory paymentToken) external override {
+        require(msg.sender == beneficiary, "ReNFT::not beneficiary");
+        for (uint256 i = 0; i < paymentToken.length; i++) {
+            uint256 amount = accruedFees[paymentToken[i]];
+            if (amount == 0) continue;
+            accruedFees[paymentToken[i]] = 0;
+            ERC20(resolver.getPaymentToken(paymentToken[i])).safeTransfer(beneficiary, amount);
+            emit IRegistry.FeesWithdrawn(paymentToken[i], beneficiary, amount);
+        }
+    }
+
+    function setPullPayments(bool enabled) external override {
+        pullPayments[msg.sender] = enabled;
+        emit IRegistry.PullPaymentsSet(msg.sender, enabled);
+    }
+
+    function withdrawCredits(uint8[] memory paymentToken) external override {
+        for (uint256 i = 0; i < paymentToken.length; i++) {
+            uint256 amount = credits[msg.sender][paymentToken[i]];
+            if (amount == 0) continue;
+            credits[msg.sender][paymentToken[i]] = 0;
+            ERC20(resolver.getPaymentToken(paymentToken[i])).safeTransfer(msg.sender, amount);
+            emit IRegistry.CreditsWithdrawn(msg.sender, paymentToken[i], amount);
+        }
+    }
+
+    function rentOffers(
+        IRegistry.LendOffer[] memory offers,
+        bytes[] memory signatures,
+        uint8[] memory rentDuration,
+        uint256[] memory rentAmount
+    ) external payable override notPaused {
+        require(offers.length == signatures.length, "ReNFT::invalid signatures");
+        require(
+            offers.length == rentDuration.length && offers.length == rentAmount.length,
+            "ReNFT::invalid rent arrays"
+        );
+        IRegistry.NFTStandard[] memory nftStandard = new IRegistry.NFTStandard[](offers.length);
+        address[] memory nftAddress = new address[](offers.length);
+        uint256[] memory tokenID = new uint256[](offers.length);
+        uint256[] memory _lendingID = new uint256[](offers.length);
+        for (uint256 i = 0; i < offers.length; i++) {
+            nftStandard[i] = offers[i].nftStandard;
+            nftAddress[i] = offers[i].nftAddress;
+            tokenID[i] = offers[i].tokenID;
+            _lendingID[i] = lendOffer(offers[i], signatures[i]);
+        }
+        // the lendings are then rented like any other, including the renter's checks
+        bundleCall(
+            handleRent, createRentCallData(nftStandard, nftAddress, tokenID, _lendingID, rentDuration, rentAmount)
+        );
+    }
+
+    function cancelLendOffers(uint256[] memory nonces) external override {
+        for (uint256 i = 0; i < nonces.length; i++) {
+            if (usedOfferNonces[msg.sender][nonces[i]]) continue;
+            usedOfferNonces[msg.sender][nonces[i]] = true;
+            emit IRegistry.LendOfferCancelled(msg.sender, nonces[i]);
+        }
+    }
+
+    function domainSeparator() external view override returns (bytes32) {
+        return _domainSeparatorV4();
+    }
+
     //      .-.     .-.     .-.     .-.     .-.     .-.     .-.     .-.     .-.     .-.
     // `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'
 
-    function handleLend(IRegistry.CallData memory cd) private {
-        for (uint256 i = cd.left; i < cd.right; i++) {
+    function handleLend(IRegistry.LendCallData memory cd) private {
+        for (uint256 i = cd.left; i < cd.right; ) {
             ensureIsLendable(cd, i);
-            bytes32 identifier = keccak256(abi.encodePacked(cd.nftAddress[cd.left], cd.tokenID[i], lendingID));
+            bytes32 identifier = keccak256(abi.encodePacked(cd.groupAddress, cd.tokenID[i], lendingID));
             IRegistry.Lending storage lending = lendings[identifier];
             ensureIsNull(lending);
             ensureTokenNotSentinel(uint8(cd.paymentToken[i]));
-            bool is721 = cd.nftStandard[i] == IRegistry.NFTStandard.E721;
+            bool is721 = cd.groupStandard == IRegistry.NFTStandard.E721;
             uint16 _lendAmount = uint16(cd.lendAmount[i]);
             if (is721) require(_lendAmount == 1, "ReNFT::lendAmount should be equal to 1");
             lendings[identifier] = IRegistry.Lending({
-                nftStandard: cd.nftStandard[i],
+                nftStandard: cd.groupStandard,
                 lenderAddress: payable(msg.sender),
                 maxRentDuration: cd.maxRentDuration[i],
                 dailyRentPrice: cd.dailyRentPrice[i],
@@ -158,7 +256,7 @@ contract Registry is IRegistry, ERC721Holder, ERC1155Receiver, ERC1155Holder {
             emit IRegistry.Lend(
                 is721,
                 msg.sender,
-                cd.nftAddress[cd.left],
+                cd.groupAddress,
                 cd.tokenID[i],
                 lendingID,
                 cd.maxRentDuration[i],
@@ -167,61 +265,51 @@ contract Registry is IRegistry, ERC721Holder, ERC1155Receiver, ERC1155Holder {
                 cd.paymentToken[i],
                 cd.willAutoRenew[i]
                 );
+            if (enumerable) indexLending(msg.sender, cd.groupAddress, cd.tokenID[i], lendingID);
             lendingID++;
+            unchecked {
+                ++i;
+            }
         }
-        safeTransfer(
-            cd,
-            msg.sender,
-            address(this),
-            sliceArr(cd.tokenID, cd.left, cd.right, 0),
-            sliceArr(cd.lendAmount, cd.left, cd.right, 0)
-        );
+        safeTransfer(cd, msg.sender, address(this));
     }
 
-    function handleStopLend(IRegistry.CallData memory cd) private {
-        uint256[] memory lentAmounts = new uint256[](cd.right - cd.left);
-        for (uint256 i = cd.left; i < cd.right; i++) {
+    function handleStopLend(IRegistry.ActionCallData memory cd) private {
+        Returns memory returns_ = newReturns(cd.right - cd.left);
+        for (uint256 i = cd.left; i < cd.right; ) {
             bytes32 lendingIdentifier =
-                keccak256(abi.encodePacked(cd.nftAddress[cd.left], cd.tokenID[i], cd.lendingID[i]));
+                keccak256(abi.encodePacked(cd.groupAddress, cd.tokenID[i], cd.lendingID[i]));
             Lending storage lending = lendings[lendingIdentifier];
             ensureIsNotNull(lending);
             ensureIsStoppable(lending, msg.sender);
-            require(cd.nftStandard[i] == lending.nftStandard, "ReNFT::invalid nft standard");
+            require(cd.groupStandard == lending.nftStandard, "ReNFT::invalid nft standard");
             require(lending.lendAmount == lending.availableAmount, "ReNFT::actively rented");
-            lentAmounts[i - cd.left] = lending.lendAmount;
-            emit IRegistry.StopLend(cd.lendingID[i], uint32(block.timestamp), lending.lendAmount);
+            addReturn(returns_, cd.groupStandard, msg.sender, cd.tokenID[i], lending.lendAmount);
+            emit IRegistry.StopLend(
+                cd.lendingID[i], uint32(block.timestamp), lending.lendAmount, cd.groupAddress, cd.tokenID[i]
+                );
+            if (enumerable) unindexLending(lending.lenderAddress, cd.groupAddress, cd.lendingID[i]);
             delete lendings[lendingIdentifier];
+            unchecked {
+                ++i;
+            }
         }
-        safeTransfer(
-            cd,
-            address(this),
-            msg.sender,
-            sliceArr(cd.tokenID, cd.left, cd.right, 0),
-            sliceArr(lentAmounts, cd.left, cd.right, cd.left)
-        );
+        sendReturns(cd.groupAddress, cd.groupStandard, returns_);
     }
 
-    function handleRent(IRegistry.CallData memory cd) private {
-        for (uint256 i = cd.left; i < cd.right; i++) {
+    function handleRent(IRegistry.RentCallData memory cd) private {
+        for (uint256 i = cd.left; i < cd.right; ) {
             bytes32 lendingIdentifier =
-                keccak256(abi.encodePacked(cd.nftAddress[cd.left], cd.tokenID[i], cd.lendingID[i]));
-            bytes32 rentingIdentifier = keccak256(abi.encodePacked(cd.nftAddress[cd.left], cd.tokenID[i], rentingID));
+                keccak256(abi.encodePacked(cd.groupAddress, cd.tokenID[i], cd.lendingID[i]));
+            bytes32 rentingIdentifier = keccak256(abi.encodePacked(cd.groupAddress, cd.tokenID[i], rentingID));
             IRegistry.Lending storage lending = lendings[lendingIdentifier];
             IRegistry.Renting storage renting = rentings[rentingIdentifier];
             ensureIsNotNull(lending);
             ensureIsNull(renting);
             ensureIsRentable(lending, cd, i, msg.sender);
-            require(cd.nftStandard[i] == lending.nftStandard, "ReNFT::invalid nft standard");
+            require(cd.groupStandard == lending.nftStandard, "ReNFT::invalid nft standard");
             require(cd.rentAmount[i] <= lending.availableAmount, "ReNFT::invalid rent amount");
-            uint8 paymentTokenIx = uint8(lending.paymentToken);
-            ERC20 paymentToken = ERC20(resolver.getPaymentToken(paymentTokenIx));
-            uint256 decimals = paymentToken.decimals();
-            {
-                uint256 scale = 10 ** decimals;
-                uint256 rentPrice = cd.rentAmount[i] * cd.rentDuration[i] * unpackPrice(lending.dailyRentPrice, scale);
-                require(rentPrice > 0, "ReNFT::rent price is zero");
-                paymentToken.safeTransferFrom(msg.sender, address(this), rentPrice);
-            }
+            uint256 rentPrice = takeRentPayment(lending, cd, i);
             rentings[rentingIdentifier] = IRegistry.Renting({
                 renterAddress: payable(msg.sender),
                 rentAmount: uint16(cd.rentAmount[i]),
@@ -230,52 +318,176 @@ contract Registry is IRegistry, ERC721Holder, ERC1155Receiver, ERC1155Holder {
             });
             lendings[lendingIdentifier].availableAmount -= uint16(cd.rentAmount[i]);
             emit IRegistry.Rent(
-                msg.sender, cd.lendingID[i], rentingID, uint16(cd.rentAmount[i]), cd.rentDuration[i], renting.rentedAt
+                msg.sender,
+                cd.lendingID[i],
+                rentingID,
+                uint16(cd.rentAmount[i]),
+                cd.rentDuration[i],
+                renting.rentedAt,
+                cd.groupAddress,
+                cd.tokenID[i],
+                lending.paymentToken,
+                rentPrice
                 );
             rentingID++;
+            unchecked {
+                ++i;
+            }
         }
     }
 
-    function handleStopRent(IRegistry.CallData memory cd) private {
-        for (uint256 i = cd.left; i < cd.right; i++) {
+    function handleStopRent(IRegistry.ActionCallData memory cd) private {
+        Returns memory returns_ = newReturns(cd.right - cd.left);
+        for (uint256 i = cd.left; i < cd.right; ) {
             bytes32 lendingIdentifier =
-                keccak256(abi.encodePacked(cd.nftAddress[cd.left], cd.tokenID[i], cd.lendingID[i]));
+                keccak256(abi.encodePacked(cd.groupAddress, cd.tokenID[i], cd.lendingID[i]));
             bytes32 rentingIdentifier =
-                keccak256(abi.encodePacked(cd.nftAddress[cd.left], cd.tokenID[i], cd.rentingID[i]));
+                keccak256(abi.encodePacked(cd.groupAddress, cd.tokenID[i], cd.rentingID[i]));
             IRegistry.Lending storage lending = lendings[lendingIdentifier];
             IRegistry.Renting storage renting = rentings[rentingIdentifier];
             ensureIsNotNull(lending);
             ensureIsNotNull(renting);
             ensureIsReturnable(renting, msg.sender, block.timestamp);
-            require(cd.nftStandard[i] == lending.nftStandard, "ReNFT::invalid nft standard");
+            require(cd.groupStandard == lending.nftStandard, "ReNFT::invalid nft standard");
             require(renting.rentAmount <= lending.lendAmount, "ReNFT::critical error");
-            uint256 secondsSinceRentStart = block.timestamp - renting.rentedAt;
-            distributePayments(lending, renting, secondsSinceRentStart);
-            manageWillAutoRenew(
-                lending, renting, cd.nftAddress[cd.left], cd.nftStandard[cd.left], cd.tokenID[i], cd.lendingID[i]
-            );
-            emit IRegistry.StopRent(cd.rentingID[i], uint32(block.timestamp));
+            Payment memory payment = distributePayments(lending, renting, block.timestamp - renting.rentedAt);
+            manageWillAutoRenew(lending, renting, cd, i, returns_);
+            emit IRegistry.StopRent(
+                cd.rentingID[i],
+                uint32(block.timestamp),
+                payment.lenderAddress,
+                payment.renterAddress,
+                cd.groupAddress,
+                cd.tokenID[i],
+                cd.lendingID[i],
+                payment.paymentToken,
+                payment.lenderAmount,
+                payment.renterAmount,
+                payment.fee
+                );
             delete rentings[rentingIdentifier];
+            unchecked {
+                ++i;
+            }
         }
+        sendReturns(cd.groupAddress, cd.groupStandard, returns_);
     }
 
-    function handleClaimRent(CallData memory cd) private {
-        for (uint256 i = cd.left; i < cd.right; i++) {
+    function handleClaimRent(ActionCallData memory cd) private {
+        Returns memory returns_ = newReturns(cd.right - cd.left);
+        for (uint256 i = cd.left; i < cd.right; ) {
             bytes32 lendingIdentifier =
-                keccak256(abi.encodePacked(cd.nftAddress[cd.left], cd.tokenID[i], cd.lendingID[i]));
+                keccak256(abi.encodePacked(cd.groupAddress, cd.tokenID[i], cd.lendingID[i]));
             bytes32 rentingIdentifier =
-                keccak256(abi.encodePacked(cd.nftAddress[cd.left], cd.tokenID[i], cd.rentingID[i]));
+                keccak256(abi.encodePacked(cd.groupAddress, cd.tokenID[i], cd.rentingID[i]));
             IRegistry.Lending storage lending = lendings[lendingIdentifier];
             IRegistry.Renting storage renting = rentings[rentingIdentifier];
             ensureIsNotNull(lending);
             ensureIsNotNull(renting);
             ensureIsClaimable(renting, block.timestamp);
-            distributeClaimPayment(lending, renting);
-            manageWillAutoRenew(
-                lending, renting, cd.nftAddress[cd.left], cd.nftStandard[cd.left], cd.tokenID[i], cd.lendingID[i]
+            settleClaim(cd, i, lending, renting, rentingIdentifier, returns_);
+            unchecked {
+                ++i;
+            }
+        }
+        sendReturns(cd.groupAddress, cd.groupStandard, returns_);
+    }
+
+    function handleTryClaimRent(ActionCallData memory cd) private {
+        Returns memory returns_ = newReturns(cd.right - cd.left);
+        for (uint256 i = cd.left; i < cd.right; ) {
+            bytes32 lendingIdentifier =
+                keccak256(abi.encodePacked(cd.groupAddress, cd.tokenID[i], cd.lendingID[i]));
+            bytes32 rentingIdentifier =
+                keccak256(abi.encodePacked(cd.groupAddress, cd.tokenID[i], cd.rentingID[i]));
+            IRegistry.Lending storage lending = lendings[lendingIdentifier];
+            IRegistry.Renting storage renting = rentings[rentingIdentifier];
+            // skipped items are reported rather than reverted, so that a keeper racing
+            // against renters (stopRent) or other keepers still settles the rest of the batch
+            if (lending.lenderAddress == address(0)) {
+                emit IRegistry.RentClaimSkipped(cd.rentingID[i], IRegistry.ClaimSkipReason.NullLending);
+            } else if (renting.renterAddress == address(0)) {
+                emit IRegistry.RentClaimSkipped(cd.rentingID[i], IRegistry.ClaimSkipReason.NullRenting);
+            } else if (!isClaimable(renting, block.timestamp)) {
+                emit IRegistry.RentClaimSkipped(cd.rentingID[i], IRegistry.ClaimSkipReason.ReturnDateNotPassed);
+            } else {
+                settleClaim(cd, i, lending, renting, rentingIdentifier, returns_);
+            }
+            unchecked {
+                ++i;
+            }
+        }
+        sendReturns(cd.groupAddress, cd.groupStandard, returns_);
+    }
+
+    function settleClaim(
+        ActionCallData memory cd,
+        uint256 i,
+        IRegistry.Lending storage lending,
+        IRegistry.Renting storage renting,
+        bytes32 rentingIdentifier,
+        Returns memory returns_
+    ) private {
+        Payment memory payment = distributeClaimPayment(lending, renting);
+        manageWillAutoRenew(lending, renting, cd, i, returns_);
+        emit IRegistry.RentClaimed(
+            cd.rentingID[i],
+            uint32(block.timestamp),
+            payment.lenderAddress,
+            cd.groupAddress,
+            cd.tokenID[i],
+            cd.lendingID[i],
+            payment.paymentToken,
+            payment.lenderAmount,
+            payment.fee
+            );
+        delete rentings[rentingIdentifier];
+    }
+
+    // the lend of a signed offer: the same checks and lending as handleLend, for the offer's lender
+    function lendOffer(IRegistry.LendOffer memory offer, bytes memory signature) private returns (uint256 id) {
+        ensureIsSignedOffer(offer, signature);
+        usedOfferNonces[offer.lenderAddress][offer.nonce] = true;
+        require(offer.lendAmount > 0, "ReNFT::lend amount is zero");
+        require(offer.maxRentDuration > 0, "ReNFT::duration is zero");
+        require(uint32(offer.dailyRentPrice) > 0, "ReNFT::rent price is zero");
+        ensureTokenNotSentinel(offer.paymentToken);
+        bool is721 = offer.nftStandard == IRegistry.NFTStandard.E721;
+        if (is721) require(offer.lendAmount == 1, "ReNFT::lendAmount should be equal to 1");
+        id = lendingID;
+        bytes32 identifier = keccak256(abi.encodePacked(offer.nftAddress, offer.tokenID, id));
+        ensureIsNull(lendings[identifier]);
+        lendings[identifier] = IRegistry.Lending({
+            nftStandard: offer.nftStandard,
+            lenderAddress: payable(offer.lenderAddress),
+            maxRentDuration: offer.maxRentDuration,
+            dailyRentPrice: offer.dailyRentPrice,
+            lendAmount: offer.lendAmount,
+            availableAmount: offer.lendAmount,
+            paymentToken: offer.paymentToken,
+            willAutoRenew: offer.willAutoRenew
+        });
+        emit IRegistry.Lend(
+            is721,
+            offer.lenderAddress,
+            offer.nftAddress,
+            offer.tokenID,
+            id,
+            offer.maxRentDuration,
+            offer.dailyRentPrice,
+            offer.lendAmount,
+            offer.paymentToken,
+            offer.willAutoRenew
+            );
+        emit IRegistry.LendOfferFilled(offer.lenderAddress, offer.nonce, id);
+        if (enumerable) indexLending(offer.lenderAddress, offer.nftAddress, offer.tokenID, id);
+        lendingID++;
+        if (is721) {
+            IERC721(offer.nftAddress).transferFrom(offer.lenderAddress, address(this), offer.tokenID);
+        } else {
+            IERC1155(offer.nftAddress).safeTransferFrom(
+                offer.lenderAddress, address(this), offer.tokenID, offer.lendAmount, ""
             );
-            emit IRegistry.RentClaimed(cd.rentingID[i], uint32(block.timestamp));
-            delete rentings[rentingIdentifier];
         }
     }
 
@@ -285,13 +497,13 @@ contract Registry is IRegistry, ERC721Holder, ERC1155Receiver, ERC1155Holder {
     function manageWillAutoRenew(
         IRegistry.Lending storage lending,
         IRegistry.Renting storage renting,
-        address nftAddress,
-        IRegistry.NFTStandard nftStandard,
-        uint256 tokenID,
-        uint256 lendingID
+        ActionCallData memory cd,
+        uint256 i,
+        Returns memory returns_
     ) private {
         if (lending.willAutoRenew == false) {
             // No automatic renewal, stop the lending (or a portion of it) completely!
+            // The assets go back to the lender once the whole bundleCall group is settled (sendReturns).
 
             // We must be careful here, because the lending might be for an ERC1155 token, which means
             // that the renting.rentAmount might not be the same as the lending.lendAmount. In this case, we
@@ -302,9 +514,7 @@ contract Registry is IRegistry, ERC721Holder, ERC1155Receiver, ERC1155Holder {
                 // Do not update lending.availableAmount, because the assets will not be lent out again
                 lending.lendAmount -= renting.rentAmount;
                 // return the assets to the lender
-                IERC1155(nftAddress).safeTransferFrom(
-                    address(this), lending.lenderAddress, tokenID, uint256(renting.rentAmount), ""
-                );
+                addReturn(returns_, cd.groupStandard, lending.lenderAddress, cd.tokenID[i], renting.rentAmount);
             }
             // If the lending is for an ERC721 token, then the renting.rentAmount is always the same as the
             // lending.lendAmount, and we can delete the lending. If the lending is for an ERC1155 token and
@@ -312,53 +522,133 @@ contract Registry is IRegistry, ERC721Holder, ERC1155Receiver, ERC1155Holder {
             // lending.
             else if (lending.lendAmount == renting.rentAmount) {
                 // return the assets to the lender
-                if (nftStandard == IRegistry.NFTStandard.E721) {
-                    IERC721(nftAddress).transferFrom(address(this), lending.lenderAddress, tokenID);
-                } else {
-                    IERC1155(nftAddress).safeTransferFrom(
-                        address(this), lending.lenderAddress, tokenID, uint256(renting.rentAmount), ""
-                    );
-                }
-                delete lendings[keccak256(abi.encodePacked(nftAddress, tokenID, lendingID))];
+                addReturn(returns_, cd.groupStandard, lending.lenderAddress, cd.tokenID[i], renting.rentAmount);
+                if (enumerable) unindexLending(lending.lenderAddress, cd.groupAddress, cd.lendingID[i]);
+                delete lendings[keccak256(abi.encodePacked(cd.groupAddress, cd.tokenID[i], cd.lendingID[i]))];
             }
             // StopLend event but only the amount that was not renewed (or all of it)
-            emit IRegistry.StopLend(lendingID, uint32(block.timestamp), renting.rentAmount);
+            emit IRegistry.StopLend(
+                cd.lendingID[i], uint32(block.timestamp), renting.rentAmount, cd.groupAddress, cd.tokenID[i]
+                );
         } else {
             // automatic renewal, make the assets available to be lent out again
             lending.availableAmount += renting.rentAmount;
         }
     }
 
-    function bundleCall(function(IRegistry.CallData memory) handler, IRegistry.CallData memory cd) private {
-        require(cd.nftAddress.length > 0, "ReNFT::no nfts");
-        while (cd.right != cd.nftAddress.length) {
-            if (
-                (cd.nftAddress[cd.left] == cd.nftAddress[cd.right])
-                    && (cd.nftStandard[cd.right] == IRegistry.NFTStandard.E1155)
-            ) {
-                cd.right++;
-            } else {
-                handler(cd);
-                cd.left = cd.right;
-                cd.right++;
+    function indexLending(address lender, address nftAddress, uint256 tokenID, uint256 _lendingID) private {
+        lenderLendings[lender].add(_lendingID);
+        nftLendings[nftAddress].add(_lendingID);
+        lendingKeys[_lendingID] = LendingKey({nftAddress: nftAddress, tokenID: tokenID});
+    }
+
+    function unindexLending(address lender, address nftAddress, uint256 _lendingID) private {
+        // lendings made while enumeration was off are not in the sets
+        if (lendingKeys[_lendingID].nftAddress == address(0)) return;
+        lenderLendings[lender].remove(_lendingID);
+        nftLendings[nftAddress].remove(_lendingID);
+        delete lendingKeys[_lendingID];
+    }
+
+    // Each handler gets one group at a time, in order. The group ends are found in one pass
+    // over the nfts, with the group's nft cached in the call data for the handler.
+    function bundleCall(function(IRegistry.LendCallData memory) handler, IRegistry.LendCallData memory cd)
+        private
+    {
+        (uint256[] memory ends, uint256 count) = groupEnds(cd.nftStandard, cd.nftAddress);
+        for (uint256 g = 0; g < count; ) {
+            (cd.right, cd.groupAddress, cd.groupStandard) = groupAt(ends, g, cd.left, cd.nftStandard, cd.nftAddress);
+            handler(cd);
+            cd.left = cd.right;
+            unchecked {
+                ++g;
+            }
+        }
+    }
+
+    function bundleCall(function(IRegistry.RentCallData memory) handler, IRegistry.RentCallData memory cd)
+        private
+    {
+        (uint256[] memory ends, uint256 count) = groupEnds(cd.nftStandard, cd.nftAddress);
+        for (uint256 g = 0; g < count; ) {
+            (cd.right, cd.groupAddress, cd.groupStandard) = groupAt(ends, g, cd.left, cd.nftStandard, cd.nftAddress);
+            handler(cd);
+            cd.left = cd.right;
+            unchecked {
+                ++g;
             }
         }
-        handler(cd);
     }
 
-    function takeFee(uint256 rentAmt, ERC20 token) private returns (uint256 fee) {
+    function bundleCall(function(IRegistry.ActionCallData memory) handler, IRegistry.ActionCallData memory cd)
+        private
+    {
+        (uint256[] memory ends, uint256 count) = groupEnds(cd.nftStandard, cd.nftAddress);
+        for (uint256 g = 0; g < count; ) {
+            (cd.right, cd.groupAddress, cd.groupStandard) = groupAt(ends, g, cd.left, cd.nftStandard, cd.nftAddress);
+            handler(cd);
+            cd.left = cd.right;
+            unchecked {
+                ++g;
+            }
+        }
+    }
+
+    // the end, nft address and standard of group `g`, which starts at `left`. Each call data
+    // struct has its own bundleCall, as handlers of different struct types cannot share one
+    function groupAt(
+        uint256[] memory ends,
+        uint256 g,
+        uint256 left,
+        IRegistry.NFTStandard[] memory nftStandard,
+        address[] memory nftAddress
+    ) private pure returns (uint256, address, IRegistry.NFTStandard) {
+        return (ends[g], nftAddress[left], nftStandard[left]);
+    }
+
+    // the end (exclusive) of each run of items of the same nft address and standard, the first
+    // `count` entries of `ends`
+    function groupEnds(IRegistry.NFTStandard[] memory nftStandard, address[] memory nftAddress)
+        private
+        pure
+        returns (uint256[] memory ends, uint256 count)
+    {
+        uint256 length = nftAddress.length;
+        require(length > 0, "ReNFT::no nfts");
+        ends = new uint256[](length);
+        address groupAddress = nftAddress[0];
+        IRegistry.NFTStandard groupStandard = nftStandard[0];
+        for (uint256 i = 1; i < length; ) {
+            if (nftAddress[i] != groupAddress || nftStandard[i] != groupStandard) {
+                ends[count] = i;
+                count++;
+                groupAddress = nftAddress[i];
+                groupStandard = nftStandard[i];
+            }
+            unchecked {
+                ++i;
+            }
+        }
+        ends[count] = length;
+        count++;
+    }
+
+    function takeFee(uint256 rentAmt, uint8 paymentTokenIx) private returns (uint256 fee) {
         fee = rentAmt * rentFee;
         fee /= 10000;
-        token.safeTransfer(beneficiary, fee);
+        accruedFees[paymentTokenIx] += fee;
     }
 
     function distributePayments(
         IRegistry.Lending memory lending,
         IRegistry.Renting memory renting,
         uint256 secondsSinceRentStart
-    ) private {
+    ) private returns (Payment memory payment) {
         uint8 paymentTokenIx = uint8(lending.paymentToken);
         ERC20 paymentToken = ERC20(resolver.getPaymentToken(paymentTokenIx));
+        payment.lenderAddress = lending.lenderAddress;
+        payment.renterAddress = renting.renterAddress;
+        payment.paymentToken = paymentTokenIx;
         uint256 decimals = paymentToken.decimals();
         uint256 scale = 10 ** decimals;
         uint256 rentPrice = renting.rentAmount * unpackPrice(lending.dailyRentPrice, scale);
@@ -368,40 +658,140 @@ contract Registry is IRegistry, ERC721Holder, ERC1155Receiver, ERC1155Holder {
         require(sendLenderAmt > 0, "ReNFT::lender payment is zero");
         uint256 sendRenterAmt = totalRenterPmt - sendLenderAmt;
         if (rentFee != 0) {
-            uint256 takenFee = takeFee(sendLenderAmt, paymentToken);
-            sendLenderAmt -= takenFee;
+            payment.fee = takeFee(sendLenderAmt, paymentTokenIx);
+            sendLenderAmt -= payment.fee;
         }
-        paymentToken.safeTransfer(lending.lenderAddress, sendLenderAmt);
+        payLender(lending, paymentToken, sendLenderAmt);
         if (sendRenterAmt > 0) {
             paymentToken.safeTransfer(renting.renterAddress, sendRenterAmt);
         }
+        payment.lenderAmount = sendLenderAmt;
+        payment.renterAmount = sendRenterAmt;
     }
 
-    function distributeClaimPayment(IRegistry.Lending memory lending, IRegistry.Renting memory renting) private {
+    function distributeClaimPayment(IRegistry.Lending memory lending, IRegistry.Renting memory renting)
+        private
+        returns (Payment memory payment)
+    {
         uint8 paymentTokenIx = uint8(lending.paymentToken);
         ERC20 paymentToken = ERC20(resolver.getPaymentToken(paymentTokenIx));
+        payment.lenderAddress = lending.lenderAddress;
+        payment.renterAddress = renting.renterAddress;
+        payment.paymentToken = paymentTokenIx;
         uint256 decimals = paymentToken.decimals();
         uint256 scale = 10 ** decimals;
         uint256 rentPrice = renting.rentAmount * unpackPrice(lending.dailyRentPrice, scale);
         uint256 finalAmt = rentPrice * renting.rentDuration;
-        uint256 takenFee = 0;
         if (rentFee != 0) {
-            takenFee = takeFee(finalAmt, paymentToken);
+            payment.fee = takeFee(finalAmt, paymentTokenIx);
         }
-        paymentToken.safeTransfer(lending.lenderAddress, finalAmt - takenFee);
+        payment.lenderAmount = finalAmt - payment.fee;
+        payLender(lending, paymentToken, payment.lenderAmount);
     }
 
-    function safeTransfer(
-        CallData memory cd,
-        address from,
-        address to,
-        uint256[] memory tokenID,
-        uint256[] memory lendAmount
-    ) private {
-        if (cd.nftStandard[cd.left] == IRegistry.NFTStandard.E721) {
-            IERC721(cd.nftAddress[cd.left]).transferFrom(from, to, cd.tokenID[cd.left]);
+    function payLender(IRegistry.Lending memory lending, ERC20 paymentToken, uint256 amount) private {
+        if (pullPayments[lending.lenderAddress]) {
+            credits[lending.lenderAddress][lending.paymentToken] += amount;
         } else {
-            IERC1155(cd.nftAddress[cd.left]).safeBatchTransferFrom(from, to, tokenID, lendAmount, "");
+            paymentToken.safeTransfer(lending.lenderAddress, amount);
+        }
+    }
+
+    // the rent is paid up front and held by the Registry until the renting is over
+    function takeRentPayment(IRegistry.Lending storage lending, RentCallData memory cd, uint256 i)
+        private
+        returns (uint256 rentPrice)
+    {
+        ERC20 paymentToken = ERC20(resolver.getPaymentToken(uint8(lending.paymentToken)));
+        uint256 scale = 10 ** paymentToken.decimals();
+        rentPrice = cd.rentAmount[i] * cd.rentDuration[i] * unpackPrice(lending.dailyRentPrice, scale);
+        require(rentPrice > 0, "ReNFT::rent price is zero");
+        paymentToken.safeTransferFrom(msg.sender, address(this), rentPrice);
+    }
+
+    function safeTransfer(LendCallData memory cd, address from, address to) private {
+        if (cd.groupStandard == IRegistry.NFTStandard.E721) {
+            for (uint256 i = cd.left; i < cd.right; ) {
+                IERC721(cd.groupAddress).transferFrom(from, to, cd.tokenID[i]);
+                unchecked {
+                    ++i;
+                }
+            }
+        } else {
+            IERC1155(cd.groupAddress).safeBatchTransferFrom(
+                from,
+                to,
+                sliceArr(cd.tokenID, cd.left, cd.right, 0),
+                sliceArr(cd.lendAmount, cd.left, cd.right, 0),
+                ""
+            );
+        }
+    }
+
+    function newReturns(uint256 capacity) private pure returns (Returns memory) {
+        return Returns({
+            recipient: new address[](capacity),
+            tokenID: new uint256[](capacity),
+            amount: new uint256[](capacity),
+            length: 0
+        });
+    }
+
+    // Lendings of the same 1155 token id add up into a single entry. The latest entry is
+    // looked at first: batches sorted by token id only ever hit it. A 721 token id is only
+    // ever returned once, so its entry is appended without a lookup.
+    function addReturn(
+        Returns memory returns_,
+        IRegistry.NFTStandard nftStandard,
+        address recipient,
+        uint256 tokenID,
+        uint256 amount
+    ) private pure {
+        if (nftStandard == IRegistry.NFTStandard.E1155) {
+            for (uint256 j = returns_.length; j > 0; j--) {
+                if (returns_.tokenID[j - 1] == tokenID && returns_.recipient[j - 1] == recipient) {
+                    returns_.amount[j - 1] += amount;
+                    return;
+                }
+            }
+        }
+        returns_.recipient[returns_.length] = recipient;
+        returns_.tokenID[returns_.length] = tokenID;
+        returns_.amount[returns_.length] = amount;
+        returns_.length++;
+    }
+
+    // one transfer per recipient: a batch transfer for 1155s, unless there is a single token id
+    function sendReturns(address nftAddress, IRegistry.NFTStandard nftStandard, Returns memory returns_) private {
+        for (uint256 i = 0; i < returns_.length; i++) {
+            address recipient = returns_.recipient[i];
+            if (recipient == address(0)) continue;
+            if (nftStandard == IRegistry.NFTStandard.E721) {
+                IERC721(nftAddress).transferFrom(address(this), recipient, returns_.tokenID[i]);
+                continue;
+            }
+            uint256 count = 0;
+            for (uint256 j = i; j < returns_.length; j++) {
+                if (returns_.recipient[j] == recipient) count++;
+            }
+            if (count == 1) {
+                IERC1155(nftAddress).safeTransferFrom(
+                    address(this), recipient, returns_.tokenID[i], returns_.amount[i], ""
+                );
+                continue;
+            }
+            uint256[] memory tokenID = new uint256[](count);
+            uint256[] memory amount = new uint256[](count);
+            count = 0;
+            for (uint256 j = i; j < returns_.length; j++) {
+                if (returns_.recipient[j] != recipient) continue;
+                tokenID[count] = returns_.tokenID[j];
+                amount[count] = returns_.amount[j];
+                count++;
+                // sent below, skip it in the outer loop
+                returns_.recipient[j] = address(0);
+            }
+            IERC1155(nftAddress).safeBatchTransferFrom(address(this), recipient, tokenID, amount, "");
         }
     }
 
@@ -436,6 +826,51 @@ contract Registry is IRegistry, ERC721Holder, ERC1155Receiver, ERC1155Holder {
         return (renting.renterAddress, renting.rentAmount, renting.rentDuration, renting.rentedAt);
     }
 
+    function getLenderLendingCount(address lender) external view returns (uint256) {
+        return lenderLendings[lender].length();
+    }
+
+    function getNftLendingCount(address nftAddress) external view returns (uint256) {
+        return nftLendings[nftAddress].length();
+    }
+
+    // a page of (lendingID, nftAddress, tokenID) of the lender's active lendings. The order is
+    // not stable: stopping a lending moves the last one into its place
+    function getLenderLendings(address lender, uint256 offset, uint256 limit)
+        external
+        view
+        returns (uint256[] memory, address[] memory, uint256[] memory)
+    {
+        return pageLendings(lenderLendings[lender], offset, limit);
+    }
+
+    function getNftLendings(address nftAddress, uint256 offset, uint256 limit)
+        external
+        view
+        returns (uint256[] memory, address[] memory, uint256[] memory)
+    {
+        return pageLendings(nftLendings[nftAddress], offset, limit);
+    }
+
+    function pageLendings(EnumerableSet.UintSet storage set, uint256 offset, uint256 limit)
+        private
+        view
+        returns (uint256[] memory ids, address[] memory nftAddresses, uint256[] memory tokenIDs)
+    {
+        uint256 size = set.length();
+        uint256 count = offset < size ? size - offset : 0;
+        if (count > limit) count = limit;
+        ids = new uint256[](count);
+        nftAddresses = new address[](count);
+        tokenIDs = new uint256[](count);
+        for (uint256 i = 0; i < count; i++) {
+            ids[i] = set.at(offset + i);
+            LendingKey storage key = lendingKeys[ids[i]];
+            nftAddresses[i] = key.nftAddress;
+            tokenIDs[i] = key.tokenID;
+        }
+    }
+
     //      .-.     .-.     .-.     .-.     .-.     .-.     .-.     .-.     .-.     .-.
     // `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'   `._.'
 
@@ -448,18 +883,16 @@ contract Registry is IRegistry, ERC721Holder, ERC1155Receiver, ERC1155Holder {
         bytes4[] memory dailyRentPrice,
         uint8[] memory paymentToken,
         bool[] memory willAutoRenew
-    ) private pure returns (CallData memory cd) {
-        cd = CallData({
+    ) private pure returns (LendCallData memory cd) {
+        cd = LendCallData({
             left: 0,
-            right: 1,
+            right: 0,
+            groupAddress: address(0),
+            groupStandard: IRegistry.NFTStandard.E721,
             nftStandard: nftStandard,
             nftAddress: nftAddress,
             tokenID: tokenID,
             lendAmount: lendAmount,
-            lendingID: new uint256[](0),
-            rentingID: new uint256[](0),
-            rentDuration: new uint8[](0),
-            rentAmount: new uint256[](0),
             maxRentDuration: maxRentDuration,
             dailyRentPrice: dailyRentPrice,
             paymentToken: paymentToken,
@@ -474,22 +907,18 @@ contract Registry is IRegistry, ERC721Holder, ERC1155Receiver, ERC1155Holder {
         uint256[] memory _lendingID,
         uint8[] memory rentDuration,
         uint256[] memory rentAmount
-    ) private pure returns (CallData memory cd) {
-        cd = CallData({
+    ) private pure returns (RentCallData memory cd) {
+        cd = RentCallData({
             left: 0,
-            right: 1,
+            right: 0,
+            groupAddress: address(0),
+            groupStandard: IRegistry.NFTStandard.E721,
             nftStandard: nftStandard,
             nftAddress: nftAddress,
             tokenID: tokenID,
-            lendAmount: new uint256[](0),
             lendingID: _lendingID,
-            rentingID: new uint256[](0),
             rentDuration: rentDuration,
-            rentAmount: rentAmount,
-            maxRentDuration: new uint8[](0),
-            dailyRentPrice: new bytes4[](0),
-            paymentToken: new uint8[](0),
-            willAutoRenew: new bool[](0)
+            rentAmount: rentAmount
         });
     }
 
@@ -499,22 +928,17 @@ contract Registry is IRegistry, ERC721Holder, ERC1155Receiver, ERC1155Holder {
         uint256[] memory tokenID,
         uint256[] memory _lendingID,
         uint256[] memory _rentingID
-    ) private pure returns (CallData memory cd) {
-        cd = CallData({
+    ) private pure returns (ActionCallData memory cd) {
+        cd = ActionCallData({
             left: 0,
-            right: 1,
+            right: 0,
+            groupAddress: address(0),
+            groupStandard: IRegistry.NFTStandard.E721,
             nftStandard: nftStandard,
             nftAddress: nftAddress,
             tokenID: tokenID,
-            lendAmount: new uint256[](0),
             lendingID: _lendingID,
-            rentingID: _rentingID,
-            rentDuration: new uint8[](0),
-            rentAmount: new uint256[](0),
-            maxRentDuration: new uint8[](0),
-            dailyRentPrice: new bytes4[](0),
-            paymentToken: new uint8[](0),
-            willAutoRenew: new bool[](0)
+            rentingID: _rentingID
         });
     }
 
@@ -581,7 +1005,7 @@ contract Registry is IRegistry, ERC721Holder, ERC1155Receiver, ERC1155Holder {
         require(renting.rentedAt != 0, "ReNFT::rented at is zero");
     }
 
-    function ensureIsLendable(CallData memory cd, uint256 i) private pure {
+    function ensureIsLendable(LendCallData memory cd, uint256 i) private pure {
         require(cd.lendAmount[i] > 0, "ReNFT::lend amount is zero");
         require(cd.lendAmount[i] <= type(uint16).max, "ReNFT::not uint16");
         require(cd.maxRentDuration[i] > 0, "ReNFT::duration is zero");
@@ -589,7 +1013,10 @@ contract Registry is IRegistry, ERC721Holder, ERC1155Receiver, ERC1155Holder {
         require(uint32(cd.dailyRentPrice[i]) > 0, "ReNFT::rent price is zero");
     }
 
-    function ensureIsRentable(Lending memory lending, CallData memory cd, uint256 i, address msgSender) private pure {
+    function ensureIsRentable(Lending memory lending, RentCallData memory cd, uint256 i, address msgSender)
+        private
+        pure
+    {
         require(msgSender != lending.lenderAddress, "ReNFT::cant rent own nft");
         require(cd.rentDuration[i] <= type(uint8).max, "ReNFT::not uint8");
         require(cd.rentDuration[i] > 0, "ReNFT::duration is zero");
@@ -603,6 +1030,13 @@ contract Registry is IRegistry, ERC721Holder, ERC1155Receiver, ERC1155Holder {
         require(!isPastReturnDate(renting, blockTimestamp), "ReNFT::past return date");
     }
 
+    function ensureIsSignedOffer(IRegistry.LendOffer memory offer, bytes memory signature) private view {
+        require(block.timestamp <= offer.deadline, "ReNFT::offer expired");
+        require(!usedOfferNonces[offer.lenderAddress][offer.nonce], "ReNFT::offer used");
+        bytes32 digest = _hashTypedDataV4(keccak256(abi.encode(LEND_OFFER_TYPEHASH, offer)));
+        require(ECDSA.recover(digest, signature) == offer.lenderAddress, "ReNFT::invalid signature");
+    }
+
     function ensureIsStoppable(Lending memory lending, address msgSender) private pure {
         require(lending.lenderAddress == msgSender, "ReNFT::not lender");
     }
@@ -620,6 +1054,10 @@ contract Registry is IRegistry, ERC721Holder, ERC1155Receiver, ERC1155Holder {
         require(isPastReturnDate(renting, blockTimestamp), "ReNFT::return date not passed");
     }
 
+    function isClaimable(IRegistry.Renting memory renting, uint256 blockTimestamp) private pure returns (bool) {
+        return blockTimestamp > renting.rentedAt && isPastReturnDate(renting, blockTimestamp);
+    }
+
     function isPastReturnDate(Renting memory renting, uint256 nowTime) private pure returns (bool) {
         require(nowTime > renting.rentedAt, "ReNFT::now before rented");
         return nowTime - renting.rentedAt > renting.rentDuration * SECONDS_IN_DAY;
@@ -640,6 +1078,13 @@ contract Registry is IRegistry, ERC721Holder, ERC1155Receiver, ERC1155Holder {
     function setPaused(bool newPaused) external onlyAdmin {
         paused = newPaused;
     }
+
+    // With enumeration off, stopping a lending does not read the index (no cold SLOAD of its
+    // key per item). Lendings indexed before turning it off and stopped while it is off stay
+    // in the sets.
+    function setEnumerable(bool newEnumerable) external onlyAdmin {
+        enumerable = newEnumerable;
+    }
 }
 
 //              @@@@@@@@@@@@@@@@        ,@@@@@@@@@@@@@@@@
@@ -37,41 +37,114 @@ interface IRegistry {
         bool willAutoRenew
     );
 
+    // the events carry the nft and the amounts paid, so that indexers need no follow-up reads.
+    // Amounts are in the payment token's base units
     event Rent(
         address indexed renterAddress,
         uint256 indexed lendingID,
         uint256 indexed rentingID,
         uint16 rentAmount,
         uint8 rentDuration,
-        uint32 rentedAt
+        uint32 rentedAt,
+        address nftAddress,
+        uint256 tokenID,
+        uint8 paymentToken,
+        uint256 paid
+    );
+
+    event StopLend(uint256 indexed lendingID, uint32 stoppedAt, uint16 amount, address nftAddress, uint256 tokenID);
+
+    event StopRent(
+        uint256 indexed rentingID,
+        uint32 stoppedAt,
+        address indexed lenderAddress,
+        address indexed renterAddress,
+        address nftAddress,
+        uint256 tokenID,
+        uint256 lendingID,
+        uint8 paymentToken,
+        uint256 lenderAmount,
+        uint256 renterAmount,
+        uint256 fee
     );
 
-    event StopLend(uint256 indexed lendingID, uint32 stoppedAt, uint16 amount);
+    event RentClaimed(
+        uint256 indexed rentingID,
+        uint32 collectedAt,
+        address indexed lenderAddress,
+        address nftAddress,
+        uint256 tokenID,
+        uint256 lendingID,
+        uint8 paymentToken,
+        uint256 lenderAmount,
+        uint256 fee
+    );
+
+    event RentClaimSkipped(uint256 indexed rentingID, ClaimSkipReason reason);
+
+    event FeesWithdrawn(uint8 indexed paymentToken, address indexed beneficiary, uint256 amount);
+
+    event PullPaymentsSet(address indexed lenderAddress, bool enabled);
+
+    event CreditsWithdrawn(address indexed lenderAddress, uint8 indexed paymentToken, uint256 amount);
 
-    event StopRent(uint256 indexed rentingID, uint32 stoppedAt);
+    event LendOfferFilled(address indexed lenderAddress, uint256 indexed nonce, uint256 lendingID);
 
-    event RentClaimed(uint256 indexed rentingID, uint32 collectedAt);
+    event LendOfferCancelled(address indexed lenderAddress, uint256 indexed nonce);
 
     enum NFTStandard {
         E721,
         E1155
     }
 
-    struct CallData {
+    enum ClaimSkipReason {
+        NullLending,
+        NullRenting,
+        ReturnDateNotPassed
+    }
+
+    // The call data of a bundleCall, one struct per kind of call with only the columns its
+    // handler reads. left and right bound the current group ([left, right)), a run of items of
+    // the same nft, whose address and standard are cached in groupAddress and groupStandard.
+    struct LendCallData {
         uint256 left;
         uint256 right;
-        IRegistry.NFTStandard[] nftStandard;
+        address groupAddress;
+        NFTStandard groupStandard;
+        NFTStandard[] nftStandard;
         address[] nftAddress;
         uint256[] tokenID;
         uint256[] lendAmount;
         uint8[] maxRentDuration;
         bytes4[] dailyRentPrice;
+        uint8[] paymentToken;
+        bool[] willAutoRenew;
+    }
+
+    struct RentCallData {
+        uint256 left;
+        uint256 right;
+        address groupAddress;
+        NFTStandard groupStandard;
+        NFTStandard[] nftStandard;
+        address[] nftAddress;
+        uint256[] tokenID;
         uint256[] lendingID;
-        uint256[] rentingID;
         uint8[] rentDuration;
         uint256[] rentAmount;
-        uint8[] paymentToken;
-        bool[] willAutoRenew;
+    }
+
+    // stopLend (without rentingID), stopRent, claimRent and tryClaimRent
+    struct ActionCallData {
+        uint256 left;
+        uint256 right;
+        address groupAddress;
+        NFTStandard groupStandard;
+        NFTStandard[] nftStandard;
+        address[] nftAddress;
+        uint256[] tokenID;
+        uint256[] lendingID;
+        uint256[] rentingID;
     }
 
     // fits into a single storage slot
@@ -95,6 +168,48 @@ interface IRegistry {
         bool willAutoRenew;
     }
 
+    // where an enumerated lending is stored: at keccak256(nftAddress, tokenID, lendingID)
+    struct LendingKey {
+        address nftAddress;
+        uint256 tokenID;
+    }
+
+    // what distributePayments and distributeClaimPayment paid out
+    struct Payment {
+        address lenderAddress;
+        address renterAddress;
+        uint8 paymentToken;
+        uint256 lenderAmount;
+        uint256 renterAmount;
+        uint256 fee;
+    }
+
+    // nfts a bundleCall group sends back out, one entry per (recipient, tokenID)
+    struct Returns {
+        address[] recipient;
+        uint256[] tokenID;
+        uint256[] amount;
+        uint256 length;
+    }
+
+    // lend terms signed off-chain (EIP-712) by the lender, escrowed and rented in one go by
+    // rentOffers. All the fields are static, so abi.encode(LEND_OFFER_TYPEHASH, offer) is the
+    // struct's EIP-712 encoding
+    struct LendOffer {
+        address lenderAddress;
+        NFTStandard nftStandard;
+        address nftAddress;
+        uint256 tokenID;
+        uint16 lendAmount;
+        uint8 maxRentDuration;
+        bytes4 dailyRentPrice;
+        uint8 paymentToken;
+        bool willAutoRenew;
+        // one offer per nonce and lender: filling or cancelling an offer uses its nonce up
+        uint256 nonce;
+        uint256 deadline;
+    }
+
     // fits into a single storage slot
     // renterAddress 160
     // rentDuration  168
@@ -108,7 +223,7 @@ interface IRegistry {
         uint16 rentAmount;
     }
 
-    // creates the lending structs and adds them to the enumerable set
+    // creates the lending structs and, when enumeration is on, adds them to the enumerable sets
     function lend(
         IRegistry.NFTStandard[] memory nftStandard,
         address[] memory nftAddress,
@@ -127,7 +242,7 @@ interface IRegistry {
         uint256[] memory lendingID
     ) external;
 
-    // creates the renting structs and adds them to the enumerable set
+    // creates the renting structs
     function rent(
         IRegistry.NFTStandard[] memory nftStandard,
         address[] memory nftAddress,
@@ -152,6 +267,40 @@ interface IRegistry {
         uint256[] memory lendingID,
         uint256[] memory rentingID
     ) external;
+
+    // same as claimRent, but skips the rentings that cannot be claimed instead of reverting
+    function tryClaimRent(
+        IRegistry.NFTStandard[] memory nftStandard,
+        address[] memory nftAddress,
+        uint256[] memory tokenID,
+        uint256[] memory lendingID,
+        uint256[] memory rentingID
+    ) external;
+
+    // sends the fees accrued in each payment token to the beneficiary
+    function withdrawFees(uint8[] memory paymentToken) external;
+
+    // opts the sender in (or out) of pull payments: the rent of its lendings is credited to it
+    // rather than sent on every stopRent and claim. Credits stay withdrawable after opting out
+    function setPullPayments(bool enabled) external;
+
+    // sends the sender's credits in each payment token
+    function withdrawCredits(uint8[] memory paymentToken) external;
+
+    // lends each signed offer (escrowing the nft from its lender, who approved the Registry for
+    // the collection) and rents it to the sender, in one transaction
+    function rentOffers(
+        LendOffer[] memory offers,
+        bytes[] memory signatures,
+        uint8[] memory rentDuration,
+        uint256[] memory rentAmount
+    ) external payable;
+
+    // uses up the sender's offer nonces, so that their offers can no longer be filled
+    function cancelLendOffers(uint256[] memory nonces) external;
+
+    // the EIP-712 domain separator the offers are signed under
+    function domainSeparator() external view returns (bytes32);
 }
 
 //              @@@@@@@@@@@@@@@@        ,@@@@@@@@@@@@@@@@
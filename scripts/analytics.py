@@ -0,0 +1,631 @@
+import os
+from array import array
+from dataclasses import astuple, dataclass
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from scripts.model import (
+    SECONDS_IN_DAY,
+    Lending,
+    Renting,
+    RegistryRevert,
+    claim_payments,
+    price_to_int,
+    return_date,
+    stop_rent_payments,
+)
+
+# Historical analytics over the Registry's Lend, Rent, StopLend, StopRent and RentClaimed
+# events: the events are kept in columnar tables, and rolled up as they are loaded into what
+# the usual product questions read (rent paid, lender revenue, refunds and fees per payment
+# token per day, lent and rented unit-seconds per collection, rent durations per collection),
+# so that those questions are answered from the rollups in time independent of the history's
+# length. The tables and rollups are written to and read from Parquet files, one per table,
+# which DuckDB queries as they are, e.g. `SELECT * FROM 'analytics/rents.parquet'`. Writing
+# and reading them needs pyarrow.
+#
+# Amounts are exact integers, in the payment token's base units: what the events paid out,
+# and for the open rentings what distributePayments / distributeClaimPayment would pay
+# (scripts/model.py), which `verify` also checks the settlements against.
+
+# column kinds: an `array` type code, an address (dictionary encoded), a uint256 (32 bytes,
+# big endian, e.g. a token id) or an amount (16 bytes, little endian: an Arrow decimal128)
+ADDRESS = "address"
+UINT256 = "uint256"
+AMOUNT = "amount"
+# decimal128's precision
+MAX_AMOUNT = 10 ** 38
+
+TABLES = {
+    "lends": (
+        ("lending_id", "Q"),
+        ("lent_at", "I"),
+        ("lender", ADDRESS),
+        ("nft", ADDRESS),
+        ("token_id", UINT256),
+        ("is721", "B"),
+        ("max_rent_duration", "B"),
+        ("daily_rent_price", "I"),
+        ("lend_amount", "H"),
+        ("payment_token", "B"),
+        ("will_auto_renew", "B"),
+    ),
+    "rents": (
+        ("renting_id", "Q"),
+        ("lending_id", "Q"),
+        ("rented_at", "I"),
+        ("renter", ADDRESS),
+        ("nft", ADDRESS),
+        ("token_id", UINT256),
+        ("rent_amount", "H"),
+        ("rent_duration", "B"),
+        ("payment_token", "B"),
+        ("paid", AMOUNT),
+    ),
+    "stop_lends": (
+        ("lending_id", "Q"),
+        ("stopped_at", "I"),
+        ("nft", ADDRESS),
+        ("token_id", UINT256),
+        ("amount", "H"),
+    ),
+    # StopRent and RentClaimed (claimed, with no renter and no refund)
+    "settlements": (
+        ("renting_id", "Q"),
+        ("lending_id", "Q"),
+        ("settled_at", "I"),
+        ("claimed", "B"),
+        ("lender", ADDRESS),
+        ("renter", ADDRESS),
+        ("nft", ADDRESS),
+        ("token_id", UINT256),
+        ("payment_token", "B"),
+        ("lender_amount", AMOUNT),
+        ("renter_amount", AMOUNT),
+        ("fee", AMOUNT),
+    ),
+}
+
+ROLLUPS = {
+    "daily": (
+        ("day", "I"),
+        ("payment_token", "B"),
+        ("rentals", "Q"),
+        ("settlements", "Q"),
+        ("rent_paid", AMOUNT),
+        ("lender_amount", AMOUNT),
+        ("renter_amount", AMOUNT),
+        ("fee", AMOUNT),
+    ),
+    "collections": (
+        ("nft", ADDRESS),
+        ("lends", "Q"),
+        ("rentals", "Q"),
+        ("lent_closed", AMOUNT),
+        ("lent_units", "Q"),
+        ("lent_starts", AMOUNT),
+        ("rented_closed", AMOUNT),
+        ("rented_units", "Q"),
+        ("rented_starts", AMOUNT),
+    ),
+    "durations": (("nft", ADDRESS), ("rent_duration", "B"), ("count", "Q")),
+    "open_lendings": (
+        ("lending_id", "Q"),
+        ("nft", ADDRESS),
+        ("lent_at", "I"),
+        ("units", "H"),
+        ("daily_rent_price", "I"),
+    ),
+    "open_rentings": (
+        ("renting_id", "Q"),
+        ("nft", ADDRESS),
+        ("lending_id", "Q"),
+        ("payment_token", "B"),
+        ("daily_rent_price", "I"),
+        ("rent_amount", "H"),
+        ("rent_duration", "B"),
+        ("rented_at", "I"),
+    ),
+}
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+
+class AnalyticsError(Exception):
+    pass
+
+
+def import_pyarrow():
+    # pylint: disable=import-outside-toplevel
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise AnalyticsError("reading and writing the tables needs pyarrow") from e
+    return pyarrow, pyarrow.parquet
+
+
+class Dictionary:
+    """Addresses by code, shared by the address columns of all the tables."""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = dict()
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+def width(kind: str) -> int:
+    if kind == UINT256:
+        return 32
+    if kind == AMOUNT:
+        return 16
+    return array("I" if kind == ADDRESS else kind).itemsize
+
+
+class Table:
+    def __init__(self, schema: Sequence[Tuple[str, str]], addresses: Dictionary):
+        self.schema = tuple(schema)
+        self.addresses = addresses
+        self.columns = {
+            name: bytearray() if kind in (UINT256, AMOUNT) else array("I" if kind == ADDRESS else kind)
+            for name, kind in self.schema
+        }
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, row: Sequence) -> None:
+        for (name, kind), value in zip(self.schema, row):
+            if kind == AMOUNT and not 0 <= value < MAX_AMOUNT:
+                raise AnalyticsError(f"{name} out of range: {value}")
+        for (name, kind), value in zip(self.schema, row):
+            column = self.columns[name]
+            if kind == ADDRESS:
+                column.append(self.addresses.code(value))
+            elif kind == UINT256:
+                column += value.to_bytes(32, "big")
+            elif kind == AMOUNT:
+                column += value.to_bytes(16, "little")
+            else:
+                column.append(value)
+        self.size += 1
+
+    def value(self, name: str, i: int):
+        kind = dict(self.schema)[name]
+        column = self.columns[name]
+        if kind == ADDRESS:
+            return self.addresses.values[column[i]]
+        if kind == UINT256:
+            return int.from_bytes(column[32 * i : 32 * (i + 1)], "big")
+        if kind == AMOUNT:
+            return int.from_bytes(column[16 * i : 16 * (i + 1)], "little")
+        return column[i]
+
+    def rows(self) -> Iterator[Dict]:
+        for i in range(self.size):
+            yield {name: self.value(name, i) for name, _ in self.schema}
+
+    def to_arrow(self):
+        pa, _ = import_pyarrow()
+        types = {"B": pa.uint8(), "H": pa.uint16(), "I": pa.uint32(), "Q": pa.uint64(),
+                 UINT256: pa.binary(32), AMOUNT: pa.decimal128(38, 0)}
+        dictionary = pa.array(self.addresses.values, pa.string())
+        arrays = []
+        for name, kind in self.schema:
+            buffers = [None, pa.py_buffer(self.columns[name])]
+            if kind == ADDRESS:
+                indices = pa.Array.from_buffers(pa.uint32(), self.size, buffers)
+                arrays.append(pa.DictionaryArray.from_arrays(indices, dictionary))
+            else:
+                arrays.append(pa.Array.from_buffers(types[kind], self.size, buffers))
+        return pa.Table.from_arrays(arrays, names=[name for name, _ in self.schema])
+
+    @classmethod
+    def from_arrow(cls, schema: Sequence[Tuple[str, str]], table, addresses: Dictionary) -> "Table":
+        pa, _ = import_pyarrow()
+        result = cls(schema, addresses)
+        result.size = table.num_rows
+        for name, kind in result.schema:
+            column = table.column(name).combine_chunks()
+            if kind == ADDRESS:
+                # the file's dictionary codes to ours
+                codes = [addresses.code(value) for value in column.dictionary.to_pylist()]
+                column = pa.array(codes, pa.uint32()).take(column.indices)
+            size = width(kind)
+            start = size * column.offset
+            data = memoryview(column.buffers()[1])[start : start + size * table.num_rows]
+            if kind in (UINT256, AMOUNT):
+                result.columns[name] = bytearray(data)
+            else:
+                result.columns[name] = array("I" if kind == ADDRESS else kind, data.tobytes())
+        return result
+
+
+@dataclass
+class Daily:
+    rentals: int = 0
+    settlements: int = 0
+    # what the renters paid up front, in Rent
+    rent_paid: int = 0
+    # what StopRent and RentClaimed paid out
+    lender_amount: int = 0
+    renter_amount: int = 0
+    fee: int = 0
+
+
+@dataclass
+class Collection:
+    """
+    Lends and rentals of a collection, and the unit-seconds its nfts were lent and rented for.
+    Open lendings (rentings) count from their start until `now`, kept as the sum of their
+    units and of their units times their start, so that the totals take no scan.
+    """
+
+    lends: int = 0
+    rentals: int = 0
+    lent_closed: int = 0
+    lent_units: int = 0
+    lent_starts: int = 0
+    rented_closed: int = 0
+    rented_units: int = 0
+    rented_starts: int = 0
+
+    def lent(self, now: int) -> int:
+        return self.lent_closed + self.lent_units * now - self.lent_starts
+
+    def rented(self, now: int) -> int:
+        return self.rented_closed + self.rented_units * now - self.rented_starts
+
+
+@dataclass
+class OpenLending:
+    nft: str
+    lent_at: int
+    # what is left of lendAmount after the StopLends
+    units: int
+    daily_rent_price: int
+
+
+@dataclass
+class OpenRenting:
+    nft: str
+    lending_id: int
+    payment_token: int
+    # of its lending, 0 when the lending is older than the loaded history
+    daily_rent_price: int
+    rent_amount: int
+    rent_duration: int
+    rented_at: int
+
+
+def day_of(timestamp: int) -> int:
+    return timestamp // SECONDS_IN_DAY
+
+
+def median(histogram: Sequence[int]) -> Optional[int]:
+    total = sum(histogram)
+    if total == 0:
+        return None
+    seen = 0
+    for value, count in enumerate(histogram):
+        seen += count
+        if 2 * seen >= total:
+            return value
+    return None
+
+
+class Analytics:
+    """
+    Columnar tables of the Registry's events and their rollups. Events are applied in the
+    order they were emitted; Lend carries no timestamp, so it is given its block's.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self):
+        self.addresses = Dictionary()
+        self.tables = {name: Table(schema, self.addresses) for name, schema in TABLES.items()}
+        self.daily: Dict[Tuple[int, int], Daily] = dict()
+        self.collections: Dict[str, Collection] = dict()
+        # rentDuration (days) histograms, per collection and of all of them
+        self.durations: Dict[str, array] = dict()
+        self.all_durations = array("Q", [0] * 256)
+        self.open_lendings: Dict[int, OpenLending] = dict()
+        self.open_rentings: Dict[int, OpenRenting] = dict()
+
+    def apply(self, name: str, args: Mapping, timestamp: int = 0) -> None:
+        handler = getattr(self, f"on_{name}", None)
+        if handler is not None:
+            handler(args, timestamp)
+
+    def apply_events(self, events, block_time: Callable[[int], int]) -> None:
+        """Applies decoded events (scripts/events.py), `block_time` maps a block number to its time."""
+        for event in events:
+            self.apply(event.name, event, block_time(event.block_number) if event.name == "Lend" else 0)
+
+    def collection(self, nft: str) -> Collection:
+        collection = self.collections.get(nft)
+        if collection is None:
+            collection = self.collections[nft] = Collection()
+            self.durations[nft] = array("Q", [0] * 256)
+        return collection
+
+    def day(self, timestamp: int, payment_token: int) -> Daily:
+        key = (day_of(timestamp), payment_token)
+        daily = self.daily.get(key)
+        if daily is None:
+            daily = self.daily[key] = Daily()
+        return daily
+
+    def on_Lend(self, args: Mapping, timestamp: int) -> None:
+        nft, amount, price = args["nftAddress"], args["lendAmount"], price_to_int(args["dailyRentPrice"])
+        self.tables["lends"].append(
+            (
+                args["lendingID"],
+                timestamp,
+                args["lenderAddress"],
+                nft,
+                args["tokenID"],
+                args["is721"],
+                args["maxRentDuration"],
+                price,
+                amount,
+                args["paymentToken"],
+                args["willAutoRenew"],
+            )
+        )
+        collection = self.collection(nft)
+        collection.lends += 1
+        collection.lent_units += amount
+        collection.lent_starts += amount * timestamp
+        self.open_lendings[args["lendingID"]] = OpenLending(nft, timestamp, amount, price)
+
+    def on_Rent(self, args: Mapping, _=0) -> None:
+        nft, amount, rented_at = args["nftAddress"], args["rentAmount"], args["rentedAt"]
+        self.tables["rents"].append(
+            (
+                args["rentingID"],
+                args["lendingID"],
+                rented_at,
+                args["renterAddress"],
+                nft,
+                args["tokenID"],
+                amount,
+                args["rentDuration"],
+                args["paymentToken"],
+                args["paid"],
+            )
+        )
+        daily = self.day(rented_at, args["paymentToken"])
+        daily.rentals += 1
+        daily.rent_paid += args["paid"]
+        collection = self.collection(nft)
+        collection.rentals += 1
+        collection.rented_units += amount
+        collection.rented_starts += amount * rented_at
+        self.durations[nft][args["rentDuration"]] += 1
+        self.all_durations[args["rentDuration"]] += 1
+        lending = self.open_lendings.get(args["lendingID"])
+        self.open_rentings[args["rentingID"]] = OpenRenting(
+            nft,
+            args["lendingID"],
+            args["paymentToken"],
+            lending.daily_rent_price if lending is not None else 0,
+            amount,
+            args["rentDuration"],
+            rented_at,
+        )
+
+    def on_StopLend(self, args: Mapping, _=0) -> None:
+        self.tables["stop_lends"].append(
+            (args["lendingID"], args["stoppedAt"], args["nftAddress"], args["tokenID"], args["amount"])
+        )
+        lending = self.open_lendings.get(args["lendingID"])
+        if lending is None:
+            return
+        amount = min(args["amount"], lending.units)
+        collection = self.collections[lending.nft]
+        collection.lent_closed += amount * (args["stoppedAt"] - lending.lent_at)
+        collection.lent_units -= amount
+        collection.lent_starts -= amount * lending.lent_at
+        lending.units -= amount
+        if lending.units == 0:
+            del self.open_lendings[args["lendingID"]]
+
+    def on_StopRent(self, args: Mapping, _=0) -> None:
+        self.settle(args, args["stoppedAt"], False, args["renterAddress"], args["renterAmount"])
+
+    def on_RentClaimed(self, args: Mapping, _=0) -> None:
+        self.settle(args, args["collectedAt"], True, ZERO_ADDRESS, 0)
+
+    def settle(self, args: Mapping, settled_at: int, claimed: bool, renter: str, renter_amount: int) -> None:
+        # pylint: disable=too-many-arguments
+        self.tables["settlements"].append(
+            (
+                args["rentingID"],
+                args["lendingID"],
+                settled_at,
+                claimed,
+                args["lenderAddress"],
+                renter,
+                args["nftAddress"],
+                args["tokenID"],
+                args["paymentToken"],
+                args["lenderAmount"],
+                renter_amount,
+                args["fee"],
+            )
+        )
+        daily = self.day(settled_at, args["paymentToken"])
+        daily.settlements += 1
+        daily.lender_amount += args["lenderAmount"]
+        daily.renter_amount += renter_amount
+        daily.fee += args["fee"]
+        renting = self.open_rentings.pop(args["rentingID"], None)
+        if renting is None:
+            return
+        collection = self.collections[renting.nft]
+        collection.rented_closed += renting.rent_amount * (settled_at - renting.rented_at)
+        collection.rented_units -= renting.rent_amount
+        collection.rented_starts -= renting.rent_amount * renting.rented_at
+
+    # queries
+
+    def revenue(
+        self, payment_token: Optional[int] = None, start_day: int = 0, end_day: Optional[int] = None
+    ) -> Dict[Tuple[int, int], Daily]:
+        """(day, payment token) -> the day's flows, for the days in [start_day, end_day)."""
+        return {
+            key: daily
+            for key, daily in sorted(self.daily.items())
+            if (payment_token is None or key[1] == payment_token)
+            and key[0] >= start_day
+            and (end_day is None or key[0] < end_day)
+        }
+
+    def utilisation(self, now: int, nft: Optional[str] = None) -> Dict[str, float]:
+        """Rented over lent unit-seconds until `now`, per collection."""
+        collections = self.collections if nft is None else {nft: self.collections[nft]}
+        result = dict()
+        for address, collection in collections.items():
+            lent = collection.lent(now)
+            result[address] = collection.rented(now) / lent if lent > 0 else 0.0
+        return result
+
+    def median_rent_duration(self, nft: Optional[str] = None) -> Optional[int]:
+        """The median rentDuration (days), of a collection or of all of them."""
+        return median(self.all_durations if nft is None else self.durations.get(nft, []))
+
+    def accrued(self, now: int, decimals: Mapping[int, int], rent_fee: int = 0) -> Dict[int, int]:
+        """
+        Per payment token, what the lenders of the open rentings would be paid if they were
+        settled at `now`: stopRent's share until their return date, claimRent's after it.
+        """
+        result: Dict[int, int] = dict()
+        for renting_id, open_renting in self.open_rentings.items():
+            if open_renting.daily_rent_price == 0 or open_renting.payment_token not in decimals:
+                continue
+            lending, renting = self.reference(renting_id, open_renting)
+            token_decimals = decimals[open_renting.payment_token]
+            try:
+                if now > return_date(renting):
+                    amount, _ = claim_payments(lending, renting, token_decimals, rent_fee)
+                else:
+                    seconds = now - renting.rented_at
+                    amount, _, _ = stop_rent_payments(lending, renting, seconds, token_decimals, rent_fee)
+            except RegistryRevert:
+                # nothing is owed yet
+                continue
+            result[open_renting.payment_token] = result.get(open_renting.payment_token, 0) + amount
+        return result
+
+    @staticmethod
+    def reference(renting_id: int, open_renting: OpenRenting) -> Tuple[Lending, Renting]:
+        """The model's records of an open renting, for its payment maths."""
+        lending = Lending(0, ZERO_ADDRESS, 0, open_renting.daily_rent_price, 0, 0,
+                          open_renting.payment_token, False, open_renting.nft, 0, open_renting.lending_id)
+        renting = Renting(0, open_renting.nft, 0, ZERO_ADDRESS, open_renting.lending_id, renting_id,
+                          open_renting.rent_amount, open_renting.rent_duration, open_renting.rented_at)
+        return lending, renting
+
+    def verify(self, decimals: Mapping[int, int]) -> List[int]:
+        """
+        The rentingIDs of the settlements whose amounts are not what distributePayments /
+        distributeClaimPayment pay for their renting, with the fee counted as the lender's.
+        Settlements of rentings or lendings older than the loaded history are not checked.
+        """
+        lends, rents, settlements = self.tables["lends"], self.tables["rents"], self.tables["settlements"]
+        prices = dict(zip(lends.columns["lending_id"], lends.columns["daily_rent_price"]))
+        rows = {renting_id: i for i, renting_id in enumerate(rents.columns["renting_id"])}
+        mismatches = []
+        for i in range(len(settlements)):
+            renting_id = settlements.columns["renting_id"][i]
+            row, token = rows.get(renting_id), settlements.columns["payment_token"][i]
+            price = prices.get(settlements.columns["lending_id"][i])
+            if row is None or price is None or token not in decimals:
+                continue
+            lending, renting = self.reference(
+                renting_id,
+                OpenRenting(
+                    rents.value("nft", row),
+                    settlements.columns["lending_id"][i],
+                    token,
+                    price,
+                    rents.columns["rent_amount"][row],
+                    rents.columns["rent_duration"][row],
+                    rents.columns["rented_at"][row],
+                ),
+            )
+            lender_amount = settlements.value("lender_amount", i) + settlements.value("fee", i)
+            try:
+                if settlements.columns["claimed"][i]:
+                    expected = claim_payments(lending, renting, decimals[token])[0], 0
+                else:
+                    seconds = settlements.columns["settled_at"][i] - renting.rented_at
+                    expected = stop_rent_payments(lending, renting, seconds, decimals[token])[:2]
+            except RegistryRevert:
+                expected = None
+            if expected != (lender_amount, settlements.value("renter_amount", i)):
+                mismatches.append(renting_id)
+        return mismatches
+
+    # files
+
+    def rollup_tables(self) -> Dict[str, Table]:
+        tables = {name: Table(schema, self.addresses) for name, schema in ROLLUPS.items()}
+        for (day, token), daily in sorted(self.daily.items()):
+            tables["daily"].append((day, token, *astuple(daily)))
+        for nft, collection in self.collections.items():
+            tables["collections"].append((nft, *astuple(collection)))
+            for duration, count in enumerate(self.durations[nft]):
+                if count:
+                    tables["durations"].append((nft, duration, count))
+        for lending_id, lending in self.open_lendings.items():
+            tables["open_lendings"].append((lending_id, *astuple(lending)))
+        for renting_id, renting in self.open_rentings.items():
+            tables["open_rentings"].append((renting_id, *astuple(renting)))
+        return tables
+
+    def write(self, directory: str) -> None:
+        """Writes the tables and the rollups, as `<directory>/<table>.parquet`."""
+        _, parquet = import_pyarrow()
+        os.makedirs(directory, exist_ok=True)
+        for name, table in {**self.tables, **self.rollup_tables()}.items():
+            parquet.write_table(table.to_arrow(), os.path.join(directory, f"{name}.parquet"))
+
+    @classmethod
+    def read(cls, directory: str) -> "Analytics":
+        """The Analytics written by `write`, ready for more events: the rollups are read, not rebuilt."""
+        _, parquet = import_pyarrow()
+        analytics = cls()
+
+        def load(name, schema):
+            table = parquet.read_table(os.path.join(directory, f"{name}.parquet"))
+            return Table.from_arrow(schema, table, analytics.addresses)
+
+        for name, schema in TABLES.items():
+            analytics.tables[name] = load(name, schema)
+        rollups = {name: load(name, schema) for name, schema in ROLLUPS.items()}
+        for row in rollups["daily"].rows():
+            key = (row.pop("day"), row.pop("payment_token"))
+            analytics.daily[key] = Daily(**row)
+        for row in rollups["collections"].rows():
+            nft = row.pop("nft")
+            analytics.collection(nft)
+            analytics.collections[nft] = Collection(**row)
+        for row in rollups["durations"].rows():
+            analytics.durations[row["nft"]][row["rent_duration"]] = row["count"]
+            analytics.all_durations[row["rent_duration"]] += row["count"]
+        for row in rollups["open_lendings"].rows():
+            lending_id = row.pop("lending_id")
+            analytics.open_lendings[lending_id] = OpenLending(**row)
+        for row in rollups["open_rentings"].rows():
+            renting_id = row.pop("renting_id")
+            analytics.open_rentings[renting_id] = OpenRenting(**row)
+        return analytics
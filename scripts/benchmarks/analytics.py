@@ -0,0 +1,163 @@
+import random
+import tempfile
+from statistics import median
+
+from scripts.analytics import Analytics, AnalyticsError, import_pyarrow
+from scripts.benchmarks.stats import percentile, timed
+from scripts.model import (
+    SECONDS_IN_DAY,
+    Lending,
+    PaymentToken,
+    Renting,
+    claim_payments,
+    pack_price,
+    stop_rent_payments,
+)
+from scripts.tables import report
+
+# run with `brownie run benchmarks/analytics` (no chain needed)
+#
+# Loads EVENTS synthetic Registry events (lends, rents, and their returns, claims and stop
+# lends, over two years) into scripts/analytics.py and times the typical queries, which read
+# the rollups. With pyarrow installed, also times writing and reading the Parquet files, and a
+# scan of the rents table (rent paid per collection) with pyarrow's group_by.
+
+EVENTS = 10_000_000
+QUERIES = 20
+DAYS = 730
+NFTS = [f"0x{i:040x}" for i in range(1, 201)]
+DECIMALS = {PaymentToken.DAI.value: 18, PaymentToken.USDC.value: 6, PaymentToken.TUSD.value: 18}
+START = 1_600_000_000
+END = START + DAYS * SECONDS_IN_DAY
+
+
+def synthetic_events(rng: random.Random, count: int):
+    """
+    (name, args, timestamp): a lend, its rent and the rent's settlement (but for rentings still
+    open at END), until `count` events.
+    """
+    lending_id, emitted = 0, 0
+    while emitted < count:
+        lending_id += 1
+        lent_at = START + rng.randrange(DAYS * SECONDS_IN_DAY)
+        lending = Lending(0, f"0x{rng.randint(1, 50_000):040x}", rng.choice([1, 3, 7, 30]),
+                          pack_price(rng.randint(0, 20), rng.randint(1, 9999)), 1, 1,
+                          rng.choice(list(DECIMALS)), rng.random() < 0.5, rng.choice(NFTS),
+                          rng.randint(1, 10 ** 6), lending_id)
+        yield "Lend", {
+            "is721": True,
+            "lenderAddress": lending.lender_address,
+            "nftAddress": lending.nft_address,
+            "tokenID": lending.token_id,
+            "lendingID": lending_id,
+            "maxRentDuration": lending.max_rent_duration,
+            "dailyRentPrice": lending.daily_rent_price,
+            "lendAmount": 1,
+            "paymentToken": lending.payment_token,
+            "willAutoRenew": lending.will_auto_renew,
+        }, lent_at
+        renting = Renting(0, lending.nft_address, lending.token_id, f"0x{rng.randint(50_001, 500_000):040x}",
+                          lending_id, lending_id, 1, rng.randint(1, lending.max_rent_duration),
+                          lent_at + rng.randint(1, SECONDS_IN_DAY))
+        decimals = DECIMALS[lending.payment_token]
+        common = {
+            "rentingID": lending_id,
+            "lendingID": lending_id,
+            "nftAddress": lending.nft_address,
+            "tokenID": lending.token_id,
+            "paymentToken": lending.payment_token,
+        }
+        yield "Rent", {
+            **common,
+            "renterAddress": renting.renter_address,
+            "rentAmount": 1,
+            "rentDuration": renting.rent_duration,
+            "rentedAt": renting.rented_at,
+            "paid": claim_payments(lending, renting, decimals)[0],
+        }, 0
+        emitted += 2
+        if renting.rented_at + renting.rent_duration * SECONDS_IN_DAY >= END:
+            # still open at the end of the history
+            continue
+        if rng.random() < 0.3:
+            stopped_at = renting.rented_at + rng.randint(1, renting.rent_duration * SECONDS_IN_DAY)
+            lender_amount, renter_amount, fee = stop_rent_payments(
+                lending, renting, stopped_at - renting.rented_at, decimals
+            )
+            settlement = "StopRent", {
+                **common,
+                "stoppedAt": stopped_at,
+                "lenderAddress": lending.lender_address,
+                "renterAddress": renting.renter_address,
+                "lenderAmount": lender_amount,
+                "renterAmount": renter_amount,
+                "fee": fee,
+            }, 0
+        else:
+            stopped_at = renting.rented_at + renting.rent_duration * SECONDS_IN_DAY + rng.randint(1, 3600)
+            lender_amount, fee = claim_payments(lending, renting, decimals)
+            settlement = "RentClaimed", {
+                **common,
+                "collectedAt": stopped_at,
+                "lenderAddress": lending.lender_address,
+                "lenderAmount": lender_amount,
+                "fee": fee,
+            }, 0
+        if not lending.will_auto_renew:
+            yield "StopLend", {**common, "stoppedAt": stopped_at, "amount": 1}, 0
+            emitted += 1
+        yield settlement
+        emitted += 1
+
+
+def main():
+    rng = random.Random(42)
+    analytics = Analytics()
+
+    def load():
+        for name, args, timestamp in synthetic_events(rng, EVENTS):
+            analytics.apply(name, args, timestamp)
+
+    seconds = timed(load) / 1e6
+    print(f"loaded {EVENTS} events in {seconds:.1f}s ({EVENTS / seconds:.0f} events/s)")
+
+    now = END
+    last_month = (now // SECONDS_IN_DAY - 30, now // SECONDS_IN_DAY)
+    queries = {
+        "revenue per token per day": lambda: analytics.revenue(),
+        "USDC revenue, last 30 days": lambda: analytics.revenue(PaymentToken.USDC.value, *last_month),
+        "utilisation per collection": lambda: analytics.utilisation(now),
+        "utilisation of a collection": lambda: analytics.utilisation(now, NFTS[0]),
+        "median rent duration": lambda: analytics.median_rent_duration(),
+        "median rent duration of a collection": lambda: analytics.median_rent_duration(NFTS[0]),
+        "accrued rent of the open rentings": lambda: analytics.accrued(now, DECIMALS),
+    }
+    rows = []
+    for name, query in queries.items():
+        samples = [timed(query) for _ in range(QUERIES)]
+        rows.append([name, f"{median(samples):.1f}", f"{percentile(samples, 0.99):.1f}"])
+    report(f"queries over {EVENTS} events", ["query", "p50 us", "p99 us"], rows)
+
+    try:
+        _, parquet = import_pyarrow()
+    except AnalyticsError:
+        print("\npyarrow is not installed, skipping the Parquet files")
+        return
+    with tempfile.TemporaryDirectory() as directory:
+        write = timed(analytics.write, directory) / 1e6
+        read = timed(Analytics.read, directory) / 1e6
+        rents = parquet.read_table(f"{directory}/rents.parquet", columns=["nft", "paid"])
+        samples = [timed(rents.group_by("nft").aggregate, [("paid", "sum")]) for _ in range(5)]
+    report(
+        "Parquet files",
+        ["operation", "seconds"],
+        [
+            ["write", f"{write:.1f}"],
+            ["read", f"{read:.1f}"],
+            ["scan: rent paid per collection", f"{median(samples) / 1e6:.3f}"],
+        ],
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+from dataclasses import replace
+
+from scripts.benchmarks.stats import timed
+from scripts.simulator import Traffic, simulate
+from scripts.tables import report
+
+# run with `brownie run benchmarks/autorenew` (no chain needed)
+#
+# Projects a year of synthetic traffic with scripts/simulator.py, for a range of willAutoRenew
+# ratios: the lendings the Registry (and an indexer) holds at the end of each month, their
+# storage slots with the enumerable lending index on, and the month's settlement gas. Demand
+# is above supply, so that non-renewing lendings are all rented out and returned.
+
+DAYS = 360
+MONTH = 30
+RENEW_RATIOS = [0, 0.25, 0.5, 0.75, 1]
+TRAFFIC = Traffic(lends_per_day=300, rents_per_day=450, enumerable=True)
+
+
+def main():
+    rows = []
+    for renew_ratio in RENEW_RATIOS:
+        days = []
+        elapsed = timed(lambda: days.extend(simulate(replace(TRAFFIC, renew_ratio=renew_ratio), DAYS)))
+        for end in range(MONTH, DAYS + 1, MONTH):
+            month, last = days[end - MONTH : end], days[end - 1]
+            rows.append(
+                [
+                    renew_ratio,
+                    end // MONTH,
+                    last.lendings,
+                    last.idle_lendings,
+                    last.shrunk_lendings,
+                    last.rentings,
+                    last.storage_slots,
+                    sum(day.events for day in month),
+                    sum(day.settlement_transactions for day in month),
+                    sum(day.settlement_gas for day in month) // 10 ** 6,
+                ]
+            )
+        print(f"renew ratio {renew_ratio}: simulated in {elapsed / 1e6:.1f} s")
+    report(
+        f"{TRAFFIC.lends_per_day:g} lends and {TRAFFIC.rents_per_day:g} rent demands a day",
+        [
+            "renew ratio",
+            "month",
+            "lendings",
+            "idle",
+            "shrunk",
+            "rentings",
+            "storage slots",
+            "events",
+            "settlements txs",
+            "settlement gas (M)",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
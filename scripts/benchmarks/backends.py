@@ -0,0 +1,62 @@
+# pylint: disable=redefined-outer-name,invalid-name,no-name-in-module,unused-argument,too-few-public-methods,too-many-arguments,too-many-locals
+# type: ignore
+import os
+import subprocess
+import time
+
+from brownie import network, web3
+
+from scripts.benchmarks.stats import percentile, timed
+from scripts.deploy_test import setup
+from scripts.evm_backend import BACKEND, ENV_VAR, connect, disconnect
+from scripts.tables import report
+
+# run with `brownie run benchmarks/backends`
+#
+# Wall time of `brownie test tests/stateful_test.py` on ganache and on the in-process EVM of
+# scripts/evm_backend.py, each in its own process, and of the snapshot / revert pair every test
+# pays for (fn_isolation) on each backend, with the contracts deployed.
+
+STATEFUL_RUNS = 1
+SNAPSHOTS = 200
+
+
+def snapshot_revert(provider):
+    snapshot_id = provider.make_request("evm_snapshot", [])["result"]
+    provider.make_request("evm_revert", [snapshot_id])
+
+
+def snapshot_times(provider):
+    return [timed(snapshot_revert, provider) for _ in range(SNAPSHOTS)]
+
+
+def stateful(env):
+    start = time.perf_counter()
+    subprocess.run(["brownie", "test", "tests/stateful_test.py"], env=env, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    setup()
+    ganache = snapshot_times(web3.provider)
+    # the same contracts on a fresh in-process chain, ganache is stopped
+    network.disconnect()
+    connect()
+    setup()
+    in_process = snapshot_times(web3.provider)
+    disconnect()
+
+    rows = []
+    for name, times in (("ganache", ganache), (BACKEND, in_process)):
+        rows.append([name, f"{percentile(times, 0.5):.0f}", f"{percentile(times, 0.99):.0f}"])
+    report("snapshot + revert (µs)", ["backend", "p50", "p99"], rows)
+
+    # the brownie test processes launch (or create) their own chain
+    rows = []
+    for name, value in (("ganache", None), (BACKEND, BACKEND)):
+        env = {key: v for key, v in os.environ.items() if key != ENV_VAR}
+        if value is not None:
+            env[ENV_VAR] = value
+        seconds = [stateful(env) for _ in range(STATEFUL_RUNS)]
+        rows.append([name, f"{min(seconds):.1f}"])
+    report("brownie test tests/stateful_test.py, wall time (s)", ["backend", "best"], rows)
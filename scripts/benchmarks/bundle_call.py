@@ -0,0 +1,80 @@
+# pylint: disable=redefined-outer-name,invalid-name,no-name-in-module,unused-argument,too-few-public-methods,too-many-arguments,too-many-locals
+# type: ignore
+from brownie import accounts, chain
+
+from scripts.deploy_test import BILLION, setup
+from scripts.keeper import claim_args
+from scripts.model import NFTStandard, PaymentToken, pack_price
+from scripts.splitter import columns, lend_item, rent_item
+from scripts.tables import report
+
+# run with `brownie run benchmarks/bundle_call`
+#
+# Gas per item of lend, rent and stopRent across batch shapes: one collection (a single
+# bundleCall group), 721s then 1155s (two groups), two 721 collections alternating (a group per
+# item) and four collections of both standards alternating. Run it on two builds of the
+# Registry to compare how bundleCall walks the groups and what its handlers read.
+
+BATCH_SIZES = [1, 10, 50]
+
+
+def shapes(contracts):
+    e721 = (contracts["e721"], NFTStandard.E721.value)
+    e721b = (contracts["e721b"], NFTStandard.E721.value)
+    e1155 = (contracts["e1155"], NFTStandard.E1155.value)
+    e1155b = (contracts["e1155b"], NFTStandard.E1155.value)
+    return {
+        "one collection": lambda size: [e721] * size,
+        "721s then 1155s": lambda size: [e721] * (size - size // 2) + [e1155] * (size // 2),
+        "two alternating": lambda size: [[e721, e721b][i % 2] for i in range(size)],
+        "four alternating": lambda size: [[e721, e1155, e721b, e1155b][i % 4] for i in range(size)],
+    }
+
+
+def mint(nft, standard, lender):
+    txn = nft.faucet({"from": lender})
+    if standard == NFTStandard.E721.value:
+        return txn.events["Transfer"]["tokenId"]
+    return txn.events["TransferSingle"]["id"]
+
+
+def measure(contracts, nfts):
+    """Gas per item of lending, renting and returning the items of `nfts`, in that order."""
+    registry, mirror = contracts["registry"], contracts["mirror"]
+    lender, renter = accounts[2], accounts[3]
+    chain.snapshot()
+    for nft in {nft.address: nft for nft, _ in nfts}.values():
+        nft.setApprovalForAll(registry.address, True, {"from": lender})
+    items = [
+        lend_item(standard, nft.address, mint(nft, standard, lender), 1, 1, pack_price(1),
+                  PaymentToken.DAI.value, False)
+        for nft, standard in nfts
+    ]
+    lend_txn = registry.lend(*columns(items), {"from": lender})
+    mirror.apply_events(lend_txn.events)
+    lendings = [mirror.lendings[event["lendingID"]] for event in lend_txn.events["Lend"]]
+    rent_txn = registry.rent(*columns([rent_item(lending, 1, 1) for lending in lendings]), {"from": renter})
+    mirror.apply_events(rent_txn.events)
+    rentings = [mirror.rentings[event["rentingID"]] for event in rent_txn.events["Rent"]]
+    chain.sleep(100)
+    chain.mine()
+    stop_txn = registry.stopRent(*claim_args(rentings), {"from": renter})
+    mirror.apply_events(stop_txn.events)
+    chain.revert()
+    return [txn.gas_used // len(nfts) for txn in (lend_txn, rent_txn, stop_txn)]
+
+
+def main():
+    contracts = setup()
+    dai = contracts["payment_tokens"][PaymentToken.DAI.value]
+    dai.faucet({"from": accounts[3]})
+    dai.approve(contracts["registry"].address, BILLION, {"from": accounts[3]})
+    rows = []
+    for name, shape in shapes(contracts).items():
+        for size in BATCH_SIZES:
+            rows.append([name, size, *measure(contracts, shape(size))])
+    report(
+        "gas per item",
+        ["shape", "batch size", "lend", "rent", "stopRent"],
+        rows,
+    )
@@ -0,0 +1,87 @@
+# pylint: disable=redefined-outer-name,invalid-name,no-name-in-module,unused-argument,too-few-public-methods,too-many-arguments,too-many-locals
+# type: ignore
+from brownie import accounts, chain
+
+from scripts.deploy_test import lend, rent, setup, transact
+from scripts.keeper import ClaimKeeper, bundle_order, claim_args
+from scripts.model import SECONDS_IN_DAY, NFTStandard
+from scripts.tables import report
+
+# run with `brownie run benchmarks/claim_rent`
+#
+# A keeper decides what to claim from its view of the chain, and by the time its transaction
+# is mined some of those rentings are gone: the renter stopped the rent just before the return
+# date, or a rival keeper claimed it first. This compares, for the same stale batch,
+#   claimRent    - one batch, and when it reverts, one transaction per item
+#   tryClaimRent - one batch, skipping whatever is no longer claimable
+
+BATCH_SIZES = [10, 50]
+RACE_RATIOS = [0.0, 0.1, 0.3]
+
+
+def claim_with_fallback(registry, keeper, rentings):
+    txns = [transact(registry.claimRent, *claim_args(rentings), sender=keeper)]
+    if txns[0].status == 0:
+        txns += [transact(registry.claimRent, *claim_args([r]), sender=keeper) for r in rentings]
+    claimed = sum(txn.events.count("RentClaimed") for txn in txns if txn.status == 1)
+    return len(txns), sum(txn.gas_used for txn in txns), claimed
+
+
+def race(contracts, rentings, ratio, rival):
+    registry, mirror = contracts["registry"], contracts["mirror"]
+    raced = rentings[:: max(1, round(1 / ratio))][: round(len(rentings) * ratio)] if ratio else []
+    stopped, claimed = raced[: len(raced) // 2], raced[len(raced) // 2 :]
+    for renting in stopped:
+        txn = registry.stopRent(*claim_args([renting]), {"from": renting.renter_address})
+        mirror.apply_events(txn.events)
+    chain.sleep(SECONDS_IN_DAY + 1)
+    chain.mine()
+    if claimed:
+        txn = registry.claimRent(*claim_args(claimed), {"from": rival})
+        mirror.apply_events(txn.events)
+
+
+def main():
+    contracts = setup()
+    registry, mirror = contracts["registry"], contracts["mirror"]
+    lender, keeper, rival = accounts[2], accounts[4], accounts[5]
+    renters = [accounts[3], accounts[6]]
+
+    rows = []
+    for size in BATCH_SIZES:
+        for ratio in RACE_RATIOS:
+            lendings = lend(contracts, lender, contracts["e721"], size // 2, NFTStandard.E721.value)
+            lendings += lend(
+                contracts, lender, contracts["e1155"], size - size // 2, NFTStandard.E1155.value
+            )
+            rentings = []
+            for i, renter in enumerate(renters):
+                rentings += rent(contracts, renter, lendings[i :: len(renters)])
+            # the keeper's view, taken before the race
+            stale = sorted(rentings, key=bundle_order)
+            race(contracts, stale, ratio, rival)
+
+            chain.snapshot()
+            txns, gas, claimed = claim_with_fallback(registry, keeper, stale)
+            rows.append(["claimRent", size, ratio, txns, gas, claimed, gas // max(claimed, 1)])
+            chain.revert()
+
+            result = ClaimKeeper(registry, mirror, keeper, batch_size=size).claim(stale)
+            claimed = len(result.claimed)
+            rows.append(
+                [
+                    "tryClaimRent",
+                    size,
+                    ratio,
+                    result.transactions,
+                    result.gas_used,
+                    claimed,
+                    result.gas_used // max(claimed, 1),
+                ]
+            )
+
+    report(
+        "claim rent under races",
+        ["entry point", "batch", "raced", "txs", "gas", "claimed", "gas/claimed"],
+        rows,
+    )
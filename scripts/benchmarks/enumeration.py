@@ -0,0 +1,77 @@
+# pylint: disable=redefined-outer-name,invalid-name,no-name-in-module,unused-argument,too-few-public-methods,too-many-arguments,too-many-locals
+# type: ignore
+from brownie import accounts, chain, history
+
+from scripts.deploy_test import lend, setup
+from scripts.keeper import stop_lend_args
+from scripts.model import NFTStandard
+from scripts.tables import report
+
+# run with `brownie run benchmarks/enumeration`
+#
+# Gas per item of lend and stopLend with the enumerable lending index off and on, and the gas
+# of reading a page of a lender's lendings back. Each lender already has PRELOAD lendings, so
+# that the sets are not empty (the first entry of a set costs more than the next ones).
+
+BATCH_SIZES = [1, 10, 50]
+PRELOAD = 10
+PAGE = 50
+
+
+def measure(contracts, lender, nft, nft_standard, size):
+    registry, mirror = contracts["registry"], contracts["mirror"]
+    lendings = lend(contracts, lender, nft, size, nft_standard)
+    # the lend transaction is the last one `lend` sends
+    lend_gas = history[-1].gas_used
+    txn = registry.stopLend(*stop_lend_args(lendings), {"from": lender})
+    mirror.apply_events(txn.events)
+    return lend_gas, txn.gas_used
+
+
+def main():
+    contracts = setup()
+    registry = contracts["registry"]
+    lender = accounts[2]
+    nfts = [
+        ("721", contracts["e721"], NFTStandard.E721.value),
+        ("1155", contracts["e1155"], NFTStandard.E1155.value),
+    ]
+
+    results = dict()
+    page_gas = None
+    for enumerable in [False, True]:
+        chain.snapshot()
+        registry.setEnumerable(enumerable, {"from": accounts[0]})
+        for _, nft, nft_standard in nfts:
+            lend(contracts, lender, nft, PRELOAD, nft_standard)
+        for name, nft, nft_standard in nfts:
+            for size in BATCH_SIZES:
+                results[(enumerable, name, size)] = measure(contracts, lender, nft, nft_standard, size)
+        if enumerable:
+            lend(contracts, lender, contracts["e721"], PAGE, NFTStandard.E721.value)
+            page_gas = registry.getLenderLendings.estimate_gas(lender, 0, PAGE)
+        chain.revert()
+
+    rows = []
+    for name, _, _ in nfts:
+        for size in BATCH_SIZES:
+            lend_off, stop_off = results[(False, name, size)]
+            lend_on, stop_on = results[(True, name, size)]
+            rows.append(
+                [
+                    name,
+                    size,
+                    lend_off // size,
+                    lend_on // size,
+                    (lend_on - lend_off) // size,
+                    stop_off // size,
+                    stop_on // size,
+                    (stop_on - stop_off) // size,
+                ]
+            )
+    report(
+        "lend / stopLend gas per item, enumeration off vs on",
+        ["nft", "batch", "lend off", "lend on", "+lend", "stop off", "stop on", "+stop"],
+        rows,
+    )
+    print(f"\ngetLenderLendings, a page of {PAGE}: {page_gas} gas")
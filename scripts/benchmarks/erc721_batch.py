@@ -0,0 +1,67 @@
+# pylint: disable=redefined-outer-name,invalid-name,no-name-in-module,unused-argument,too-few-public-methods,too-many-arguments,too-many-locals
+# type: ignore
+from brownie import accounts, chain
+
+from scripts.deploy_test import setup
+from scripts.keeper import stop_lend_args
+from scripts.model import NFTStandard, PaymentToken, pack_price
+from scripts.tables import report
+
+# run with `brownie run benchmarks/erc721_batch`
+#
+# Gas per item of lend and stopLend for 721-only batches. Items of one collection make up a
+# single bundleCall group, transferred in one loop. Alternating two collections breaks the
+# batch into a group per item, which is what every 721 batch used to cost.
+
+BATCH_SIZES = [1, 2, 5, 10, 25, 50, 100]
+
+
+def lend_721s(contracts, lender, nfts, size):
+    registry, mirror = contracts["registry"], contracts["mirror"]
+    nft_addresses, token_ids = [], []
+    for nft in nfts:
+        nft.setApprovalForAll(registry.address, True, {"from": lender})
+    for i in range(size):
+        nft = nfts[i % len(nfts)]
+        nft_addresses.append(nft.address)
+        token_ids.append(nft.faucet({"from": lender}).events["Transfer"]["tokenId"])
+    txn = registry.lend(
+        [NFTStandard.E721.value] * size,
+        nft_addresses,
+        token_ids,
+        [1] * size,
+        [1] * size,
+        [pack_price(1)] * size,
+        [PaymentToken.DAI.value] * size,
+        [False] * size,
+        {"from": lender},
+    )
+    mirror.apply_events(txn.events)
+    return txn, [mirror.lendings[event["lendingID"]] for event in txn.events["Lend"]]
+
+
+def measure(contracts, lender, nfts, size):
+    chain.snapshot()
+    lend_txn, lendings = lend_721s(contracts, lender, nfts, size)
+    stop_txn = contracts["registry"].stopLend(*stop_lend_args(lendings), {"from": lender})
+    contracts["mirror"].apply_events(stop_txn.events)
+    chain.revert()
+    return lend_txn.gas_used // size, stop_txn.gas_used // size
+
+
+def main():
+    contracts = setup()
+    lender = accounts[2]
+    grouped = [contracts["e721"]]
+    alternating = [contracts["e721"], contracts["e721b"]]
+
+    rows = []
+    for size in BATCH_SIZES:
+        lend_grouped, stop_grouped = measure(contracts, lender, grouped, size)
+        lend_alternating, stop_alternating = measure(contracts, lender, alternating, size)
+        rows.append([size, lend_grouped, lend_alternating, stop_grouped, stop_alternating])
+    report(
+        "721 lend / stopLend gas per item, one collection vs two alternating",
+        ["batch", "lend", "lend alt", "stopLend", "stopLend alt"],
+        rows,
+    )
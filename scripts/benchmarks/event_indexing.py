@@ -0,0 +1,77 @@
+# pylint: disable=redefined-outer-name,invalid-name,no-name-in-module,unused-argument,too-few-public-methods,too-many-arguments,too-many-locals
+# type: ignore
+from brownie import accounts, chain, web3
+from brownie.network.event import _decode_logs as brownie_decode_logs
+
+from scripts.benchmarks.stats import timed
+from scripts.deploy_test import lend, rent, setup
+from scripts.events import PaymentLedger, decode_logs
+from scripts.keeper import claim_args
+from scripts.mirror import RegistryMirror
+from scripts.model import NFTStandard
+from scripts.tables import report
+
+# run with `brownie run benchmarks/event_indexing`
+#
+# Indexes a history of lends, rents, stopRents and claims, and times it three ways: brownie's
+# decoder with the follow-up reads an indexer needed when StopRent and RentClaimed only carried
+# the renting id (getRenting and getLending at the block before, to learn the nft and the
+# payment), brownie's decoder on its own, and the hand-written decoder of scripts/events.py.
+# All three feed a RegistryMirror; the last two also rebuild the payments with a PaymentLedger.
+
+BATCHES = 20
+BATCH_SIZE = 10
+REPEATS = 3
+
+
+def main():
+    contracts = setup()
+    registry = contracts["registry"]
+    start_block = registry.tx.block_number
+    lender, renter = accounts[2], accounts[3]
+    for i in range(BATCHES):
+        lendings = lend(contracts, lender, contracts["e1155"], BATCH_SIZE, NFTStandard.E1155.value, 5)
+        rentings = rent(contracts, renter, lendings)
+        chain.sleep(3600)
+        chain.mine()
+        if i % 2 == 0:
+            registry.stopRent(*claim_args(rentings), {"from": renter})
+        else:
+            chain.sleep(2 * 86400)
+            chain.mine()
+            registry.claimRent(*claim_args(rentings), {"from": lender})
+
+    logs = web3.eth.get_logs({"address": registry.address, "fromBlock": start_block, "toBlock": "latest"})
+
+    def with_reads():
+        events = brownie_decode_logs(logs)
+        RegistryMirror(registry.address).apply_events(events)
+        for event, log in zip(events, logs):
+            if event.name in ("StopRent", "RentClaimed"):
+                before = log["blockNumber"] - 1
+                registry.getRenting.call(
+                    event["nftAddress"], event["tokenID"], event["rentingID"], block_identifier=before
+                )
+                registry.getLending.call(
+                    event["nftAddress"], event["tokenID"], event["lendingID"], block_identifier=before
+                )
+
+    def brownie_only():
+        events = brownie_decode_logs(logs)
+        RegistryMirror(registry.address).apply_events(events)
+        PaymentLedger().apply_events(events)
+
+    def hand_written():
+        events = decode_logs(logs)
+        RegistryMirror(registry.address).apply_events(events)
+        PaymentLedger().apply_events(events)
+
+    rows = []
+    for name, fn in [
+        ("brownie + follow-up reads", with_reads),
+        ("brownie, events only", brownie_only),
+        ("scripts/events.py", hand_written),
+    ]:
+        ms = min(timed(fn) for _ in range(REPEATS)) / 1e3
+        rows.append([name, f"{ms:.1f}", f"{len(logs) / (ms / 1e3):.0f}"])
+    report(f"indexing {len(logs)} Registry logs", ["indexer", "ms", "events/s"], rows)
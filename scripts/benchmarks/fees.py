@@ -0,0 +1,54 @@
+# pylint: disable=redefined-outer-name,invalid-name,no-name-in-module,unused-argument,too-few-public-methods,too-many-arguments,too-many-locals
+# type: ignore
+from brownie import accounts, chain
+
+from scripts.deploy_test import lend, rent, setup
+from scripts.keeper import claim_args
+from scripts.model import NFTStandard, PaymentToken
+from scripts.tables import report
+
+# run with `brownie run benchmarks/fees`
+#
+# Gas per item of stopRent and claimRent without a rent fee and with one. The fee is accrued in
+# the Registry rather than sent to the beneficiary on every item, so it costs a storage update
+# per item (a cold one for the first item of a payment token in the transaction), and the
+# beneficiary pays for a single transfer per payment token when withdrawing.
+
+BATCH_SIZES = [1, 5, 10, 25]
+RENT_FEE = 500
+
+
+def settle(contracts, size):
+    registry, mirror = contracts["registry"], contracts["mirror"]
+    lender, renter = accounts[2], accounts[3]
+    lendings = lend(contracts, lender, contracts["e1155"], 2 * size, NFTStandard.E1155.value)
+    rentings = rent(contracts, renter, lendings)
+    chain.sleep(3600)
+    chain.mine()
+    stop = registry.stopRent(*claim_args(rentings[:size]), {"from": renter})
+    mirror.apply_events(stop.events)
+    chain.sleep(2 * 86400)
+    chain.mine()
+    claim = registry.claimRent(*claim_args(rentings[size:]), {"from": lender})
+    mirror.apply_events(claim.events)
+    return stop.gas_used // size, claim.gas_used // size
+
+
+def main():
+    contracts = setup()
+    registry = contracts["registry"]
+
+    rows = []
+    for size in BATCH_SIZES:
+        chain.snapshot()
+        stop_off, claim_off = settle(contracts, size)
+        registry.setRentFee(RENT_FEE, {"from": accounts[0]})
+        stop_on, claim_on = settle(contracts, size)
+        withdraw = registry.withdrawFees([PaymentToken.DAI.value], {"from": accounts[1]})
+        chain.revert()
+        rows.append([size, stop_off, stop_on, claim_off, claim_on, withdraw.gas_used])
+    report(
+        f"gas per item without a rent fee and with a {RENT_FEE / 100:.0f}% fee",
+        ["batch", "stopRent", "stopRent fee", "claimRent", "claimRent fee", "withdrawFees"],
+        rows,
+    )
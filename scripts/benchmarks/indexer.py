@@ -0,0 +1,61 @@
+# pylint: disable=redefined-outer-name,invalid-name,no-name-in-module,unused-argument,too-few-public-methods,too-many-arguments,too-many-locals
+# type: ignore
+from brownie import accounts, chain, web3
+
+from scripts.benchmarks.stats import timed
+from scripts.deploy_test import lend, rent, setup
+from scripts.indexer import Indexer, LogSource
+from scripts.mirror import RegistryMirror
+from scripts.model import NFTStandard
+from scripts.tables import report
+
+# run with `brownie run benchmarks/indexer`
+#
+# Indexes a history of BATCHES lend and rent batches, then replaces the last few rent batches
+# (REORG_DEPTHS) with a fork that rents other lendings, and times how long the indexer takes to
+# catch up (roll back the abandoned blocks and apply the new ones) against rebuilding the mirror
+# from all the logs.
+
+BATCHES = 40
+BATCH_SIZE = 10
+REORG_DEPTHS = [1, 5, 20]
+
+
+def main():
+    contracts = setup()
+    registry = contracts["registry"]
+    start_block = registry.tx.block_number
+    lender, renter = accounts[2], accounts[3]
+    lendings = []
+    for _ in range(BATCHES):
+        batch = lend(contracts, lender, contracts["e1155"], BATCH_SIZE, NFTStandard.E1155.value, 5)
+        rent(contracts, renter, batch)
+        lendings += batch
+
+    rows = []
+    for depth in REORG_DEPTHS:
+        index = Indexer(RegistryMirror(registry.address), LogSource(web3, registry.address), start_block)
+        index.poll()
+        chain.snapshot()
+        for i in range(depth):
+            rent(contracts, renter, lendings[i * BATCH_SIZE : (i + 1) * BATCH_SIZE])
+        index.poll()
+
+        # the fork rents other lendings, in as many blocks
+        chain.revert()
+        for i in range(depth):
+            rent(contracts, renter, lendings[-(i + 1) * BATCH_SIZE :][:BATCH_SIZE])
+        catch_up = timed(index.poll) / 1e3
+
+        def rebuild():
+            RegistryMirror(registry.address).sync(registry, start_block, "latest")
+
+        full = timed(rebuild) / 1e3
+        rows.append([depth, index.rolled_back, f"{catch_up:.1f}", f"{full:.1f}"])
+        chain.revert()
+
+    report(
+        f"recovering from a reorg after {BATCHES * 2} batches of {BATCH_SIZE}",
+        ["forked rent batches", "blocks rolled back", "indexer ms", "rebuild ms"],
+        rows,
+    )
@@ -0,0 +1,97 @@
+import random
+from statistics import median
+
+from scripts.benchmarks.stats import percentile, timed
+from scripts.listings import ListingIndex
+from scripts.mirror import RegistryMirror
+from scripts.model import Lending, NFTStandard, PaymentToken, pack_price
+from scripts.tables import report
+
+# run with `brownie run benchmarks/listings` (no chain needed)
+#
+# Builds the listing index over LISTINGS synthetic lendings and times top-k queries and the
+# incremental updates of a rent and of its return.
+
+LISTINGS = 1_000_000
+QUERIES = 1_000
+K = 20
+NFTS = [f"0x{i:040x}" for i in range(1, 201)]
+DURATIONS = [1, 1, 1, 3, 7, 7, 14, 30, 30, 90, 255]
+DECIMALS = {PaymentToken.DAI.value: 18, PaymentToken.USDC.value: 6, PaymentToken.TUSD.value: 18}
+
+
+def synthetic_lending(rng: random.Random, lending_id: int) -> Lending:
+    nft_standard = rng.choice([NFTStandard.E721.value, NFTStandard.E1155.value])
+    lend_amount = 1 if nft_standard == NFTStandard.E721.value else rng.randint(1, 10)
+    # prices are roughly log-uniform between 0.0001 and 100 tokens a day
+    price = int(10 ** rng.uniform(0, 6))
+    return Lending(
+        nft_standard=nft_standard,
+        lender_address=f"0x{rng.randint(1, 5000):040x}",
+        max_rent_duration=rng.choice(DURATIONS),
+        daily_rent_price=pack_price(price // 10000, price % 10000),
+        lend_amount=lend_amount,
+        available_amount=rng.randint(0, lend_amount) if rng.random() < 0.2 else lend_amount,
+        payment_token=rng.choice(list(DECIMALS)),
+        will_auto_renew=rng.random() < 0.5,
+        nft_address=rng.choice(NFTS),
+        token_id=rng.randint(1, 10_000),
+        lending_id=lending_id,
+    )
+
+
+def main():
+    rng = random.Random(42)
+    mirror = RegistryMirror()
+    mirror.lendings = {i: synthetic_lending(rng, i) for i in range(1, LISTINGS + 1)}
+
+    index = None
+
+    def build():
+        nonlocal index
+        index = ListingIndex(mirror, DECIMALS)
+
+    seconds = timed(build) / 1e6
+    print(f"indexed {len(index)} available listings out of {LISTINGS} in {seconds:.2f}s")
+
+    queries = {
+        "cheapest in USDC": {"payment_token": PaymentToken.USDC.value},
+        "1155, USDC, duration >= 7": {
+            "nft_standard": NFTStandard.E1155.value,
+            "payment_token": PaymentToken.USDC.value,
+            "min_duration": 7,
+        },
+        "721, DAI, duration >= 30": {
+            "nft_standard": NFTStandard.E721.value,
+            "payment_token": PaymentToken.DAI.value,
+            "min_duration": 30,
+        },
+        "1155, USDC, 5 available, duration >= 90": {
+            "nft_standard": NFTStandard.E1155.value,
+            "payment_token": PaymentToken.USDC.value,
+            "min_available": 5,
+            "min_duration": 90,
+        },
+        "single collection, USDC": {"payment_token": PaymentToken.USDC.value, "nft_address": NFTS[0]},
+    }
+    rows = []
+    for name, query in queries.items():
+        samples = [timed(index.top, K, **query) for _ in range(QUERIES)]
+        rows.append([name, f"{median(samples):.1f}", f"{percentile(samples, 0.99):.1f}"])
+
+    # a rent that takes the last available unit of a listing, and its return
+    updates = []
+    for lending_id in rng.sample(list(mirror.lendings), QUERIES):
+        lending = mirror.lendings[lending_id]
+        if lending.available_amount == 0:
+            continue
+        rented = Lending(**{**lending.__dict__, "available_amount": 0})
+        updates.append(timed(mirror.set_lending, lending_id, rented))
+        updates.append(timed(mirror.set_lending, lending_id, lending))
+    rows.append(["update (rent / return)", f"{median(updates):.1f}", f"{percentile(updates, 0.99):.1f}"])
+
+    report(f"top {K} queries over {LISTINGS} listings", ["query", "p50 us", "p99 us"], rows)
+
+
+if __name__ == "__main__":
+    main()
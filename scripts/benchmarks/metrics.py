@@ -0,0 +1,56 @@
+# pylint: disable=redefined-outer-name,invalid-name,no-name-in-module,unused-argument,too-few-public-methods,too-many-arguments,too-many-locals
+# type: ignore
+from brownie import accounts, chain, history, web3
+
+from scripts.benchmarks.stats import percentile, timed
+from scripts.deploy_test import lend, setup
+from scripts.metrics import METRICS, instrument_provider, record_transaction
+from scripts.model import NFTStandard
+from scripts.tables import report
+
+# run with `brownie run benchmarks/metrics`
+#
+# Overhead of scripts/metrics.py: the wall time of an RPC request and of a lend sent and
+# recorded, with the metrics off and on, and what a run of them looks like.
+
+CALLS = 2000
+LENDS = 50
+
+
+def lend_recorded(contracts):
+    chain.snapshot()
+    lend(contracts, accounts[2], contracts["e721"], 1, NFTStandard.E721.value)
+    # the faucet, approval and lend of the item
+    for txn in history[-3:]:
+        record_transaction(txn)
+    chain.revert()
+
+
+def measure(contracts):
+    calls = [timed(web3.provider.make_request, "eth_blockNumber", []) for _ in range(CALLS)]
+    lends = [timed(lend_recorded, contracts) for _ in range(LENDS)]
+    return calls, lends
+
+
+def main():
+    contracts = setup()
+    instrument_provider(web3.provider)
+    rows = []
+    for enabled in (False, True):
+        METRICS.enabled = enabled
+        calls, lends = measure(contracts)
+        rows.append(
+            [
+                "on" if enabled else "off",
+                f"{percentile(calls, 0.5):.0f}",
+                f"{percentile(calls, 0.99):.0f}",
+                f"{percentile(lends, 0.5):.0f}",
+                f"{percentile(lends, 0.99):.0f}",
+            ]
+        )
+    report(
+        "wall time (µs)",
+        ["metrics", "eth_blockNumber p50", "p99", "lend p50", "p99"],
+        rows,
+    )
+    print(METRICS.render())
@@ -0,0 +1,95 @@
+# pylint: disable=redefined-outer-name,invalid-name,no-name-in-module,unused-argument,too-few-public-methods,too-many-arguments,too-many-locals
+# type: ignore
+from brownie import accounts, chain
+
+from scripts.deploy_test import BILLION, setup
+from scripts.model import NFTStandard, PaymentToken, pack_price
+from scripts.offers import LendOffer, OfferBook, domain_separator, rent_offers, sign_offer
+from scripts.splitter import columns, lend_item, rent_item
+from scripts.tables import report
+
+# run with `brownie run benchmarks/offers`
+#
+# Gas per completed rental of a batch of 721s: lent with `lend` and then rented with `rent`
+# (two transactions, the lender paying for the first), vs signed off-chain and filled with
+# `rentOffers` (one transaction, paid for by the renter). The lender's setApprovalForAll is
+# left out of both.
+
+BATCH_SIZES = [1, 5, 10, 25, 50]
+
+
+def mint(contracts, lender, size):
+    nft = contracts["e721"]
+    nft.setApprovalForAll(contracts["registry"].address, True, {"from": lender})
+    return nft, [nft.faucet({"from": lender}).events["Transfer"]["tokenId"] for _ in range(size)]
+
+
+def lend_then_rent(contracts, lender, renter, size):
+    registry, mirror = contracts["registry"], contracts["mirror"]
+    nft, token_ids = mint(contracts, lender, size)
+    items = [
+        lend_item(NFTStandard.E721.value, nft.address, token_id, 1, 1, pack_price(1),
+                  PaymentToken.DAI.value, False)
+        for token_id in token_ids
+    ]
+    lend_txn = registry.lend(*columns(items), {"from": lender})
+    mirror.apply_events(lend_txn.events)
+    lendings = [mirror.lendings[event["lendingID"]] for event in lend_txn.events["Lend"]]
+    rent_txn = registry.rent(*columns([rent_item(lending, 1, 1) for lending in lendings]), {"from": renter})
+    return lend_txn.gas_used, rent_txn.gas_used
+
+
+def signed_offers(contracts, lender, renter, size):
+    registry = contracts["registry"]
+    nft, token_ids = mint(contracts, lender, size)
+    separator = domain_separator(chain.id, registry.address)
+    book = OfferBook(separator)
+    for nonce, token_id in enumerate(token_ids):
+        offer = LendOffer(
+            lender.address,
+            NFTStandard.E721.value,
+            nft.address,
+            token_id,
+            1,
+            1,
+            pack_price(1),
+            PaymentToken.DAI.value,
+            False,
+            nonce,
+            chain.time() + 86400,
+        )
+        book.add(sign_offer(offer, lender.private_key, separator), chain.time())
+    txn = rent_offers(registry, book, book.match(renter.address, chain.time(), 1), renter, 1)
+    return txn.gas_used
+
+
+def main():
+    contracts = setup()
+    lender, renter = accounts.add(), accounts[3]
+    accounts[0].transfer(lender, "10 ether")
+    dai = contracts["payment_tokens"][PaymentToken.DAI.value]
+    dai.faucet({"from": renter})
+    dai.approve(contracts["registry"].address, BILLION, {"from": renter})
+    rows = []
+    for size in BATCH_SIZES:
+        chain.snapshot()
+        lend_gas, rent_gas = lend_then_rent(contracts, lender, renter, size)
+        chain.revert()
+        chain.snapshot()
+        offers_gas = signed_offers(contracts, lender, renter, size)
+        chain.revert()
+        rows.append(
+            [
+                size,
+                lend_gas // size,
+                rent_gas // size,
+                (lend_gas + rent_gas) // size,
+                offers_gas // size,
+                f"{100 * (offers_gas - lend_gas - rent_gas) / (lend_gas + rent_gas):+.1f}",
+            ]
+        )
+    report(
+        "gas per completed rental",
+        ["batch size", "lend", "rent", "lend + rent", "rentOffers", "difference (%)"],
+        rows,
+    )
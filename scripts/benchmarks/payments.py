@@ -0,0 +1,53 @@
+# pylint: disable=redefined-outer-name,invalid-name,no-name-in-module,unused-argument,too-few-public-methods,too-many-arguments,too-many-locals
+# type: ignore
+from brownie import accounts, chain
+
+from scripts.deploy_test import lend, rent, setup
+from scripts.keeper import claim_args
+from scripts.model import NFTStandard
+from scripts.payments import LenderPayments
+from scripts.tables import report
+
+# run with `brownie run benchmarks/payments`
+#
+# Aggregate gas for a lender whose N rentings are settled one claimRent at a time (as they
+# come past their return date), with rent pushed to the lender on every settlement and with
+# pull payments: credited on every settlement, then withdrawn in one transaction.
+
+SETTLEMENTS = [1, 10, 50, 100]
+
+
+def settle(contracts, count, pull):
+    registry, mirror = contracts["registry"], contracts["mirror"]
+    lender, renter = accounts[2], accounts[3]
+    payments = LenderPayments(registry, lender)
+    if pull:
+        payments.set_pull(True)
+    lendings = lend(contracts, lender, contracts["e1155"], count, NFTStandard.E1155.value)
+    rentings = rent(contracts, renter, lendings)
+    chain.sleep(2 * 86400)
+    chain.mine()
+    settlements = 0
+    for renting in rentings:
+        txn = registry.claimRent(*claim_args([renting]), {"from": lender})
+        mirror.apply_events(txn.events)
+        settlements += txn.gas_used
+    withdraw = payments.withdraw() if pull else None
+    return settlements, withdraw.gas_used if withdraw is not None else 0
+
+
+def main():
+    contracts = setup()
+    rows = []
+    for count in SETTLEMENTS:
+        chain.snapshot()
+        push, _ = settle(contracts, count, pull=False)
+        chain.revert()
+        pull, withdraw = settle(contracts, count, pull=True)
+        chain.revert()
+        rows.append([count, push, pull + withdraw, withdraw, f"{100 * (pull + withdraw) / push:.1f}%"])
+    report(
+        "aggregate gas of a lender's settlements, push vs pull payments",
+        ["settlements", "push", "pull", "of which withdraw", "pull / push"],
+        rows,
+    )
@@ -0,0 +1,95 @@
+# pylint: disable=redefined-outer-name,invalid-name,no-name-in-module,unused-argument,too-few-public-methods,too-many-arguments,too-many-locals
+# type: ignore
+import itertools
+from dataclasses import astuple
+
+from brownie import accounts, chain
+
+from scripts.deploy_test import lend, rent, setup
+from scripts.model import NFTStandard, PaymentToken
+from scripts.portfolio import plan_returns, return_all
+from scripts.splitter import GasModel, fit
+from scripts.tables import report
+
+# run with `brownie run benchmarks/portfolio`
+#
+# A renter returning a portfolio of rentals spread over four collections (two of 721s, two of
+# 1155s) and two payment tokens, with scripts/portfolio.py's return_all. The stopRent gas model
+# is fitted first, on portfolios returned in a single transaction.
+
+CALIBRATION_SIZES = [1, 2, 4, 8]
+PORTFOLIO_SIZES = [1, 4, 16, 64, 128]
+GAS_CAP = 3_000_000
+
+
+def portfolio(contracts, size, kinds=4):
+    """`size` rentings of the renter, round robin over the first `kinds` collections."""
+    lender, renter = accounts[2], accounts[3]
+    collections = [
+        (contracts["e721"], NFTStandard.E721.value, PaymentToken.DAI.value),
+        (contracts["e1155"], NFTStandard.E1155.value, PaymentToken.USDC.value),
+        (contracts["e721b"], NFTStandard.E721.value, PaymentToken.USDC.value),
+        (contracts["e1155b"], NFTStandard.E1155.value, PaymentToken.DAI.value),
+    ][:kinds]
+    per_collection = []
+    for i, (nft, standard, token) in enumerate(collections):
+        count = size // kinds + (1 if i < size % kinds else 0)
+        if count:
+            lendings = lend(contracts, lender, nft, count, standard, payment_token=token)
+            per_collection.append(lendings)
+    # rented in the order a renter would have picked them up, not in bundle order
+    rows = itertools.zip_longest(*per_collection)
+    lendings = [lending for row in rows for lending in row if lending is not None]
+    rentings = rent(contracts, renter, lendings)
+    chain.sleep(100)
+    chain.mine()
+    return rentings
+
+
+def calibrate(contracts):
+    registry, mirror, renter = contracts["registry"], contracts["mirror"], accounts[3]
+    samples = []
+    for kinds in (1, 2, 3, 4):
+        for size in CALIBRATION_SIZES:
+            chain.snapshot()
+            portfolio(contracts, size * kinds, kinds)
+            # a model of zeros puts every item in one transaction
+            plan = plan_returns(mirror, renter.address, chain.time(), GasModel())
+            result = return_all(registry, mirror, renter, chain.time(), GasModel())
+            samples.append((plan.transactions[0], result.gas_used))
+            chain.revert()
+    return fit(samples)
+
+
+def main():
+    contracts = setup()
+    model = calibrate(contracts)
+    report(
+        "stopRent gas model",
+        ["base", "721 group", "1155 group", "721 item", "1155 item", "payment token"],
+        [astuple(model)],
+    )
+
+    registry, mirror, renter = contracts["registry"], contracts["mirror"], accounts[3]
+    rows = []
+    for size in PORTFOLIO_SIZES:
+        chain.snapshot()
+        portfolio(contracts, size)
+        now = chain.time()
+        plan = plan_returns(mirror, renter.address, now, model, GAS_CAP)
+        result = return_all(registry, mirror, renter, now, model, GAS_CAP)
+        rows.append(
+            [
+                size,
+                result.transactions,
+                result.gas_used,
+                result.gas_used // size,
+                f"{100 * (plan.total_gas - result.gas_used) / result.gas_used:+.1f}",
+            ]
+        )
+        chain.revert()
+    report(
+        f"returning a portfolio, under {GAS_CAP} gas per transaction",
+        ["rentings", "transactions", "gas used", "gas / item", "estimate error (%)"],
+        rows,
+    )
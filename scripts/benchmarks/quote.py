@@ -0,0 +1,67 @@
+# pylint: disable=redefined-outer-name,invalid-name,no-name-in-module,unused-argument,too-few-public-methods,too-many-arguments,too-many-locals
+# type: ignore
+import random
+import time
+
+from brownie import accounts, web3
+
+from scripts.deploy_test import lend, setup
+from scripts.model import NFTStandard, PaymentToken, pack_price
+from scripts.quote import LendingCache, Quoter, TokenCache
+from scripts.tables import report
+
+# run with `brownie run benchmarks/quote`
+#
+# Quotes random carts of CART_SIZE mixed 721 / 1155 lendings in mixed payment tokens, with no
+# caching (fresh caches for every quote), and with the caches warmed up.
+
+LENDINGS_PER_KIND = 20
+CART_SIZE = 10
+QUOTES = 200
+
+
+def main():
+    contracts = setup()
+    lender = accounts[2]
+    lendings = []
+    for payment_token in (PaymentToken.DAI.value, PaymentToken.USDC.value):
+        lendings += lend(
+            contracts, lender, contracts["e721"], LENDINGS_PER_KIND, NFTStandard.E721.value,
+            max_rent_duration=7, payment_token=payment_token,
+        )
+        lendings += lend(
+            contracts, lender, contracts["e1155"], LENDINGS_PER_KIND, NFTStandard.E1155.value,
+            lend_amount=5, max_rent_duration=7, daily_rent_price=pack_price(0, 2500),
+            payment_token=payment_token,
+        )
+    rng = random.Random(42)
+    carts = []
+    for _ in range(QUOTES):
+        picked = rng.sample(lendings, CART_SIZE)
+        carts.append(
+            (
+                [lending.nft_standard for lending in picked],
+                [lending.nft_address for lending in picked],
+                [lending.token_id for lending in picked],
+                [lending.lending_id for lending in picked],
+                [rng.randint(1, 7) for _ in picked],
+                [1 for _ in picked],
+            )
+        )
+
+    def fresh():
+        return Quoter(TokenCache(web3, contracts["resolver"]), LendingCache(contracts["registry"]))
+
+    rows = []
+    warm = fresh()
+    for name, quoter in [("uncached", None), ("cached", warm)]:
+        if quoter is not None:
+            for cart in carts:
+                quoter.quote(*cart)
+        start = time.perf_counter()
+        for cart in carts:
+            (quoter or fresh()).quote(*cart, renter=accounts[3].address)
+        elapsed = time.perf_counter() - start
+        rows.append([name, f"{QUOTES / elapsed:.1f}", f"{QUOTES * CART_SIZE / elapsed:.1f}"])
+
+    report(f"quoting carts of {CART_SIZE}", ["caches", "carts/s", "items/s"], rows)
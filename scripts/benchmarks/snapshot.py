@@ -0,0 +1,63 @@
+import os
+import random
+import tempfile
+from statistics import median
+
+from scripts.benchmarks.listings import synthetic_lending
+from scripts.benchmarks.stats import percentile, timed
+from scripts.benchmarks.timeline import synthetic_renting
+from scripts.mirror import RegistryMirror
+from scripts.snapshot import Snapshot, write_snapshot
+from scripts.tables import report
+
+# run with `brownie run benchmarks/snapshot` (no chain needed)
+#
+# Writes a snapshot of LENDINGS synthetic lendings and RENTINGS rentings, then times a cold
+# start from it (open and a mirror over the mapped records), point lookups, and decoding it
+# all into plain dicts.
+
+LENDINGS = 1_000_000
+RENTINGS = 500_000
+LOOKUPS = 10_000
+
+
+def main():
+    rng = random.Random(42)
+    mirror = RegistryMirror()
+    mirror.lendings = {i: synthetic_lending(rng, i) for i in range(1, LENDINGS + 1)}
+    mirror.rentings = {i: synthetic_renting(rng, i) for i in range(1, RENTINGS + 1)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "registry.snapshot")
+        write = timed(write_snapshot, path, mirror, 1, "0x" + "00" * 32) / 1e6
+        print(f"wrote {os.path.getsize(path) / 1e6:.1f}MB in {write:.2f}s")
+
+        snapshots = []
+
+        def cold_start():
+            snapshot = Snapshot(path)
+            snapshots.append(snapshot)
+            return snapshot.mirror()
+
+        starts = [timed(cold_start) for _ in range(10)]
+        snapshot = snapshots[0]
+        restarted = snapshot.mirror()
+        lendings = [timed(restarted.lendings.get, rng.randint(1, LENDINGS)) for _ in range(LOOKUPS)]
+        rentings = [timed(restarted.rentings.get, rng.randint(1, RENTINGS)) for _ in range(LOOKUPS)]
+        load = timed(snapshot.load)
+        rows = [
+            ["cold start (open + mirror)", f"{median(starts):.1f}", f"{max(starts):.1f}"],
+            ["lending lookup", f"{median(lendings):.1f}", f"{percentile(lendings, 0.99):.1f}"],
+            ["renting lookup", f"{median(rentings):.1f}", f"{percentile(rentings, 0.99):.1f}"],
+            ["decode everything into dicts", f"{load:.0f}", f"{load:.0f}"],
+        ]
+        for opened in snapshots:
+            opened.close()
+
+    report(
+        f"snapshot of {LENDINGS} lendings and {RENTINGS} rentings", ["operation", "p50 us", "p99 us"], rows
+    )
+
+
+if __name__ == "__main__":
+    main()
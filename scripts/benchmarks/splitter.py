@@ -0,0 +1,160 @@
+# pylint: disable=redefined-outer-name,invalid-name,no-name-in-module,unused-argument,too-few-public-methods,too-many-arguments,too-many-locals
+# type: ignore
+import itertools
+import random
+from dataclasses import astuple
+
+from brownie import accounts, chain
+
+from scripts.deploy_test import BILLION, setup
+from scripts.model import NFTStandard, pack_price
+from scripts.payments import PAYMENT_TOKENS
+from scripts.splitter import columns, fit, lend_item, rent_item, save_model, split
+from scripts.tables import report
+
+# run with `brownie run benchmarks/splitter` (or `brownie run benchmarks/splitter main <path>`
+# to also save the fitted models, for scripts/splitter.py's load_model)
+#
+# Fits the gas models of lend and rent on carts of every shape (721s and 1155s, one or two
+# collections, one to three payment tokens, a few sizes), then checks them on random mixed carts
+# and splits a large cart under a gas cap, sending every transaction of the plan.
+
+SIZES = [1, 4, 12]
+RANDOM_CARTS = 20
+LARGE_CART = 300
+GAS_CAP = 8_000_000
+
+
+def collections(contracts, shape):
+    """The (nft, standard) of each item of a cart of the given shape, grouped by collection."""
+    standard, count = shape
+    if standard == NFTStandard.E721.value:
+        return [(contracts["e721"], standard), (contracts["e721b"], standard)][:count]
+    return [(contracts["e1155"], standard), (contracts["e1155b"], standard)][:count]
+
+
+def mint(nft, standard, lender):
+    txn = nft.faucet({"from": lender})
+    if standard == NFTStandard.E721.value:
+        return txn.events["Transfer"]["tokenId"]
+    return txn.events["TransferSingle"]["id"]
+
+
+def lend_cart(contracts, lender, nfts, tokens):
+    """`nfts` is the (nft, standard) of each item, `tokens` their payment tokens."""
+    registry = contracts["registry"]
+    for nft in {nft.address: nft for nft, _ in nfts}.values():
+        nft.setApprovalForAll(registry.address, True, {"from": lender})
+    items = []
+    for (nft, standard), token in zip(nfts, tokens):
+        token_id = mint(nft, standard, lender)
+        items.append(lend_item(standard, nft.address, token_id, 1, 7, pack_price(1), token, False))
+    return items
+
+
+def send(contracts, method, items, sender):
+    registry, mirror = contracts["registry"], contracts["mirror"]
+    txn = getattr(registry, method)(*columns(items), {"from": sender})
+    mirror.apply_events(txn.events)
+    return txn
+
+
+def lend_and_rent(contracts, nfts, tokens):
+    """Lends then rents a cart, returns the items and gas used of each transaction."""
+    lender, renter = accounts[2], accounts[3]
+    items = lend_cart(contracts, lender, nfts, tokens)
+    lend_txn = send(contracts, "lend", items, lender)
+    mirror = contracts["mirror"]
+    lendings = [mirror.lendings[event["lendingID"]] for event in lend_txn.events["Lend"]]
+    rent_items = [rent_item(lending, 1, 1) for lending in lendings]
+    rent_txn = send(contracts, "rent", rent_items, renter)
+    return (items, lend_txn.gas_used), (rent_items, rent_txn.gas_used)
+
+
+def cart_shapes(contracts):
+    shapes = itertools.product(
+        itertools.product([NFTStandard.E721.value, NFTStandard.E1155.value], [1, 2]),
+        SIZES,
+        [1, 2, 3],
+    )
+    for shape, size, token_count in shapes:
+        nfts = collections(contracts, shape)
+        # the collections one after the other, each a bundleCall group
+        per_nft = [nft for nft in nfts for _ in range(size)]
+        yield per_nft, [PAYMENT_TOKENS[i % token_count] for i in range(len(per_nft))]
+    # mixed standards
+    for size in SIZES:
+        nfts = collections(contracts, (NFTStandard.E721.value, 1)) * size
+        nfts += collections(contracts, (NFTStandard.E1155.value, 1)) * size
+        yield nfts, [PAYMENT_TOKENS[0]] * len(nfts)
+
+
+def random_cart(contracts, rng, size):
+    """Items of random collections, sorted by collection, in random payment tokens."""
+    kinds = [
+        (contracts["e721"], NFTStandard.E721.value),
+        (contracts["e721b"], NFTStandard.E721.value),
+        (contracts["e1155"], NFTStandard.E1155.value),
+        (contracts["e1155b"], NFTStandard.E1155.value),
+    ]
+    nfts = sorted((rng.choice(kinds) for _ in range(size)), key=lambda kind: kinds.index(kind))
+    return nfts, [rng.choice(PAYMENT_TOKENS) for _ in range(size)]
+
+
+def error(model, items, gas_used):
+    return 100 * (model.estimate(items) - gas_used) / gas_used
+
+
+def main(path=None):
+    contracts = setup()
+    renter = accounts[3]
+    for token in contracts["payment_tokens"].values():
+        token.faucet({"from": renter})
+        token.approve(contracts["registry"].address, BILLION, {"from": renter})
+
+    lend_samples, rent_samples = [], []
+    for nfts, tokens in cart_shapes(contracts):
+        chain.snapshot()
+        lend_sample, rent_sample = lend_and_rent(contracts, nfts, tokens)
+        chain.revert()
+        lend_samples.append(lend_sample)
+        rent_samples.append(rent_sample)
+    models = {"lend": fit(lend_samples), "rent": fit(rent_samples)}
+    report(
+        "fitted gas models",
+        ["call", "base", "721 group", "1155 group", "721 item", "1155 item", "payment token"],
+        [[name, *astuple(model)] for name, model in models.items()],
+    )
+    if path is not None:
+        save_model(path, models)
+
+    rng = random.Random(42)
+    errors = {"lend": [], "rent": []}
+    for _ in range(RANDOM_CARTS):
+        chain.snapshot()
+        cart = random_cart(contracts, rng, rng.randint(1, 30))
+        lend_sample, rent_sample = lend_and_rent(contracts, *cart)
+        chain.revert()
+        errors["lend"].append(error(models["lend"], *lend_sample))
+        errors["rent"].append(error(models["rent"], *rent_sample))
+    report(
+        f"estimate error on {RANDOM_CARTS} random carts (%)",
+        ["call", "mean", "min", "max"],
+        [
+            [name, f"{sum(e) / len(e):+.2f}", f"{min(e):+.2f}", f"{max(e):+.2f}"]
+            for name, e in errors.items()
+        ],
+    )
+
+    # a large cart, split under the cap and sent
+    lender = accounts[2]
+    nfts, tokens = random_cart(contracts, rng, LARGE_CART)
+    rng.shuffle(nfts)
+    items = lend_cart(contracts, lender, nfts, tokens)
+    plan = split(items, models["lend"], GAS_CAP)
+    used = [send(contracts, "lend", tx, lender).gas_used for tx in plan.transactions]
+    report(
+        f"lend of {LARGE_CART} items in random order, split under {GAS_CAP} gas",
+        ["transactions", "estimated gas", "gas used", "largest transaction"],
+        [[len(plan.transactions), plan.total_gas, sum(used), max(used)]],
+    )
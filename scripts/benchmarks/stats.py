@@ -0,0 +1,17 @@
+import time
+from typing import List
+
+# helpers shared by the benchmarks that do not need a chain
+
+
+def timed(fn, *args, **kwargs) -> float:
+    """Wall time of a single call, in microseconds."""
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return (time.perf_counter() - start) * 1e6
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
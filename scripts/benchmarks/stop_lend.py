@@ -0,0 +1,87 @@
+# pylint: disable=redefined-outer-name,invalid-name,no-name-in-module,unused-argument,too-few-public-methods,too-many-arguments,too-many-locals
+# type: ignore
+from brownie import accounts, chain
+
+from scripts.deploy_test import rent, setup
+from scripts.keeper import claim_args, stop_lend_args
+from scripts.model import NFTStandard, PaymentToken, pack_price
+from scripts.tables import report
+
+# run with `brownie run benchmarks/stop_lend`
+#
+# A lender exiting 50 1155 lendings at once, with stopLend, and renters returning them all
+# with stopRent (no auto renewal, so every renting sends its tokens back to the lender). The
+# lendings are spread over fewer and fewer token ids: returns of the same token id add up
+# into a single entry of the transfer, so the gas per item falls as the copies per id grow.
+
+LENDINGS = 50
+# (token ids, lendings of each token id); the E1155 faucet mints 10 copies of an id
+LAYOUTS = [(50, 1), (25, 2), (10, 5), (5, 10)]
+
+
+def lend_copies(contracts, lender, ids, copies):
+    registry, mirror, nft = contracts["registry"], contracts["mirror"], contracts["e1155"]
+    nft.setApprovalForAll(registry.address, True, {"from": lender})
+    token_ids = []
+    for _ in range(ids):
+        token_id = nft.faucet({"from": lender}).events["TransferSingle"]["id"]
+        token_ids += [token_id] * copies
+    count = len(token_ids)
+    txn = registry.lend(
+        [NFTStandard.E1155.value] * count,
+        [nft.address] * count,
+        token_ids,
+        [1] * count,
+        [1] * count,
+        [pack_price(1)] * count,
+        [PaymentToken.DAI.value] * count,
+        [False] * count,
+        {"from": lender},
+    )
+    mirror.apply_events(txn.events)
+    return [mirror.lendings[event["lendingID"]] for event in txn.events["Lend"]]
+
+
+def transferred_ids(txn):
+    sent = 0
+    if "TransferSingle" in txn.events:
+        sent += len(txn.events["TransferSingle"])
+    if "TransferBatch" in txn.events:
+        sent += sum(len(event["ids"]) for event in txn.events["TransferBatch"])
+    return sent
+
+
+def main():
+    contracts = setup()
+    registry, mirror = contracts["registry"], contracts["mirror"]
+    lender, renter = accounts[2], accounts[3]
+
+    rows = []
+    for ids, copies in LAYOUTS:
+        chain.snapshot()
+        lendings = lend_copies(contracts, lender, ids, copies)
+        stop_lend = registry.stopLend(*stop_lend_args(lendings), {"from": lender})
+        mirror.apply_events(stop_lend.events)
+
+        lendings = lend_copies(contracts, lender, ids, copies)
+        rentings = rent(contracts, renter, lendings)
+        chain.sleep(100)
+        chain.mine()
+        stop_rent = registry.stopRent(*claim_args(rentings), {"from": renter})
+        mirror.apply_events(stop_rent.events)
+        chain.revert()
+
+        rows.append(
+            [
+                f"{ids} x {copies}",
+                stop_lend.gas_used // LENDINGS,
+                transferred_ids(stop_lend),
+                stop_rent.gas_used // LENDINGS,
+                transferred_ids(stop_rent),
+            ]
+        )
+    report(
+        f"exiting {LENDINGS} 1155 lendings, gas per item",
+        ["ids x copies", "stopLend", "ids sent", "stopRent", "ids sent"],
+        rows,
+    )
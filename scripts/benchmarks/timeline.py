@@ -0,0 +1,90 @@
+import random
+from dataclasses import replace
+from statistics import median
+
+from scripts.benchmarks.stats import percentile, timed
+from scripts.mirror import RegistryMirror
+from scripts.model import SECONDS_IN_DAY, NFTStandard, Renting, is_claimable
+from scripts.tables import report
+from scripts.timeline import ExpiryTimeline
+
+# run with `brownie run benchmarks/timeline` (no chain needed)
+#
+# Builds the expiry timeline over RENTINGS synthetic active rentings and times range queries,
+# cursor advances and incremental updates, against a scan of the mirror.
+
+RENTINGS = 1_000_000
+QUERIES = 1_000
+SCANS = 5
+NOW = 1_700_000_000
+DURATIONS = [1, 1, 1, 3, 7, 7, 14, 30, 30, 90, 255]
+
+
+def synthetic_renting(rng: random.Random, renting_id: int) -> Renting:
+    rent_duration = rng.choice(DURATIONS)
+    return Renting(
+        nft_standard=rng.choice([NFTStandard.E721.value, NFTStandard.E1155.value]),
+        nft_address=f"0x{rng.randint(1, 200):040x}",
+        token_id=rng.randint(1, 10_000),
+        renter_address=f"0x{rng.randint(1, 5000):040x}",
+        lending_id=renting_id,
+        renting_id=renting_id,
+        rent_amount=1,
+        rent_duration=rent_duration,
+        # rented at some point during the rent duration before NOW
+        rented_at=NOW - rng.randint(1, rent_duration * SECONDS_IN_DAY),
+    )
+
+
+def main():
+    rng = random.Random(42)
+    mirror = RegistryMirror()
+    mirror.rentings = {i: synthetic_renting(rng, i) for i in range(1, RENTINGS + 1)}
+
+    timeline = None
+
+    def build():
+        nonlocal timeline
+        timeline = ExpiryTimeline(mirror)
+
+    seconds = timed(build) / 1e6
+    print(f"indexed {len(timeline)} rentings in {seconds:.2f}s")
+
+    def scan(now):
+        return [r for r in mirror.rentings.values() if is_claimable(r, now)]
+
+    rows = []
+    scans = [timed(scan, NOW + 60) for _ in range(SCANS)]
+    rows.append(["claimable, mirror scan", f"{median(scans):.1f}", f"{max(scans):.1f}"])
+
+    def window():
+        start = NOW + rng.randint(0, 30 * SECONDS_IN_DAY)
+        return list(timeline.between(start, start + 3600))
+
+    queries = {
+        "claimable in the next minute": lambda: list(timeline.expired(NOW + 60)),
+        "expiring in a 1 hour window": window,
+        "next expiry": lambda: timeline.next_expiry(NOW + rng.randint(0, 30 * SECONDS_IN_DAY)),
+    }
+    for name, query in queries.items():
+        samples = [timed(query) for _ in range(QUERIES)]
+        rows.append([name, f"{median(samples):.1f}", f"{percentile(samples, 0.99):.1f}"])
+
+    # a keeper polling every 12s (one block)
+    cursor = timeline.cursor(NOW)
+    advances = [timed(cursor.advance, NOW + 12 * i) for i in range(1, QUERIES + 1)]
+    rows.append(["cursor advance by 12s", f"{median(advances):.1f}", f"{percentile(advances, 0.99):.1f}"])
+
+    # a rent and its stop
+    updates = []
+    for renting_id in rng.sample(list(mirror.rentings), QUERIES):
+        renting = mirror.rentings[renting_id]
+        updates.append(timed(mirror.set_renting, renting_id, None))
+        updates.append(timed(mirror.set_renting, renting_id, replace(renting, rented_at=NOW)))
+    rows.append(["update (rent / stop)", f"{median(updates):.1f}", f"{percentile(updates, 0.99):.1f}"])
+
+    report(f"expiry queries over {RENTINGS} active rentings", ["query", "p50 us", "p99 us"], rows)
+
+
+if __name__ == "__main__":
+    main()
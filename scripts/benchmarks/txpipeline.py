@@ -0,0 +1,104 @@
+# pylint: disable=redefined-outer-name,invalid-name,no-name-in-module,unused-argument,too-few-public-methods,too-many-arguments,too-many-locals
+# type: ignore
+import threading
+import time
+
+from brownie import E721, accounts, web3
+
+from scripts.deploy_test import setup
+from scripts.model import NFTStandard, PaymentToken, pack_price
+from scripts.tables import report
+from scripts.txpipeline import TxPipeline
+
+# run with `brownie run benchmarks/txpipeline`
+#
+# Onboards a collection (mint, setApprovalForAll, lend in batches) with automine off and a block
+# every BLOCK_TIME seconds, once waiting for every receipt and once through the TxPipeline.
+
+BLOCK_TIME = 1.0
+COUNT = 40
+LEND_BATCH = 10
+FAUCET_GAS = 200_000
+APPROVAL_GAS = 100_000
+LEND_GAS_PER_ITEM = 250_000
+
+
+class Miner(threading.Thread):
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(BLOCK_TIME):
+            web3.provider.make_request("evm_mine", [])
+
+
+def lend_args(nft, token_ids):
+    n = len(token_ids)
+    return (
+        [NFTStandard.E721.value] * n,
+        [nft.address] * n,
+        token_ids,
+        [1] * n,
+        [1] * n,
+        [pack_price(1)] * n,
+        [PaymentToken.DAI.value] * n,
+        [False] * n,
+    )
+
+
+def batches():
+    # E721 token ids are a counter starting at 1 on a fresh deployment
+    token_ids = list(range(1, COUNT + 1))
+    return [token_ids[i : i + LEND_BATCH] for i in range(0, COUNT, LEND_BATCH)]
+
+
+def onboard_sequentially(registry, nft, signer):
+    for _ in range(COUNT):
+        nft.faucet({"from": signer})
+    nft.setApprovalForAll(registry.address, True, {"from": signer})
+    for token_ids in batches():
+        registry.lend(*lend_args(nft, token_ids), {"from": signer})
+    return COUNT + 1 + len(batches())
+
+
+def onboard_pipelined(registry, nft, signer):
+    with TxPipeline(web3, signer, poll_interval=0.1) as pipeline:
+        for _ in range(COUNT):
+            pipeline.submit_call(nft.faucet, gas=FAUCET_GAS)
+        pipeline.submit_call(nft.setApprovalForAll, registry.address, True, gas=APPROVAL_GAS)
+        for token_ids in batches():
+            pipeline.submit_call(
+                registry.lend, *lend_args(nft, token_ids), gas=LEND_GAS_PER_ITEM * len(token_ids)
+            )
+        stats = pipeline.wait(timeout=COUNT * BLOCK_TIME * 4)
+    assert stats.reverted == 0
+    return stats.mined
+
+
+def main():
+    contracts = setup()
+    signer = accounts.add()
+    accounts[0].transfer(signer, "10 ether")
+
+    web3.provider.make_request("miner_stop", [])
+    miner = Miner()
+    miner.start()
+    rows = []
+    try:
+        for name, onboard in [("sequential", onboard_sequentially), ("pipelined", onboard_pipelined)]:
+            nft = E721.deploy({"from": signer})
+            start = time.perf_counter()
+            txs = onboard(contracts["registry"], nft, signer)
+            elapsed = time.perf_counter() - start
+            assert nft.balanceOf(contracts["registry"]) == COUNT
+            rows.append([name, txs, f"{elapsed:.1f}", f"{txs / elapsed:.2f}"])
+    finally:
+        miner.stopped.set()
+        web3.provider.make_request("miner_start", [])
+
+    report(
+        f"onboarding {COUNT} NFTs, one block every {BLOCK_TIME}s",
+        ["mode", "txs", "seconds", "tx/s"],
+        rows,
+    )
@@ -0,0 +1,287 @@
+# pylint: disable=import-outside-toplevel
+import hashlib
+import json
+from dataclasses import asdict, astuple, dataclass
+from typing import Dict, Iterable, List, Mapping, Optional
+
+from scripts.events import decode_logs
+from scripts.mirror import RegistryMirror
+
+# An ordered corpus of transactions, replayed on a fresh local chain against the current build.
+#
+# The corpus is a json lines file: a header line, then one line per transaction. Contracts
+# deployed by the corpus are stored by contract name and constructor arguments, and replayed
+# with the bytecode of the current build. Every other transaction is stored as raw calldata.
+# Replaying the same transactions from the same accounts on a fresh chain deploys every
+# contract at its recorded address, so the calldata (and the addresses in it) stays valid.
+# That holds as long as the external interface of the contracts does not change between builds
+
+VERSION = 1
+# explicit gas limit, so that transactions that revert are still sent (and their gas measured)
+GAS_LIMIT = 12_000_000
+
+
+class CorpusError(Exception):
+    """The corpus cannot be replayed on this chain."""
+
+
+@dataclass
+class Call:
+    sender: str
+    # None for a deployment
+    to: Optional[str]
+    # calldata, or the abi encoded constructor arguments of a deployment
+    data: str
+    value: int = 0
+    # seconds since the first transaction of the corpus
+    offset: int = 0
+    # contract name of a deployment, "<Contract>.<function>" of a call, for the reports
+    label: str = ""
+    deploy: Optional[str] = None
+    # address of the deployed contract, checked at replay
+    address: Optional[str] = None
+
+
+@dataclass
+class CallResult:
+    index: int
+    label: str
+    status: int
+    gas_used: int
+    # of the Registry lendings and rentings after the call, see state_hash
+    state_hash: str
+
+
+@dataclass
+class CallDiff:
+    index: int
+    label: str
+    gas_before: int
+    gas_after: int
+    status_changed: bool
+    state_changed: bool
+
+    @property
+    def gas_delta(self) -> int:
+        return self.gas_after - self.gas_before
+
+
+def write_corpus(path: str, calls: Iterable[Call]) -> None:
+    with open(path, "w") as f:
+        f.write(json.dumps({"version": VERSION}) + "\n")
+        for call in calls:
+            f.write(json.dumps(asdict(call)) + "\n")
+
+
+def read_corpus(path: str) -> List[Call]:
+    with open(path) as f:
+        header = json.loads(f.readline())
+        if header.get("version") != VERSION:
+            raise CorpusError(f"unsupported corpus version {header.get('version')}")
+        return [Call(**json.loads(line)) for line in f if line.strip()]
+
+
+def write_results(path: str, results: Iterable[CallResult]) -> None:
+    with open(path, "w") as f:
+        json.dump([asdict(result) for result in results], f, indent=1)
+
+
+def read_results(path: str) -> List[CallResult]:
+    with open(path) as f:
+        return [CallResult(**result) for result in json.load(f)]
+
+
+def to_hex(value) -> str:
+    if isinstance(value, str):
+        return value if value.startswith("0x") else "0x" + value
+    return "0x" + bytes(value).hex()
+
+
+def from_history(history, bytecodes: Mapping[str, str]) -> List[Call]:
+    """
+    Calls of brownie's transaction history (e.g. after a stateful run), in order. `bytecodes`
+    maps a contract name to the bytecode it was deployed with, to split off the constructor
+    arguments; transactions that deploy other contracts are not supported.
+    """
+    calls: List[Call] = []
+    start = None
+    for txn in history:
+        start = txn.timestamp if start is None else start
+        data = to_hex(txn.input)
+        call = Call(
+            sender=str(txn.sender),
+            to=None,
+            data=data,
+            value=int(txn.value),
+            offset=txn.timestamp - start,
+        )
+        if txn.receiver is None:
+            bytecode = to_hex(bytecodes[txn.contract_name])
+            if not data.startswith(bytecode):
+                raise CorpusError(f"{txn.contract_name} was not deployed with the given bytecode")
+            call.data = "0x" + data[len(bytecode) :]
+            call.deploy = call.label = txn.contract_name
+            call.address = str(txn.contract_address)
+        else:
+            call.to = str(txn.receiver)
+            call.label = f"{txn.contract_name}.{txn.fn_name}" if txn.fn_name else "transfer"
+        calls.append(call)
+    return calls
+
+
+def translate(data: str, aliases: Mapping[str, str]) -> str:
+    """Replaces the addresses in calldata, e.g. mainnet contracts by the ones a corpus deploys."""
+    data = data.lower()
+    for old, new in aliases.items():
+        data = data.replace(old.lower()[2:].rjust(40, "0"), new.lower()[2:].rjust(40, "0"))
+    return data
+
+
+def from_transactions(txs: Iterable[Mapping], aliases: Mapping[str, str]) -> List[Call]:
+    """
+    Calls from decoded chain history (e.g. `eth_getTransactionByHash` results with their block
+    timestamp under "timestamp"), with their addresses translated by `aliases`: senders to
+    local accounts, contracts to the ones deployed by the calls the corpus starts with.
+    """
+    calls: List[Call] = []
+    start = None
+    lowered = {old.lower(): new for old, new in aliases.items()}
+    for tx in txs:
+        start = tx["timestamp"] if start is None else start
+        calls.append(
+            Call(
+                sender=lowered.get(tx["from"].lower(), tx["from"]),
+                to=lowered.get(tx["to"].lower(), tx["to"]),
+                data=translate(to_hex(tx["input"]), aliases),
+                value=int(tx.get("value", 0)),
+                offset=tx["timestamp"] - start,
+                label=to_hex(tx["input"])[:10],
+            )
+        )
+    return calls
+
+
+def state_hash(mirror: RegistryMirror, start: int) -> str:
+    """
+    Hash of the lendings and rentings, with the rent timestamps taken relative to `start`:
+    two replays of a corpus started at different times hash the same.
+    """
+    digest = hashlib.sha256()
+    for lending_id in sorted(mirror.lendings):
+        digest.update(repr(astuple(mirror.lendings[lending_id])).encode())
+    for renting_id in sorted(mirror.rentings):
+        renting = mirror.rentings[renting_id]
+        fields = astuple(renting)[:-1] + (renting.rented_at - start,)
+        digest.update(repr(fields).encode())
+    return digest.hexdigest()[:16]
+
+
+def pin_timestamp(web3, timestamp: int) -> bool:
+    """Sets the timestamp of the next block, where the node supports it (anvil, hardhat)."""
+    try:
+        response = web3.provider.make_request("evm_setNextBlockTimestamp", [timestamp])
+    except Exception:  # pylint: disable=broad-except
+        return False
+    return "error" not in response
+
+
+def replay(calls: List[Call], bytecodes: Mapping[str, str]) -> List[CallResult]:
+    """
+    Sends the calls in order on the connected (fresh) chain. Deployments use `bytecodes`,
+    typically the current build. Block timestamps follow the recorded offsets: exactly on
+    nodes that can pin the next block's timestamp, within a second or two elsewhere.
+    """
+    from brownie import accounts, chain, web3
+
+    senders: Dict[str, object] = {str(account).lower(): account for account in accounts}
+    mirror = RegistryMirror()
+    start = chain.time()
+    results: List[CallResult] = []
+    for index, call in enumerate(calls):
+        sender = senders.get(call.sender.lower())
+        if sender is None:
+            raise CorpusError(f"call {index}: {call.sender} is not a local account")
+        if not pin_timestamp(web3, start + call.offset):
+            chain.sleep(max(0, start + call.offset - chain.time()))
+        data = call.data
+        if call.deploy is not None:
+            data = to_hex(bytecodes[call.deploy]) + call.data[2:]
+        txn = sender.transfer(
+            call.to, call.value, gas_limit=GAS_LIMIT, data=data, allow_revert=True, silent=True
+        )
+        if call.address is not None and str(txn.contract_address).lower() != call.address.lower():
+            raise CorpusError(
+                f"call {index}: {call.deploy} deployed at {txn.contract_address}, recorded at "
+                f"{call.address}. Replay on a fresh chain"
+            )
+        mirror.apply_events(decode_logs(txn.logs))
+        results.append(
+            CallResult(index, call.label, txn.status, txn.gas_used, state_hash(mirror, start))
+        )
+    return results
+
+
+def diff(baseline: List[CallResult], candidate: List[CallResult]) -> List[CallDiff]:
+    if len(baseline) != len(candidate):
+        raise CorpusError(f"{len(baseline)} results vs {len(candidate)}: not the same corpus")
+    return [
+        CallDiff(
+            before.index,
+            before.label,
+            before.gas_used,
+            after.gas_used,
+            before.status != after.status,
+            before.state_hash != after.state_hash,
+        )
+        for before, after in zip(baseline, candidate)
+    ]
+
+
+def report_diff(diffs: List[CallDiff]) -> None:
+    from scripts.tables import report
+
+    by_label: Dict[str, List[CallDiff]] = dict()
+    for call_diff in diffs:
+        by_label.setdefault(call_diff.label, []).append(call_diff)
+    rows = []
+    for label, label_diffs in sorted(by_label.items()):
+        before = sum(d.gas_before for d in label_diffs)
+        after = sum(d.gas_after for d in label_diffs)
+        rows.append(
+            [
+                label,
+                len(label_diffs),
+                before,
+                after,
+                f"{100 * (after - before) / before:+.2f}%" if before else "",
+                sum(d.status_changed for d in label_diffs),
+                sum(d.state_changed for d in label_diffs),
+            ]
+        )
+    report(
+        "corpus replay, baseline vs this build",
+        ["call", "count", "gas before", "gas after", "delta", "status changed", "state changed"],
+        rows,
+    )
+
+
+def project_bytecodes() -> Dict[str, str]:
+    """The bytecode of every contract of the loaded brownie project, by name."""
+    from brownie import project
+
+    containers = project.get_loaded_projects()[0].dict()
+    return {name: container.bytecode for name, container in containers.items()}
+
+
+def main(corpus_path: str, results_path: Optional[str] = None, baseline_path: Optional[str] = None):
+    """
+    `brownie run corpus main <corpus> [<results>] [<baseline results>]`: replays the corpus
+    against this build, writes the per call results and compares them with a baseline.
+    """
+    results = replay(read_corpus(corpus_path), project_bytecodes())
+    if results_path is not None:
+        write_results(results_path, results)
+    if baseline_path is not None:
+        report_diff(diff(read_results(baseline_path), results))
+    else:
+        print(f"{len(results)} calls, {sum(r.gas_used for r in results)} gas")
@@ -1,6 +1,6 @@
 # pylint: disable=redefined-outer-name,invalid-name,no-name-in-module,unused-argument,too-few-public-methods,too-many-arguments,too-many-locals
 # type: ignore
-from enum import Enum
+from typing import Dict, List
 
 from brownie import (
     Resolver,
@@ -12,26 +12,26 @@ from brownie import (
     TUSD,
     accounts,
     chain,
+    history,
 )
+from brownie.exceptions import VirtualMachineError
 
+from scripts.metrics import METRICS
+from scripts.mirror import RegistryMirror
+from scripts.model import Lending, NFTStandard, PaymentToken, Renting, pack_price
 
-class NFTStandard(Enum):
-    E721 = 0
-    E1155 = 1
+BILLION = 10 ** 27
+# explicit gas limit, so that transactions that are expected to revert are still broadcast
+# (and their gas accounted for) instead of failing at estimation
+GAS_LIMIT = 12_000_000
 
 
-class PaymentToken(Enum):
-    SENTINEL = 0
-    DAI = 1
-    USDC = 2
-    TUSD = 3
+def deploy(a, beneficiary, admin):
+    with METRICS.timer("job_seconds", job="deploy"):
+        return deploy_contracts(a, beneficiary, admin)
 
 
-def main():
-
-    a = accounts[0]
-    beneficiary = accounts[1]
-    admin = accounts[0]
+def deploy_contracts(a, beneficiary, admin):
 
     from_a = {"from": a}
 
@@ -53,3 +53,100 @@ def main():
     e721b = E721.deploy(from_a)
     e1155 = E1155.deploy(from_a)
     e1155b = E1155.deploy(from_a)
+
+    return {
+        "dai": dai,
+        "usdc": usdc,
+        "tusd": tusd,
+        "e721": e721,
+        "e721b": e721b,
+        "e1155": e1155,
+        "e1155b": e1155b,
+        "resolver": resolver,
+        "registry": registry,
+        "payment_tokens": {
+            PaymentToken.DAI.value: dai,
+            PaymentToken.USDC.value: usdc,
+            PaymentToken.TUSD.value: tusd,
+        },
+    }
+
+
+def setup() -> Dict:
+    contracts = deploy(accounts[0], accounts[1], accounts[0])
+    contracts["mirror"] = RegistryMirror(contracts["registry"].address)
+    return contracts
+
+
+def transact(method, *args, sender):
+    """Send a transaction and return its receipt, whether it reverted or not."""
+    try:
+        return method(*args, {"from": sender, "gas_limit": GAS_LIMIT, "allow_revert": True})
+    except VirtualMachineError:
+        return history[-1]
+
+
+def lend(
+    contracts: Dict,
+    lender,
+    nft,
+    count: int,
+    nft_standard: int,
+    lend_amount: int = 1,
+    max_rent_duration: int = 1,
+    daily_rent_price: int = pack_price(1),
+    payment_token: int = PaymentToken.DAI.value,
+    will_auto_renew: bool = False,
+) -> List[Lending]:
+    registry, mirror = contracts["registry"], contracts["mirror"]
+    nft.setApprovalForAll(registry.address, True, {"from": lender})
+    token_ids = []
+    for _ in range(count):
+        txn = nft.faucet({"from": lender})
+        if nft_standard == NFTStandard.E721.value:
+            token_ids.append(txn.events["Transfer"]["tokenId"])
+        else:
+            token_ids.append(txn.events["TransferSingle"]["id"])
+    txn = registry.lend(
+        [nft_standard] * count,
+        [nft.address] * count,
+        token_ids,
+        [lend_amount] * count,
+        [max_rent_duration] * count,
+        [daily_rent_price] * count,
+        [payment_token] * count,
+        [will_auto_renew] * count,
+        {"from": lender},
+    )
+    mirror.apply_events(txn.events)
+    return [mirror.lendings[event["lendingID"]] for event in txn.events["Lend"]]
+
+
+def rent(
+    contracts: Dict, renter, lendings: List[Lending], rent_duration: int = 1, rent_amount: int = 1
+) -> List[Renting]:
+    registry, mirror = contracts["registry"], contracts["mirror"]
+    for payment_token in {lending.payment_token for lending in lendings}:
+        token = contracts["payment_tokens"][payment_token]
+        token.faucet({"from": renter})
+        token.approve(registry.address, BILLION, {"from": renter})
+    txn = registry.rent(
+        [lending.nft_standard for lending in lendings],
+        [lending.nft_address for lending in lendings],
+        [lending.token_id for lending in lendings],
+        [lending.lending_id for lending in lendings],
+        [rent_duration] * len(lendings),
+        [rent_amount] * len(lendings),
+        {"from": renter},
+    )
+    mirror.apply_events(txn.events)
+    return [mirror.rentings[event["rentingID"]] for event in txn.events["Rent"]]
+
+
+def main():
+
+    a = accounts[0]
+    beneficiary = accounts[1]
+    admin = accounts[0]
+
+    return deploy(a, beneficiary, admin)
@@ -0,0 +1,252 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from eth_utils import keccak, to_checksum_address
+
+# Registry events decoded straight from raw logs (topics and data), without an ABI or brownie.
+# Every field is a static type, so each one is a single 32-byte word: indexed fields are the
+# topics after the signature, the others follow each other in the data
+
+
+@dataclass(frozen=True)
+class EventSpec:
+    name: str
+    # (name, solidity type, indexed), in the order of the event declaration in IRegistry.sol
+    fields: Tuple[Tuple[str, str, bool], ...]
+
+    @property
+    def signature(self) -> str:
+        return f"{self.name}({','.join(kind for _, kind, _ in self.fields)})"
+
+    @property
+    def topic(self) -> bytes:
+        return keccak(text=self.signature)
+
+
+SPECS = [
+    EventSpec(
+        "Lend",
+        (
+            ("is721", "bool", False),
+            ("lenderAddress", "address", True),
+            ("nftAddress", "address", True),
+            ("tokenID", "uint256", True),
+            ("lendingID", "uint256", False),
+            ("maxRentDuration", "uint8", False),
+            ("dailyRentPrice", "bytes4", False),
+            ("lendAmount", "uint16", False),
+            ("paymentToken", "uint8", False),
+            ("willAutoRenew", "bool", False),
+        ),
+    ),
+    EventSpec(
+        "Rent",
+        (
+            ("renterAddress", "address", True),
+            ("lendingID", "uint256", True),
+            ("rentingID", "uint256", True),
+            ("rentAmount", "uint16", False),
+            ("rentDuration", "uint8", False),
+            ("rentedAt", "uint32", False),
+            ("nftAddress", "address", False),
+            ("tokenID", "uint256", False),
+            ("paymentToken", "uint8", False),
+            ("paid", "uint256", False),
+        ),
+    ),
+    EventSpec(
+        "StopLend",
+        (
+            ("lendingID", "uint256", True),
+            ("stoppedAt", "uint32", False),
+            ("amount", "uint16", False),
+            ("nftAddress", "address", False),
+            ("tokenID", "uint256", False),
+        ),
+    ),
+    EventSpec(
+        "StopRent",
+        (
+            ("rentingID", "uint256", True),
+            ("stoppedAt", "uint32", False),
+            ("lenderAddress", "address", True),
+            ("renterAddress", "address", True),
+            ("nftAddress", "address", False),
+            ("tokenID", "uint256", False),
+            ("lendingID", "uint256", False),
+            ("paymentToken", "uint8", False),
+            ("lenderAmount", "uint256", False),
+            ("renterAmount", "uint256", False),
+            ("fee", "uint256", False),
+        ),
+    ),
+    EventSpec(
+        "RentClaimed",
+        (
+            ("rentingID", "uint256", True),
+            ("collectedAt", "uint32", False),
+            ("lenderAddress", "address", True),
+            ("nftAddress", "address", False),
+            ("tokenID", "uint256", False),
+            ("lendingID", "uint256", False),
+            ("paymentToken", "uint8", False),
+            ("lenderAmount", "uint256", False),
+            ("fee", "uint256", False),
+        ),
+    ),
+    # the enum is encoded as a uint8
+    EventSpec("RentClaimSkipped", (("rentingID", "uint256", True), ("reason", "uint8", False))),
+    EventSpec(
+        "FeesWithdrawn",
+        (
+            ("paymentToken", "uint8", True),
+            ("beneficiary", "address", True),
+            ("amount", "uint256", False),
+        ),
+    ),
+    EventSpec("PullPaymentsSet", (("lenderAddress", "address", True), ("enabled", "bool", False))),
+    EventSpec(
+        "CreditsWithdrawn",
+        (
+            ("lenderAddress", "address", True),
+            ("paymentToken", "uint8", True),
+            ("amount", "uint256", False),
+        ),
+    ),
+    EventSpec(
+        "LendOfferFilled",
+        (
+            ("lenderAddress", "address", True),
+            ("nonce", "uint256", True),
+            ("lendingID", "uint256", False),
+        ),
+    ),
+    EventSpec("LendOfferCancelled", (("lenderAddress", "address", True), ("nonce", "uint256", True))),
+]
+
+BY_TOPIC: Dict[bytes, EventSpec] = {spec.topic: spec for spec in SPECS}
+
+
+def to_bytes(value) -> bytes:
+    if isinstance(value, str):
+        return bytes.fromhex(value[2:] if value.startswith("0x") else value)
+    return bytes(value)
+
+
+def decode_word(kind: str, word: bytes):
+    if kind == "address":
+        return to_checksum_address(word[12:])
+    if kind == "bool":
+        return word[-1] == 1
+    if kind == "bytes4":
+        return word[:4]
+    return int.from_bytes(word, "big")
+
+
+class Event(dict):
+    """A decoded Registry event: its fields by name, plus where it was emitted."""
+
+    def __init__(self, name: str, address: str, fields: Mapping, block_number: int, log_index: int):
+        super().__init__(fields)
+        self.name = name
+        self.address = address
+        self.block_number = block_number
+        self.log_index = log_index
+
+
+def decode_log(log: Mapping) -> Optional[Event]:
+    """Decodes a log as returned by `eth_getLogs`, None if it is not a Registry event."""
+    topics = [to_bytes(topic) for topic in log["topics"]]
+    spec = BY_TOPIC.get(topics[0]) if topics else None
+    if spec is None:
+        return None
+    data = to_bytes(log["data"])
+    indexed, offset = iter(topics[1:]), 0
+    fields = dict()
+    for name, kind, is_indexed in spec.fields:
+        if is_indexed:
+            word = next(indexed)
+        else:
+            word = data[offset : offset + 32]
+            offset += 32
+        fields[name] = decode_word(kind, word)
+    return Event(
+        spec.name,
+        to_checksum_address(log["address"]),
+        fields,
+        log.get("blockNumber", 0),
+        log.get("logIndex", 0),
+    )
+
+
+def decode_logs(logs: Iterable[Mapping]) -> List[Event]:
+    return [event for event in map(decode_log, logs) if event is not None]
+
+
+class PaymentLedger:
+    """
+    Payment token flows through the Registry, from the events alone: what each account paid
+    or received, the rent held by the Registry, the fees it has accrued for the beneficiary
+    (until withdrawFees) and the rent credited to lenders in pull payment mode (until
+    withdrawCredits). Keyed by payment token index, amounts in the token's base units.
+    """
+
+    def __init__(self):
+        # (account, payment token) -> received minus paid
+        self.balances: Dict[Tuple[str, int], int] = defaultdict(int)
+        self.escrow: Dict[int, int] = defaultdict(int)
+        self.fees: Dict[int, int] = defaultdict(int)
+        self.credits: Dict[Tuple[str, int], int] = defaultdict(int)
+        self.pull: Set[str] = set()
+
+    def apply(self, name: str, args: Mapping) -> None:
+        handler = getattr(self, f"on_{name}", None)
+        if handler is not None:
+            handler(args)
+
+    def apply_events(self, events) -> None:
+        for event in events:
+            self.apply(event.name, event)
+
+    def on_Rent(self, args: Mapping) -> None:
+        token = args["paymentToken"]
+        self.balances[(args["renterAddress"], token)] -= args["paid"]
+        self.escrow[token] += args["paid"]
+
+    def on_StopRent(self, args: Mapping) -> None:
+        token = args["paymentToken"]
+        self.pay_lender(args["lenderAddress"], token, args["lenderAmount"])
+        self.balances[(args["renterAddress"], token)] += args["renterAmount"]
+        self.settle(token, args["lenderAmount"] + args["renterAmount"], args["fee"])
+
+    def on_RentClaimed(self, args: Mapping) -> None:
+        token = args["paymentToken"]
+        self.pay_lender(args["lenderAddress"], token, args["lenderAmount"])
+        self.settle(token, args["lenderAmount"], args["fee"])
+
+    def on_FeesWithdrawn(self, args: Mapping) -> None:
+        token = args["paymentToken"]
+        self.balances[(args["beneficiary"], token)] += args["amount"]
+        self.fees[token] -= args["amount"]
+
+    def on_PullPaymentsSet(self, args: Mapping) -> None:
+        if args["enabled"]:
+            self.pull.add(args["lenderAddress"])
+        else:
+            self.pull.discard(args["lenderAddress"])
+
+    def on_CreditsWithdrawn(self, args: Mapping) -> None:
+        key = (args["lenderAddress"], args["paymentToken"])
+        self.credits[key] -= args["amount"]
+        self.balances[key] += args["amount"]
+
+    def pay_lender(self, lender: str, token: int, amount: int) -> None:
+        if lender in self.pull:
+            self.credits[(lender, token)] += amount
+        else:
+            self.balances[(lender, token)] += amount
+
+    def settle(self, token: int, paid_out: int, fee: int) -> None:
+        self.fees[token] += fee
+        self.escrow[token] -= paid_out + fee
@@ -0,0 +1,203 @@
+# pylint: disable=import-outside-toplevel
+import time
+from typing import Any, Dict, List, Optional
+
+from web3.providers.eth_tester import EthereumTesterProvider
+
+# An in-process EVM (eth-tester on py-evm) for `brownie test` and the benchmarks, instead of a
+# ganache subprocess behind a socket.
+#
+# The provider answers the ganache specific methods brownie's rpc backend sends (evm_snapshot,
+# evm_revert, evm_increaseTime, evm_mine, evm_setNextBlockTimestamp), and reports reverts the way
+# ganache does, with the revert data in the error, so that `brownie.reverts` and the revert
+# messages of the receipts work unchanged. Traces are not supported (no debug_traceTransaction),
+# so brownie falls back to the revert data of the error.
+#
+# Enable it for the test suite with `REGISTRY_EVM=pyevm brownie test`, see tests/conftest.py
+
+ENV_VAR = "REGISTRY_EVM"
+BACKEND = "pyevm"
+
+# Error(string)
+ERROR_SELECTOR = bytes.fromhex("08c379a0")
+METHOD_NOT_FOUND = -32601
+# what geth and ganache answer for a reverted call or gas estimate
+EXECUTION_ERROR = -32000
+REVERTED = "execution reverted"
+# of a transaction, in eth-tester's format
+FEE_FIELDS = {"gas_price", "max_fee_per_gas", "max_priority_fee_per_gas"}
+
+
+def revert_data(reason: Any) -> str:
+    """The abi encoded revert data of eth-tester's TransactionFailed reason."""
+    from eth_abi import encode
+
+    if isinstance(reason, Exception) and reason.args:
+        reason = reason.args[0]
+    if isinstance(reason, bytes):
+        return "0x" + reason.hex()
+    # web3's provider prefixes the reason, py-evm reports a revert without data as the prefix
+    reason = str(reason)
+    if reason.startswith(REVERTED):
+        reason = reason[len(REVERTED) :].lstrip(": ")
+    if not reason:
+        return "0x"
+    return "0x" + (ERROR_SELECTOR + encode(["string"], [reason])).hex()
+
+
+class InProcessProvider(EthereumTesterProvider):
+    """
+    eth-tester's web3 provider, with the chain clock and the `evm_*` methods of ganache.
+
+    ganache keeps a time offset on top of the wall clock: the blocks it mines after
+    `evm_increaseTime` are stamped with the wall clock plus the offset, and snapshots restore it.
+    """
+
+    def __init__(self, genesis_overrides: Optional[Dict] = None):
+        from eth.vm.forks import IstanbulVM
+        from eth_tester import EthereumTester, PyEVMBackend
+
+        # the hardfork brownie launches ganache with: no base fee, so the gas price of 0 of
+        # brownie's development networks is accepted
+        backend = PyEVMBackend(
+            PyEVMBackend.generate_genesis_params(overrides=genesis_overrides),
+            vm_configuration=((0, IstanbulVM),),
+        )
+        super().__init__(EthereumTester(backend))
+        self.backend = backend
+        self.time_offset = 0
+        # evm_setNextBlockTimestamp, applied to the next block only
+        self.next_timestamp: Optional[int] = None
+        # snapshot id -> time offset
+        self.snapshot_offsets: Dict[int, int] = {}
+
+    def _pending_timestamp(self) -> int:
+        return self.backend.chain.header.timestamp
+
+    def _set_pending_timestamp(self, timestamp: int) -> None:
+        chain = self.backend.chain
+        header = chain.header
+        # the difficulty of a pre-merge block depends on its timestamp: a block with a stale
+        # one is rejected when it is imported again, on the revert to a snapshot
+        parent = chain.get_block_header_by_hash(header.parent_hash)
+        vm_class = chain.get_vm_class_for_block_number(header.block_number)
+        difficulty = vm_class.compute_difficulty(parent, timestamp)
+        chain.header = header.copy(timestamp=timestamp, difficulty=difficulty)
+
+    def _sync_clock(self) -> None:
+        """Stamps the pending block with the chain time, before it is mined."""
+        if self.next_timestamp is not None:
+            timestamp, self.next_timestamp = self.next_timestamp, None
+        else:
+            timestamp = int(time.time()) + self.time_offset
+        if timestamp > self._pending_timestamp():
+            self._set_pending_timestamp(timestamp)
+
+    def _mine(self, timestamp: Optional[int]) -> None:
+        if timestamp is not None:
+            self.time_offset = timestamp - int(time.time())
+        self._sync_clock()
+        self.ethereum_tester.mine_blocks(1)
+
+    def _evm(self, method: str, params: List) -> Any:
+        if method == "evm_snapshot":
+            snapshot_id = self.ethereum_tester.take_snapshot()
+            self.snapshot_offsets[snapshot_id] = self.time_offset
+            return snapshot_id
+        if method == "evm_revert":
+            snapshot_id = int(params[0], 0) if isinstance(params[0], str) else params[0]
+            self.ethereum_tester.revert_to_snapshot(snapshot_id)
+            self.time_offset = self.snapshot_offsets[snapshot_id]
+            self.next_timestamp = None
+            return True
+        if method == "evm_increaseTime":
+            self.time_offset += int(params[0])
+            return self.time_offset
+        if method == "evm_setNextBlockTimestamp":
+            self.next_timestamp = int(params[0])
+            self.time_offset = self.next_timestamp - int(time.time())
+            return self.next_timestamp
+        if method == "evm_mine":
+            self._mine(int(params[0]) if params else None)
+            return "0x0"
+        raise KeyError(method)
+
+    def make_request(self, method, params):
+        from eth_tester.exceptions import TransactionFailed
+
+        request_id = self._current_request_id
+        if method.startswith("evm_"):
+            self._current_request_id += 1
+            try:
+                return {"id": request_id, "jsonrpc": "2.0", "result": self._evm(method, params)}
+            except KeyError:
+                return self.error(request_id, METHOD_NOT_FOUND, f"Unknown RPC Endpoint: {method}")
+        if method in ("eth_sendTransaction", "eth_sendRawTransaction"):
+            self._sync_clock()
+        elif method in ("eth_call", "eth_estimateGas") and not FEE_FIELDS & set(params[0]):
+            # eth-tester turns a call without a fee into a 1559 transaction, invalid on Istanbul
+            params = [{**params[0], "gas_price": 0}, *params[1:]]
+        try:
+            response = super().make_request(method, params)
+        except TransactionFailed as exc:
+            return self.error(request_id, EXECUTION_ERROR, str(exc), revert_data(exc.args[0]))
+        if method in ("eth_sendTransaction", "eth_sendRawTransaction") and "result" in response:
+            txid = response["result"]
+            reverted = self._reverted(txid)
+            if reverted is not None:
+                message = f"VM Exception while processing transaction: revert {reverted}"
+                data = revert_data(reverted)
+                error = {"error": "revert", "program_counter": None, "return": data, "reason": data}
+                return self.error(request_id, EXECUTION_ERROR, message, {txid: error})
+        return response
+
+    def _reverted(self, txid: str) -> Any:
+        """
+        The revert reason of a mined transaction that reverted (None if it did not), from the
+        transaction replayed as a call on the state it was mined on.
+        """
+        from eth_tester.exceptions import TransactionFailed
+
+        receipt = self.ethereum_tester.get_transaction_receipt(txid)
+        if receipt["status"] != 0:
+            return None
+        tx = self.ethereum_tester.get_transaction_by_hash(txid)
+        if tx["to"]:
+            call = {key: tx[key] for key in ("from", "to", "gas", "gas_price", "value", "data")}
+            try:
+                self.ethereum_tester.call(call, receipt["block_number"] - 1)
+            except TransactionFailed as exc:
+                return exc.args[0]
+        return ""
+
+    @staticmethod
+    def error(request_id: int, code: int, message: str, data: Any = None) -> Dict:
+        error: Dict[str, Any] = {"code": code, "message": message}
+        if data is not None:
+            error["data"] = data
+        return {"id": request_id, "jsonrpc": "2.0", "error": error}
+
+
+def connect(network: str = "development") -> InProcessProvider:
+    """
+    Connects brownie to a new in-process chain, in place of `brownie.network.connect`, with the
+    settings (gas limit and price, ...) of the given development network.
+    """
+    from brownie._config import CONFIG
+    from brownie.network import web3
+    from brownie.network.rpc import Rpc, chain, ganache
+
+    CONFIG.set_active_network(network)
+    provider = InProcessProvider()
+    web3.provider = provider
+    web3.reset_middlewares()
+    # the evm_* requests of ganache's backend are the ones the provider answers
+    Rpc().backend = ganache
+    chain._network_connected()
+    return provider
+
+
+def disconnect() -> None:
+    from brownie import network
+
+    network.disconnect(kill_rpc=False)
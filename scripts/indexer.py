@@ -0,0 +1,162 @@
+from collections import deque
+from dataclasses import dataclass, field
+from itertools import groupby
+from typing import Deque, List, Optional, Tuple
+
+from scripts.events import decode_logs
+from scripts.metrics import METRICS
+from scripts.mirror import RegistryMirror
+
+LENDING = "lending"
+RENTING = "renting"
+
+
+class ReorgTooDeep(Exception):
+    """The chain reorganised past the oldest block the journal can undo: rebuild from scratch."""
+
+
+def to_hex(value) -> str:
+    return value if isinstance(value, str) else "0x" + bytes(value).hex()
+
+
+@dataclass
+class JournalEntry:
+    number: int
+    hash: str
+    # (LENDING or RENTING, id, record before the change), in the order the block changed them
+    undo: List[Tuple[str, int, Optional[object]]] = field(default_factory=list)
+
+
+class LogSource:
+    """The Registry logs and block hashes, read through web3."""
+
+    def __init__(self, web3, address: str):
+        self.web3 = web3
+        self.address = address
+
+    def head(self) -> int:
+        return self.web3.eth.block_number
+
+    def block_hash(self, number: int) -> Optional[str]:
+        try:
+            return to_hex(self.web3.eth.get_block(number)["hash"])
+        except Exception:  # pylint: disable=broad-except
+            # web3 raises BlockNotFound for a block past the head
+            return None
+
+    def blocks(self, from_block: int, to_block: int) -> List[Tuple[int, str, List]]:
+        """(number, hash, decoded events) of every block in the range with Registry logs."""
+        logs = self.web3.eth.get_logs(
+            {"address": self.address, "fromBlock": from_block, "toBlock": to_block}
+        )
+        blocks = []
+        for number, group in groupby(logs, lambda log: log["blockNumber"]):
+            block_logs = list(group)
+            blocks.append((number, to_hex(block_logs[0]["blockHash"]), decode_logs(block_logs)))
+        return blocks
+
+
+class Indexer:
+    """
+    Keeps a RegistryMirror in sync with the chain through reorgs.
+
+    Blocks are applied one at a time while the indexer, subscribed to the mirror, records the
+    previous value of every lending and renting the block changes. The journal holds an entry
+    for every block with Registry logs plus the last block synced, so that each poll can check
+    that the last indexed block is still part of the chain (its hash at that height is
+    unchanged, i.e. the new blocks descend from it). When it is not, blocks are undone from the
+    newest until one that is still canonical, and indexing resumes from there: only the blocks
+    of the abandoned fork are rolled back and re-applied. Entries older than `depth` blocks
+    behind the head are considered final and dropped.
+    """
+
+    def __init__(
+        self, mirror: RegistryMirror, source, start_block: int = 0, depth: int = 256
+    ):
+        self.mirror = mirror
+        self.source = source
+        self.start_block = start_block
+        self.depth = depth
+        self.journal: Deque[JournalEntry] = deque()
+        # the newest entry dropped from the journal: a reorg past it cannot be undone
+        self.anchor: Optional[JournalEntry] = None
+        self.recording: Optional[List] = None
+        self.reorgs = 0
+        self.rolled_back = 0
+        mirror.subscribe(self)
+
+    @property
+    def synced_block(self) -> int:
+        if self.journal:
+            return self.journal[-1].number
+        return self.anchor.number if self.anchor is not None else self.start_block - 1
+
+    def lending_changed(self, lending_id, old, new) -> None:
+        if self.recording is not None:
+            self.recording.append((LENDING, lending_id, old))
+
+    def renting_changed(self, renting_id, old, new) -> None:
+        if self.recording is not None:
+            self.recording.append((RENTING, renting_id, old))
+
+    def apply_block(self, number: int, block_hash: str, events) -> None:
+        entry = JournalEntry(number, block_hash)
+        self.recording = entry.undo
+        try:
+            self.mirror.apply_events(events)
+        finally:
+            self.recording = None
+        self.journal.append(entry)
+
+    def undo_block(self) -> JournalEntry:
+        entry = self.journal.pop()
+        for kind, record_id, old in reversed(entry.undo):
+            if kind == LENDING:
+                self.mirror.set_lending(record_id, old)
+            else:
+                self.mirror.set_renting(record_id, old)
+        return entry
+
+    def is_canonical(self, entry: JournalEntry) -> bool:
+        return self.source.block_hash(entry.number) == entry.hash
+
+    def rewind(self) -> int:
+        """Undo the blocks that are no longer part of the chain, returns how many were undone."""
+        undone = 0
+        while self.journal and not self.is_canonical(self.journal[-1]):
+            self.undo_block()
+            undone += 1
+        if undone and not self.journal and self.anchor is not None:
+            if not self.is_canonical(self.anchor):
+                raise ReorgTooDeep(f"reorg past block {self.anchor.number}")
+        if undone:
+            self.reorgs += 1
+            self.rolled_back += undone
+            METRICS.inc("indexer_reorgs_total")
+            METRICS.inc("indexer_blocks_rolled_back_total", undone)
+        return undone
+
+    def poll(self) -> int:
+        """Index up to the current head, returns the number of blocks with logs applied."""
+        with METRICS.timer("job_seconds", job="indexer"):
+            return self.index()
+
+    def index(self) -> int:
+        head = self.source.head()
+        self.rewind()
+        start = self.synced_block + 1
+        if start > head:
+            return 0
+        blocks = self.source.blocks(start, head)
+        for number, block_hash, events in blocks:
+            self.apply_block(number, block_hash, events)
+        if not blocks or blocks[-1][0] != head:
+            # journal the head as well, so that the next poll can check it
+            self.apply_block(head, self.source.block_hash(head), [])
+        self.prune(head)
+        return len(blocks)
+
+    def prune(self, head: int) -> None:
+        while len(self.journal) > 1 and self.journal[0].number <= head - self.depth:
+            entry = self.journal.popleft()
+            self.anchor = JournalEntry(entry.number, entry.hash)
@@ -0,0 +1,95 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from scripts.metrics import METRICS, record_transaction
+from scripts.mirror import RegistryMirror
+from scripts.model import ClaimSkipReason, Lending, Renting, is_claimable
+from scripts.timeline import ExpiryTimeline
+
+
+@dataclass
+class ClaimReport:
+    claimed: List[int] = field(default_factory=list)
+    skipped: Dict[int, ClaimSkipReason] = field(default_factory=dict)
+    transactions: int = 0
+    gas_used: int = 0
+
+
+def bundle_order(renting: Renting) -> Tuple:
+    # items of the same nft are contiguous so that bundleCall groups as many as it can
+    return (renting.nft_address, renting.nft_standard, renting.token_id, renting.renting_id)
+
+
+def claim_args(rentings: List[Renting]) -> Tuple[List, List, List, List, List]:
+    return (
+        [r.nft_standard for r in rentings],
+        [r.nft_address for r in rentings],
+        [r.token_id for r in rentings],
+        [r.lending_id for r in rentings],
+        [r.renting_id for r in rentings],
+    )
+
+
+def stop_lend_args(lendings: List[Lending]) -> Tuple[List, List, List, List]:
+    return (
+        [lending.nft_standard for lending in lendings],
+        [lending.nft_address for lending in lendings],
+        [lending.token_id for lending in lendings],
+        [lending.lending_id for lending in lendings],
+    )
+
+
+class ClaimKeeper:
+    """
+    Claims the rent of every renting that is past its return date, using `tryClaimRent`.
+
+    The keeper works off a RegistryMirror. Its view of the rentings may be stale (a renter
+    may have stopped the rent, another keeper may have claimed it), which `tryClaimRent`
+    tolerates: such items are reported as skipped instead of reverting the whole batch.
+    With an ExpiryTimeline over the same mirror, finding the claimable rentings does not
+    scan all of them.
+    """
+
+    def __init__(
+        self,
+        registry,
+        mirror: RegistryMirror,
+        account,
+        batch_size: int = 50,
+        timeline: Optional[ExpiryTimeline] = None,
+    ):
+        self.registry = registry
+        self.mirror = mirror
+        self.account = account
+        self.batch_size = batch_size
+        self.timeline = timeline
+
+    def claimable(self, now: int) -> List[Renting]:
+        if self.timeline is not None:
+            rentings = list(self.timeline.expired(now))
+        else:
+            rentings = [r for r in self.mirror.rentings.values() if is_claimable(r, now)]
+        rentings.sort(key=bundle_order)
+        return rentings
+
+    def claim(self, rentings: List[Renting], report: Optional[ClaimReport] = None) -> ClaimReport:
+        if report is None:
+            report = ClaimReport()
+        for i in range(0, len(rentings), self.batch_size):
+            txn = self.registry.tryClaimRent(
+                *claim_args(rentings[i : i + self.batch_size]), {"from": self.account}
+            )
+            record_transaction(txn)
+            report.transactions += 1
+            report.gas_used += txn.gas_used
+            for event in txn.events:
+                if event.name == "RentClaimed":
+                    report.claimed.append(event["rentingID"])
+                elif event.name == "RentClaimSkipped":
+                    report.skipped[event["rentingID"]] = ClaimSkipReason(event["reason"])
+            self.mirror.apply_events(txn.events)
+        return report
+
+    def run_once(self, now: int) -> ClaimReport:
+        with METRICS.timer("job_seconds", job="keeper"):
+            return self.claim(self.claimable(now))
@@ -0,0 +1,134 @@
+from bisect import bisect_left, insort
+from heapq import merge
+from itertools import islice
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from scripts.mirror import RegistryMirror
+from scripts.model import PRICE_DECIMAL_SCALE, Lending, same_address, unpack_price
+
+
+def price_key(lending: Lending) -> int:
+    # unpackPrice at the smallest valid scale is the price in 1/10000ths of a token: the same
+    # ordering as the decoded price in any token with at least 4 decimals. Prices in different
+    # payment tokens do not compare, so every query is for one payment token.
+    return unpack_price(lending.daily_rent_price, PRICE_DECIMAL_SCALE)
+
+
+class ListingIndex:
+    """
+    Lendings that can currently be rented, sorted by daily rent price.
+
+    Listings are bucketed by (nftStandard, paymentToken, maxRentDuration), each bucket being a
+    sorted list of (price key, lendingID), and by nftAddress for queries on a single collection.
+    A query (always for one payment token) merges the buckets that match its filters, cheapest
+    first, and stops after k results.
+    The index follows a RegistryMirror, so it is updated incrementally by Lend / Rent / StopRent /
+    RentClaimed / StopLend.
+    """
+
+    def __init__(self, mirror: RegistryMirror, decimals: Optional[Dict[int, int]] = None):
+        self.mirror = mirror
+        # payment token index -> ERC20 decimals, to report prices in base units
+        self.decimals = decimals if decimals is not None else dict()
+        # (nft_standard, payment_token) -> max_rent_duration -> [(price key, lending id)]
+        self.buckets: Dict[Tuple[int, int], Dict[int, List[Tuple[int, int]]]] = dict()
+        # nft_address -> [(price key, lending id)]
+        self.collections: Dict[str, List[Tuple[int, int]]] = dict()
+        self.rebuild()
+        mirror.subscribe(self)
+
+    def rebuild(self) -> None:
+        self.buckets = dict()
+        self.collections = dict()
+        for lending in self.mirror.lendings.values():
+            if lending.available_amount > 0:
+                entry = (price_key(lending), lending.lending_id)
+                self.bucket(lending).append(entry)
+                self.collections.setdefault(lending.nft_address, []).append(entry)
+        for durations in self.buckets.values():
+            for bucket in durations.values():
+                bucket.sort()
+        for bucket in self.collections.values():
+            bucket.sort()
+
+    def bucket(self, lending: Lending) -> List[Tuple[int, int]]:
+        durations = self.buckets.setdefault((lending.nft_standard, lending.payment_token), dict())
+        return durations.setdefault(lending.max_rent_duration, [])
+
+    def add(self, lending: Lending) -> None:
+        entry = (price_key(lending), lending.lending_id)
+        insort(self.bucket(lending), entry)
+        insort(self.collections.setdefault(lending.nft_address, []), entry)
+
+    def remove(self, lending: Lending) -> None:
+        entry = (price_key(lending), lending.lending_id)
+        for bucket in (self.bucket(lending), self.collections[lending.nft_address]):
+            i = bisect_left(bucket, entry)
+            if i < len(bucket) and bucket[i] == entry:
+                del bucket[i]
+
+    def lending_changed(self, lending_id: int, old: Optional[Lending], new: Optional[Lending]):
+        was_listed = old is not None and old.available_amount > 0
+        is_listed = new is not None and new.available_amount > 0
+        # the listing terms never change, only the amounts do
+        if was_listed and not is_listed:
+            self.remove(old)
+        elif is_listed and not was_listed:
+            self.add(new)
+
+    def renting_changed(self, renting_id, old, new) -> None:
+        pass
+
+    def daily_price(self, lending: Lending) -> int:
+        """Daily rent price of one unit, in the payment token's base units."""
+        return unpack_price(lending.daily_rent_price, 10 ** self.decimals[lending.payment_token])
+
+    def top(
+        self,
+        k: int,
+        payment_token: int,
+        nft_standard: Optional[int] = None,
+        min_duration: int = 1,
+        min_available: int = 1,
+        nft_address: Optional[str] = None,
+        exclude_lender: Optional[str] = None,
+    ) -> List[Lending]:
+        """Cheapest k listings in `payment_token` that match all of the other filters."""
+        lendings = self.mirror.lendings
+        if nft_address is not None:
+            # one collection is small next to a (standard, token, duration) bucket: scan it
+            matches = (
+                lendings[lending_id]
+                for _, lending_id in self.collections.get(nft_address, [])
+                if (nft_standard is None or lendings[lending_id].nft_standard == nft_standard)
+                and lendings[lending_id].payment_token == payment_token
+                and lendings[lending_id].max_rent_duration >= min_duration
+                and lendings[lending_id].available_amount >= min_available
+                and (
+                    exclude_lender is None
+                    or not same_address(lendings[lending_id].lender_address, exclude_lender)
+                )
+            )
+            return list(islice(matches, k))
+
+        buckets: List[Iterable[Tuple[int, int]]] = []
+        for (standard, token), durations in self.buckets.items():
+            if token != payment_token or (nft_standard is not None and standard != nft_standard):
+                continue
+            for duration, bucket in durations.items():
+                if duration >= min_duration and bucket:
+                    buckets.append(bucket)
+
+        matches = (
+            lendings[lending_id]
+            for _, lending_id in merge(*buckets)
+            if lendings[lending_id].available_amount >= min_available
+            and (
+                exclude_lender is None
+                or not same_address(lendings[lending_id].lender_address, exclude_lender)
+            )
+        )
+        return list(islice(matches, k))
+
+    def __len__(self) -> int:
+        return sum(len(b) for durations in self.buckets.values() for b in durations.values())
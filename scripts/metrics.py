@@ -0,0 +1,245 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Prometheus style metrics of the Python tooling: RPC latency and calls per method, gas used per
+# Registry entry point, reverts by reason, and the time spent in stateful rules, keeper runs,
+# indexer polls and deployments.
+#
+# Metrics are off by default and every hook then costs a single attribute check. Enable them
+# with `METRICS.enabled = True` (and `instrument_provider` for the RPC metrics), or from the
+# environment with `configure_from_env`:
+#
+#   REGISTRY_METRICS=<path>        write the metrics to <path> at exit, in the text format
+#   REGISTRY_METRICS_PORT=<port>   serve them on http://127.0.0.1:<port>/metrics
+#
+# `brownie test` reads both, see tests/conftest.py.
+
+PATH_VAR = "REGISTRY_METRICS"
+PORT_VAR = "REGISTRY_METRICS_PORT"
+
+# seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+GAS_BUCKETS = (50_000, 100_000, 200_000, 500_000, 1_000_000, 2_000_000, 5_000_000, 10_000_000)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+HELP = {
+    "rpc_requests_total": ("counter", "JSON-RPC requests, by method"),
+    "rpc_errors_total": ("counter", "JSON-RPC requests answered with an error, by method"),
+    "rpc_request_seconds": ("histogram", "JSON-RPC request latency, by method"),
+    "tx_total": ("counter", "transactions, by entry point and status"),
+    "tx_gas_used": ("histogram", "gas used per transaction, by entry point"),
+    "tx_reverts_total": ("counter", "reverted transactions, by entry point and reason"),
+    "rule_steps_total": ("counter", "stateful rule steps, by rule and outcome"),
+    "rule_seconds": ("histogram", "stateful rule step time, by rule"),
+    "job_seconds": ("histogram", "time of a keeper run, an indexer poll or a deployment"),
+    "indexer_reorgs_total": ("counter", "reorgs the indexer rolled back"),
+    "indexer_blocks_rolled_back_total": ("counter", "blocks the indexer rolled back"),
+}
+BUCKETS = {"rpc_request_seconds": LATENCY_BUCKETS, "tx_gas_used": GAS_BUCKETS}
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # one count per bucket, the last one is +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def format_labels(labels: Labels, extra: Labels = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.counters: Dict[str, Dict[Labels, float]] = dict()
+        self.histograms: Dict[str, Dict[Labels, Histogram]] = dict()
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.counters.setdefault(name, dict())
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        if not self.enabled:
+            return
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.histograms.setdefault(name, dict())
+            if key not in series:
+                series[key] = Histogram(BUCKETS.get(name, LATENCY_BUCKETS))
+            series[key].observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self) -> None:
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        lines: List[str] = []
+        with self.lock:
+            for name in sorted(set(self.counters) | set(self.histograms)):
+                kind, text = HELP.get(name, ("untyped", name))
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in sorted(self.counters.get(name, dict()).items()):
+                    lines.append(f"{name}{format_labels(labels)} {value:g}")
+                for labels, histogram in sorted(self.histograms.get(name, dict()).items()):
+                    cumulative = 0
+                    bounds = [f"{b:g}" for b in histogram.buckets] + ["+Inf"]
+                    for bound, count in zip(bounds, histogram.counts):
+                        cumulative += count
+                        le = format_labels(labels, (("le", bound),))
+                        lines.append(f"{name}_bucket{le} {cumulative}")
+                    lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum:g}")
+                    lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str) -> None:
+        with open(path, "w") as f:
+            f.write(self.render())
+
+    def serve(self, port: int, host: str = "127.0.0.1") -> HTTPServer:
+        """Serves the metrics on http://<host>:<port>/metrics from a daemon thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # pylint: disable=invalid-name
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+METRICS = Metrics()
+
+
+def instrument_provider(provider, metrics: Metrics = METRICS):
+    """
+    Times every JSON-RPC request of a web3 provider (brownie's `web3.provider`), by method.
+    Wrapping the provider rather than adding a web3 middleware also covers the `evm_*` requests
+    brownie sends to the node directly.
+    """
+    if getattr(provider, "_metrics_instrumented", False):
+        return provider
+    make_request = provider.make_request
+
+    def timed_request(method, params):
+        if not metrics.enabled:
+            return make_request(method, params)
+        start = time.perf_counter()
+        try:
+            response = make_request(method, params)
+        except Exception:
+            metrics.inc("rpc_errors_total", method=method)
+            raise
+        finally:
+            metrics.observe("rpc_request_seconds", time.perf_counter() - start, method=method)
+            metrics.inc("rpc_requests_total", method=method)
+        if isinstance(response, dict) and "error" in response:
+            metrics.inc("rpc_errors_total", method=method)
+        return response
+
+    provider.make_request = timed_request
+    provider._metrics_instrumented = True  # pylint: disable=protected-access
+    return provider
+
+
+def entry_point(txn) -> str:
+    """`<Contract>.<function>` of a brownie TransactionReceipt, `<Contract>.constructor` of a deployment."""
+    if txn.contract_address:
+        return f"{txn.contract_name}.constructor"
+    if txn.fn_name:
+        return f"{txn.contract_name}.{txn.fn_name}"
+    return "transfer"
+
+
+def revert_reason(txn) -> str:
+    try:
+        return txn.revert_msg or "unknown"
+    except Exception:  # pylint: disable=broad-except
+        # the node cannot trace the transaction
+        return "unknown"
+
+
+def record_transaction(txn, reason: Optional[str] = None, metrics: Metrics = METRICS) -> None:
+    """
+    Records the gas and status of a brownie TransactionReceipt under its entry point. `reason`
+    overrides the revert reason read from the receipt, e.g. when the caller knows it already.
+    """
+    if not metrics.enabled:
+        return
+    name = entry_point(txn)
+    record_receipt(name, txn.status, txn.gas_used, metrics)
+    if txn.status == 0:
+        record_revert(name, reason or revert_reason(txn), metrics)
+
+
+def record_receipt(name: str, status: int, gas_used: int, metrics: Metrics = METRICS) -> None:
+    metrics.inc("tx_total", entry_point=name, status="ok" if status else "reverted")
+    metrics.observe("tx_gas_used", gas_used, entry_point=name)
+
+
+def record_revert(name: str, reason: Optional[str], metrics: Metrics = METRICS) -> None:
+    metrics.inc("tx_reverts_total", entry_point=name, reason=reason or "unknown")
+
+
+def configure_from_env(metrics: Metrics = METRICS) -> bool:
+    """Enables the metrics when REGISTRY_METRICS or REGISTRY_METRICS_PORT is set."""
+    # pylint: disable=import-outside-toplevel
+    import atexit
+
+    path, port = os.environ.get(PATH_VAR), os.environ.get(PORT_VAR)
+    if not path and not port:
+        return False
+    metrics.enabled = True
+    if path:
+        atexit.register(metrics.dump, path)
+    if port:
+        metrics.serve(int(port))
+    return True
@@ -0,0 +1,127 @@
+from dataclasses import replace
+from typing import Dict, List, Mapping, Optional
+
+from scripts.events import decode_logs
+from scripts.model import Lending, Renting, NFTStandard, price_to_int
+
+
+class RegistryMirror:
+    """
+    Off-chain copy of the Registry lendings and rentings, rebuilt from the contract's events.
+
+    Lendings are keyed by lendingID and rentings by rentingID (both are global counters in
+    the Registry). Records are never mutated in place: every change replaces the record, and
+    listeners are told about the old and the new value. A listener is any object with
+    `lending_changed(lending_id, old, new)` and `renting_changed(renting_id, old, new)`;
+    `old` is None for a creation and `new` is None for a deletion.
+    """
+
+    def __init__(self, address: Optional[str] = None):
+        # when set, events emitted by other contracts (e.g. in the same transaction) are ignored
+        self.address = address
+        self.lendings: Dict[int, Lending] = dict()
+        self.rentings: Dict[int, Renting] = dict()
+        self.listeners: List = []
+
+    def subscribe(self, listener) -> None:
+        self.listeners.append(listener)
+
+    def set_lending(self, lending_id: int, lending: Optional[Lending]) -> None:
+        old = self.lendings.get(lending_id)
+        if lending is None:
+            self.lendings.pop(lending_id, None)
+        else:
+            self.lendings[lending_id] = lending
+        for listener in self.listeners:
+            listener.lending_changed(lending_id, old, lending)
+
+    def set_renting(self, renting_id: int, renting: Optional[Renting]) -> None:
+        old = self.rentings.get(renting_id)
+        if renting is None:
+            self.rentings.pop(renting_id, None)
+        else:
+            self.rentings[renting_id] = renting
+        for listener in self.listeners:
+            listener.renting_changed(renting_id, old, renting)
+
+    def apply(self, name: str, args: Mapping) -> None:
+        handler = getattr(self, f"on_{name}", None)
+        if handler is not None:
+            handler(args)
+
+    def apply_events(self, events) -> None:
+        """Apply brownie events (e.g. `txn.events`) in the order they were emitted."""
+        for event in events:
+            if self.address is None or event.address == self.address:
+                self.apply(event.name, event)
+
+    def sync(self, registry, from_block: int, to_block) -> None:
+        # pylint: disable=import-outside-toplevel
+        from brownie import web3
+
+        logs = web3.eth.get_logs(
+            {"address": registry.address, "fromBlock": from_block, "toBlock": to_block}
+        )
+        self.apply_events(decode_logs(logs))
+
+    def on_Lend(self, args: Mapping) -> None:
+        lending = Lending(
+            nft_standard=NFTStandard.E721.value if args["is721"] else NFTStandard.E1155.value,
+            lender_address=args["lenderAddress"],
+            max_rent_duration=args["maxRentDuration"],
+            daily_rent_price=price_to_int(args["dailyRentPrice"]),
+            lend_amount=args["lendAmount"],
+            available_amount=args["lendAmount"],
+            payment_token=args["paymentToken"],
+            will_auto_renew=args["willAutoRenew"],
+            nft_address=args["nftAddress"],
+            token_id=args["tokenID"],
+            lending_id=args["lendingID"],
+        )
+        self.set_lending(lending.lending_id, lending)
+
+    def on_Rent(self, args: Mapping) -> None:
+        lending = self.lendings[args["lendingID"]]
+        renting = Renting(
+            nft_standard=lending.nft_standard,
+            nft_address=lending.nft_address,
+            token_id=lending.token_id,
+            renter_address=args["renterAddress"],
+            lending_id=lending.lending_id,
+            renting_id=args["rentingID"],
+            rent_amount=args["rentAmount"],
+            rent_duration=args["rentDuration"],
+            rented_at=args["rentedAt"],
+        )
+        self.set_lending(
+            lending.lending_id,
+            replace(lending, available_amount=lending.available_amount - renting.rent_amount),
+        )
+        self.set_renting(renting.renting_id, renting)
+
+    def on_StopLend(self, args: Mapping) -> None:
+        # emitted both by stopLend (for the full lendAmount) and by manageWillAutoRenew (for the
+        # rented amount that is not renewed). Neither changes the availableAmount
+        lending = self.lendings[args["lendingID"]]
+        lend_amount = lending.lend_amount - args["amount"]
+        if lend_amount == 0:
+            self.set_lending(lending.lending_id, None)
+        else:
+            self.set_lending(lending.lending_id, replace(lending, lend_amount=lend_amount))
+
+    def on_StopRent(self, args: Mapping) -> None:
+        self.close_renting(args["rentingID"])
+
+    def on_RentClaimed(self, args: Mapping) -> None:
+        self.close_renting(args["rentingID"])
+
+    def close_renting(self, renting_id: int) -> None:
+        renting = self.rentings[renting_id]
+        lending = self.lendings.get(renting.lending_id)
+        # a lending that is not renewed has already been reduced (or deleted) by its StopLend
+        if lending is not None and lending.will_auto_renew:
+            self.set_lending(
+                lending.lending_id,
+                replace(lending, available_amount=lending.available_amount + renting.rent_amount),
+            )
+        self.set_renting(renting_id, None)
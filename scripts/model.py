@@ -0,0 +1,159 @@
+from dataclasses import dataclass, replace
+from enum import Enum
+from typing import Optional, Tuple, Union
+
+# reference (pure python) semantics of the Registry structs and maths. Everything that
+# reads Registry state off-chain (mirror, keeper, ...) goes through this module, so that
+# there is exactly one place to update when Registry.sol changes
+
+SECONDS_IN_DAY = 86400
+# unpackPrice clamps both halves of the packed price to this value
+MAX_PRICE_PART = 9999
+PRICE_DECIMAL_SCALE = 10000
+
+
+class RegistryRevert(ValueError):
+    """Raised by the reference semantics wherever the Registry would revert, with its reason."""
+
+
+class NFTStandard(Enum):
+    E721 = 0
+    E1155 = 1
+
+
+class PaymentToken(Enum):
+    SENTINEL = 0
+    DAI = 1
+    USDC = 2
+    TUSD = 3
+
+
+class ClaimSkipReason(Enum):
+    NULL_LENDING = 0
+    NULL_RENTING = 1
+    RETURN_DATE_NOT_PASSED = 2
+
+
+@dataclass
+class Lending:
+    nft_standard: int
+    lender_address: str
+    max_rent_duration: int
+    daily_rent_price: int
+    lend_amount: int
+    available_amount: int
+    payment_token: int
+    will_auto_renew: bool
+
+    # below are not part of the contract struct
+    nft_address: str
+    token_id: int
+    lending_id: int
+
+
+@dataclass
+class Renting:
+    nft_standard: int
+    nft_address: str
+    token_id: int
+    renter_address: str
+    lending_id: int
+    renting_id: int
+    rent_amount: int
+    rent_duration: int
+    rented_at: int
+
+
+def price_to_int(price: Union[int, bytes, str]) -> int:
+    """Normalise a bytes4 price (as returned by brownie / web3) to its uint32 value."""
+    if isinstance(price, int):
+        return price
+    if isinstance(price, str):
+        return int(price, 16)
+    return int.from_bytes(bytes(price), "big")
+
+
+def same_address(a: str, b: str) -> bool:
+    return a.lower() == b.lower()
+
+
+def pack_price(whole: int, decimal: int = 0) -> int:
+    return (whole << 16) | decimal
+
+
+def unpack_price(price: int, scale: int) -> int:
+    if price <= 0:
+        raise RegistryRevert("ReNFT::invalid price")
+    if scale < PRICE_DECIMAL_SCALE:
+        raise RegistryRevert("ReNFT::invalid scale")
+    whole = min(price >> 16, MAX_PRICE_PART)
+    decimal = min(price & 0xFFFF, MAX_PRICE_PART)
+    return whole * scale + decimal * (scale // PRICE_DECIMAL_SCALE)
+
+
+def return_date(renting: Renting) -> int:
+    """Last timestamp at which the renting is not yet past its return date."""
+    return renting.rented_at + renting.rent_duration * SECONDS_IN_DAY
+
+
+def is_past_return_date(renting: Renting, now: int) -> bool:
+    if now <= renting.rented_at:
+        raise RegistryRevert("ReNFT::now before rented")
+    return now - renting.rented_at > renting.rent_duration * SECONDS_IN_DAY
+
+
+def is_claimable(renting: Renting, now: int) -> bool:
+    return now > renting.rented_at and is_past_return_date(renting, now)
+
+
+def rent_price(lending: Lending, rent_amount: int, rent_duration: int, decimals: int) -> int:
+    """What the renter pays up front in handleRent, in the payment token's base units."""
+    price = rent_amount * rent_duration * unpack_price(lending.daily_rent_price, 10 ** decimals)
+    if price <= 0:
+        raise RegistryRevert("ReNFT::rent price is zero")
+    return price
+
+
+def take_fee(amount: int, rent_fee: int) -> int:
+    return amount * rent_fee // 10000
+
+
+def stop_rent_payments(
+    lending: Lending, renting: Renting, seconds_since_rent_start: int, decimals: int, rent_fee: int = 0
+) -> Tuple[int, int, int]:
+    """(lender amount, renter refund, fee) paid out by distributePayments."""
+    rent_price_ = renting.rent_amount * unpack_price(lending.daily_rent_price, 10 ** decimals)
+    total_renter_pmt = rent_price_ * renting.rent_duration
+    send_lender_amt = seconds_since_rent_start * rent_price_ // SECONDS_IN_DAY
+    if total_renter_pmt <= 0:
+        raise RegistryRevert("ReNFT::total renter payment is zero")
+    if send_lender_amt <= 0:
+        raise RegistryRevert("ReNFT::lender payment is zero")
+    send_renter_amt = total_renter_pmt - send_lender_amt
+    fee = take_fee(send_lender_amt, rent_fee) if rent_fee != 0 else 0
+    return send_lender_amt - fee, send_renter_amt, fee
+
+
+def claim_payments(
+    lending: Lending, renting: Renting, decimals: int, rent_fee: int = 0
+) -> Tuple[int, int]:
+    """(lender amount, fee) paid out by distributeClaimPayment."""
+    rent_price_ = renting.rent_amount * unpack_price(lending.daily_rent_price, 10 ** decimals)
+    final_amt = rent_price_ * renting.rent_duration
+    fee = take_fee(final_amt, rent_fee) if rent_fee != 0 else 0
+    return final_amt - fee, fee
+
+
+def settle_lending(lending: Lending, renting: Renting) -> Tuple[Optional[Lending], int]:
+    """
+    manageWillAutoRenew: the lending left once the renting is over (None if it is deleted),
+    and the amount of the NFT returned to the lender.
+    """
+    if lending.will_auto_renew:
+        return replace(lending, available_amount=lending.available_amount + renting.rent_amount), 0
+    if lending.lend_amount > renting.rent_amount:
+        return replace(lending, lend_amount=lending.lend_amount - renting.rent_amount), renting.rent_amount
+    if lending.lend_amount == renting.rent_amount:
+        return None, renting.rent_amount
+    # unreachable through stopRent, which requires rentAmount <= lendAmount
+    return lending, 0
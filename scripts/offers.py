@@ -0,0 +1,283 @@
+from dataclasses import astuple, dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from eth_abi import encode
+from eth_keys import keys
+from eth_utils import keccak
+
+from scripts.events import to_bytes
+from scripts.metrics import record_transaction
+from scripts.model import (
+    PRICE_DECIMAL_SCALE,
+    Lending,
+    NFTStandard,
+    RegistryRevert,
+    same_address,
+    unpack_price,
+)
+from scripts.validator import ensure_is_rentable
+
+# An off-chain book of lend offers: lend terms a lender signs (EIP-712) instead of sending a
+# lend, so that the nft stays in their wallet until a renter shows up. Registry.rentOffers
+# then escrows and rents many offers in one transaction, paid for by the renter. The lender
+# only approves the Registry for the collection once.
+#
+# Offers are checked on the way into the book with the same checks as rentOffers (signature,
+# deadline, unused nonce, lend terms), and dropped once their nonce is used, from the
+# LendOfferFilled and LendOfferCancelled events.
+
+DOMAIN_NAME = "ReNFT"
+DOMAIN_VERSION = "1"
+DOMAIN_TYPE = "EIP712Domain(string name,string version,uint256 chainId,address verifyingContract)"
+# (name, solidity type) of LendOffer's fields, in the order of IRegistry.sol
+LEND_OFFER_FIELDS = (
+    ("lenderAddress", "address"),
+    ("nftStandard", "uint8"),
+    ("nftAddress", "address"),
+    ("tokenID", "uint256"),
+    ("lendAmount", "uint16"),
+    ("maxRentDuration", "uint8"),
+    ("dailyRentPrice", "bytes4"),
+    ("paymentToken", "uint8"),
+    ("willAutoRenew", "bool"),
+    ("nonce", "uint256"),
+    ("deadline", "uint256"),
+)
+LEND_OFFER_TYPE = f"LendOffer({','.join(f'{kind} {name}' for name, kind in LEND_OFFER_FIELDS)})"
+
+# an offer that expires before the fill is mined reverts the whole fill: leave it out
+DEFAULT_MARGIN = 15 * 60
+
+
+@dataclass(frozen=True)
+class LendOffer:
+    lender_address: str
+    nft_standard: int
+    nft_address: str
+    token_id: int
+    lend_amount: int
+    max_rent_duration: int
+    daily_rent_price: int
+    payment_token: int
+    will_auto_renew: bool
+    nonce: int
+    deadline: int
+
+    @property
+    def key(self) -> Tuple[str, int]:
+        return (self.lender_address.lower(), self.nonce)
+
+    def lending(self, lending_id: int = 0) -> Lending:
+        """The lending rentOffers creates from the offer."""
+        return Lending(
+            self.nft_standard,
+            self.lender_address,
+            self.max_rent_duration,
+            self.daily_rent_price,
+            self.lend_amount,
+            self.lend_amount,
+            self.payment_token,
+            self.will_auto_renew,
+            self.nft_address,
+            self.token_id,
+            lending_id,
+        )
+
+
+@dataclass(frozen=True)
+class SignedOffer:
+    offer: LendOffer
+    # r, s, v (27 or 28): what ECDSA.recover takes
+    signature: bytes
+
+
+def domain_separator(chain_id: int, registry: str) -> bytes:
+    """What Registry.domainSeparator() returns on the chain `chain_id`."""
+    return keccak(
+        encode(
+            ["bytes32", "bytes32", "bytes32", "uint256", "address"],
+            [
+                keccak(text=DOMAIN_TYPE),
+                keccak(text=DOMAIN_NAME),
+                keccak(text=DOMAIN_VERSION),
+                chain_id,
+                registry,
+            ],
+        )
+    )
+
+
+def offer_digest(offer: LendOffer, separator: bytes) -> bytes:
+    values = list(astuple(offer))
+    values[6] = offer.daily_rent_price.to_bytes(4, "big")
+    struct_hash = keccak(
+        encode(["bytes32"] + [kind for _, kind in LEND_OFFER_FIELDS], [keccak(text=LEND_OFFER_TYPE)] + values)
+    )
+    return keccak(b"\x19\x01" + bytes(separator) + struct_hash)
+
+
+def sign_offer(offer: LendOffer, private_key, separator: bytes) -> SignedOffer:
+    """`private_key` as bytes or hex, e.g. a brownie LocalAccount's `private_key`."""
+    signature = keys.PrivateKey(to_bytes(private_key)).sign_msg_hash(offer_digest(offer, separator))
+    r, s = signature.r.to_bytes(32, "big"), signature.s.to_bytes(32, "big")
+    return SignedOffer(offer, r + s + bytes([signature.v + 27]))
+
+
+def recover_signer(signed: SignedOffer, separator: bytes) -> Optional[str]:
+    signature = signed.signature
+    if len(signature) != 65 or signature[64] not in (27, 28):
+        return None
+    r, s = int.from_bytes(signature[:32], "big"), int.from_bytes(signature[32:64], "big")
+    try:
+        public_key = keys.Signature(vrs=(signature[64] - 27, r, s)).recover_public_key_from_msg_hash(
+            offer_digest(signed.offer, separator)
+        )
+    except Exception:  # pylint: disable=broad-except
+        # eth_keys raises BadSignature, or ValidationError for out of range values
+        return None
+    return public_key.to_checksum_address()
+
+
+def ensure_is_fillable(signed: SignedOffer, separator: bytes, now: int) -> None:
+    """
+    The checks rentOffers makes before escrowing the offer's nft, raising the Registry's revert
+    reason, but for the nonce: the book tracks the used ones. Terms that do not fit LendOffer's
+    types cannot be signed, their signature does not recover.
+    """
+    offer = signed.offer
+    if now > offer.deadline:
+        raise RegistryRevert("ReNFT::offer expired")
+    signer = recover_signer(signed, separator)
+    if signer is None or not same_address(signer, offer.lender_address):
+        raise RegistryRevert("ReNFT::invalid signature")
+    if offer.lend_amount <= 0:
+        raise RegistryRevert("ReNFT::lend amount is zero")
+    if offer.max_rent_duration <= 0:
+        raise RegistryRevert("ReNFT::duration is zero")
+    if offer.daily_rent_price <= 0:
+        raise RegistryRevert("ReNFT::rent price is zero")
+    if offer.payment_token <= 0:
+        raise RegistryRevert("ReNFT::token is sentinel")
+    if offer.nft_standard == NFTStandard.E721.value and offer.lend_amount != 1:
+        raise RegistryRevert("ReNFT::lendAmount should be equal to 1")
+
+
+def fill_order(signed: SignedOffer) -> Tuple:
+    # items of the same nft are contiguous so that bundleCall groups as many as it can
+    offer = signed.offer
+    return (offer.nft_address.lower(), offer.nft_standard, offer.token_id, offer.key)
+
+
+def fill_args(
+    offers: List[SignedOffer], rent_duration: int, rent_amount: int
+) -> Tuple[List[Tuple], List[bytes], List[int], List[int]]:
+    """rentOffers' arguments renting each offer for `rent_duration` days, in bundle order."""
+    offers = sorted(offers, key=fill_order)
+    return (
+        [astuple(signed.offer) for signed in offers],
+        [signed.signature for signed in offers],
+        [rent_duration] * len(offers),
+        [rent_amount] * len(offers),
+    )
+
+
+class OfferBook:
+    """
+    Signed lend offers by (lender, nonce), all signed under the same Registry's domain
+    separator. An offer with the nonce of one already in the book replaces it: only one of
+    them could ever be filled.
+    """
+
+    def __init__(self, separator: bytes):
+        self.separator = bytes(separator)
+        self.offers: Dict[Tuple[str, int], SignedOffer] = dict()
+        # nonces filled or cancelled, by lender
+        self.used: Set[Tuple[str, int]] = set()
+
+    def add(self, signed: SignedOffer, now: int) -> None:
+        if signed.offer.key in self.used:
+            raise RegistryRevert("ReNFT::offer used")
+        ensure_is_fillable(signed, self.separator, now)
+        self.offers[signed.offer.key] = signed
+
+    def prune(self, now: int) -> int:
+        """Drops the expired offers, returns how many were dropped."""
+        expired = [key for key, signed in self.offers.items() if signed.offer.deadline < now]
+        for key in expired:
+            del self.offers[key]
+        return len(expired)
+
+    def match(
+        self,
+        renter: str,
+        now: int,
+        rent_duration: int,
+        rent_amount: int = 1,
+        nft_address: Optional[str] = None,
+        payment_token: Optional[int] = None,
+        limit: Optional[int] = None,
+        margin: int = DEFAULT_MARGIN,
+    ) -> List[SignedOffer]:
+        """
+        The cheapest offers the renter can rent for `rent_duration` days until `now + margin`,
+        one per nft: two offers of the same token cannot both be escrowed.
+        """
+        # pylint: disable=too-many-arguments
+        candidates = []
+        for signed in self.offers.values():
+            offer = signed.offer
+            if offer.deadline < now + margin:
+                continue
+            if nft_address is not None and not same_address(offer.nft_address, nft_address):
+                continue
+            if payment_token is not None and offer.payment_token != payment_token:
+                continue
+            try:
+                ensure_is_rentable(offer.lending(), rent_duration, rent_amount, renter)
+            except RegistryRevert:
+                continue
+            if rent_amount > offer.lend_amount:
+                continue
+            candidates.append(signed)
+        candidates.sort(
+            key=lambda s: (unpack_price(s.offer.daily_rent_price, PRICE_DECIMAL_SCALE), s.offer.deadline)
+        )
+        matched, nfts = [], set()
+        for signed in candidates:
+            nft = (signed.offer.nft_address.lower(), signed.offer.token_id)
+            if nft in nfts:
+                continue
+            nfts.add(nft)
+            matched.append(signed)
+            if limit is not None and len(matched) == limit:
+                break
+        return matched
+
+    def apply(self, name: str, args) -> None:
+        if name in ("LendOfferFilled", "LendOfferCancelled"):
+            key = (args["lenderAddress"].lower(), args["nonce"])
+            self.used.add(key)
+            self.offers.pop(key, None)
+
+    def apply_events(self, events) -> None:
+        for event in events:
+            self.apply(event.name, event)
+
+
+def rent_offers(
+    registry,
+    book: OfferBook,
+    offers: List[SignedOffer],
+    renter,
+    rent_duration: int,
+    rent_amount: int = 1,
+    mirror=None,
+):
+    """Fills the offers with Registry.rentOffers, applying its events to the book (and mirror)."""
+    # pylint: disable=too-many-arguments
+    txn = registry.rentOffers(*fill_args(offers, rent_duration, rent_amount), {"from": renter})
+    record_transaction(txn)
+    book.apply_events(txn.events)
+    if mirror is not None:
+        mirror.apply_events(txn.events)
+    return txn
@@ -0,0 +1,38 @@
+from typing import Dict, Iterable, Optional
+
+from scripts.model import PaymentToken
+
+# every payment token but the sentinel
+PAYMENT_TOKENS = [token.value for token in PaymentToken if token != PaymentToken.SENTINEL]
+
+
+class LenderPayments:
+    """
+    A lender's pull payment mode. Once it is on, the rent of the lender's stopRents and
+    claims is credited in the Registry instead of sent on every settlement, and the lender
+    withdraws all of it, per payment token, in a single transaction.
+    """
+
+    def __init__(self, registry, account, payment_tokens: Iterable[int] = tuple(PAYMENT_TOKENS)):
+        self.registry = registry
+        self.account = account
+        self.payment_tokens = list(payment_tokens)
+
+    @property
+    def pull(self) -> bool:
+        return self.registry.pullPayments(self.account)
+
+    def set_pull(self, enabled: bool):
+        return self.registry.setPullPayments(enabled, {"from": self.account})
+
+    def balances(self) -> Dict[int, int]:
+        """The credits of the lender, by payment token, leaving out the empty ones."""
+        credits = {ix: self.registry.credits(self.account, ix) for ix in self.payment_tokens}
+        return {ix: amount for ix, amount in credits.items() if amount > 0}
+
+    def withdraw(self) -> Optional[object]:
+        """Withdraws every credit, returns the transaction (None when there are no credits)."""
+        balances = self.balances()
+        if not balances:
+            return None
+        return self.registry.withdrawCredits(sorted(balances), {"from": self.account})
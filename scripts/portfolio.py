@@ -0,0 +1,90 @@
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from scripts.keeper import bundle_order
+from scripts.metrics import record_transaction
+from scripts.mirror import RegistryMirror
+from scripts.model import Renting, is_past_return_date, same_address
+from scripts.splitter import DEFAULT_GAS_CAP, GasModel, Item, Plan, columns, split
+
+# Returns every renting of a renter at once, off a RegistryMirror.
+#
+# stopRent takes five columns that bundleCall walks in groups of consecutive items of the same
+# nft, and one item that fails ensureIsReturnable (not the renter's, past its return date) or
+# whose lending is gone reverts the whole transaction. So the rentings are picked from the
+# mirror with the contract's checks, sorted by nft so that each collection is one group, and
+# split under a gas cap with a stopRent GasModel (fitted by scripts/benchmarks/portfolio.py).
+
+# a renting that reaches its return date between `now` and the block the return is mined in
+# reverts the batch: leave it out
+DEFAULT_MARGIN = 15 * 60
+
+
+@dataclass
+class ReturnReport:
+    returned: List[int] = field(default_factory=list)
+    transactions: int = 0
+    gas_used: int = 0
+
+
+def returnable(
+    mirror: RegistryMirror, renter: str, now: int, margin: int = DEFAULT_MARGIN
+) -> List[Renting]:
+    """The renter's rentings that stopRent accepts until `now + margin`, in bundle order."""
+    rentings = []
+    for renting in mirror.rentings.values():
+        if not same_address(renting.renter_address, renter) or now <= renting.rented_at:
+            continue
+        if is_past_return_date(renting, now + margin):
+            continue
+        lending = mirror.lendings.get(renting.lending_id)
+        if lending is None or lending.nft_standard != renting.nft_standard:
+            continue
+        rentings.append(renting)
+    rentings.sort(key=bundle_order)
+    return rentings
+
+
+def return_item(mirror: RegistryMirror, renting: Renting) -> Item:
+    args = (renting.nft_standard, renting.nft_address, renting.token_id, renting.lending_id,
+            renting.renting_id)
+    payment_token = mirror.lendings[renting.lending_id].payment_token
+    return Item(renting.nft_standard, renting.nft_address, payment_token, args)
+
+
+def plan_returns(
+    mirror: RegistryMirror,
+    renter: str,
+    now: int,
+    model: GasModel,
+    gas_cap: int = DEFAULT_GAS_CAP,
+    margin: int = DEFAULT_MARGIN,
+) -> Plan:
+    """The stopRent transactions returning all of the renter's returnable rentings."""
+    items = [return_item(mirror, r) for r in returnable(mirror, renter, now, margin)]
+    return split(items, model, gas_cap)
+
+
+def return_all(
+    registry,
+    mirror: RegistryMirror,
+    renter,
+    now: int,
+    model: GasModel,
+    gas_cap: int = DEFAULT_GAS_CAP,
+    margin: int = DEFAULT_MARGIN,
+    report: Optional[ReturnReport] = None,
+) -> ReturnReport:
+    """Sends the stopRent transactions of `plan_returns`, applying their events to the mirror."""
+    # pylint: disable=too-many-arguments
+    if report is None:
+        report = ReturnReport()
+    plan = plan_returns(mirror, renter.address, now, model, gas_cap, margin)
+    for tx in plan.transactions:
+        txn = registry.stopRent(*columns(tx), {"from": renter})
+        record_transaction(txn)
+        report.transactions += 1
+        report.gas_used += txn.gas_used
+        report.returned += [event["rentingID"] for event in txn.events["StopRent"]]
+        mirror.apply_events(txn.events)
+    return report
@@ -0,0 +1,196 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from scripts.model import Lending, RegistryRevert, price_to_int, rent_price
+from scripts.validator import PAYMENT_TOKEN_NOT_SET, ensure_is_rentable, ensure_lending_not_null
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+# decimals()
+DECIMALS_SELECTOR = "0x313ce567"
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+
+
+class TokenCache:
+    """
+    Payment token addresses and decimals, cached for good: the Resolver cannot reset a token
+    once it is set, and an ERC20's decimals do not change. Unset tokens are not cached, since
+    they may still be set.
+    """
+
+    def __init__(self, web3, resolver):
+        self.web3 = web3
+        self.resolver = resolver
+        self.addresses: Dict[int, str] = dict()
+        self.decimals: Dict[int, int] = dict()
+        self.stats = CacheStats()
+
+    def address(self, payment_token: int) -> Optional[str]:
+        if payment_token in self.addresses:
+            self.stats.hits += 1
+            return self.addresses[payment_token]
+        self.stats.misses += 1
+        return self.resolve(payment_token)
+
+    def resolve(self, payment_token: int) -> Optional[str]:
+        address = self.resolver.getPaymentToken(payment_token)
+        if address == ZERO_ADDRESS:
+            return None
+        self.addresses[payment_token] = address
+        return address
+
+    def decimal(self, payment_token: int) -> Optional[int]:
+        if payment_token in self.decimals:
+            self.stats.hits += 1
+            return self.decimals[payment_token]
+        # one miss per cold call, whether or not the address was cached
+        self.stats.misses += 1
+        address = self.addresses.get(payment_token) or self.resolve(payment_token)
+        if address is None:
+            return None
+        result = self.web3.eth.call({"to": address, "data": DECIMALS_SELECTOR})
+        self.decimals[payment_token] = int.from_bytes(bytes(result), "big")
+        return self.decimals[payment_token]
+
+
+class LendingCache:
+    """
+    Lendings read through `Registry.getLending`, in a bounded LRU cache keyed by lendingID.
+
+    Entries are invalidated by the Registry events: `apply_events` takes the events of new
+    blocks, and the cache is also a RegistryMirror listener.
+    """
+
+    def __init__(self, registry, capacity: int = 10_000):
+        self.registry = registry
+        self.capacity = capacity
+        self.entries: "OrderedDict[int, Lending]" = OrderedDict()
+        self.stats = CacheStats()
+
+    def get(self, nft_address: str, token_id: int, lending_id: int) -> Optional[Lending]:
+        lending = self.entries.get(lending_id)
+        # the cache is keyed by lendingID alone, the registry by (nft, token, lendingID)
+        if (
+            lending is not None
+            and lending.token_id == token_id
+            and lending.nft_address.lower() == nft_address.lower()
+        ):
+            self.stats.hits += 1
+            self.entries.move_to_end(lending_id)
+            return lending
+        self.stats.misses += 1
+        lending = self.fetch(nft_address, token_id, lending_id)
+        if lending is not None:
+            self.entries[lending_id] = lending
+            self.entries.move_to_end(lending_id)
+            while len(self.entries) > self.capacity:
+                self.entries.popitem(last=False)
+        return lending
+
+    def fetch(self, nft_address: str, token_id: int, lending_id: int) -> Optional[Lending]:
+        (nft_standard, lender_address, max_rent_duration, daily_rent_price, lend_amount,
+         available_amount, payment_token) = self.registry.getLending(nft_address, token_id, lending_id)
+        if lender_address == ZERO_ADDRESS:
+            return None
+        return Lending(
+            nft_standard=nft_standard,
+            lender_address=lender_address,
+            max_rent_duration=max_rent_duration,
+            daily_rent_price=price_to_int(daily_rent_price),
+            lend_amount=lend_amount,
+            available_amount=available_amount,
+            payment_token=payment_token,
+            # not exposed by getLending, and not needed to quote
+            will_auto_renew=False,
+            nft_address=nft_address,
+            token_id=token_id,
+            lending_id=lending_id,
+        )
+
+    def invalidate(self, lending_id: int) -> None:
+        self.entries.pop(lending_id, None)
+
+    def apply_events(self, events) -> None:
+        for event in events:
+            if event.address != self.registry.address:
+                continue
+            if event.name in ("Rent", "StopLend", "StopRent", "RentClaimed"):
+                self.invalidate(event["lendingID"])
+
+    def lending_changed(self, lending_id, old, new) -> None:
+        self.invalidate(lending_id)
+
+    def renting_changed(self, renting_id, old, new) -> None:
+        pass
+
+
+@dataclass
+class ItemQuote:
+    # base units of the payment token, 0 when the item cannot be rented
+    price: int = 0
+    payment_token: int = 0
+    token_address: Optional[str] = None
+    reason: Optional[str] = None
+
+
+@dataclass
+class CartQuote:
+    items: List[ItemQuote] = field(default_factory=list)
+    # payment token address -> total the renter is charged in it
+    totals: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return all(item.reason is None for item in self.items)
+
+
+class Quoter:
+    """Prices a cart the way `handleRent` charges it, off the token and lending caches."""
+
+    def __init__(self, tokens: TokenCache, lendings: LendingCache):
+        self.tokens = tokens
+        self.lendings = lendings
+
+    def quote(
+        self,
+        nft_standard: Sequence[int],
+        nft_address: Sequence[str],
+        token_id: Sequence[int],
+        lending_id: Sequence[int],
+        rent_duration: Sequence[int],
+        rent_amount: Sequence[int],
+        renter: str = ZERO_ADDRESS,
+    ) -> CartQuote:
+        cart = CartQuote()
+        # rents earlier in the cart take from the same lendings
+        taken: Dict[Tuple[str, int, int], int] = dict()
+        for i in range(len(nft_address)):
+            key = (nft_address[i].lower(), token_id[i], lending_id[i])
+            item = ItemQuote()
+            cart.items.append(item)
+            try:
+                lending = self.lendings.get(nft_address[i], token_id[i], lending_id[i])
+                ensure_lending_not_null(lending)
+                lending = replace(lending, available_amount=lending.available_amount - taken.get(key, 0))
+                ensure_is_rentable(lending, rent_duration[i], rent_amount[i], renter)
+                if nft_standard[i] != lending.nft_standard:
+                    raise RegistryRevert("ReNFT::invalid nft standard")
+                if rent_amount[i] > lending.available_amount:
+                    raise RegistryRevert("ReNFT::invalid rent amount")
+                decimals = self.tokens.decimal(lending.payment_token)
+                if decimals is None:
+                    raise RegistryRevert(PAYMENT_TOKEN_NOT_SET)
+                item.price = rent_price(lending, rent_amount[i], rent_duration[i], decimals)
+            except RegistryRevert as exc:
+                item.reason = str(exc)
+                continue
+            item.payment_token = lending.payment_token
+            item.token_address = self.tokens.address(lending.payment_token)
+            taken[key] = taken.get(key, 0) + rent_amount[i]
+            cart.totals[item.token_address] = cart.totals.get(item.token_address, 0) + item.price
+        return cart
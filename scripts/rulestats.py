@@ -0,0 +1,129 @@
+import functools
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Set, Tuple
+
+from scripts.metrics import METRICS
+from scripts.tables import report
+
+# what a step of a stateful rule did
+HIT = "hit"
+# nothing to act on: the rule returned without sending a transaction
+NOOP = "noop"
+REVERT = "revert"
+
+
+@dataclass
+class RuleStats:
+    steps: int = 0
+    hits: int = 0
+    noops: int = 0
+    reverts: int = 0
+    seconds: float = 0.0
+    new_branches: int = 0
+
+    @property
+    def effective(self) -> int:
+        """Steps that sent a transaction to the Registry, whether it reverted or not."""
+        return self.hits + self.reverts
+
+
+class CoverageTracker:
+    """
+    Contract branches covered so far, from brownie's coverage evaluator. The evaluator only
+    runs under `brownie test --coverage`; without it no branch is ever new.
+    """
+
+    def __init__(self):
+        self.hashes: Set[str] = set()
+        self.branches: Set[Tuple[str, str, int, int]] = set()
+
+    def new_branches(self) -> int:
+        # pylint: disable=import-outside-toplevel
+        from brownie.test import coverage
+
+        evals = coverage.get_coverage_eval()
+        before = len(self.branches)
+        for coverage_hash in evals.keys() - self.hashes:
+            self.hashes.add(coverage_hash)
+            for contract, paths in evals[coverage_hash].items():
+                for path, (_, true_branches, false_branches) in paths.items():
+                    self.branches.update((contract, path, 1, i) for i in true_branches)
+                    self.branches.update((contract, path, 0, i) for i in false_branches)
+        return len(self.branches) - before
+
+
+class RuleRecorder:
+    """Per rule hit / no-op / revert counts, wall time and newly covered branches."""
+
+    def __init__(self, coverage: Optional[CoverageTracker] = None):
+        self.coverage = coverage
+        self.rules: Dict[str, RuleStats] = dict()
+
+    def record(self, rule: str, outcome: str, seconds: float, new_branches: int = 0) -> None:
+        stats = self.rules.setdefault(rule, RuleStats())
+        stats.steps += 1
+        stats.seconds += seconds
+        stats.new_branches += new_branches
+        if outcome == HIT:
+            stats.hits += 1
+        elif outcome == NOOP:
+            stats.noops += 1
+        else:
+            stats.reverts += 1
+        if METRICS.enabled:
+            METRICS.inc("rule_steps_total", rule=rule, outcome=outcome)
+            METRICS.observe("rule_seconds", seconds, rule=rule)
+
+    def total(self) -> RuleStats:
+        total = RuleStats()
+        for stats in self.rules.values():
+            total.steps += stats.steps
+            total.hits += stats.hits
+            total.noops += stats.noops
+            total.reverts += stats.reverts
+            total.seconds += stats.seconds
+            total.new_branches += stats.new_branches
+        return total
+
+    def effective_per_second(self) -> float:
+        total = self.total()
+        return total.effective / total.seconds if total.seconds else 0.0
+
+    def report(self, title: str) -> None:
+        if not self.rules:
+            return
+        rows = []
+        for rule, stats in sorted(self.rules.items()) + [("total", self.total())]:
+            rows.append(
+                [
+                    rule,
+                    stats.steps,
+                    f"{100 * stats.hits / stats.steps:.0f}%",
+                    f"{100 * stats.noops / stats.steps:.0f}%",
+                    f"{100 * stats.reverts / stats.steps:.0f}%",
+                    stats.new_branches,
+                    f"{1000 * stats.seconds / stats.steps:.0f}",
+                ]
+            )
+        columns = ["rule", "steps", "hit", "noop", "revert", "new branches", "ms/step"]
+        report(title, columns, rows)
+        print(f"effective steps per second: {self.effective_per_second():.2f}")
+
+
+def recorded(fn):
+    """
+    Records a rule's steps in the `stats` RuleRecorder of its state machine. The rule returns
+    HIT, NOOP or REVERT, which is not passed on: hypothesis wants rules to return None.
+    """
+
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        start = time.perf_counter()
+        outcome = fn(self, *args, **kwargs)
+        seconds = time.perf_counter() - start
+        coverage = self.stats.coverage
+        new_branches = coverage.new_branches() if coverage is not None else 0
+        self.stats.record(fn.__name__, outcome, seconds, new_branches)
+
+    return wrapper
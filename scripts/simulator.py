@@ -0,0 +1,313 @@
+import heapq
+import random
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from scripts.model import (
+    SECONDS_IN_DAY,
+    Lending,
+    NFTStandard,
+    PaymentToken,
+    Renting,
+    pack_price,
+    return_date,
+    settle_lending,
+)
+
+# A discrete event simulation of a market's lendings over months of synthetic traffic, to size
+# what auto-renewing lendings leave behind: manageWillAutoRenew (settle_lending) makes a
+# willAutoRenew lending available again after each renting instead of deleting it, so it lives
+# until its lender calls stopLend, and a non-renewing 1155 lending that is rented in part only
+# shrinks. The simulation projects, day by day, the lendings and rentings the Registry (and so
+# a mirror or indexer) holds, the storage slots they take and the gas of settling the rentings.
+#
+# Lends and rent demands arrive as Poisson processes. A rent demand takes a random lending
+# with an available amount, or is lost when there is none. A renting is either returned early
+# by its renter (stopRent, one transaction each) or claimed by a keeper once past its return
+# date (claimRent, batched every `keeper_interval` under a gas cap). Some lenders eventually
+# stopLend, as soon as nothing of their lending is rented.
+
+# storage slots of a Lending and of a Renting (both pack into one), and what the enumerable
+# lending index adds per lending: an entry and an index in each of the two EnumerableSets, and
+# the LendingKey (the sets' length slots are left out)
+LENDING_SLOTS = 1
+RENTING_SLOTS = 1
+INDEX_SLOTS = 6
+
+LEND, RENT, STOP_RENT, KEEPER, EXIT = range(5)
+
+
+@dataclass
+class Traffic:
+    lends_per_day: float = 500.0
+    rents_per_day: float = 400.0
+    # of the lendings, those lent with willAutoRenew
+    renew_ratio: float = 0.5
+    # of the lendings, the 1155s, lent with 1 to max_lend_amount
+    share_1155: float = 0.3
+    max_lend_amount: int = 10
+    # a lending's maxRentDuration is drawn from 1 to this, a renting's rentDuration from 1 to that
+    max_rent_duration: int = 30
+    # of the rentings, those returned with stopRent before their return date
+    early_return_ratio: float = 0.3
+    # of the lendings, those whose lender eventually calls stopLend, after mean_exit_days
+    exit_ratio: float = 0.2
+    mean_exit_days: float = 30.0
+    keeper_interval: int = SECONDS_IN_DAY
+    enumerable: bool = False
+
+
+@dataclass
+class SettlementGas:
+    """
+    Linear gas of the settlements: per transaction, and per settled item by what
+    manageWillAutoRenew does with its lending. The defaults are ballpark figures, measure yours
+    with scripts/benchmarks/claim_rent.py and scripts/benchmarks/stop_lend.py.
+    """
+
+    base: int = 45_000
+    # availableAmount += rentAmount
+    renew: int = 25_000
+    # the nft is sent back, and the lending deleted (or shrunk, for a part of an 1155)
+    return_721: int = 55_000
+    return_1155: int = 45_000
+    # per item of a stopLend
+    stop_lend: int = 40_000
+    # a keeper's claimRent batch stays under this
+    gas_cap: int = 10_000_000
+
+    def item(self, lending: Lending) -> int:
+        if lending.will_auto_renew:
+            return self.renew
+        if lending.nft_standard == NFTStandard.E721.value:
+            return self.return_721
+        return self.return_1155
+
+
+@dataclass
+class DayStats:
+    day: int
+    lendings: int = 0
+    renewing_lendings: int = 0
+    # lendings with nothing rented
+    idle_lendings: int = 0
+    # non-renewing 1155 lendings that manageWillAutoRenew shrank
+    shrunk_lendings: int = 0
+    rentings: int = 0
+    storage_slots: int = 0
+    # over the day
+    events: int = 0
+    lost_rents: int = 0
+    settlements: int = 0
+    settlement_transactions: int = 0
+    settlement_gas: int = 0
+
+
+class Simulator:
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, traffic: Traffic, gas: Optional[SettlementGas] = None, seed: int = 0):
+        self.traffic = traffic
+        self.gas = gas or SettlementGas()
+        self.rng = random.Random(seed)
+        self.now = 0
+        self.queue: List[Tuple[int, int, int, int]] = []
+        self.sequence = 0
+        self.lendings: Dict[int, Lending] = dict()
+        self.rentings: Dict[int, Renting] = dict()
+        # lendings with an available amount, for a random pick and an O(1) removal
+        self.available: List[int] = []
+        self.position: Dict[int, int] = dict()
+        self.shrunk: Set[int] = set()
+        self.claimable: List[int] = []
+        self.next_lending_id = 1
+        self.next_renting_id = 1
+        self.today = DayStats(0)
+        self.days: List[DayStats] = []
+
+    def schedule(self, time: int, kind: int, target: int = 0) -> None:
+        self.sequence += 1
+        heapq.heappush(self.queue, (time, self.sequence, kind, target))
+
+    def arrival(self, per_day: float) -> int:
+        return self.now + max(1, int(self.rng.expovariate(per_day / SECONDS_IN_DAY)))
+
+    def run(self, days: int) -> List[DayStats]:
+        traffic = self.traffic
+        if not self.queue:
+            if traffic.lends_per_day > 0:
+                self.schedule(self.arrival(traffic.lends_per_day), LEND)
+            if traffic.rents_per_day > 0:
+                self.schedule(self.arrival(traffic.rents_per_day), RENT)
+            self.schedule(traffic.keeper_interval, KEEPER)
+        handlers = {
+            LEND: self.lend,
+            RENT: self.rent,
+            STOP_RENT: self.stop_rent,
+            KEEPER: self.keep,
+            EXIT: self.stop_lend,
+        }
+        end = (len(self.days) + days) * SECONDS_IN_DAY
+        while self.queue and self.queue[0][0] <= end:
+            time, _, kind, target = heapq.heappop(self.queue)
+            while time > (self.today.day + 1) * SECONDS_IN_DAY:
+                self.close_day()
+            self.now = time
+            handlers[kind](target)
+        while len(self.days) * SECONDS_IN_DAY < end:
+            self.close_day()
+        return self.days
+
+    def close_day(self) -> None:
+        stats = self.today
+        stats.lendings = len(self.lendings)
+        stats.renewing_lendings = sum(1 for lending in self.lendings.values() if lending.will_auto_renew)
+        stats.idle_lendings = sum(
+            1 for lending in self.lendings.values() if lending.available_amount == lending.lend_amount
+        )
+        stats.shrunk_lendings = len(self.shrunk)
+        stats.rentings = len(self.rentings)
+        index_slots = INDEX_SLOTS if self.traffic.enumerable else 0
+        stats.storage_slots = (LENDING_SLOTS + index_slots) * stats.lendings + RENTING_SLOTS * stats.rentings
+        self.days.append(stats)
+        self.today = DayStats(stats.day + 1)
+
+    def make_available(self, lending_id: int) -> None:
+        if lending_id not in self.position:
+            self.position[lending_id] = len(self.available)
+            self.available.append(lending_id)
+
+    def make_unavailable(self, lending_id: int) -> None:
+        i = self.position.pop(lending_id, None)
+        if i is None:
+            return
+        last = self.available.pop()
+        if last != lending_id:
+            self.available[i] = last
+            self.position[last] = i
+
+    def lend(self, _) -> None:
+        traffic, rng = self.traffic, self.rng
+        self.schedule(self.arrival(traffic.lends_per_day), LEND)
+        is_1155 = rng.random() < traffic.share_1155
+        lend_amount = rng.randint(1, traffic.max_lend_amount) if is_1155 else 1
+        lending = Lending(
+            nft_standard=NFTStandard.E1155.value if is_1155 else NFTStandard.E721.value,
+            lender_address=f"0x{rng.randint(1, 5000):040x}",
+            max_rent_duration=rng.randint(1, traffic.max_rent_duration),
+            daily_rent_price=pack_price(1),
+            lend_amount=lend_amount,
+            available_amount=lend_amount,
+            payment_token=PaymentToken.DAI.value,
+            will_auto_renew=rng.random() < traffic.renew_ratio,
+            nft_address=f"0x{rng.randint(1, 200):040x}",
+            token_id=self.next_lending_id,
+            lending_id=self.next_lending_id,
+        )
+        self.next_lending_id += 1
+        self.lendings[lending.lending_id] = lending
+        self.make_available(lending.lending_id)
+        self.today.events += 1
+        if rng.random() < traffic.exit_ratio:
+            delay = rng.expovariate(1 / (traffic.mean_exit_days * SECONDS_IN_DAY))
+            self.schedule(self.now + max(1, int(delay)), EXIT, lending.lending_id)
+
+    def rent(self, _) -> None:
+        traffic, rng = self.traffic, self.rng
+        self.schedule(self.arrival(traffic.rents_per_day), RENT)
+        if not self.available:
+            self.today.lost_rents += 1
+            return
+        lending = self.lendings[self.available[rng.randrange(len(self.available))]]
+        renting = Renting(
+            nft_standard=lending.nft_standard,
+            nft_address=lending.nft_address,
+            token_id=lending.token_id,
+            renter_address=f"0x{rng.randint(5001, 50000):040x}",
+            lending_id=lending.lending_id,
+            renting_id=self.next_renting_id,
+            rent_amount=rng.randint(1, lending.available_amount),
+            rent_duration=rng.randint(1, lending.max_rent_duration),
+            rented_at=self.now,
+        )
+        self.next_renting_id += 1
+        self.rentings[renting.renting_id] = renting
+        lending.available_amount -= renting.rent_amount
+        if lending.available_amount == 0:
+            self.make_unavailable(lending.lending_id)
+        self.today.events += 1
+        if rng.random() < traffic.early_return_ratio:
+            # stopRent takes up to and including the return date
+            at = self.now + rng.randint(1, renting.rent_duration * SECONDS_IN_DAY)
+            self.schedule(at, STOP_RENT, renting.renting_id)
+        else:
+            self.claimable.append(renting.renting_id)
+
+    def settle(self, renting: Renting) -> int:
+        """manageWillAutoRenew, and the gas of the settled item."""
+        del self.rentings[renting.renting_id]
+        lending = self.lendings[renting.lending_id]
+        gas = self.gas.item(lending)
+        settled, _ = settle_lending(lending, renting)
+        self.today.settlements += 1
+        self.today.events += 1
+        if not lending.will_auto_renew:
+            # StopLend of the part that is not renewed
+            self.today.events += 1
+        if settled is None:
+            del self.lendings[lending.lending_id]
+            self.make_unavailable(lending.lending_id)
+            self.shrunk.discard(lending.lending_id)
+            return gas
+        if settled.lend_amount < lending.lend_amount:
+            self.shrunk.add(lending.lending_id)
+        self.lendings[lending.lending_id] = settled
+        if settled.available_amount > 0:
+            self.make_available(lending.lending_id)
+        return gas
+
+    def stop_rent(self, renting_id: int) -> None:
+        gas = self.gas.base + self.settle(self.rentings[renting_id])
+        self.today.settlement_transactions += 1
+        self.today.settlement_gas += gas
+
+    def keep(self, _) -> None:
+        self.schedule(self.now + self.traffic.keeper_interval, KEEPER)
+        due, pending = [], []
+        for renting_id in self.claimable:
+            renting = self.rentings[renting_id]
+            (due if self.now > return_date(renting) else pending).append(renting)
+        self.claimable = [renting.renting_id for renting in pending]
+        # the due rentings in claimRent transactions filled up to the gas cap
+        transactions, gas = 0, 0
+        for renting in due:
+            item = self.settle(renting)
+            if transactions == 0 or gas + item > self.gas.gas_cap:
+                self.today.settlement_gas += gas
+                transactions += 1
+                gas = self.gas.base
+            gas += item
+        self.today.settlement_gas += gas
+        self.today.settlement_transactions += transactions
+
+    def stop_lend(self, lending_id: int) -> None:
+        lending = self.lendings.get(lending_id)
+        if lending is None:
+            return
+        if lending.available_amount != lending.lend_amount:
+            # actively rented: the lender tries again the next day
+            self.schedule(self.now + SECONDS_IN_DAY, EXIT, lending_id)
+            return
+        del self.lendings[lending_id]
+        self.make_unavailable(lending_id)
+        self.shrunk.discard(lending_id)
+        self.today.events += 1
+        self.today.settlement_transactions += 1
+        self.today.settlement_gas += self.gas.base + self.gas.stop_lend
+
+
+def simulate(
+    traffic: Traffic, days: int, gas: Optional[SettlementGas] = None, seed: int = 0
+) -> List[DayStats]:
+    """The state at the end of each of the first `days` days, and the day's activity."""
+    return Simulator(traffic, gas, seed).run(days)
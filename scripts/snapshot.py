@@ -0,0 +1,297 @@
+import mmap
+import os
+import struct
+from collections.abc import MutableMapping
+from typing import Callable, Dict, Iterator, Optional, Set
+
+from eth_utils import to_checksum_address
+
+from scripts.mirror import RegistryMirror
+from scripts.model import Lending, Renting
+
+MAGIC = b"RENFTSNP"
+VERSION = 1
+
+# magic, version, block number, block hash, lendings, rentings
+HEADER = struct.Struct(">8sH6xQ32sQQ")
+# lendingID, nftAddress, tokenID, then the Lending storage slot as a big endian word. Solidity
+# packs struct members from the low order bytes up, so the word reads (from its first byte)
+# willAutoRenew, paymentToken, availableAmount, lendAmount, dailyRentPrice, maxRentDuration,
+# lenderAddress, nftStandard
+LENDING = struct.Struct(">Q20s32sBBHHIB20sB")
+LENDING_SLOT = slice(LENDING.size - 32, LENDING.size)
+# rentingID, lendingID, nftAddress, tokenID, nftStandard (of the lending), then the Renting
+# storage slot: 5 unused bytes, rentAmount, rentedAt, rentDuration, renterAddress
+RENTING = struct.Struct(">QQ20s32sB5xHIB20s")
+RENTING_SLOT = slice(RENTING.size - 32, RENTING.size)
+RECORD_ID = struct.Struct(">Q")
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class Addresses:
+    """Checksummed address strings, converted once per distinct address."""
+
+    def __init__(self):
+        self.cache: Dict[bytes, str] = dict()
+
+    def __call__(self, raw: bytes) -> str:
+        address = self.cache.get(raw)
+        if address is None:
+            address = self.cache[raw] = to_checksum_address(raw)
+        return address
+
+
+def pack_lending(lending: Lending) -> bytes:
+    return LENDING.pack(
+        lending.lending_id,
+        bytes.fromhex(lending.nft_address[2:]),
+        lending.token_id.to_bytes(32, "big"),
+        int(lending.will_auto_renew),
+        lending.payment_token,
+        lending.available_amount,
+        lending.lend_amount,
+        lending.daily_rent_price,
+        lending.max_rent_duration,
+        bytes.fromhex(lending.lender_address[2:]),
+        lending.nft_standard,
+    )
+
+
+def pack_renting(renting: Renting) -> bytes:
+    return RENTING.pack(
+        renting.renting_id,
+        renting.lending_id,
+        bytes.fromhex(renting.nft_address[2:]),
+        renting.token_id.to_bytes(32, "big"),
+        renting.nft_standard,
+        renting.rent_amount,
+        renting.rented_at,
+        renting.rent_duration,
+        bytes.fromhex(renting.renter_address[2:]),
+    )
+
+
+def write_snapshot(path: str, mirror: RegistryMirror, block_number: int, block_hash: str) -> None:
+    """Write the mirror as of `block_number`, atomically replacing `path`."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(
+            HEADER.pack(
+                MAGIC,
+                VERSION,
+                block_number,
+                bytes.fromhex(block_hash[2:]),
+                len(mirror.lendings),
+                len(mirror.rentings),
+            )
+        )
+        f.write(b"".join(pack_lending(mirror.lendings[i]) for i in sorted(mirror.lendings)))
+        f.write(b"".join(pack_renting(mirror.rentings[i]) for i in sorted(mirror.rentings)))
+    os.replace(tmp, path)
+
+
+class Records:
+    """A sorted run of fixed width records in the mapped file, searchable by their leading id."""
+
+    def __init__(self, buf, offset: int, count: int, layout: struct.Struct):
+        self.buf = buf
+        self.offset = offset
+        self.count = count
+        self.layout = layout
+
+    def __len__(self) -> int:
+        return self.count
+
+    def at(self, i: int) -> int:
+        return self.offset + i * self.layout.size
+
+    def index(self, record_id: int) -> Optional[int]:
+        if self.count == 0:
+            return None
+        size, offset, buf = self.layout.size, self.offset, self.buf
+        # ids are increasing integers, so the record is at most (id - first id) records in:
+        # exactly there while no record before it has been deleted
+        first = RECORD_ID.unpack_from(buf, offset)[0]
+        if record_id < first:
+            return None
+        lo, hi = 0, min(self.count, record_id - first + 1)
+        if RECORD_ID.unpack_from(buf, offset + (hi - 1) * size)[0] == record_id:
+            return hi - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if RECORD_ID.unpack_from(buf, offset + mid * size)[0] < record_id:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == self.count or RECORD_ID.unpack_from(buf, offset + lo * size)[0] != record_id:
+            return None
+        return lo
+
+    def find(self, record_id: int) -> Optional[tuple]:
+        i = self.index(record_id)
+        return None if i is None else self.layout.unpack_from(self.buf, self.at(i))
+
+    def raw(self, i: int) -> bytes:
+        return bytes(self.buf[self.at(i) : self.at(i + 1)])
+
+    def ids(self) -> Iterator[int]:
+        for i in range(self.count):
+            yield RECORD_ID.unpack_from(self.buf, self.at(i))[0]
+
+    def __iter__(self) -> Iterator[tuple]:
+        return self.layout.iter_unpack(self.buf[self.offset : self.at(self.count)])
+
+
+class Overlay(MutableMapping):
+    """
+    The records of a snapshot keyed by id, decoded on access, with the changes made since the
+    snapshot kept on top of them: a mirror can start from a snapshot without reading it whole.
+    """
+
+    def __init__(self, records: Records, decode: Callable):
+        self.records = records
+        self.decode = decode
+        self.changed: Dict[int, object] = dict()
+        # ids of snapshot records deleted since
+        self.deleted: Set[int] = set()
+        self.size = len(records)
+
+    def in_snapshot(self, key: int) -> bool:
+        return key not in self.deleted and self.records.index(key) is not None
+
+    def __getitem__(self, key: int):
+        if key in self.changed:
+            return self.changed[key]
+        record = None if key in self.deleted else self.records.find(key)
+        if record is None:
+            raise KeyError(key)
+        return self.decode(record)
+
+    def __contains__(self, key) -> bool:
+        return key in self.changed or self.in_snapshot(key)
+
+    def __setitem__(self, key: int, value) -> None:
+        if key not in self:
+            self.size += 1
+        self.changed[key] = value
+
+    def __delitem__(self, key: int) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self.changed.pop(key, None)
+        if self.records.index(key) is not None:
+            self.deleted.add(key)
+        self.size -= 1
+
+    def __iter__(self) -> Iterator[int]:
+        for key in self.records.ids():
+            if key not in self.deleted and key not in self.changed:
+                yield key
+        yield from list(self.changed)
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class Snapshot:
+    """
+    A snapshot file, memory mapped: opening it only reads the header, and single records are
+    found by binary search over the mapped records without reading the rest of the file.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.buf = memoryview(self.mmap)
+        if len(self.buf) < HEADER.size:
+            raise SnapshotError("truncated header")
+        magic, version, self.block_number, block_hash, lendings, rentings = HEADER.unpack_from(
+            self.buf
+        )
+        if magic != MAGIC:
+            raise SnapshotError("not a registry snapshot")
+        if version != VERSION:
+            raise SnapshotError(f"unsupported snapshot version {version}")
+        self.block_hash = "0x" + block_hash.hex()
+        self.lending_records = Records(self.buf, HEADER.size, lendings, LENDING)
+        self.renting_records = Records(
+            self.buf, self.lending_records.at(lendings), rentings, RENTING
+        )
+        if self.renting_records.at(rentings) != len(self.buf):
+            raise SnapshotError("size does not match the header")
+        self.address = Addresses()
+
+    def close(self) -> None:
+        self.lending_records = self.renting_records = None
+        self.buf.release()
+        self.mmap.close()
+
+    def __enter__(self) -> "Snapshot":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def to_lending(self, record: tuple) -> Lending:
+        (lending_id, nft_address, token_id, will_auto_renew, payment_token, available_amount,
+         lend_amount, daily_rent_price, max_rent_duration, lender_address, nft_standard) = record
+        # positional: decoding is what a full load spends its time on
+        return Lending(
+            nft_standard,
+            self.address(lender_address),
+            max_rent_duration,
+            daily_rent_price,
+            lend_amount,
+            available_amount,
+            payment_token,
+            will_auto_renew == 1,
+            self.address(nft_address),
+            int.from_bytes(token_id, "big"),
+            lending_id,
+        )
+
+    def to_renting(self, record: tuple) -> Renting:
+        (renting_id, lending_id, nft_address, token_id, nft_standard, rent_amount, rented_at,
+         rent_duration, renter_address) = record
+        return Renting(
+            nft_standard,
+            self.address(nft_address),
+            int.from_bytes(token_id, "big"),
+            self.address(renter_address),
+            lending_id,
+            renting_id,
+            rent_amount,
+            rent_duration,
+            rented_at,
+        )
+
+    def lending(self, lending_id: int) -> Optional[Lending]:
+        record = self.lending_records.find(lending_id)
+        return None if record is None else self.to_lending(record)
+
+    def renting(self, renting_id: int) -> Optional[Renting]:
+        record = self.renting_records.find(renting_id)
+        return None if record is None else self.to_renting(record)
+
+    def lendings(self) -> Iterator[Lending]:
+        return map(self.to_lending, self.lending_records)
+
+    def rentings(self) -> Iterator[Renting]:
+        return map(self.to_renting, self.renting_records)
+
+    def mirror(self, address: Optional[str] = None) -> RegistryMirror:
+        """A mirror that starts from the snapshot, reading its records only when they are used."""
+        mirror = RegistryMirror(address)
+        mirror.lendings = Overlay(self.lending_records, self.to_lending)
+        mirror.rentings = Overlay(self.renting_records, self.to_renting)
+        return mirror
+
+    def load(self, address: Optional[str] = None) -> RegistryMirror:
+        """A mirror with the whole snapshot decoded into plain dicts."""
+        mirror = RegistryMirror(address)
+        mirror.lendings = {lending.lending_id: lending for lending in self.lendings()}
+        mirror.rentings = {renting.renting_id: renting for renting in self.rentings()}
+        return mirror
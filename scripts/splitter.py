@@ -0,0 +1,198 @@
+import json
+from dataclasses import asdict, astuple, dataclass, field
+from typing import Dict, List, Sequence, Tuple
+
+from scripts.model import Lending, NFTStandard
+
+# Splits a large lend or rent cart into transactions under a gas cap, off a linear gas model.
+#
+# bundleCall runs a handler per group of consecutive items of the same nft (address and
+# standard), and each group pays for its nft transfers (a safeBatchTransferFrom for 1155s, a
+# transferFrom per 721), so a transaction costs
+#
+#   base + per group of each standard + per item of each standard + per distinct payment token
+#
+# where a payment token is cold the first time a transaction uses it (resolver slot, ERC20
+# account and balances). The coefficients are fitted on measured transactions, see
+# scripts/benchmarks/splitter.py.
+
+# under mainnet's block gas limit of 30M, leaving room for the model's error
+DEFAULT_GAS_CAP = 25_000_000
+
+
+class SplitError(Exception):
+    """The cart cannot be split under the gas cap."""
+
+
+@dataclass(frozen=True)
+class Item:
+    nft_standard: int
+    nft_address: str
+    # of the lending (rent) or of the item (lend)
+    payment_token: int
+    # the item's arguments of the call, in order, e.g. one row of lend's columns
+    args: Tuple
+
+    @property
+    def group(self) -> Tuple[str, int]:
+        return (self.nft_address.lower(), self.nft_standard)
+
+
+def lend_item(
+    nft_standard: int,
+    nft_address: str,
+    token_id: int,
+    lend_amount: int,
+    max_rent_duration: int,
+    daily_rent_price: int,
+    payment_token: int,
+    will_auto_renew: bool,
+) -> Item:
+    args = (nft_standard, nft_address, token_id, lend_amount, max_rent_duration, daily_rent_price,
+            payment_token, will_auto_renew)
+    return Item(nft_standard, nft_address, payment_token, args)
+
+
+def rent_item(lending: Lending, rent_duration: int, rent_amount: int) -> Item:
+    args = (lending.nft_standard, lending.nft_address, lending.token_id, lending.lending_id,
+            rent_duration, rent_amount)
+    return Item(lending.nft_standard, lending.nft_address, lending.payment_token, args)
+
+
+@dataclass
+class GasModel:
+    base: int = 0
+    group_721: int = 0
+    group_1155: int = 0
+    item_721: int = 0
+    item_1155: int = 0
+    payment_token: int = 0
+
+    def estimate(self, items: Sequence[Item]) -> int:
+        return sum(c * x for c, x in zip(astuple(self), features(items)))
+
+
+def features(items: Sequence[Item]) -> List[int]:
+    """The counts the coefficients of a GasModel apply to, for one transaction."""
+    groups = {NFTStandard.E721.value: 0, NFTStandard.E1155.value: 0}
+    counts = {NFTStandard.E721.value: 0, NFTStandard.E1155.value: 0}
+    for i, item in enumerate(items):
+        if i == 0 or item.group != items[i - 1].group:
+            groups[item.nft_standard] += 1
+        counts[item.nft_standard] += 1
+    return [
+        1,
+        groups[NFTStandard.E721.value],
+        groups[NFTStandard.E1155.value],
+        counts[NFTStandard.E721.value],
+        counts[NFTStandard.E1155.value],
+        len({item.payment_token for item in items}),
+    ]
+
+
+def solve(matrix: List[List[float]], vector: List[float]) -> List[float]:
+    """Gaussian elimination with partial pivoting, on copies."""
+    n = len(vector)
+    rows = [list(row) + [value] for row, value in zip(matrix, vector)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        if abs(rows[pivot][col]) < 1e-9:
+            raise SplitError(f"samples do not vary coefficient {col} of the gas model")
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(col + 1, n):
+            factor = rows[r][col] / rows[col][col]
+            for c in range(col, n + 1):
+                rows[r][c] -= factor * rows[col][c]
+    solution = [0.0] * n
+    for r in reversed(range(n)):
+        known = sum(rows[r][c] * solution[c] for c in range(r + 1, n))
+        solution[r] = (rows[r][n] - known) / rows[r][r]
+    return solution
+
+
+def fit(samples: Sequence[Tuple[Sequence[Item], int]]) -> GasModel:
+    """Least squares fit of a GasModel on (transaction items, gas used) samples."""
+    xs = [features(items) for items, _ in samples]
+    n = len(xs[0])
+    xtx = [[sum(x[i] * x[j] for x in xs) for j in range(n)] for i in range(n)]
+    xty = [sum(x[i] * gas for x, (_, gas) in zip(xs, samples)) for i in range(n)]
+    return GasModel(*[round(c) for c in solve(xtx, xty)])
+
+
+def save_model(path: str, models: Dict[str, GasModel]) -> None:
+    with open(path, "w") as f:
+        json.dump({name: asdict(model) for name, model in models.items()}, f, indent=1)
+
+
+def load_model(path: str) -> Dict[str, GasModel]:
+    with open(path) as f:
+        return {name: GasModel(**model) for name, model in json.load(f).items()}
+
+
+def group_items(items: Sequence[Item]) -> List[List[Item]]:
+    """
+    The cart's items grouped by nft, in the order each nft first appears: items of a collection
+    scattered across the cart end up in a single bundleCall group.
+    """
+    groups: Dict[Tuple[str, int], List[Item]] = dict()
+    for item in items:
+        groups.setdefault(item.group, []).append(item)
+    return list(groups.values())
+
+
+def columns(items: Sequence[Item]) -> List[List]:
+    """Call data columns (one list per argument) of a transaction's items."""
+    return [list(column) for column in zip(*(item.args for item in items))]
+
+
+@dataclass
+class Plan:
+    transactions: List[List[Item]] = field(default_factory=list)
+    # estimated gas of each transaction
+    gas: List[int] = field(default_factory=list)
+
+    @property
+    def total_gas(self) -> int:
+        return sum(self.gas)
+
+    def cost(self, gas_price: int) -> int:
+        """Expected cost of the whole cart, in wei."""
+        return self.total_gas * gas_price
+
+    def calls(self) -> List[List[List]]:
+        return [columns(tx) for tx in self.transactions]
+
+
+def split(items: Sequence[Item], model: GasModel, gas_cap: int = DEFAULT_GAS_CAP) -> Plan:
+    """
+    Packs the cart's groups into as few transactions under `gas_cap` as first fit decreasing
+    finds, each group whole in one transaction when it fits under the cap. A group too large for
+    a transaction of its own is cut into chunks that each fill one.
+    """
+    pieces: List[List[Item]] = []
+    for group in group_items(items):
+        if model.estimate(group) <= gas_cap:
+            pieces.append(group)
+            continue
+        chunk: List[Item] = []
+        for item in group:
+            if chunk and model.estimate(chunk + [item]) > gas_cap:
+                pieces.append(chunk)
+                chunk = []
+            if model.estimate([item]) > gas_cap:
+                raise SplitError(f"a single item takes more than {gas_cap} gas")
+            chunk.append(item)
+        pieces.append(chunk)
+
+    plan = Plan()
+    for piece in sorted(pieces, key=model.estimate, reverse=True):
+        for i, tx in enumerate(plan.transactions):
+            gas = model.estimate(tx + piece)
+            if gas <= gas_cap:
+                plan.transactions[i] = tx + piece
+                plan.gas[i] = gas
+                break
+        else:
+            plan.transactions.append(list(piece))
+            plan.gas.append(model.estimate(piece))
+    return plan
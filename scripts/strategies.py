@@ -0,0 +1,195 @@
+from dataclasses import dataclass
+from typing import List, Sequence, Tuple
+
+from hypothesis import strategies as st
+
+from scripts.model import MAX_PRICE_PART, NFTStandard, PaymentToken, pack_price
+from scripts.validator import UINT8_MAX, UINT16_MAX
+
+# hypothesis strategies for Registry call data. Values are drawn from weighted buckets: the
+# common case first (hypothesis shrinks towards it), then rarer but valid values, then the
+# edge values that make the Registry revert, which can be left out with `edges=False`.
+#
+# Strategies do not see the chain: items that act on existing lendings / rentings carry a
+# `pick`, an index the caller takes modulo the number of candidates it has.
+
+SET_PAYMENT_TOKENS = [PaymentToken.DAI.value, PaymentToken.USDC.value, PaymentToken.TUSD.value]
+# a payment token index the resolver has no token for
+UNSET_PAYMENT_TOKEN = max(SET_PAYMENT_TOKENS) + 1
+# how often an item of a batch carries the other nft standard, in percent
+FLIP_PERCENT = 5
+
+
+def weighted(*buckets: Tuple[int, st.SearchStrategy]) -> st.SearchStrategy:
+    """Draw from one of the (weight, strategy) buckets, with probability weight / total."""
+    buckets = [(weight, strategy) for weight, strategy in buckets if weight > 0]
+    total = sum(weight for weight, _ in buckets)
+
+    def bucket(roll: int) -> st.SearchStrategy:
+        for weight, strategy in buckets:
+            if roll < weight:
+                return strategy
+            roll -= weight
+        raise AssertionError(roll)
+
+    return st.integers(0, total - 1).flatmap(bucket)
+
+
+def durations(edges: bool = True) -> st.SearchStrategy:
+    """maxRentDuration / rentDuration in days: mostly up to a week."""
+    # both are uint8 in the ABI, so zero is the only out of range value that can be sent
+    return weighted(
+        (70, st.integers(1, 7)),
+        (20, st.integers(8, 31)),
+        (5, st.integers(32, UINT8_MAX)),
+        (5 if edges else 0, st.just(0)),
+    )
+
+
+def daily_rent_prices(edges: bool = True) -> st.SearchStrategy:
+    """Packed bytes4 prices (whole units << 16 | ten thousandths of a unit)."""
+    return weighted(
+        (60, st.builds(pack_price, st.integers(1, 100), st.sampled_from([0, 5000, 9999]))),
+        (15, st.builds(pack_price, st.just(0), st.integers(1, MAX_PRICE_PART))),
+        (15, st.builds(pack_price, st.integers(101, MAX_PRICE_PART), st.integers(0, MAX_PRICE_PART))),
+        # both halves go above 9999, which unpackPrice clamps
+        (5, st.builds(pack_price, st.integers(MAX_PRICE_PART + 1, 2 ** 16 - 1), st.integers(0, 2 ** 16 - 1))),
+        (5 if edges else 0, st.just(0)),
+    )
+
+
+def payment_tokens(edges: bool = True) -> st.SearchStrategy:
+    # lending with a token the resolver does not know succeeds, renting it reverts
+    return weighted(
+        (50, st.just(PaymentToken.DAI.value)),
+        (45, st.sampled_from(SET_PAYMENT_TOKENS[1:])),
+        (5 if edges else 0, st.sampled_from([PaymentToken.SENTINEL.value, UNSET_PAYMENT_TOKEN])),
+    )
+
+
+def lend_amounts(
+    nft_standard: int, edges: bool = True, max_amount: int = UINT16_MAX
+) -> st.SearchStrategy:
+    """`max_amount` is how many of a 1155 the lender holds: the transfer fails past it."""
+    if nft_standard == NFTStandard.E721.value:
+        return weighted((95, st.just(1)), (5 if edges else 0, st.sampled_from([0, 2])))
+    return weighted(
+        (80, st.integers(1, min(10, max_amount))),
+        (15 if max_amount > 10 else 0, st.integers(11, max_amount)),
+        (5 if edges else 0, st.sampled_from([0, UINT16_MAX + 1])),
+    )
+
+
+def rent_amounts(edges: bool = True) -> st.SearchStrategy:
+    # amounts above what is available revert with "invalid rent amount"
+    return weighted(
+        (85, st.just(1)),
+        (10, st.integers(2, 10)),
+        (5 if edges else 0, st.sampled_from([0, UINT16_MAX + 1])),
+    )
+
+
+def nft_standards() -> st.SearchStrategy:
+    return st.sampled_from([s.value for s in NFTStandard])
+
+
+def picks() -> st.SearchStrategy:
+    return st.integers(0, 2 ** 16 - 1)
+
+
+def flips(edges: bool = True) -> st.SearchStrategy:
+    """Whether an item is sent with the other nft standard (an "invalid nft standard")."""
+    return weighted((100 - FLIP_PERCENT, st.just(False)), (FLIP_PERCENT if edges else 0, st.just(True)))
+
+
+@dataclass
+class LendItem:
+    nft_standard: int
+    # which of the caller's nft contracts of that standard
+    pick: int
+    lend_amount: int
+    max_rent_duration: int
+    daily_rent_price: int
+    payment_token: int
+    will_auto_renew: bool
+
+
+@dataclass
+class RentItem:
+    pick: int
+    flip: bool
+    rent_duration: int
+    rent_amount: int
+
+
+@dataclass
+class ActionItem:
+    """An item of stopLend, stopRent or claimRent: a pick among existing lendings or rentings."""
+
+    pick: int
+    flip: bool
+
+
+def lend_items(edges: bool = True, max_amount: int = UINT16_MAX) -> st.SearchStrategy:
+    return nft_standards().flatmap(
+        lambda nft_standard: st.builds(
+            LendItem,
+            st.just(nft_standard),
+            picks(),
+            lend_amounts(nft_standard, edges, max_amount),
+            durations(edges),
+            daily_rent_prices(edges),
+            payment_tokens(edges),
+            st.booleans(),
+        )
+    )
+
+
+def rent_items(edges: bool = True) -> st.SearchStrategy:
+    return st.builds(RentItem, picks(), flips(edges), durations(edges), rent_amounts(edges))
+
+
+def action_items(edges: bool = True) -> st.SearchStrategy:
+    return st.builds(ActionItem, picks(), flips(edges))
+
+
+def batches(items: st.SearchStrategy, max_size: int = 8) -> st.SearchStrategy:
+    """Batches of one to `max_size` items, mostly short ones."""
+    return weighted(
+        (60, st.lists(items, min_size=1, max_size=min(max_size, 3))),
+        (40, st.lists(items, min_size=1, max_size=max_size)),
+    )
+
+
+def lend_batches(
+    max_size: int = 8, edges: bool = True, max_amount: int = UINT16_MAX
+) -> st.SearchStrategy:
+    return batches(lend_items(edges, max_amount), max_size)
+
+
+def rent_batches(max_size: int = 8, edges: bool = True) -> st.SearchStrategy:
+    return batches(rent_items(edges), max_size)
+
+
+def action_batches(max_size: int = 8, edges: bool = True) -> st.SearchStrategy:
+    return batches(action_items(edges), max_size)
+
+
+def sleeps() -> st.SearchStrategy:
+    """Seconds to let pass before stopping or claiming: within a day, or days past it."""
+    return weighted(
+        (60, st.integers(1, 86_400)),
+        (40, st.integers(86_401, 10 * 86_400)),
+    )
+
+
+def resolve(candidates: Sequence, items: Sequence) -> List:
+    """The candidate each item picks, or an empty list when there are no candidates."""
+    if not candidates:
+        return []
+    return [candidates[item.pick % len(candidates)] for item in items]
+
+
+def columns(rows: Sequence[Sequence]) -> List[List]:
+    """Call data columns (one list per argument) from per item rows."""
+    return [list(column) for column in zip(*rows)]
@@ -0,0 +1,11 @@
+from typing import List
+
+# plain text tables, printed by the benchmarks and at the end of the stateful tests
+
+
+def report(title: str, columns: List[str], rows: List[List]) -> None:
+    widths = [max([len(str(c))] + [len(str(row[i])) for row in rows]) for i, c in enumerate(columns)]
+    print(f"\n{title}")
+    print("  ".join(str(c).rjust(w) for c, w in zip(columns, widths)))
+    for row in rows:
+        print("  ".join(str(v).rjust(w) for v, w in zip(row, widths)))
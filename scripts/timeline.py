@@ -0,0 +1,127 @@
+from bisect import bisect_left, insort
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from scripts.mirror import RegistryMirror
+from scripts.model import Renting, return_date
+
+# one bucket per hour of return dates
+BUCKET_WIDTH = 3600
+
+
+class ExpiryTimeline:
+    """
+    Active rentings ordered by return date (`rentedAt + rentDuration * 86400`).
+
+    Return dates are bucketed by BUCKET_WIDTH seconds: a sorted list of the non empty bucket
+    numbers, and per bucket a sorted list of (return date, rentingID). Finding where a range
+    starts is a bisection over the buckets and then within one bucket, and inserting or
+    removing a renting only touches its own bucket. A renting is past its return date (and so
+    claimable) at any `now` strictly greater than its return date. The timeline follows a
+    RegistryMirror, so it is updated incrementally by Rent / StopRent / RentClaimed.
+    """
+
+    def __init__(self, mirror: RegistryMirror, bucket_width: int = BUCKET_WIDTH):
+        self.mirror = mirror
+        self.bucket_width = bucket_width
+        self.keys: List[int] = []
+        self.buckets: Dict[int, List[Tuple[int, int]]] = dict()
+        self.size = 0
+        self.rebuild()
+        mirror.subscribe(self)
+
+    def rebuild(self) -> None:
+        self.buckets = dict()
+        for renting in self.mirror.rentings.values():
+            expiry = return_date(renting)
+            self.buckets.setdefault(expiry // self.bucket_width, []).append(
+                (expiry, renting.renting_id)
+            )
+        for bucket in self.buckets.values():
+            bucket.sort()
+        self.keys = sorted(self.buckets)
+        self.size = len(self.mirror.rentings)
+
+    def add(self, renting: Renting) -> None:
+        expiry = return_date(renting)
+        key = expiry // self.bucket_width
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = []
+            insort(self.keys, key)
+        insort(bucket, (expiry, renting.renting_id))
+        self.size += 1
+
+    def remove(self, renting: Renting) -> None:
+        expiry = return_date(renting)
+        key = expiry // self.bucket_width
+        bucket = self.buckets.get(key, [])
+        entry = (expiry, renting.renting_id)
+        i = bisect_left(bucket, entry)
+        if i == len(bucket) or bucket[i] != entry:
+            return
+        del bucket[i]
+        self.size -= 1
+        if not bucket:
+            del self.buckets[key]
+            del self.keys[bisect_left(self.keys, key)]
+
+    def lending_changed(self, lending_id, old, new) -> None:
+        pass
+
+    def renting_changed(self, renting_id: int, old: Optional[Renting], new: Optional[Renting]):
+        if old is not None:
+            self.remove(old)
+        if new is not None:
+            self.add(new)
+
+    def entries(self, start: int, end: int) -> Iterator[Tuple[int, int]]:
+        """(return date, rentingID) with start <= return date < end, in return date order."""
+        i = bisect_left(self.keys, start // self.bucket_width)
+        while i < len(self.keys):
+            key = self.keys[i]
+            if key * self.bucket_width >= end:
+                return
+            bucket = self.buckets[key]
+            j = bisect_left(bucket, (start, -1)) if key == start // self.bucket_width else 0
+            for j in range(j, len(bucket)):
+                if bucket[j][0] >= end:
+                    return
+                yield bucket[j]
+            i += 1
+
+    def between(self, start: int, end: int) -> Iterator[Renting]:
+        rentings = self.mirror.rentings
+        return (rentings[renting_id] for _, renting_id in self.entries(start, end))
+
+    def expired(self, now: int) -> Iterator[Renting]:
+        """The rentings that are past their return date at `now`."""
+        return self.between(0, now)
+
+    def next_expiry(self, after: int = 0) -> Optional[int]:
+        """The first return date at or after `after`."""
+        for expiry, _ in self.entries(after, 2 ** 256):
+            return expiry
+        return None
+
+    def cursor(self, position: int) -> "ExpiryCursor":
+        return ExpiryCursor(self, position)
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class ExpiryCursor:
+    """Walks the timeline forward: each advance returns the rentings that expired since the last."""
+
+    def __init__(self, timeline: ExpiryTimeline, position: int):
+        self.timeline = timeline
+        # return dates before this have already been reported
+        self.position = position
+
+    def advance(self, now: int) -> List[Renting]:
+        if now <= self.position:
+            return []
+        # a renting is past its return date once now > return date
+        expired = list(self.timeline.between(self.position, now))
+        self.position = now
+        return expired
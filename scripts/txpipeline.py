@@ -0,0 +1,182 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from scripts.metrics import METRICS, record_receipt
+
+# a node only accepts a replacement (same nonce) that pays at least 10% more
+MIN_REPLACEMENT_BUMP = 1.1
+
+
+@dataclass
+class PendingTx:
+    nonce: int
+    tx: Dict
+    hashes: List[str] = field(default_factory=list)
+    sent_at: float = 0.0
+    replacements: int = 0
+    receipt: Optional[Dict] = None
+    # `<Contract>.<function>` of a submit_call, for the metrics
+    entry_point: str = "transfer"
+
+
+@dataclass
+class PipelineStats:
+    submitted: int = 0
+    mined: int = 0
+    reverted: int = 0
+    replaced: int = 0
+    gas_used: int = 0
+    started_at: float = 0.0
+    finished_at: float = 0.0
+
+    @property
+    def elapsed(self) -> float:
+        return self.finished_at - self.started_at
+
+    @property
+    def throughput(self) -> float:
+        return self.mined / self.elapsed if self.elapsed > 0 else 0.0
+
+
+class TxPipeline:
+    """
+    Signs and broadcasts many transactions from one account without waiting for receipts.
+
+    Nonces are handed out locally, so transactions can be sent back to back and are still mined
+    in submission order. Receipts are polled for all pending transactions at once; a transaction
+    that is still pending after `replace_after` seconds is re-sent with the same nonce and a
+    bumped gas price. Gas limits must be given explicitly whenever a transaction depends on an
+    earlier one that is not mined yet (estimation runs against the latest block).
+    """
+
+    def __init__(
+        self,
+        web3,
+        account,
+        gas_price: Optional[int] = None,
+        gas_bump: float = 1.125,
+        max_gas_price: Optional[int] = None,
+        replace_after: float = 30.0,
+        poll_interval: float = 0.5,
+        workers: int = 8,
+    ):
+        if gas_bump < MIN_REPLACEMENT_BUMP:
+            raise ValueError(f"gas_bump must be at least {MIN_REPLACEMENT_BUMP}")
+        self.web3 = web3
+        self.address = account.address
+        # brownie LocalAccount exposes `private_key`, eth_account's LocalAccount `key`
+        self.private_key = getattr(account, "private_key", None) or getattr(account, "key", None)
+        self.gas_price = gas_price if gas_price is not None else web3.eth.gas_price
+        self.gas_bump = gas_bump
+        self.max_gas_price = max_gas_price
+        self.replace_after = replace_after
+        self.poll_interval = poll_interval
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.chain_id = web3.eth.chain_id
+        self.nonce = web3.eth.get_transaction_count(self.address, "pending")
+        self.pending: Dict[int, PendingTx] = dict()
+        self.done: List[PendingTx] = []
+        self.stats = PipelineStats(started_at=time.monotonic())
+
+    def submit(
+        self, to: str, data: str = "0x", value: int = 0, gas: Optional[int] = None
+    ) -> PendingTx:
+        tx = {"from": self.address, "to": to, "data": data, "value": value, "nonce": self.nonce}
+        tx["gas"] = gas if gas is not None else self.web3.eth.estimate_gas(tx)
+        tx["gasPrice"] = self.gas_price
+        tx["chainId"] = self.chain_id
+        pending = PendingTx(nonce=self.nonce, tx=tx)
+        self.broadcast(pending)
+        self.pending[self.nonce] = pending
+        self.nonce += 1
+        self.stats.submitted += 1
+        return pending
+
+    def submit_call(self, method, *args, value: int = 0, gas: Optional[int] = None) -> PendingTx:
+        """Submit a call to a brownie ContractTx, e.g. `submit_call(registry.lend, ...)`."""
+        # pylint: disable=protected-access
+        pending = self.submit(method._address, method.encode_input(*args), value=value, gas=gas)
+        pending.entry_point = method._name
+        return pending
+
+    def broadcast(self, pending: PendingTx) -> None:
+        if self.private_key is None:
+            # an account unlocked on the node (e.g. the development accounts)
+            tx_hash = self.web3.eth.send_transaction(pending.tx)
+        else:
+            tx = {k: v for k, v in pending.tx.items() if k != "from"}
+            signed = self.web3.eth.account.sign_transaction(tx, self.private_key)
+            raw = getattr(signed, "raw_transaction", None) or signed.rawTransaction
+            tx_hash = self.web3.eth.send_raw_transaction(raw)
+        pending.hashes.append("0x" + bytes(tx_hash).hex())
+        pending.sent_at = time.monotonic()
+
+    def bump(self, pending: PendingTx) -> None:
+        gas_price = int(pending.tx["gasPrice"] * self.gas_bump) + 1
+        if self.max_gas_price is not None and gas_price > self.max_gas_price:
+            return
+        pending.tx = {**pending.tx, "gasPrice": gas_price}
+        try:
+            self.broadcast(pending)
+        except Exception as exc:  # pylint: disable=broad-except
+            # the original got mined in the meantime, the next poll picks its receipt up
+            if "nonce too low" not in str(exc).lower():
+                raise
+            return
+        pending.replacements += 1
+        self.stats.replaced += 1
+
+    def receipt(self, tx_hash: str) -> Optional[Dict]:
+        try:
+            return self.web3.eth.get_transaction_receipt(tx_hash)
+        except Exception:  # pylint: disable=broad-except
+            # web3 raises TransactionNotFound while the transaction is pending
+            return None
+
+    def poll(self) -> List[PendingTx]:
+        """Collect the receipts of the pending transactions, replacing the ones that are stuck."""
+        pending = list(self.pending.values())
+        hashes = [(p, h) for p in pending for h in p.hashes]
+        receipts = self.executor.map(self.receipt, [h for _, h in hashes])
+        mined = []
+        for (tx, _), receipt in zip(hashes, receipts):
+            if receipt is not None and tx.receipt is None:
+                tx.receipt = receipt
+                mined.append(tx)
+        now = time.monotonic()
+        for tx in mined:
+            del self.pending[tx.nonce]
+            self.done.append(tx)
+            self.stats.mined += 1
+            self.stats.gas_used += tx.receipt["gasUsed"]
+            if tx.receipt["status"] == 0:
+                self.stats.reverted += 1
+            if METRICS.enabled:
+                record_receipt(tx.entry_point, tx.receipt["status"], tx.receipt["gasUsed"])
+        for tx in self.pending.values():
+            if now - tx.sent_at > self.replace_after:
+                self.bump(tx)
+        self.stats.finished_at = now
+        return mined
+
+    def wait(self, timeout: Optional[float] = None) -> PipelineStats:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending:
+            self.poll()
+            if not self.pending:
+                break
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"{len(self.pending)} transactions still pending")
+            time.sleep(self.poll_interval)
+        return self.stats
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=True)
+
+    def __enter__(self) -> "TxPipeline":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
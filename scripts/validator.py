@@ -0,0 +1,383 @@
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from scripts.mirror import RegistryMirror
+from scripts.model import (
+    Lending,
+    NFTStandard,
+    Renting,
+    RegistryRevert,
+    is_past_return_date,
+    rent_price,
+    same_address,
+    settle_lending,
+    stop_rent_payments,
+    unpack_price,
+)
+
+UINT8_MAX = 2 ** 8 - 1
+UINT16_MAX = 2 ** 16 - 1
+
+# reverts that do not come from a require in the Registry
+# the Registry has no length check: it panics at the first read past the end of a short column
+# (maybe after an earlier item has reverted with its own reason), and ignores extra items
+LENGTH_MISMATCH = "array lengths differ"
+PAYMENT_TOKEN_NOT_SET = "payment token not set in resolver"
+ERC20_BALANCE = "ERC20: transfer amount exceeds balance"
+ERC20_ALLOWANCE = "ERC20: transfer amount exceeds allowance"
+# claimRent returns the NFTs through the interface of the nftStandard it is given, which it
+# does not check against the lending: the call of the other standard reverts without a reason
+NFT_RETURN = "nft returned with the other standard"
+# the reverts above that have no revert reason
+REASONLESS = (PAYMENT_TOKEN_NOT_SET, NFT_RETURN)
+
+
+@dataclass
+class Validation:
+    # one entry per item, None when the item passes
+    reasons: List[Optional[str]] = field(default_factory=list)
+    # reasons that fail the whole batch before any item is looked at
+    error: Optional[str] = None
+    # item -> the last item of its bundleCall group, for failures raised once the group has
+    # been settled (the NFT returns) rather than at the item
+    deferred: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and all(reason is None for reason in self.reasons)
+
+    @property
+    def revert_reason(self) -> Optional[str]:
+        """
+        The reason the transaction reverts with: bundleCall runs the items in order, and sends
+        the NFTs of a group back after its last item.
+        """
+        if self.error is not None:
+            return self.error
+        failures = [
+            ((self.deferred.get(i, i), i in self.deferred), reason)
+            for i, reason in enumerate(self.reasons)
+            if reason is not None
+        ]
+        return min(failures, key=lambda failure: failure[0])[1] if failures else None
+
+    def failed(self) -> Dict[int, str]:
+        return {i: reason for i, reason in enumerate(self.reasons) if reason is not None}
+
+
+class BatchValidator:
+    """
+    Checks a batch against a RegistryMirror the way the Registry would, without sending it.
+
+    Every item is checked in order with the require checks of its handler, in the same order as
+    in Registry.sol, so the first failing item carries the reason the transaction would revert
+    with. Items that pass are applied to a scratch copy of the state, so that later items in
+    the same batch see them (e.g. two rents of the same lending, or a stopLend repeated twice);
+    items that fail are not applied, which gives the reason each of them would fail with if
+    the failing items before it were dropped. The NFT transfers are not checked, but for the
+    NFTs claimRent returns with the wrong nftStandard (NFT_RETURN): those items are settled and
+    applied, and fail their whole group after its last item.
+
+    Columns of different lengths fail the whole batch (LENGTH_MISMATCH), which is stricter than
+    the Registry.
+
+    `decimals` maps a payment token index to the decimals of the ERC20 set in the resolver, and
+    `funds` (optional) maps it to the sender's (balance, allowance to the Registry).
+    """
+
+    def __init__(
+        self,
+        mirror: RegistryMirror,
+        decimals: Dict[int, int],
+        rent_fee: int = 0,
+        paused: bool = False,
+    ):
+        self.mirror = mirror
+        self.decimals = decimals
+        self.rent_fee = rent_fee
+        self.paused = paused
+
+    def lend(
+        self,
+        sender: str,
+        nft_standard: Sequence[int],
+        nft_address: Sequence[str],
+        token_id: Sequence[int],
+        lend_amount: Sequence[int],
+        max_rent_duration: Sequence[int],
+        daily_rent_price: Sequence[int],
+        payment_token: Sequence[int],
+        will_auto_renew: Sequence[bool],
+    ) -> Validation:
+        # pylint: disable=unused-argument
+        columns = (nft_standard, nft_address, token_id, lend_amount, max_rent_duration)
+        columns += (daily_rent_price, payment_token, will_auto_renew)
+        validation = self.start(columns)
+        if validation.error is not None:
+            return validation
+        for i in range(len(nft_address)):
+            validation.reasons.append(
+                self.check_lend(
+                    nft_standard[i],
+                    lend_amount[i],
+                    max_rent_duration[i],
+                    daily_rent_price[i],
+                    payment_token[i],
+                )
+            )
+        return validation
+
+    def stop_lend(
+        self,
+        sender: str,
+        nft_standard: Sequence[int],
+        nft_address: Sequence[str],
+        token_id: Sequence[int],
+        lending_id: Sequence[int],
+    ) -> Validation:
+        validation = self.start((nft_standard, nft_address, token_id, lending_id))
+        if validation.error is not None:
+            return validation
+        state = Scratch(self.mirror)
+        for i in range(len(nft_address)):
+            key = (nft_address[i], token_id[i], lending_id[i])
+            try:
+                lending = state.lending(*key)
+                ensure_lending_not_null(lending)
+                if not same_address(lending.lender_address, sender):
+                    raise RegistryRevert("ReNFT::not lender")
+                if nft_standard[i] != lending.nft_standard:
+                    raise RegistryRevert("ReNFT::invalid nft standard")
+                if lending.lend_amount != lending.available_amount:
+                    raise RegistryRevert("ReNFT::actively rented")
+            except RegistryRevert as exc:
+                validation.reasons.append(str(exc))
+                continue
+            state.set_lending(*key, None)
+            validation.reasons.append(None)
+        return validation
+
+    def rent(
+        self,
+        sender: str,
+        nft_standard: Sequence[int],
+        nft_address: Sequence[str],
+        token_id: Sequence[int],
+        lending_id: Sequence[int],
+        rent_duration: Sequence[int],
+        rent_amount: Sequence[int],
+        funds: Optional[Dict[int, Tuple[int, int]]] = None,
+    ) -> Validation:
+        columns = (nft_standard, nft_address, token_id, lending_id, rent_duration, rent_amount)
+        validation = self.start(columns)
+        if validation.error is not None:
+            return validation
+        state = Scratch(self.mirror)
+        spent: Dict[int, int] = dict()
+        for i in range(len(nft_address)):
+            key = (nft_address[i], token_id[i], lending_id[i])
+            try:
+                lending = state.lending(*key)
+                ensure_lending_not_null(lending)
+                ensure_is_rentable(lending, rent_duration[i], rent_amount[i], sender)
+                if nft_standard[i] != lending.nft_standard:
+                    raise RegistryRevert("ReNFT::invalid nft standard")
+                if rent_amount[i] > lending.available_amount:
+                    raise RegistryRevert("ReNFT::invalid rent amount")
+                price = rent_price(lending, rent_amount[i], rent_duration[i], self.decimal(lending))
+                if funds is not None:
+                    balance, allowance = funds.get(lending.payment_token, (0, 0))
+                    total = spent.get(lending.payment_token, 0) + price
+                    if total > balance:
+                        raise RegistryRevert(ERC20_BALANCE)
+                    if total > allowance:
+                        raise RegistryRevert(ERC20_ALLOWANCE)
+                    spent[lending.payment_token] = total
+            except RegistryRevert as exc:
+                validation.reasons.append(str(exc))
+                continue
+            state.set_lending(
+                *key, replace(lending, available_amount=lending.available_amount - rent_amount[i])
+            )
+            validation.reasons.append(None)
+        return validation
+
+    def stop_rent(
+        self,
+        sender: str,
+        now: int,
+        nft_standard: Sequence[int],
+        nft_address: Sequence[str],
+        token_id: Sequence[int],
+        lending_id: Sequence[int],
+        renting_id: Sequence[int],
+    ) -> Validation:
+        return self.end_rentings(
+            sender, now, nft_standard, nft_address, token_id, lending_id, renting_id, claim=False
+        )
+
+    def claim_rent(
+        self,
+        sender: str,
+        now: int,
+        nft_standard: Sequence[int],
+        nft_address: Sequence[str],
+        token_id: Sequence[int],
+        lending_id: Sequence[int],
+        renting_id: Sequence[int],
+    ) -> Validation:
+        return self.end_rentings(
+            sender, now, nft_standard, nft_address, token_id, lending_id, renting_id, claim=True
+        )
+
+    def end_rentings(
+        self, sender, now, nft_standard, nft_address, token_id, lending_id, renting_id, claim
+    ) -> Validation:
+        # pylint: disable=too-many-arguments
+        validation = self.start((nft_standard, nft_address, token_id, lending_id, renting_id))
+        if validation.error is not None:
+            return validation
+        state = Scratch(self.mirror)
+        last = group_ends(nft_standard, nft_address)
+        for i in range(len(nft_address)):
+            lending_key = (nft_address[i], token_id[i], lending_id[i])
+            renting_key = (nft_address[i], token_id[i], renting_id[i])
+            try:
+                lending = state.lending(*lending_key)
+                renting = state.renting(*renting_key)
+                ensure_lending_not_null(lending)
+                ensure_renting_not_null(renting)
+                if claim:
+                    if not is_past_return_date(renting, now):
+                        raise RegistryRevert("ReNFT::return date not passed")
+                    # distributeClaimPayment
+                    unpack_price(lending.daily_rent_price, 10 ** self.decimal(lending))
+                    # the item is settled, but sendReturns fails after the group's last item
+                    returned = settle_lending(lending, renting)[1]
+                    if returned > 0 and nft_standard[i] != lending.nft_standard:
+                        validation.deferred[i] = last[i]
+                else:
+                    if not same_address(renting.renter_address, sender):
+                        raise RegistryRevert("ReNFT::not renter")
+                    if is_past_return_date(renting, now):
+                        raise RegistryRevert("ReNFT::past return date")
+                    if nft_standard[i] != lending.nft_standard:
+                        raise RegistryRevert("ReNFT::invalid nft standard")
+                    if renting.rent_amount > lending.lend_amount:
+                        raise RegistryRevert("ReNFT::critical error")
+                    stop_rent_payments(
+                        lending, renting, now - renting.rented_at, self.decimal(lending), self.rent_fee
+                    )
+            except RegistryRevert as exc:
+                validation.reasons.append(str(exc))
+                continue
+            state.set_lending(*lending_key, settle_lending(lending, renting)[0])
+            state.set_renting(*renting_key, None)
+            validation.reasons.append(NFT_RETURN if i in validation.deferred else None)
+        return validation
+
+    def start(self, columns: Sequence[Sequence]) -> Validation:
+        if self.paused:
+            return Validation(error="ReNFT::paused")
+        # a batch error, where the Registry would fail or ignore items, see LENGTH_MISMATCH
+        if len({len(column) for column in columns}) != 1:
+            return Validation(error=LENGTH_MISMATCH)
+        if len(columns[0]) == 0:
+            return Validation(error="ReNFT::no nfts")
+        return Validation()
+
+    def check_lend(
+        self, nft_standard, lend_amount, max_rent_duration, daily_rent_price, payment_token
+    ) -> Optional[str]:
+        # pylint: disable=too-many-return-statements
+        # ensureIsLendable
+        if lend_amount <= 0:
+            return "ReNFT::lend amount is zero"
+        if lend_amount > UINT16_MAX:
+            return "ReNFT::not uint16"
+        if max_rent_duration <= 0:
+            return "ReNFT::duration is zero"
+        if max_rent_duration > UINT8_MAX:
+            return "ReNFT::not uint8"
+        if daily_rent_price <= 0:
+            return "ReNFT::rent price is zero"
+        # ensureTokenNotSentinel
+        if payment_token <= 0:
+            return "ReNFT::token is sentinel"
+        if nft_standard == NFTStandard.E721.value and lend_amount != 1:
+            return "ReNFT::lendAmount should be equal to 1"
+        return None
+
+    def decimal(self, lending: Lending) -> int:
+        if lending.payment_token not in self.decimals:
+            # the call to decimals() on the zero address reverts without a reason
+            raise RegistryRevert(PAYMENT_TOKEN_NOT_SET)
+        return self.decimals[lending.payment_token]
+
+
+class Scratch:
+    """Copy-on-write view of the mirror, keyed like the Registry (nftAddress, tokenID, id)."""
+
+    def __init__(self, mirror: RegistryMirror):
+        self.mirror = mirror
+        self.lendings: Dict[Tuple[str, int, int], Optional[Lending]] = dict()
+        self.rentings: Dict[Tuple[str, int, int], Optional[Renting]] = dict()
+
+    def lending(self, nft_address: str, token_id: int, lending_id: int) -> Optional[Lending]:
+        key = (nft_address.lower(), token_id, lending_id)
+        if key in self.lendings:
+            return self.lendings[key]
+        lending = self.mirror.lendings.get(lending_id)
+        if lending is None or lending.token_id != token_id:
+            return None
+        return lending if same_address(lending.nft_address, nft_address) else None
+
+    def renting(self, nft_address: str, token_id: int, renting_id: int) -> Optional[Renting]:
+        key = (nft_address.lower(), token_id, renting_id)
+        if key in self.rentings:
+            return self.rentings[key]
+        renting = self.mirror.rentings.get(renting_id)
+        if renting is None or renting.token_id != token_id:
+            return None
+        return renting if same_address(renting.nft_address, nft_address) else None
+
+    def set_lending(self, nft_address: str, token_id: int, lending_id: int, lending) -> None:
+        self.lendings[(nft_address.lower(), token_id, lending_id)] = lending
+
+    def set_renting(self, nft_address: str, token_id: int, renting_id: int, renting) -> None:
+        self.rentings[(nft_address.lower(), token_id, renting_id)] = renting
+
+
+def group_ends(nft_standard: Sequence[int], nft_address: Sequence[str]) -> List[int]:
+    """groupEnds: the last item of the bundleCall group of each item."""
+    last = list(range(len(nft_address)))
+    for i in reversed(range(len(nft_address) - 1)):
+        if same_address(nft_address[i], nft_address[i + 1]) and nft_standard[i] == nft_standard[i + 1]:
+            last[i] = last[i + 1]
+    return last
+
+
+def ensure_lending_not_null(lending: Optional[Lending]) -> None:
+    # a missing lending reads as all zeroes, which fails the first check
+    if lending is None:
+        raise RegistryRevert("ReNFT::zero address")
+
+
+def ensure_renting_not_null(renting: Optional[Renting]) -> None:
+    if renting is None:
+        raise RegistryRevert("ReNFT::zero address")
+
+
+def ensure_is_rentable(lending: Lending, rent_duration: int, rent_amount: int, sender: str) -> None:
+    if same_address(sender, lending.lender_address):
+        raise RegistryRevert("ReNFT::cant rent own nft")
+    if rent_duration > UINT8_MAX:
+        raise RegistryRevert("ReNFT::not uint8")
+    if rent_duration <= 0:
+        raise RegistryRevert("ReNFT::duration is zero")
+    if rent_amount > UINT16_MAX:
+        raise RegistryRevert("ReNFT::not uint16")
+    if rent_amount <= 0:
+        raise RegistryRevert("ReNFT::rentAmount is zero")
+    if rent_duration > lending.max_rent_duration:
+        raise RegistryRevert("ReNFT::rent duration exceeds allowed max")
@@ -0,0 +1,183 @@
+import pytest
+
+from scripts.analytics import Analytics, AnalyticsError, Daily
+from scripts.events import Event
+from scripts.model import (
+    SECONDS_IN_DAY,
+    Lending,
+    PaymentToken,
+    Renting,
+    claim_payments,
+    pack_price,
+    rent_price,
+    stop_rent_payments,
+)
+
+DAI, USDC = PaymentToken.DAI.value, PaymentToken.USDC.value
+DECIMALS = {DAI: 18, USDC: 6}
+NFT_A = "0x00000000000000000000000000000000000000aA"
+NFT_B = "0x00000000000000000000000000000000000000bB"
+LENDER = "0x0000000000000000000000000000000000000001"
+RENTER = "0x0000000000000000000000000000000000000002"
+REGISTRY = "0x00000000000000000000000000000000000000cc"
+T0 = 100 * SECONDS_IN_DAY
+BLOCK_TIMES = {1: T0}
+
+LENDING_A = Lending(0, LENDER, 3, pack_price(1), 1, 1, DAI, False, NFT_A, 7, 1)
+LENDING_B = Lending(1, LENDER, 5, pack_price(2, 5000), 4, 4, USDC, True, NFT_B, 2 ** 255, 2)
+
+
+def event(name, **fields):
+    return Event(name, REGISTRY, fields, 1, 0)
+
+
+def lend(lending):
+    return event(
+        "Lend",
+        is721=lending.nft_standard == 0,
+        lenderAddress=lending.lender_address,
+        nftAddress=lending.nft_address,
+        tokenID=lending.token_id,
+        lendingID=lending.lending_id,
+        maxRentDuration=lending.max_rent_duration,
+        dailyRentPrice=lending.daily_rent_price.to_bytes(4, "big"),
+        lendAmount=lending.lend_amount,
+        paymentToken=lending.payment_token,
+        willAutoRenew=lending.will_auto_renew,
+    )
+
+
+def rent(lending, renting):
+    return event(
+        "Rent",
+        renterAddress=renting.renter_address,
+        lendingID=lending.lending_id,
+        rentingID=renting.renting_id,
+        rentAmount=renting.rent_amount,
+        rentDuration=renting.rent_duration,
+        rentedAt=renting.rented_at,
+        nftAddress=lending.nft_address,
+        tokenID=lending.token_id,
+        paymentToken=lending.payment_token,
+        paid=rent_price(lending, renting.rent_amount, renting.rent_duration, DECIMALS[lending.payment_token]),
+    )
+
+
+def settlement(lending, renting, at, **overrides):
+    fields = dict(
+        rentingID=renting.renting_id,
+        lenderAddress=lending.lender_address,
+        nftAddress=lending.nft_address,
+        tokenID=lending.token_id,
+        lendingID=lending.lending_id,
+        paymentToken=lending.payment_token,
+    )
+    decimals = DECIMALS[lending.payment_token]
+    if at > renting.rented_at + renting.rent_duration * SECONDS_IN_DAY:
+        lender_amount, fee = claim_payments(lending, renting, decimals, rent_fee=100)
+        fields.update(collectedAt=at, lenderAmount=lender_amount, fee=fee)
+        name = "RentClaimed"
+    else:
+        lender_amount, renter_amount, fee = stop_rent_payments(
+            lending, renting, at - renting.rented_at, decimals, rent_fee=100
+        )
+        fields.update(
+            stoppedAt=at,
+            renterAddress=renting.renter_address,
+            lenderAmount=lender_amount,
+            renterAmount=renter_amount,
+            fee=fee,
+        )
+        name = "StopRent"
+    fields.update(overrides)
+    return event(name, **fields)
+
+
+def renting(lending, renting_id, amount, duration, rented_at):
+    return Renting(lending.nft_standard, lending.nft_address, lending.token_id, RENTER, lending.lending_id,
+                   renting_id, amount, duration, rented_at)
+
+
+RENTING_1 = renting(LENDING_A, 1, 1, 3, T0 + SECONDS_IN_DAY)
+RENTING_2 = renting(LENDING_B, 2, 2, 2, T0 + SECONDS_IN_DAY)
+RENTING_3 = renting(LENDING_B, 3, 1, 1, T0 + 5 * SECONDS_IN_DAY)
+STOPPED_AT = T0 + 3 * SECONDS_IN_DAY // 2
+
+
+def history():
+    stop_lend = event("StopLend", lendingID=1, stoppedAt=STOPPED_AT, amount=1, nftAddress=NFT_A, tokenID=7)
+    return [
+        lend(LENDING_A),
+        lend(LENDING_B),
+        rent(LENDING_A, RENTING_1),
+        rent(LENDING_B, RENTING_2),
+        # manageWillAutoRenew's StopLend is emitted before the StopRent
+        stop_lend,
+        settlement(LENDING_A, RENTING_1, STOPPED_AT),
+        settlement(LENDING_B, RENTING_2, T0 + 4 * SECONDS_IN_DAY),
+        rent(LENDING_B, RENTING_3),
+    ]
+
+
+def test_rollups():
+    analytics = Analytics()
+    analytics.apply_events(history(), BLOCK_TIMES.get)
+    sizes = [len(analytics.tables[name]) for name in ("lends", "rents", "stop_lends", "settlements")]
+    assert sizes == [2, 3, 1, 2]
+    assert analytics.tables["lends"].value("token_id", 1) == 2 ** 255
+
+    revenue = analytics.revenue()
+    day = T0 // SECONDS_IN_DAY
+    assert list(revenue) == [(day + 1, DAI), (day + 1, USDC), (day + 4, USDC), (day + 5, USDC)]
+    stop_payments = stop_rent_payments(LENDING_A, RENTING_1, SECONDS_IN_DAY // 2, 18, 100)
+    assert revenue[(day + 1, DAI)] == Daily(1, 1, 3 * 10 ** 18, *stop_payments)
+    claim_lender, claim_fee = claim_payments(LENDING_B, RENTING_2, 6, 100)
+    assert revenue[(day + 4, USDC)] == Daily(0, 1, 0, claim_lender, 0, claim_fee)
+    assert list(analytics.revenue(USDC, day + 2, day + 5)) == [(day + 4, USDC)]
+
+    now = T0 + 6 * SECONDS_IN_DAY
+    utilisation = analytics.utilisation(now)
+    # A: lent for a day and a half, rented for half a day of it
+    assert utilisation[NFT_A] == pytest.approx(1 / 3)
+    # B: 4 units lent for 6 days, 2 rented for 3 days and 1 for a day
+    assert utilisation[NFT_B] == pytest.approx(7 / 24)
+    assert analytics.median_rent_duration() == 2
+    assert analytics.median_rent_duration(NFT_A) == 3
+
+
+def test_payment_maths():
+    analytics = Analytics()
+    analytics.apply_events(history(), BLOCK_TIMES.get)
+    assert analytics.verify(DECIMALS) == []
+    now = RENTING_3.rented_at + SECONDS_IN_DAY // 4
+    lender_amount, _, _ = stop_rent_payments(LENDING_B, RENTING_3, now - RENTING_3.rented_at, 6)
+    assert analytics.accrued(now, DECIMALS) == {USDC: lender_amount}
+    # past its return date, the whole rent is owed
+    later = RENTING_3.rented_at + 2 * SECONDS_IN_DAY
+    assert analytics.accrued(later, DECIMALS) == {USDC: claim_payments(LENDING_B, RENTING_3, 6)[0]}
+
+    tampered = Analytics()
+    events = history()
+    events[5] = settlement(LENDING_A, RENTING_1, STOPPED_AT, renterAmount=1)
+    tampered.apply_events(events, BLOCK_TIMES.get)
+    assert tampered.verify(DECIMALS) == [RENTING_1.renting_id]
+    with pytest.raises(AnalyticsError):
+        tampered.apply("Rent", {**rent(LENDING_A, RENTING_1), "paid": 10 ** 38})
+
+
+def test_parquet_round_trip(tmp_path):
+    pytest.importorskip("pyarrow")
+    events = history()
+    analytics = Analytics()
+    analytics.apply_events(events[:-1], BLOCK_TIMES.get)
+    analytics.write(str(tmp_path))
+    read = Analytics.read(str(tmp_path))
+    for name, table in analytics.tables.items():
+        assert list(read.tables[name].rows()) == list(table.rows())
+    # the rollups continue where they were written
+    analytics.apply_events(events[-1:], BLOCK_TIMES.get)
+    read.apply_events(events[-1:], BLOCK_TIMES.get)
+    assert read.daily == analytics.daily
+    assert read.collections == analytics.collections
+    assert read.durations == analytics.durations and read.all_durations == analytics.all_durations
+    assert read.open_lendings == analytics.open_lendings and read.open_rentings == analytics.open_rentings
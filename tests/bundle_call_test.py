@@ -0,0 +1,80 @@
+import brownie
+import pytest
+from brownie import accounts, chain
+
+from scripts.keeper import claim_args
+from scripts.model import NFTStandard, PaymentToken, pack_price
+from scripts.splitter import columns, lend_item, rent_item
+
+LENDER, RENTER = 2, 3
+
+
+@pytest.fixture(scope="module")
+def contracts(contracts):
+    dai = contracts["payment_tokens"][PaymentToken.DAI.value]
+    dai.faucet({"from": accounts[RENTER]})
+    dai.approve(contracts["registry"].address, 10 ** 27, {"from": accounts[RENTER]})
+    return contracts
+
+
+def lend_items(contracts, names):
+    registry, lender = contracts["registry"], accounts[LENDER]
+    items = []
+    for name in names:
+        nft = contracts[name]
+        nft.setApprovalForAll(registry.address, True, {"from": lender})
+        txn = nft.faucet({"from": lender})
+        if name.startswith("e721"):
+            standard, token_id = NFTStandard.E721.value, txn.events["Transfer"]["tokenId"]
+        else:
+            standard, token_id = NFTStandard.E1155.value, txn.events["TransferSingle"]["id"]
+        items.append(
+            lend_item(standard, nft.address, token_id, 1, 1, pack_price(1), PaymentToken.DAI.value, False)
+        )
+    return items
+
+
+def owner(contracts, lending, account):
+    nft = {contracts[n].address: contracts[n] for n in ("e721", "e721b", "e1155", "e1155b")}
+    nft = nft[lending.nft_address]
+    if lending.nft_standard == NFTStandard.E721.value:
+        return nft.ownerOf(lending.token_id) == account
+    return nft.balanceOf(account, lending.token_id) > 0
+
+
+def test_interleaved_groups(contracts):
+    registry, mirror = contracts["registry"], contracts["mirror"]
+    # runs of one, two and three items, collections coming back after another one
+    names = ["e721", "e721", "e1155", "e721b", "e721", "e1155", "e1155", "e1155b", "e721b", "e721b"]
+    items = lend_items(contracts, names)
+    txn = registry.lend(*columns(items), {"from": accounts[LENDER]})
+    mirror.apply_events(txn.events)
+    lendings = [mirror.lendings[event["lendingID"]] for event in txn.events["Lend"]]
+    assert [(lending.nft_address, lending.token_id) for lending in lendings] == [
+        (item.nft_address, item.args[2]) for item in items
+    ]
+    assert all(owner(contracts, lending, registry.address) for lending in lendings)
+
+    rent_items = [rent_item(lending, 1, 1) for lending in lendings]
+    txn = registry.rent(*columns(rent_items), {"from": accounts[RENTER]})
+    mirror.apply_events(txn.events)
+    rentings = [mirror.rentings[event["rentingID"]] for event in txn.events["Rent"]]
+    assert [r.lending_id for r in rentings] == [lending.lending_id for lending in lendings]
+
+    chain.sleep(100)
+    chain.mine()
+    txn = registry.stopRent(*claim_args(rentings), {"from": accounts[RENTER]})
+    assert [e["rentingID"] for e in txn.events["StopRent"]] == [r.renting_id for r in rentings]
+    assert all(owner(contracts, lending, accounts[LENDER]) for lending in lendings)
+
+
+def test_malformed_call_data_reverts(contracts):
+    registry = contracts["registry"]
+    with brownie.reverts("ReNFT::no nfts"):
+        registry.stopLend([], [], [], [], {"from": accounts[LENDER]})
+
+    items = lend_items(contracts, ["e721", "e1155"])
+    nft_standard, *rest = columns(items)
+    # a short column
+    with brownie.reverts():
+        registry.lend(nft_standard[:1], *rest, {"from": accounts[LENDER]})
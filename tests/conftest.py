@@ -0,0 +1,42 @@
+import os
+
+import pytest
+
+from scripts.evm_backend import BACKEND, ENV_VAR, connect
+from scripts.metrics import METRICS, configure_from_env, instrument_provider
+
+
+def pytest_collection_modifyitems(items):
+    # `REGISTRY_EVM=pyevm brownie test` runs the suite on an in-process chain: brownie only
+    # launches ganache when no network is connected once the tests are collected
+    if items and os.environ.get(ENV_VAR) == BACKEND:
+        from brownie import network  # pylint: disable=import-outside-toplevel
+
+        if not network.is_connected():
+            connect()
+
+
+# reset state before each test
+@pytest.fixture(autouse=True)
+def shared_setup(fn_isolation):
+    pass
+
+
+@pytest.fixture(scope="module")
+def contracts():
+    # the Registry, its resolver, payment tokens and nfts, and a mirror of the Registry
+    from scripts.deploy_test import setup  # pylint: disable=import-outside-toplevel
+
+    return setup()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def metrics():
+    # `REGISTRY_METRICS=metrics.prom brownie test` writes the metrics of the run, see
+    # scripts/metrics.py
+    if configure_from_env():
+        from brownie import web3  # pylint: disable=import-outside-toplevel
+
+        if web3.provider is not None:
+            instrument_provider(web3.provider)
+    yield METRICS
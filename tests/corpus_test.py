@@ -0,0 +1,81 @@
+import pytest
+
+from scripts.corpus import (
+    Call,
+    CallResult,
+    CorpusError,
+    diff,
+    from_transactions,
+    read_corpus,
+    state_hash,
+    translate,
+    write_corpus,
+)
+from scripts.mirror import RegistryMirror
+from scripts.model import Lending, Renting
+
+MAINNET_NFT = "0x00000000000000000000000000000000000000AA"
+LOCAL_NFT = "0x00000000000000000000000000000000000000bb"
+MAINNET_LENDER = "0x00000000000000000000000000000000000000cc"
+LOCAL_LENDER = "0x00000000000000000000000000000000000000dd"
+REGISTRY = "0x00000000000000000000000000000000000000ee"
+
+
+def test_corpus_round_trip(tmp_path):
+    calls = [
+        Call(sender=LOCAL_LENDER, to=None, data="0x00", deploy="Registry", label="Registry"),
+        Call(sender=LOCAL_LENDER, to=REGISTRY, data="0x1234", offset=60, label="Registry.lend"),
+    ]
+    path = str(tmp_path / "corpus.jsonl")
+    write_corpus(path, calls)
+    assert read_corpus(path) == calls
+
+    with open(path, "w") as f:
+        f.write('{"version": 0}\n')
+    with pytest.raises(CorpusError):
+        read_corpus(path)
+
+
+def test_translate_and_from_transactions():
+    word = MAINNET_NFT[2:].lower().rjust(64, "0")
+    data = "0xabcdef01" + word + "00" * 32
+    translated = "0xabcdef01" + LOCAL_NFT[2:].rjust(64, "0") + "00" * 32
+    assert translate(data, {MAINNET_NFT: LOCAL_NFT}) == translated
+    txs = [
+        {"from": MAINNET_LENDER, "to": REGISTRY, "input": data, "timestamp": 1000},
+        {"from": MAINNET_LENDER, "to": REGISTRY, "input": data[:10], "timestamp": 1090, "value": 5},
+    ]
+    calls = from_transactions(txs, {MAINNET_LENDER: LOCAL_LENDER, MAINNET_NFT: LOCAL_NFT})
+    assert [call.sender for call in calls] == [LOCAL_LENDER, LOCAL_LENDER]
+    assert [(call.offset, call.value, call.label) for call in calls] == [
+        (0, 0, "0xabcdef01"),
+        (90, 5, "0xabcdef01"),
+    ]
+    assert LOCAL_NFT[2:] in calls[0].data
+
+
+def test_state_hash_ignores_when_the_replay_started():
+    def mirror(start):
+        mirror = RegistryMirror()
+        mirror.lendings[1] = Lending(1, LOCAL_LENDER, 3, 1 << 16, 2, 1, 1, False, LOCAL_NFT, 7, 1)
+        mirror.rentings[1] = Renting(1, LOCAL_NFT, 7, MAINNET_LENDER, 1, 1, 1, 1, start + 60)
+        return mirror
+
+    assert state_hash(mirror(1000), 1000) == state_hash(mirror(5000), 5000)
+    assert state_hash(mirror(1000), 1000) != state_hash(mirror(1000), 990)
+
+
+def test_diff():
+    baseline = [
+        CallResult(0, "Registry.lend", 1, 100_000, "a"),
+        CallResult(1, "Registry.rent", 1, 80_000, "b"),
+    ]
+    candidate = [
+        CallResult(0, "Registry.lend", 1, 90_000, "a"),
+        CallResult(1, "Registry.rent", 0, 30_000, "c"),
+    ]
+    diffs = diff(baseline, candidate)
+    assert [d.gas_delta for d in diffs] == [-10_000, -50_000]
+    assert [(d.status_changed, d.state_changed) for d in diffs] == [(False, False), (True, True)]
+    with pytest.raises(CorpusError):
+        diff(baseline, candidate[:1])
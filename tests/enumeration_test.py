@@ -0,0 +1,92 @@
+import brownie
+from brownie import accounts, chain
+
+from scripts.deploy_test import lend, rent
+from scripts.keeper import claim_args, stop_lend_args
+from scripts.model import NFTStandard
+
+LENDER, RENTER = 2, 3
+
+
+def lend_mixed(contracts):
+    lendings = lend(contracts, accounts[LENDER], contracts["e721"], 3, NFTStandard.E721.value)
+    lendings += lend(
+        contracts, accounts[LENDER], contracts["e1155"], 2, NFTStandard.E1155.value, lend_amount=2
+    )
+    return lendings
+
+
+def lender_lendings(registry, lender, page_size):
+    found, offset = set(), 0
+    while True:
+        ids, nft_addresses, token_ids = registry.getLenderLendings(lender, offset, page_size)
+        found.update(zip(ids, nft_addresses, token_ids))
+        if len(ids) < page_size:
+            return found
+        offset += page_size
+
+
+def keys(lendings):
+    return {(lending.lending_id, lending.nft_address, lending.token_id) for lending in lendings}
+
+
+def test_off_by_default(contracts):
+    registry = contracts["registry"]
+    assert not registry.enumerable()
+    lend_mixed(contracts)
+    assert registry.getLenderLendingCount(accounts[LENDER]) == 0
+    assert registry.getLenderLendings(accounts[LENDER], 0, 10) == ((), (), ())
+
+
+def test_only_admin_toggles(contracts):
+    with brownie.reverts("ReNFT::not admin"):
+        contracts["registry"].setEnumerable(True, {"from": accounts[LENDER]})
+
+
+def test_pages_cover_every_lending(contracts):
+    registry = contracts["registry"]
+    registry.setEnumerable(True, {"from": accounts[0]})
+    lendings = lend_mixed(contracts)
+    assert registry.getLenderLendingCount(accounts[LENDER]) == 5
+    for page_size in [1, 2, 5, 10]:
+        assert lender_lendings(registry, accounts[LENDER], page_size) == keys(lendings)
+    assert registry.getNftLendingCount(contracts["e721"]) == 3
+    ids, _, token_ids = registry.getNftLendings(contracts["e1155"], 0, 10)
+    assert set(zip(ids, token_ids)) == {(l.lending_id, l.token_id) for l in lendings[3:]}
+    assert registry.getLenderLendings(accounts[LENDER], 5, 10) == ((), (), ())
+    assert registry.getLenderLendings(accounts[LENDER], 2**256 - 1, 2**256 - 1) == ((), (), ())
+
+
+def test_stopped_lendings_leave_the_sets(contracts):
+    registry = contracts["registry"]
+    registry.setEnumerable(True, {"from": accounts[0]})
+    lendings = lend_mixed(contracts)
+    registry.stopLend(*stop_lend_args([lendings[0], lendings[3]]), {"from": accounts[LENDER]})
+    remaining = keys([lendings[1], lendings[2], lendings[4]])
+    assert lender_lendings(registry, accounts[LENDER], 2) == remaining
+
+    # a 721 that does not auto renew is stopped along with its renting
+    rentings = rent(contracts, accounts[RENTER], [lendings[1]])
+    chain.sleep(100)
+    chain.mine()
+    registry.stopRent(*claim_args(rentings), {"from": accounts[RENTER]})
+    assert lender_lendings(registry, accounts[LENDER], 2) == keys([lendings[2], lendings[4]])
+    assert registry.getNftLendingCount(contracts["e721"]) == 1
+
+
+def test_lendings_from_before_enumeration_can_be_stopped(contracts):
+    registry = contracts["registry"]
+    before = lend_mixed(contracts)
+    registry.setEnumerable(True, {"from": accounts[0]})
+    after = lend_mixed(contracts)
+    registry.stopLend(*stop_lend_args(before), {"from": accounts[LENDER]})
+    assert lender_lendings(registry, accounts[LENDER], 10) == keys(after)
+
+
+def test_lendings_stopped_while_off_stay_in_the_sets(contracts):
+    registry = contracts["registry"]
+    registry.setEnumerable(True, {"from": accounts[0]})
+    lendings = lend_mixed(contracts)
+    registry.setEnumerable(False, {"from": accounts[0]})
+    registry.stopLend(*stop_lend_args(lendings[:1]), {"from": accounts[LENDER]})
+    assert lender_lendings(registry, accounts[LENDER], 10) == keys(lendings)
@@ -0,0 +1,31 @@
+from brownie import accounts, chain
+
+from scripts.deploy_test import lend, rent
+from scripts.keeper import claim_args, stop_lend_args
+from scripts.model import NFTStandard
+
+LENDER, RENTER = 2, 3
+
+
+def test_a_721_batch_moves_every_token(contracts):
+    registry, e721 = contracts["registry"], contracts["e721"]
+    lendings = lend(contracts, accounts[LENDER], e721, 5, NFTStandard.E721.value)
+    for lending in lendings:
+        assert e721.ownerOf(lending.token_id) == registry.address
+    txn = registry.stopLend(*stop_lend_args(lendings), {"from": accounts[LENDER]})
+    assert len(txn.events["Transfer"]) == 5
+    for lending in lendings:
+        assert e721.ownerOf(lending.token_id) == accounts[LENDER]
+
+
+def test_721s_of_two_collections_return_to_the_lender(contracts):
+    registry = contracts["registry"]
+    lendings = lend(contracts, accounts[LENDER], contracts["e721"], 3, NFTStandard.E721.value)
+    lendings += lend(contracts, accounts[LENDER], contracts["e721b"], 2, NFTStandard.E721.value)
+    rentings = rent(contracts, accounts[RENTER], lendings)
+    chain.sleep(100)
+    chain.mine()
+    registry.stopRent(*claim_args(rentings), {"from": accounts[RENTER]})
+    nfts = {nft.address: nft for nft in [contracts["e721"], contracts["e721b"]]}
+    for lending in lendings:
+        assert nfts[lending.nft_address].ownerOf(lending.token_id) == accounts[LENDER]
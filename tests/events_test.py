@@ -0,0 +1,178 @@
+import re
+from pathlib import Path
+from types import SimpleNamespace
+
+from eth_abi import encode
+from eth_utils import to_checksum_address
+
+from scripts.events import SPECS, PaymentLedger, decode_log, decode_logs
+from scripts.mirror import RegistryMirror
+from scripts.model import PaymentToken, pack_price
+
+REGISTRY = to_checksum_address("0x0000000000000000000000000000000000000a01")
+NFT = to_checksum_address("0x0000000000000000000000000000000000000a02")
+LENDER = to_checksum_address("0x0000000000000000000000000000000000000a03")
+RENTER = to_checksum_address("0x0000000000000000000000000000000000000a04")
+BENEFICIARY = to_checksum_address("0x0000000000000000000000000000000000000a05")
+DAI = PaymentToken.DAI.value
+
+SPECS_BY_NAME = {spec.name: spec for spec in SPECS}
+ENUMS = {"ClaimSkipReason": "uint8"}
+
+
+def make_log(name, **fields):
+    spec = SPECS_BY_NAME[name]
+    topics = [spec.topic]
+    data_types, data_values = [], []
+    for field, kind, indexed in spec.fields:
+        value = fields[field]
+        if indexed:
+            topics.append(encode([kind], [value]))
+        else:
+            data_types.append(kind)
+            data_values.append(value)
+    return {
+        "address": REGISTRY.lower(),
+        "topics": topics,
+        "data": "0x" + encode(data_types, data_values).hex(),
+        "blockNumber": 1,
+        "logIndex": 0,
+    }
+
+
+def test_specs_match_the_interface():
+    source = (Path(__file__).parent.parent / "contracts/interfaces/IRegistry.sol").read_text()
+    for spec in SPECS:
+        declaration = re.search(rf"event {spec.name}\((.*?)\);", source, re.S).group(1)
+        params = [param.split() for param in declaration.split(",")]
+        # enums are encoded as uint8
+        expected = [(p[-1], ENUMS.get(p[0], p[0]), "indexed" in p) for p in params]
+        assert list(spec.fields) == expected
+
+
+def test_decode_log():
+    log = make_log(
+        "Lend",
+        is721=True,
+        lenderAddress=LENDER,
+        nftAddress=NFT,
+        tokenID=7,
+        lendingID=1,
+        maxRentDuration=3,
+        dailyRentPrice=pack_price(1, 5).to_bytes(4, "big"),
+        lendAmount=1,
+        paymentToken=DAI,
+        willAutoRenew=False,
+    )
+    event = decode_log(log)
+    assert (event.name, event.address) == ("Lend", REGISTRY)
+    assert event["is721"] and not event["willAutoRenew"]
+    assert event["lenderAddress"] == LENDER
+    assert (event["tokenID"], event["dailyRentPrice"]) == (7, pack_price(1, 5).to_bytes(4, "big"))
+    assert decode_log({"address": REGISTRY, "topics": [b"\x00" * 32], "data": "0x"}) is None
+
+
+def lend_log():
+    return make_log(
+        "Lend",
+        is721=False,
+        lenderAddress=LENDER,
+        nftAddress=NFT,
+        tokenID=7,
+        lendingID=1,
+        maxRentDuration=3,
+        dailyRentPrice=pack_price(1).to_bytes(4, "big"),
+        lendAmount=2,
+        paymentToken=DAI,
+        willAutoRenew=False,
+    )
+
+
+def test_mirror_sync_reads_the_registry_logs(monkeypatch):
+    requests = []
+
+    def get_logs(params):
+        requests.append(params)
+        # a log of another contract's event is skipped
+        return [lend_log(), {"address": NFT, "topics": [b"\x00" * 32], "data": "0x"}]
+
+    monkeypatch.setattr("brownie.web3", SimpleNamespace(eth=SimpleNamespace(get_logs=get_logs)))
+    mirror = RegistryMirror(REGISTRY)
+    mirror.sync(SimpleNamespace(address=REGISTRY), 5, "latest")
+    assert requests == [{"address": REGISTRY, "fromBlock": 5, "toBlock": "latest"}]
+    assert mirror.lendings[1].lend_amount == 2
+    assert mirror.lendings[1].daily_rent_price == pack_price(1)
+
+
+def test_events_alone_rebuild_state_and_payments():
+    logs = [
+        lend_log(),
+        make_log(
+            "Rent",
+            renterAddress=RENTER,
+            lendingID=1,
+            rentingID=1,
+            rentAmount=2,
+            rentDuration=1,
+            rentedAt=100,
+            nftAddress=NFT,
+            tokenID=7,
+            paymentToken=DAI,
+            paid=200,
+        ),
+        make_log("StopLend", lendingID=1, stoppedAt=200, amount=2, nftAddress=NFT, tokenID=7),
+        make_log(
+            "StopRent",
+            rentingID=1,
+            stoppedAt=200,
+            lenderAddress=LENDER,
+            renterAddress=RENTER,
+            nftAddress=NFT,
+            tokenID=7,
+            lendingID=1,
+            paymentToken=DAI,
+            lenderAmount=45,
+            renterAmount=150,
+            fee=5,
+        ),
+        make_log("FeesWithdrawn", paymentToken=DAI, beneficiary=BENEFICIARY, amount=5),
+    ]
+    events = decode_logs(logs)
+    mirror, ledger = RegistryMirror(REGISTRY), PaymentLedger()
+    mirror.apply_events(events[:2])
+    assert mirror.rentings[1].token_id == 7
+    mirror.apply_events(events[2:])
+    ledger.apply_events(events)
+    assert not mirror.lendings and not mirror.rentings
+    assert ledger.balances[(RENTER, DAI)] == -50
+    assert ledger.balances[(LENDER, DAI)] == 45
+    assert ledger.balances[(BENEFICIARY, DAI)] == 5
+    assert (ledger.escrow[DAI], ledger.fees[DAI]) == (0, 0)
+
+
+def test_pull_payments_are_credited_until_withdrawn():
+    claimed = dict(
+        rentingID=1,
+        collectedAt=200,
+        lenderAddress=LENDER,
+        nftAddress=NFT,
+        tokenID=7,
+        lendingID=1,
+        paymentToken=DAI,
+        lenderAmount=100,
+        fee=0,
+    )
+    ledger = PaymentLedger()
+    ledger.apply_events(
+        decode_logs(
+            [
+                make_log("PullPaymentsSet", lenderAddress=LENDER, enabled=True),
+                make_log("RentClaimed", **claimed),
+            ]
+        )
+    )
+    assert (ledger.credits[(LENDER, DAI)], ledger.balances[(LENDER, DAI)]) == (100, 0)
+    ledger.apply_events(
+        decode_logs([make_log("CreditsWithdrawn", lenderAddress=LENDER, paymentToken=DAI, amount=100)])
+    )
+    assert (ledger.credits[(LENDER, DAI)], ledger.balances[(LENDER, DAI)]) == (0, 100)
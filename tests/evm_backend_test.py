@@ -0,0 +1,83 @@
+from eth_abi import encode
+
+from scripts.evm_backend import ERROR_SELECTOR, InProcessProvider, revert_data
+
+REASON = "ReNFT::no"
+REVERT_DATA = ERROR_SELECTOR + encode(["string"], [REASON])
+
+
+def copy_code(payload: bytes, opcode: str) -> bytes:
+    """12 bytes of code that copy the payload following them to memory and return or revert it."""
+    size = f"60{len(payload):02x}"
+    return bytes.fromhex(f"{size}600c600039{size}6000{opcode}") + payload
+
+
+# reverts every call with REVERT_DATA
+REVERTER = copy_code(REVERT_DATA, "fd")
+INIT = copy_code(REVERTER, "f3")
+
+
+def request(provider, method, *params):
+    response = provider.make_request(method, list(params))
+    assert "error" not in response, response
+    return response["result"]
+
+
+def transaction(provider, **fields):
+    sender = request(provider, "eth_accounts")[0]
+    return {"from": sender, "gas": 200_000, "gas_price": 0, "value": 0, "data": "0x", **fields}
+
+
+def latest_timestamp(provider):
+    return request(provider, "eth_getBlockByNumber", "latest", False)["timestamp"]
+
+
+def deploy_reverter(provider):
+    txid = request(provider, "eth_sendTransaction", transaction(provider, data="0x" + INIT.hex()))
+    return request(provider, "eth_getTransactionReceipt", txid)["contract_address"]
+
+
+def test_revert_data():
+    assert revert_data(REASON) == "0x" + REVERT_DATA.hex()
+    assert revert_data(REVERT_DATA) == "0x" + REVERT_DATA.hex()
+    assert revert_data("execution reverted") == "0x"
+
+
+def test_reverts_are_reported_like_ganache():
+    provider = InProcessProvider()
+    reverter = deploy_reverter(provider)
+    assert request(provider, "eth_getCode", reverter, "latest") == "0x" + REVERTER.hex()
+
+    error = provider.make_request("eth_call", [transaction(provider, to=reverter), "latest"])["error"]
+    assert error["data"] == "0x" + REVERT_DATA.hex()
+
+    # a reverted transaction is mined, with its revert data in the error keyed by its hash
+    error = provider.make_request("eth_sendTransaction", [transaction(provider, to=reverter)])["error"]
+    assert REASON in error["message"]
+    ((txid, data),) = error["data"].items()
+    assert data["reason"] == "0x" + REVERT_DATA.hex()
+    assert request(provider, "eth_getTransactionReceipt", txid)["status"] == 0
+
+
+def test_time_offset_and_snapshots():
+    provider = InProcessProvider()
+    start = latest_timestamp(provider)
+    snapshot_id = request(provider, "evm_snapshot")
+    assert request(provider, "evm_increaseTime", 3600) == 3600
+    request(provider, "evm_mine")
+    assert latest_timestamp(provider) >= start + 3600
+    # transactions are stamped with the offset too
+    deploy_reverter(provider)
+    assert latest_timestamp(provider) >= start + 3600
+    height = request(provider, "eth_blockNumber")
+
+    assert request(provider, "evm_revert", snapshot_id)
+    assert request(provider, "eth_blockNumber") < height
+    assert provider.time_offset == 0
+    request(provider, "evm_mine")
+    assert latest_timestamp(provider) < start + 3600
+
+    request(provider, "evm_setNextBlockTimestamp", start + 86400)
+    request(provider, "evm_mine")
+    assert latest_timestamp(provider) == start + 86400
+    assert provider.make_request("evm_setAutomine", [False])["error"]["code"] == -32601
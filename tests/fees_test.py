@@ -0,0 +1,66 @@
+import brownie
+import pytest
+from brownie import accounts, chain
+
+from scripts.deploy_test import lend, rent
+from scripts.keeper import claim_args
+from scripts.model import NFTStandard, PaymentToken, claim_payments, stop_rent_payments
+
+BENEFICIARY, LENDER, RENTER = 1, 2, 3
+DAI, USDC = PaymentToken.DAI.value, PaymentToken.USDC.value
+RENT_FEE = 500
+
+
+@pytest.fixture(scope="module")
+def contracts(contracts):
+    contracts["registry"].setRentFee(RENT_FEE, {"from": accounts[0]})
+    return contracts
+
+
+def settle(contracts):
+    """Stops half of the rentings and claims the others, returns the fees the model expects."""
+    registry, mirror = contracts["registry"], contracts["mirror"]
+    decimals = contracts["payment_tokens"][DAI].decimals()
+    lendings = lend(contracts, accounts[LENDER], contracts["e1155"], 4, NFTStandard.E1155.value, 2)
+    rentings = rent(contracts, accounts[RENTER], lendings, rent_amount=2)
+    expected = 0
+
+    chain.sleep(3600)
+    chain.mine()
+    txn = registry.stopRent(*claim_args(rentings[:2]), {"from": accounts[RENTER]})
+    for renting, event in zip(rentings[:2], txn.events["StopRent"]):
+        lending = mirror.lendings[renting.lending_id]
+        seconds = event["stoppedAt"] - renting.rented_at
+        expected += stop_rent_payments(lending, renting, seconds, decimals, RENT_FEE)[2]
+    mirror.apply_events(txn.events)
+
+    chain.sleep(2 * 86400)
+    chain.mine()
+    for renting in rentings[2:]:
+        expected += claim_payments(mirror.lendings[renting.lending_id], renting, decimals, RENT_FEE)[1]
+    txn = registry.claimRent(*claim_args(rentings[2:]), {"from": accounts[LENDER]})
+    mirror.apply_events(txn.events)
+    return expected
+
+
+def test_fees_accrue_instead_of_being_sent(contracts):
+    registry, dai = contracts["registry"], contracts["payment_tokens"][DAI]
+    before = dai.balanceOf(accounts[BENEFICIARY])
+    expected = settle(contracts)
+    assert expected > 0
+    assert registry.accruedFees(DAI) == expected
+    assert dai.balanceOf(accounts[BENEFICIARY]) == before
+
+
+def test_beneficiary_withdraws_the_fees(contracts):
+    registry, dai = contracts["registry"], contracts["payment_tokens"][DAI]
+    expected = settle(contracts)
+    with brownie.reverts("ReNFT::not beneficiary"):
+        registry.withdrawFees([DAI], {"from": accounts[LENDER]})
+    before = dai.balanceOf(accounts[BENEFICIARY])
+    txn = registry.withdrawFees([DAI, USDC], {"from": accounts[BENEFICIARY]})
+    # nothing accrued in USDC, so nothing is sent
+    assert len(txn.events["FeesWithdrawn"]) == 1
+    assert txn.events["FeesWithdrawn"]["amount"] == expected
+    assert dai.balanceOf(accounts[BENEFICIARY]) == before + expected
+    assert registry.accruedFees(DAI) == 0
@@ -0,0 +1,71 @@
+import pytest
+from brownie import accounts, chain, web3
+
+from scripts.deploy_test import lend, rent
+from scripts.indexer import Indexer, LogSource, ReorgTooDeep
+from scripts.mirror import RegistryMirror
+from scripts.model import NFTStandard
+
+
+@pytest.fixture(autouse=True)
+def shared_setup(module_isolation):
+    # the tests take their own chain snapshots, which function isolation would clobber
+    pass
+
+
+def indexer(contracts, depth=256):
+    registry = contracts["registry"]
+    source = LogSource(web3, registry.address)
+    return Indexer(RegistryMirror(registry.address), source, registry.tx.block_number, depth)
+
+
+def rebuilt(contracts):
+    mirror = RegistryMirror(contracts["registry"].address)
+    mirror.sync(contracts["registry"], contracts["registry"].tx.block_number, "latest")
+    return mirror
+
+
+def test_rolls_back_the_abandoned_fork(contracts):
+    index = indexer(contracts)
+    lendings = lend(contracts, accounts[2], contracts["e721"], 2, NFTStandard.E721.value)
+    index.poll()
+    chain.snapshot()
+
+    rent(contracts, accounts[3], lendings[:1])
+    stopped = lendings[1]
+    contracts["registry"].stopLend(
+        [stopped.nft_standard],
+        [stopped.nft_address],
+        [stopped.token_id],
+        [stopped.lending_id],
+        {"from": accounts[2]},
+    )
+    index.poll()
+    assert stopped.lending_id not in index.mirror.lendings
+    assert len(index.mirror.rentings) == 1
+
+    # the fork rents the other lending instead
+    chain.revert()
+    rent(contracts, accounts[3], lendings[1:])
+    chain.mine()
+    index.poll()
+
+    assert index.reorgs == 1
+    expected = rebuilt(contracts)
+    assert index.mirror.lendings == expected.lendings
+    assert index.mirror.rentings == expected.rentings
+    assert [r.lending_id for r in index.mirror.rentings.values()] == [lendings[1].lending_id]
+
+
+def test_reorg_past_the_journal(contracts):
+    index = indexer(contracts, depth=1)
+    lend(contracts, accounts[2], contracts["e721"], 1, NFTStandard.E721.value)
+    chain.snapshot()
+    lend(contracts, accounts[2], contracts["e721"], 1, NFTStandard.E721.value)
+    chain.mine(3)
+    index.poll()
+
+    chain.revert()
+    chain.mine(5)
+    with pytest.raises(ReorgTooDeep):
+        index.poll()
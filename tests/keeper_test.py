@@ -0,0 +1,60 @@
+import pytest
+from brownie import accounts, chain
+
+from scripts.deploy_test import lend, rent
+from scripts.keeper import ClaimKeeper, claim_args
+from scripts.model import SECONDS_IN_DAY, ClaimSkipReason, NFTStandard
+
+
+@pytest.fixture(scope="module")
+def rentings(contracts):
+    lendings = lend(contracts, accounts[2], contracts["e721"], 2, NFTStandard.E721.value)
+    lendings += lend(contracts, accounts[2], contracts["e1155"], 2, NFTStandard.E1155.value)
+    return rent(contracts, accounts[3], lendings)
+
+
+def test_try_claim_rent_skips_unclaimable(contracts, rentings):
+    registry = contracts["registry"]
+    chain.sleep(100)
+    chain.mine()
+    # the lending of a stopped 721 that does not auto renew is deleted along with the renting
+    registry.stopRent(*claim_args(rentings[:1]), {"from": accounts[3]})
+
+    txn = registry.tryClaimRent(*claim_args(rentings), {"from": accounts[4]})
+    assert txn.events.count("RentClaimed") == 0
+    assert [e["reason"] for e in txn.events["RentClaimSkipped"]] == [
+        ClaimSkipReason.NULL_LENDING.value,
+        ClaimSkipReason.RETURN_DATE_NOT_PASSED.value,
+        ClaimSkipReason.RETURN_DATE_NOT_PASSED.value,
+        ClaimSkipReason.RETURN_DATE_NOT_PASSED.value,
+    ]
+
+    chain.sleep(SECONDS_IN_DAY + 1)
+    chain.mine()
+    txn = registry.tryClaimRent(*claim_args(rentings), {"from": accounts[4]})
+    assert [e["rentingID"] for e in txn.events["RentClaimed"]] == [
+        r.renting_id for r in rentings[1:]
+    ]
+    assert txn.events["RentClaimSkipped"]["rentingID"] == rentings[0].renting_id
+
+
+def test_keeper_claims_everything_claimable(contracts, rentings):
+    keeper = ClaimKeeper(contracts["registry"], contracts["mirror"], accounts[4], batch_size=3)
+    assert keeper.claimable(chain.time()) == []
+
+    chain.sleep(SECONDS_IN_DAY + 1)
+    chain.mine()
+    stale = keeper.claimable(chain.time())
+    assert len(stale) == len(rentings)
+    # a rival keeper claims one of the rentings before our batch is mined
+    txn = contracts["registry"].claimRent(*claim_args(stale[-1:]), {"from": accounts[5]})
+
+    report = keeper.claim(stale)
+    assert report.transactions == 2
+    assert sorted(report.claimed) == sorted(r.renting_id for r in stale[:-1])
+    assert report.skipped == {stale[-1].renting_id: ClaimSkipReason.NULL_LENDING}
+
+    contracts["mirror"].apply_events(txn.events)
+    assert contracts["mirror"].rentings == {}
+    # nothing was renewed, so every lending has been returned
+    assert contracts["mirror"].lendings == {}
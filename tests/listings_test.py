@@ -0,0 +1,97 @@
+from scripts.listings import ListingIndex
+from scripts.mirror import RegistryMirror
+from scripts.model import NFTStandard, PaymentToken, pack_price
+
+LENDER = "0x00000000000000000000000000000000000000a1"
+RENTER = "0x00000000000000000000000000000000000000b1"
+NFT_A = "0x0000000000000000000000000000000000000a00"
+NFT_B = "0x0000000000000000000000000000000000000b00"
+USDC, DAI = PaymentToken.USDC.value, PaymentToken.DAI.value
+
+
+def lend(
+    mirror,
+    lending_id,
+    price,
+    max_rent_duration=7,
+    payment_token=PaymentToken.USDC.value,
+    is721=False,
+    nft=NFT_A,
+):
+    mirror.apply(
+        "Lend",
+        {
+            "is721": is721,
+            "lenderAddress": LENDER,
+            "nftAddress": nft,
+            "tokenID": lending_id,
+            "lendingID": lending_id,
+            "maxRentDuration": max_rent_duration,
+            "dailyRentPrice": price,
+            "lendAmount": 1 if is721 else 2,
+            "paymentToken": payment_token,
+            "willAutoRenew": True,
+        },
+    )
+
+
+def rent(mirror, lending_id, renting_id, rent_amount):
+    mirror.apply(
+        "Rent",
+        {
+            "renterAddress": RENTER,
+            "lendingID": lending_id,
+            "rentingID": renting_id,
+            "rentAmount": rent_amount,
+            "rentDuration": 1,
+            "rentedAt": 1000,
+        },
+    )
+
+
+def ids(lendings):
+    return [lending.lending_id for lending in lendings]
+
+
+def test_filters_and_price_order():
+    mirror = RegistryMirror()
+    lend(mirror, 1, pack_price(3))
+    lend(mirror, 2, pack_price(1, 5000))
+    lend(mirror, 3, pack_price(1, 5000), max_rent_duration=3)
+    lend(mirror, 4, pack_price(0, 1), payment_token=PaymentToken.DAI.value)
+    lend(mirror, 5, pack_price(2), is721=True)
+    lend(mirror, 6, pack_price(1), nft=NFT_B)
+    index = ListingIndex(mirror, {PaymentToken.USDC.value: 6, PaymentToken.DAI.value: 18})
+
+    query = {"nft_standard": NFTStandard.E1155.value, "payment_token": PaymentToken.USDC.value}
+    assert ids(index.top(10, **query)) == [6, 2, 3, 1]
+    assert ids(index.top(10, min_duration=7, **query)) == [6, 2, 1]
+    # prices in different payment tokens are not ranked together
+    assert ids(index.top(2, USDC)) == [6, 2]
+    assert ids(index.top(10, DAI)) == [4]
+    assert ids(index.top(10, nft_address=NFT_A, min_duration=7, **query)) == [2, 1]
+    assert index.daily_price(mirror.lendings[2]) == 1_500_000
+    # the lender's own listings are excluded whatever the case of the address
+    assert index.top(10, USDC, exclude_lender=LENDER.upper().replace("0X", "0x")) == []
+    assert index.top(10, USDC, nft_address=NFT_A, exclude_lender=LENDER.upper().replace("0X", "0x")) == []
+
+
+def test_follows_rents_and_returns():
+    mirror = RegistryMirror()
+    index = ListingIndex(mirror)
+    lend(mirror, 1, pack_price(1))
+    lend(mirror, 2, pack_price(2))
+
+    rent(mirror, 1, 1, 1)
+    assert ids(index.top(10, USDC)) == [1, 2]
+    assert ids(index.top(10, USDC, min_available=2)) == [2]
+
+    rent(mirror, 1, 2, 1)
+    assert ids(index.top(10, USDC)) == [2]
+
+    mirror.apply("StopRent", {"rentingID": 2, "stoppedAt": 2000})
+    assert ids(index.top(10, USDC)) == [1, 2]
+
+    mirror.apply("StopLend", {"lendingID": 2, "stoppedAt": 2000, "amount": 2})
+    assert ids(index.top(10, USDC)) == [1]
+    assert len(index) == 1
@@ -0,0 +1,63 @@
+import urllib.request
+
+from scripts.metrics import Metrics, instrument_provider, record_receipt, record_revert
+
+
+class Provider:
+    def make_request(self, method, params):
+        if method == "eth_fail":
+            return {"jsonrpc": "2.0", "id": 1, "error": {"code": -32000, "message": "fail"}}
+        return {"jsonrpc": "2.0", "id": 1, "result": params}
+
+
+def test_disabled_records_nothing():
+    metrics = Metrics()
+    metrics.inc("tx_total", entry_point="Registry.lend", status="ok")
+    metrics.observe("rule_seconds", 0.1, rule="rule_lend")
+    with metrics.timer("job_seconds", job="keeper"):
+        pass
+    provider = instrument_provider(Provider(), metrics)
+    assert provider.make_request("eth_chainId", [])["result"] == []
+    assert metrics.render() == "\n"
+
+
+def test_render():
+    metrics = Metrics()
+    metrics.enabled = True
+    provider = instrument_provider(instrument_provider(Provider(), metrics), metrics)
+    for method in ("eth_call", "eth_call", "eth_fail"):
+        provider.make_request(method, [])
+    record_receipt("Registry.lend", 1, 75_000, metrics)
+    record_receipt("Registry.lend", 0, 3_000_000, metrics)
+    record_revert("Registry.rent", 'ReNFT::"quoted"', metrics)
+    text = metrics.render()
+
+    assert 'rpc_requests_total{method="eth_call"} 2' in text
+    assert 'rpc_errors_total{method="eth_fail"} 1' in text
+    # instrumenting twice wraps the provider once
+    assert 'rpc_request_seconds_count{method="eth_call"} 2' in text
+    assert 'tx_total{entry_point="Registry.lend",status="reverted"} 1' in text
+    assert 'tx_gas_used_bucket{entry_point="Registry.lend",le="100000"} 1' in text
+    assert 'tx_gas_used_bucket{entry_point="Registry.lend",le="5e+06"} 2' in text
+    assert 'tx_gas_used_bucket{entry_point="Registry.lend",le="+Inf"} 2' in text
+    assert 'tx_gas_used_sum{entry_point="Registry.lend"} 3.075e+06' in text
+    assert 'tx_reverts_total{entry_point="Registry.rent",reason="ReNFT::\\"quoted\\""} 1' in text
+    assert "# TYPE tx_gas_used histogram" in text
+
+
+def test_dump_and_serve(tmp_path):
+    metrics = Metrics()
+    metrics.enabled = True
+    metrics.inc("indexer_reorgs_total")
+    path = str(tmp_path / "metrics.prom")
+    metrics.dump(path)
+    with open(path) as f:
+        assert f.read() == metrics.render()
+
+    server = metrics.serve(0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url) as response:
+            assert response.read().decode() == metrics.render()
+    finally:
+        server.shutdown()
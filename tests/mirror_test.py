@@ -0,0 +1,95 @@
+from scripts.mirror import RegistryMirror
+from scripts.model import NFTStandard, pack_price, unpack_price
+
+NFT = "0x0000000000000000000000000000000000000721"
+LENDER = "0x00000000000000000000000000000000000000a1"
+RENTER = "0x00000000000000000000000000000000000000b1"
+
+
+class Recorder:
+    def __init__(self):
+        self.changes = []
+
+    def lending_changed(self, lending_id, old, new):
+        self.changes.append(("lending", lending_id, old, new))
+
+    def renting_changed(self, renting_id, old, new):
+        self.changes.append(("renting", renting_id, old, new))
+
+
+def lend_event(lending_id, lend_amount, will_auto_renew, is721=False):
+    return {
+        "is721": is721,
+        "lenderAddress": LENDER,
+        "nftAddress": NFT,
+        "tokenID": 7,
+        "lendingID": lending_id,
+        "maxRentDuration": 3,
+        "dailyRentPrice": "0x00010000",
+        "lendAmount": lend_amount,
+        "paymentToken": 1,
+        "willAutoRenew": will_auto_renew,
+    }
+
+
+def rent_event(lending_id, renting_id, rent_amount):
+    return {
+        "renterAddress": RENTER,
+        "lendingID": lending_id,
+        "rentingID": renting_id,
+        "rentAmount": rent_amount,
+        "rentDuration": 1,
+        "rentedAt": 1000,
+    }
+
+
+def test_unpack_price():
+    assert unpack_price(pack_price(1), 10 ** 18) == 10 ** 18
+    assert unpack_price(pack_price(0, 5), 10 ** 6) == 500
+    # both halves are clamped to 9999
+    assert unpack_price(pack_price(65535, 65535), 10 ** 4) == 9999 * 10 ** 4 + 9999
+
+
+def test_auto_renew_makes_rented_amount_available_again():
+    mirror = RegistryMirror()
+    mirror.apply("Lend", lend_event(1, 10, True))
+    mirror.apply("Rent", rent_event(1, 1, 4))
+    assert mirror.lendings[1].available_amount == 6
+    assert mirror.rentings[1].nft_address == NFT
+    assert mirror.rentings[1].nft_standard == NFTStandard.E1155.value
+
+    mirror.apply("RentClaimed", {"rentingID": 1, "collectedAt": 2000})
+    assert mirror.lendings[1].available_amount == 10
+    assert mirror.rentings == {}
+
+
+def test_no_renew_shrinks_then_deletes_the_lending():
+    mirror = RegistryMirror()
+    mirror.apply("Lend", lend_event(1, 10, False))
+    mirror.apply("Rent", rent_event(1, 1, 4))
+    mirror.apply("Rent", rent_event(1, 2, 6))
+
+    # manageWillAutoRenew emits StopLend for the rented amount before StopRent
+    mirror.apply("StopLend", {"lendingID": 1, "stoppedAt": 2000, "amount": 4})
+    mirror.apply("StopRent", {"rentingID": 1, "stoppedAt": 2000})
+    assert mirror.lendings[1].lend_amount == 6
+    assert mirror.lendings[1].available_amount == 0
+
+    mirror.apply("StopLend", {"lendingID": 1, "stoppedAt": 2000, "amount": 6})
+    mirror.apply("RentClaimed", {"rentingID": 2, "collectedAt": 2000})
+    assert mirror.lendings == {}
+    assert mirror.rentings == {}
+
+
+def test_listeners_see_every_change():
+    mirror = RegistryMirror()
+    recorder = Recorder()
+    mirror.subscribe(recorder)
+    mirror.apply("Lend", lend_event(1, 1, False, is721=True))
+    mirror.apply("StopLend", {"lendingID": 1, "stoppedAt": 2000, "amount": 1})
+    mirror.apply("Transfer", {})
+
+    (_, _, old, created), (_, _, removed, new) = recorder.changes
+    assert old is None and new is None
+    assert created is removed
+    assert created.daily_rent_price == pack_price(1)
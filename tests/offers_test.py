@@ -0,0 +1,133 @@
+from dataclasses import astuple, replace
+
+import pytest
+from eth_account import Account
+from eth_account.messages import encode_typed_data
+from eth_keys import keys
+
+from scripts.model import NFTStandard, PaymentToken, RegistryRevert, pack_price
+from scripts.offers import (
+    LEND_OFFER_FIELDS,
+    LEND_OFFER_TYPE,
+    LendOffer,
+    OfferBook,
+    SignedOffer,
+    domain_separator,
+    fill_args,
+    recover_signer,
+    sign_offer,
+)
+
+E721, E1155 = NFTStandard.E721.value, NFTStandard.E1155.value
+DAI, USDC = PaymentToken.DAI.value, PaymentToken.USDC.value
+REGISTRY = "0x00000000000000000000000000000000000000cc"
+NFT_A = "0x00000000000000000000000000000000000000aa"
+NFT_B = "0x00000000000000000000000000000000000000bb"
+RENTER = "0x00000000000000000000000000000000000000dd"
+LENDER_KEY = keys.PrivateKey(b"\x01" * 32)
+LENDER = LENDER_KEY.public_key.to_checksum_address()
+SEPARATOR = domain_separator(1, REGISTRY)
+NOW = 1_000_000
+
+
+def offer(nonce, nft_address=NFT_A, token_id=1, price=1, **kwargs):
+    fields = dict(
+        lender_address=LENDER,
+        nft_standard=E721,
+        nft_address=nft_address,
+        token_id=token_id,
+        lend_amount=1,
+        max_rent_duration=7,
+        daily_rent_price=pack_price(price),
+        payment_token=DAI,
+        will_auto_renew=False,
+        nonce=nonce,
+        deadline=NOW + 86400,
+    )
+    fields.update(kwargs)
+    return sign_offer(LendOffer(**fields), LENDER_KEY.to_bytes(), SEPARATOR)
+
+
+def test_signature_recovers_the_lender():
+    assert LEND_OFFER_TYPE.startswith("LendOffer(address lenderAddress,uint8 nftStandard,")
+    signed = offer(1)
+    assert recover_signer(signed, SEPARATOR) == LENDER
+    # another Registry, or other terms, do not recover the lender
+    assert recover_signer(signed, domain_separator(1, NFT_A)) != LENDER
+    other_terms = SignedOffer(replace(signed.offer, token_id=2), signed.signature)
+    assert recover_signer(other_terms, SEPARATOR) != LENDER
+    assert recover_signer(SignedOffer(signed.offer, signed.signature[:64]), SEPARATOR) is None
+
+
+def test_signature_matches_eth_account():
+    # the same offer, signed by eth_account's EIP-712 encoder
+    signed = offer(1, token_id=2 ** 200, price=3)
+    message = dict(zip([name for name, _ in LEND_OFFER_FIELDS], astuple(signed.offer)))
+    message["dailyRentPrice"] = signed.offer.daily_rent_price.to_bytes(4, "big")
+    typed = encode_typed_data(
+        full_message={
+            "types": {
+                "EIP712Domain": [
+                    {"name": "name", "type": "string"},
+                    {"name": "version", "type": "string"},
+                    {"name": "chainId", "type": "uint256"},
+                    {"name": "verifyingContract", "type": "address"},
+                ],
+                "LendOffer": [{"name": name, "type": kind} for name, kind in LEND_OFFER_FIELDS],
+            },
+            "primaryType": "LendOffer",
+            "domain": {"name": "ReNFT", "version": "1", "chainId": 1, "verifyingContract": REGISTRY},
+            "message": message,
+        }
+    )
+    assert typed.header == SEPARATOR
+    assert Account.sign_message(typed, LENDER_KEY.to_bytes()).signature == signed.signature
+    assert Account.recover_message(typed, signature=signed.signature) == LENDER
+
+
+def test_book_checks_offers_like_rent_offers():
+    book = OfferBook(SEPARATOR)
+    with pytest.raises(RegistryRevert, match="offer expired"):
+        book.add(offer(1, deadline=NOW - 1), NOW)
+    signed = offer(2)
+    forged = SignedOffer(replace(signed.offer, daily_rent_price=pack_price(0, 5000)), signed.signature)
+    with pytest.raises(RegistryRevert, match="invalid signature"):
+        book.add(forged, NOW)
+    with pytest.raises(RegistryRevert, match="lendAmount should be equal to 1"):
+        book.add(offer(3, lend_amount=2), NOW)
+    with pytest.raises(RegistryRevert, match="token is sentinel"):
+        book.add(offer(4, payment_token=0), NOW)
+    book.add(offer(5), NOW)
+    # same nonce: the new terms replace the old ones
+    book.add(offer(5, price=2), NOW)
+    assert len(book.offers) == 1
+
+    book.apply("LendOfferCancelled", {"lenderAddress": LENDER, "nonce": 5})
+    assert not book.offers
+    with pytest.raises(RegistryRevert, match="offer used"):
+        book.add(offer(5), NOW)
+
+
+def test_match_picks_the_cheapest_offer_per_nft():
+    book = OfferBook(SEPARATOR)
+    book.add(offer(1, price=3), NOW)
+    book.add(offer(2, price=2), NOW)
+    book.add(offer(3, nft_address=NFT_B, price=5, payment_token=USDC), NOW)
+    book.add(offer(4, token_id=2, price=4, max_rent_duration=1), NOW)
+    # too close to its deadline to be mined in time
+    book.add(offer(5, token_id=3, price=1, deadline=NOW + 60), NOW)
+
+    matched = book.match(RENTER, NOW, rent_duration=2)
+    assert [s.offer.nonce for s in matched] == [2, 3]
+    assert [s.offer.nonce for s in book.match(RENTER, NOW, 2, payment_token=USDC)] == [3]
+    assert [s.offer.nonce for s in book.match(RENTER, NOW, 1, limit=2)] == [2, 4]
+    assert not book.match(LENDER, NOW, 1)
+
+    offers, signatures, durations, amounts = fill_args(matched[::-1], 2, 1)
+    assert [o[9] for o in offers] == [2, 3]
+    assert signatures == [s.signature for s in matched]
+    assert (durations, amounts) == ([2, 2], [1, 1])
+
+    book.apply("LendOfferFilled", {"lenderAddress": LENDER, "nonce": 2, "lendingID": 1})
+    assert book.prune(NOW + 61) == 1
+    assert sorted(book.offers) == [(LENDER.lower(), 1), (LENDER.lower(), 3), (LENDER.lower(), 4)]
@@ -0,0 +1,49 @@
+from brownie import accounts, chain
+
+from scripts.deploy_test import lend, rent
+from scripts.keeper import claim_args
+from scripts.model import NFTStandard, PaymentToken
+from scripts.payments import LenderPayments
+
+LENDER, RENTER = 2, 3
+DAI = PaymentToken.DAI.value
+
+
+def claim(contracts, count):
+    """Lends, rents and claims `count` rentings, returns what the lender was paid."""
+    lendings = lend(contracts, accounts[LENDER], contracts["e1155"], count, NFTStandard.E1155.value)
+    rentings = rent(contracts, accounts[RENTER], lendings)
+    chain.sleep(2 * 86400)
+    chain.mine()
+    txn = contracts["registry"].claimRent(*claim_args(rentings), {"from": accounts[LENDER]})
+    contracts["mirror"].apply_events(txn.events)
+    return sum(event["lenderAmount"] for event in txn.events["RentClaimed"])
+
+
+def test_push_is_the_default(contracts):
+    dai = contracts["payment_tokens"][DAI]
+    payments = LenderPayments(contracts["registry"], accounts[LENDER])
+    assert not payments.pull
+    before = dai.balanceOf(accounts[LENDER])
+    paid = claim(contracts, 2)
+    assert dai.balanceOf(accounts[LENDER]) == before + paid
+    assert payments.balances() == {}
+    assert payments.withdraw() is None
+
+
+def test_pull_credits_then_withdraws(contracts):
+    dai = contracts["payment_tokens"][DAI]
+    payments = LenderPayments(contracts["registry"], accounts[LENDER])
+    payments.set_pull(True)
+    before = dai.balanceOf(accounts[LENDER])
+    paid = claim(contracts, 3)
+    paid += claim(contracts, 2)
+    assert dai.balanceOf(accounts[LENDER]) == before
+    assert payments.balances() == {DAI: paid}
+
+    # credits stay withdrawable after opting out
+    payments.set_pull(False)
+    txn = payments.withdraw()
+    assert txn.events["CreditsWithdrawn"]["amount"] == paid
+    assert dai.balanceOf(accounts[LENDER]) == before + paid
+    assert payments.balances() == {}
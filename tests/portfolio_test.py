@@ -0,0 +1,70 @@
+import pytest
+from brownie import accounts, chain
+
+from scripts.deploy_test import lend, rent
+from scripts.keeper import claim_args
+from scripts.model import SECONDS_IN_DAY, NFTStandard, PaymentToken
+from scripts.portfolio import plan_returns, return_all, returnable
+from scripts.splitter import GasModel
+
+MODEL = GasModel(
+    base=50_000, group_721=10_000, group_1155=30_000, item_721=60_000, item_1155=40_000
+)
+
+
+@pytest.fixture(scope="module")
+def rentings(contracts):
+    lender, renter = accounts[2], accounts[3]
+    e721, e1155 = NFTStandard.E721.value, NFTStandard.E1155.value
+    lendings = lend(contracts, lender, contracts["e721"], 3, e721, max_rent_duration=2)
+    lendings += lend(
+        contracts,
+        lender,
+        contracts["e1155"],
+        3,
+        e1155,
+        max_rent_duration=2,
+        payment_token=PaymentToken.USDC.value,
+    )
+    lendings += lend(contracts, lender, contracts["e721b"], 2, e721, max_rent_duration=2)
+    # interleaved, so that the rent's order is not bundle order
+    rentings = rent(contracts, renter, lendings[::2], rent_duration=1)
+    rentings += rent(contracts, renter, lendings[1::2], rent_duration=2)
+    return rentings
+
+
+def test_returnable_follows_ensure_is_returnable(contracts, rentings):
+    mirror = contracts["mirror"]
+    chain.sleep(10)
+    chain.mine()
+    now = chain.time()
+    assert returnable(mirror, accounts[4].address, now) == []
+    returning = returnable(mirror, accounts[3].address, now)
+    assert sorted(r.renting_id for r in returning) == sorted(r.renting_id for r in rentings)
+    # one contiguous run per collection
+    addresses = [r.nft_address for r in returning]
+    assert len([a for i, a in enumerate(addresses) if i == 0 or a != addresses[i - 1]]) == 3
+
+    # the one day rentings are past their return date, or about to be
+    one_day = {r.renting_id for r in rentings if r.rent_duration == 1}
+    later = returnable(mirror, accounts[3].address, now + SECONDS_IN_DAY - 60)
+    assert {r.renting_id for r in later}.isdisjoint(one_day)
+    assert len(later) == len(rentings) - len(one_day)
+    assert returnable(mirror, accounts[3].address, now + 2 * SECONDS_IN_DAY) == []
+
+
+def test_return_all(contracts, rentings):
+    registry, mirror = contracts["registry"], contracts["mirror"]
+    chain.sleep(10)
+    chain.mine()
+    txn = registry.stopRent(*claim_args(rentings[:1]), {"from": accounts[3]})
+    mirror.apply_events(txn.events)
+    assert rentings[0] not in returnable(mirror, accounts[3].address, chain.time())
+
+    plan = plan_returns(mirror, accounts[3].address, chain.time(), MODEL, gas_cap=400_000)
+    assert len(plan.transactions) > 1
+    report = return_all(registry, mirror, accounts[3], chain.time(), MODEL, gas_cap=400_000)
+    assert report.transactions == len(plan.transactions)
+    assert sorted(report.returned) == sorted(r.renting_id for r in rentings[1:])
+    assert mirror.rentings == dict()
+    assert returnable(mirror, accounts[3].address, chain.time()) == []
@@ -0,0 +1,81 @@
+import pytest
+from brownie import accounts, web3
+
+from scripts.deploy_test import BILLION, lend
+from scripts.model import NFTStandard, PaymentToken, pack_price
+from scripts.quote import LendingCache, Quoter, TokenCache
+
+
+@pytest.fixture(scope="module")
+def lendings(contracts):
+    lendings = lend(contracts, accounts[2], contracts["e721"], 2, NFTStandard.E721.value, max_rent_duration=3)
+    lendings += lend(
+        contracts,
+        accounts[2],
+        contracts["e1155"],
+        2,
+        NFTStandard.E1155.value,
+        lend_amount=5,
+        max_rent_duration=7,
+        daily_rent_price=pack_price(2, 5000),
+        payment_token=PaymentToken.USDC.value,
+    )
+    return lendings
+
+
+def cart(lendings, rent_duration, rent_amount):
+    return (
+        [lending.nft_standard for lending in lendings],
+        [lending.nft_address for lending in lendings],
+        [lending.token_id for lending in lendings],
+        [lending.lending_id for lending in lendings],
+        rent_duration,
+        rent_amount,
+    )
+
+
+def test_quote_matches_what_rent_charges(contracts, lendings):
+    registry = contracts["registry"]
+    quoter = Quoter(TokenCache(web3, contracts["resolver"]), LendingCache(registry))
+    # the same 1155 lending twice in the cart
+    args = cart(lendings + lendings[2:3], [3, 1, 7, 2, 2], [1, 1, 2, 1, 3])
+    quote = quoter.quote(*args, renter=accounts[3].address)
+    assert quote.ok
+    usdc = contracts["payment_tokens"][PaymentToken.USDC.value]
+    dai = contracts["payment_tokens"][PaymentToken.DAI.value]
+    assert quote.totals == {dai.address: 4 * 10 ** 18, usdc.address: 22 * 2_500_000}
+
+    balances = {}
+    for token in (dai, usdc):
+        token.faucet({"from": accounts[3]})
+        token.approve(registry.address, BILLION, {"from": accounts[3]})
+        balances[token.address] = token.balanceOf(accounts[3])
+    txn = registry.rent(*args, {"from": accounts[3]})
+    for token in (dai, usdc):
+        assert balances[token.address] - token.balanceOf(accounts[3]) == quote.totals[token.address]
+
+    # the Rent events invalidate the cached lendings
+    quoter.lendings.apply_events(txn.events)
+    quote = quoter.quote(*cart(lendings[:1] + lendings[2:], [1] * 3, [1, 1, 4]), renter=accounts[3].address)
+    assert [item.reason for item in quote.items] == [
+        "ReNFT::invalid rent amount",
+        "ReNFT::invalid rent amount",
+        None,
+    ]
+
+
+def test_caches(contracts, lendings):
+    tokens = TokenCache(web3, contracts["resolver"])
+    quoter = Quoter(tokens, LendingCache(contracts["registry"], capacity=2))
+    args = cart(lendings, [1] * 4, [1] * 4)
+    quoter.quote(*args)
+    # one miss per payment token, the address being read with its decimals
+    assert tokens.stats.misses == 2
+    assert quoter.lendings.stats.misses == 4
+    quoter.quote(*args)
+    assert tokens.stats.misses == 2
+    # only the last two lendings fit
+    assert quoter.lendings.stats.misses == 8
+    quoter.quote(*cart(lendings[2:], [1] * 2, [1] * 2))
+    assert quoter.lendings.stats.misses == 8
+    assert quoter.quote(*args, renter=accounts[2].address).items[0].reason == "ReNFT::cant rent own nft"
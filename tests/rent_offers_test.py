@@ -0,0 +1,149 @@
+from dataclasses import replace
+
+import brownie
+import pytest
+from brownie import accounts, chain, web3
+
+from scripts.deploy_test import BILLION
+from scripts.model import NFTStandard, PaymentToken, pack_price
+from scripts.offers import (
+    LendOffer,
+    OfferBook,
+    SignedOffer,
+    domain_separator,
+    fill_args,
+    rent_offers,
+    sign_offer,
+)
+
+E721, E1155 = NFTStandard.E721.value, NFTStandard.E1155.value
+DAI = PaymentToken.DAI.value
+# EIP-170: the largest runtime bytecode a contract can deploy
+MAX_CODE_SIZE = 24_576
+
+
+@pytest.fixture(scope="module")
+def contracts(contracts):
+    # a local account, to sign its offers with
+    contracts["lender"] = accounts.add()
+    accounts[0].transfer(contracts["lender"], "10 ether")
+    renter = accounts[3]
+    token = contracts["payment_tokens"][DAI]
+    token.faucet({"from": renter})
+    token.approve(contracts["registry"].address, BILLION, {"from": renter})
+    return contracts
+
+
+def mint(contracts, nft_standard):
+    lender, registry = contracts["lender"], contracts["registry"]
+    if nft_standard == E721:
+        nft = contracts["e721"]
+        token_id = nft.faucet({"from": lender}).events["Transfer"]["tokenId"]
+    else:
+        nft = contracts["e1155"]
+        token_id = nft.faucet({"from": lender}).events["TransferSingle"]["id"]
+    nft.setApprovalForAll(registry.address, True, {"from": lender})
+    return nft, token_id
+
+
+def sign(contracts, nonce, nft_standard=E721, lend_amount=1, deadline=None):
+    lender, registry = contracts["lender"], contracts["registry"]
+    nft, token_id = mint(contracts, nft_standard)
+    offer = LendOffer(
+        lender.address,
+        nft_standard,
+        nft.address,
+        token_id,
+        lend_amount,
+        3,
+        pack_price(1),
+        DAI,
+        False,
+        nonce,
+        deadline if deadline is not None else chain.time() + 86400,
+    )
+    return sign_offer(offer, lender.private_key, domain_separator(chain.id, registry.address))
+
+
+def test_domain_separator(contracts):
+    registry = contracts["registry"]
+    assert registry.domainSeparator() == "0x" + domain_separator(chain.id, registry.address).hex()
+
+
+def test_rent_offers(contracts):
+    registry, mirror, lender = contracts["registry"], contracts["mirror"], contracts["lender"]
+    renter = accounts[3]
+    book = OfferBook(registry.domainSeparator())
+    offers = [sign(contracts, 1), sign(contracts, 2, E1155, 2), sign(contracts, 3)]
+    for signed in offers:
+        book.add(signed, chain.time())
+    matched = book.match(renter.address, chain.time(), 2)
+    assert len(matched) == 3
+
+    txn = rent_offers(registry, book, matched, renter, 2, mirror=mirror)
+    assert len(txn.events["LendOfferFilled"]) == 3
+    assert len(txn.events["Rent"]) == 3
+    assert not book.offers
+    for event in txn.events["LendOfferFilled"]:
+        assert event["lenderAddress"] == lender.address
+        assert registry.usedOfferNonces(lender.address, event["nonce"])
+        lending = mirror.lendings[event["lendingID"]]
+        assert lending.lender_address == lender.address
+    # the nfts are in escrow, and rented
+    assert contracts["e721"].ownerOf(offers[0].offer.token_id) == registry.address
+    assert len(mirror.rentings) == 3
+
+    # a signed offer is filled once
+    with brownie.reverts("ReNFT::offer used"):
+        registry.rentOffers(*fill_args(offers[:1], 1, 1), {"from": accounts[4]})
+
+
+def test_offer_checks(contracts):
+    registry, lender, renter = contracts["registry"], contracts["lender"], accounts[3]
+    expired = sign(contracts, 1, deadline=chain.time() - 1)
+    with brownie.reverts("ReNFT::offer expired"):
+        registry.rentOffers(*fill_args([expired], 1, 1), {"from": renter})
+
+    signed = sign(contracts, 2)
+    # signed under another Registry
+    other = sign_offer(signed.offer, lender.private_key, domain_separator(chain.id, renter.address))
+    with brownie.reverts("ReNFT::invalid signature"):
+        registry.rentOffers(*fill_args([other], 1, 1), {"from": renter})
+    with brownie.reverts("ReNFT::cant rent own nft"):
+        registry.rentOffers(*fill_args([signed], 1, 1), {"from": lender})
+    offers, signatures, rent_duration, rent_amount = fill_args([signed], 1, 1)
+    with brownie.reverts("ReNFT::invalid signatures"):
+        registry.rentOffers(offers, [], rent_duration, rent_amount, {"from": renter})
+    with brownie.reverts("ReNFT::invalid rent arrays"):
+        registry.rentOffers(offers, signatures, rent_duration + [1], rent_amount, {"from": renter})
+    with brownie.reverts("ReNFT::invalid rent arrays"):
+        registry.rentOffers(offers, signatures, rent_duration, [], {"from": renter})
+
+    txn = registry.cancelLendOffers([2, 3], {"from": lender})
+    assert [event["nonce"] for event in txn.events["LendOfferCancelled"]] == [2, 3]
+    with brownie.reverts("ReNFT::offer used"):
+        registry.rentOffers(*fill_args([signed], 1, 1), {"from": renter})
+    # the failed fills left the nft with the lender
+    assert contracts["e721"].ownerOf(signed.offer.token_id) == lender.address
+
+
+def test_altered_offers_are_rejected(contracts):
+    registry, renter = contracts["registry"], accounts[3]
+    signed = sign(contracts, 1)
+    longer = SignedOffer(replace(signed.offer, max_rent_duration=5), signed.signature)
+    with brownie.reverts("ReNFT::invalid signature"):
+        registry.rentOffers(*fill_args([longer], 1, 1), {"from": renter})
+    separator = domain_separator(chain.id, registry.address)
+    forged = sign_offer(signed.offer, accounts.add().private_key, separator)
+    with brownie.reverts("ReNFT::invalid signature"):
+        registry.rentOffers(*fill_args([forged], 1, 1), {"from": renter})
+    truncated = SignedOffer(signed.offer, signed.signature[:64])
+    with brownie.reverts("ECDSA: invalid signature length"):
+        registry.rentOffers(*fill_args([truncated], 1, 1), {"from": renter})
+    # the untouched offer still fills
+    txn = registry.rentOffers(*fill_args([signed], 1, 1), {"from": renter})
+    assert len(txn.events["LendOfferFilled"]) == 1
+
+
+def test_registry_fits_the_contract_size_limit(contracts):
+    assert len(web3.eth.get_code(contracts["registry"].address)) <= MAX_CODE_SIZE
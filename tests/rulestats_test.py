@@ -0,0 +1,56 @@
+from hypothesis import settings
+from hypothesis import strategies as st
+from hypothesis.stateful import RuleBasedStateMachine, precondition, rule, run_state_machine_as_test
+
+from scripts.rulestats import HIT, NOOP, REVERT, RuleRecorder, recorded
+
+
+def test_record_and_total():
+    stats = RuleRecorder()
+    stats.record("rule_lend", HIT, 0.5, new_branches=3)
+    stats.record("rule_lend", REVERT, 0.5, new_branches=1)
+    stats.record("rule_rent", NOOP, 1.0)
+    lend = stats.rules["rule_lend"]
+    assert (lend.steps, lend.hits, lend.reverts, lend.new_branches) == (2, 1, 1, 4)
+    total = stats.total()
+    assert (total.steps, total.noops, total.effective) == (3, 1, 2)
+    assert stats.effective_per_second() == 1.0
+
+
+class Counter(RuleBasedStateMachine):
+    # pylint: disable=no-self-use
+    stats = RuleRecorder()
+
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    @rule(step=st.integers(1, 3))
+    @recorded
+    def rule_add(self, step):
+        self.count += step
+        return HIT
+
+    @precondition(lambda self: self.count > 0)
+    @rule()
+    @recorded
+    def rule_take(self):
+        self.count -= 1
+        return HIT
+
+    @rule()
+    @recorded
+    def rule_nothing(self):
+        return NOOP
+
+    rule_add_again = rule_add
+
+
+def test_recorded_rules():
+    Counter.stats = RuleRecorder()
+    run_state_machine_as_test(Counter, settings=settings(max_examples=20, deadline=None))
+    rules = Counter.stats.rules
+    assert rules["rule_take"].noops == 0
+    assert rules["rule_nothing"].noops == rules["rule_nothing"].steps
+    # defined twice, so that hypothesis samples it from the rules twice
+    assert [r.function.__name__ for r in Counter.rules()].count("rule_add") == 2
@@ -0,0 +1,48 @@
+from dataclasses import replace
+
+from scripts.simulator import INDEX_SLOTS, SettlementGas, Traffic, simulate
+
+# all 721s, rented until their return date and claimed, no lender exits
+TRAFFIC = Traffic(
+    lends_per_day=50,
+    rents_per_day=100,
+    share_1155=0,
+    max_rent_duration=3,
+    early_return_ratio=0,
+    exit_ratio=0,
+)
+
+
+def test_renewing_lendings_accumulate():
+    renewing = simulate(replace(TRAFFIC, renew_ratio=1), 30)
+    returned = simulate(replace(TRAFFIC, renew_ratio=0), 30)
+    lends = sum(day.events for day in renewing) - 2 * sum(day.settlements for day in renewing)
+    # every lend is still there, rented or not
+    assert renewing[-1].lendings == renewing[-1].renewing_lendings == lends - renewing[-1].rentings
+    # with twice the demand of the supply, the non-renewing ones are rented as soon as they are
+    # lent, and gone once returned
+    assert returned[-1].lendings == returned[-1].rentings + returned[-1].idle_lendings
+    assert returned[-1].idle_lendings <= 5
+    assert returned[-1].lendings < renewing[-1].lendings / 5
+    assert all(day.lost_rents == 0 for day in renewing[5:])
+    assert simulate(replace(TRAFFIC, renew_ratio=1), 30) == renewing
+
+
+def test_partly_rented_1155s_shrink():
+    traffic = replace(TRAFFIC, share_1155=1, max_lend_amount=10, renew_ratio=0, rents_per_day=20)
+    days = simulate(traffic, 30)
+    assert days[-1].shrunk_lendings > 0
+    assert days[-1].renewing_lendings == 0
+
+
+def test_settlement_gas_and_storage():
+    gas = SettlementGas(base=1_000, renew=100, gas_cap=1_500)
+    days = simulate(replace(TRAFFIC, renew_ratio=1), 10, gas)
+    for day in days:
+        # at most five items per claimRent under the cap
+        assert day.settlement_transactions >= day.settlements / 5
+        assert day.settlement_gas == 1_000 * day.settlement_transactions + 100 * day.settlements
+        assert day.storage_slots == day.lendings + day.rentings
+
+    indexed = simulate(replace(TRAFFIC, renew_ratio=1, enumerable=True), 10, gas)
+    assert indexed[-1].storage_slots == (1 + INDEX_SLOTS) * days[-1].lendings + days[-1].rentings
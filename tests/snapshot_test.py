@@ -0,0 +1,96 @@
+import pytest
+from brownie import accounts, chain, web3
+from eth_utils import keccak
+
+from scripts.deploy_test import lend, rent
+from scripts.indexer import to_hex
+from scripts.model import NFTStandard, PaymentToken, price_to_int
+from scripts.snapshot import LENDING_SLOT, RENTING_SLOT, Snapshot, SnapshotError, write_snapshot
+
+# storage slots of the lendings and rentings mappings in the Registry
+LENDINGS_SLOT = 7
+RENTINGS_SLOT = 8
+
+
+def storage(registry, mapping_slot, nft_address, token_id, record_id):
+    identifier = keccak(
+        bytes.fromhex(nft_address[2:]) + token_id.to_bytes(32, "big") + record_id.to_bytes(32, "big")
+    )
+    slot = keccak(identifier + mapping_slot.to_bytes(32, "big"))
+    return bytes(web3.eth.get_storage_at(registry.address, slot)).rjust(32, b"\0")
+
+
+def test_round_trip_against_the_registry(contracts, tmp_path):
+    registry, mirror = contracts["registry"], contracts["mirror"]
+    lendings = lend(contracts, accounts[2], contracts["e721"], 3, NFTStandard.E721.value)
+    lendings += lend(
+        contracts,
+        accounts[2],
+        contracts["e1155"],
+        3,
+        NFTStandard.E1155.value,
+        lend_amount=4,
+        max_rent_duration=7,
+        daily_rent_price=0x12345,
+        payment_token=PaymentToken.USDC.value,
+        will_auto_renew=True,
+    )
+    rent(contracts, accounts[3], lendings[::2], rent_duration=1, rent_amount=1)
+    path = str(tmp_path / "registry.snapshot")
+    write_snapshot(path, mirror, chain[-1].number, to_hex(chain[-1].hash))
+
+    with Snapshot(path) as snapshot:
+        assert snapshot.block_number == chain[-1].number
+        assert snapshot.load(registry.address).lendings == mirror.lendings
+        assert snapshot.load(registry.address).rentings == mirror.rentings
+
+        for i, record in enumerate(snapshot.lending_records):
+            lending = snapshot.to_lending(record)
+            view = registry.getLending(lending.nft_address, lending.token_id, lending.lending_id)
+            assert view[:3] == (lending.nft_standard, lending.lender_address, lending.max_rent_duration)
+            assert price_to_int(view[3]) == lending.daily_rent_price
+            assert view[4:] == (lending.lend_amount, lending.available_amount, lending.payment_token)
+            # the record holds the storage slot as is
+            slot = storage(registry, LENDINGS_SLOT, lending.nft_address, lending.token_id, lending.lending_id)
+            assert snapshot.lending_records.raw(i)[LENDING_SLOT] == slot
+
+        for i, record in enumerate(snapshot.renting_records):
+            renting = snapshot.to_renting(record)
+            view = registry.getRenting(renting.nft_address, renting.token_id, renting.renting_id)
+            assert view == (renting.renter_address, renting.rent_amount, renting.rent_duration, renting.rented_at)
+            slot = storage(registry, RENTINGS_SLOT, renting.nft_address, renting.token_id, renting.renting_id)
+            assert snapshot.renting_records.raw(i)[RENTING_SLOT] == slot
+
+
+def test_mirror_starts_from_the_snapshot(contracts, tmp_path):
+    registry, mirror = contracts["registry"], contracts["mirror"]
+    lendings = lend(contracts, accounts[2], contracts["e721"], 3, NFTStandard.E721.value)
+    path = str(tmp_path / "registry.snapshot")
+    write_snapshot(path, mirror, chain[-1].number, to_hex(chain[-1].hash))
+
+    rent(contracts, accounts[3], lendings[:1])
+    stopped = lendings[1]
+    txn = registry.stopLend(
+        [stopped.nft_standard],
+        [stopped.nft_address],
+        [stopped.token_id],
+        [stopped.lending_id],
+        {"from": accounts[2]},
+    )
+    mirror.apply_events(txn.events)
+
+    with Snapshot(path) as snapshot:
+        restarted = snapshot.mirror(registry.address)
+        assert len(restarted.lendings) == 3
+        restarted.sync(registry, snapshot.block_number + 1, "latest")
+        assert stopped.lending_id not in restarted.lendings
+        assert len(restarted.lendings) == 2
+        assert dict(restarted.lendings) == mirror.lendings
+        assert dict(restarted.rentings) == mirror.rentings
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "other"
+    path.write_bytes(b"\0" * 128)
+    with pytest.raises(SnapshotError):
+        Snapshot(str(path))
@@ -0,0 +1,90 @@
+import pytest
+
+from scripts.model import Lending, NFTStandard, PaymentToken, pack_price
+from scripts.splitter import (
+    GasModel,
+    SplitError,
+    features,
+    fit,
+    lend_item,
+    load_model,
+    rent_item,
+    save_model,
+    split,
+)
+
+E721, E1155 = NFTStandard.E721.value, NFTStandard.E1155.value
+DAI, USDC = PaymentToken.DAI.value, PaymentToken.USDC.value
+NFT_A = "0x00000000000000000000000000000000000000aa"
+NFT_B = "0x00000000000000000000000000000000000000bb"
+MODEL = GasModel(
+    base=60_000,
+    group_721=20_000,
+    group_1155=45_000,
+    item_721=90_000,
+    item_1155=70_000,
+    payment_token=15_000,
+)
+
+
+def item(nft_standard, nft_address, token_id, payment_token=DAI):
+    return lend_item(nft_standard, nft_address, token_id, 1, 7, pack_price(1), payment_token, False)
+
+
+def test_features_follow_bundle_call_groups():
+    items = [item(E721, NFT_A, 1), item(E721, NFT_A, 2), item(E1155, NFT_B, 3, USDC)]
+    items.append(item(E721, NFT_A, 4))
+    # NFT_A twice: it is not contiguous
+    assert features(items) == [1, 2, 1, 3, 1, 2]
+    assert MODEL.estimate(items) == 60_000 + 2 * 20_000 + 45_000 + 3 * 90_000 + 70_000 + 2 * 15_000
+
+    lending = Lending(E1155, NFT_A, 7, pack_price(1), 5, 5, USDC, False, NFT_B, 9, 3)
+    rent = rent_item(lending, 2, 4)
+    assert (rent.payment_token, rent.args) == (USDC, (E1155, NFT_B, 9, 3, 2, 4))
+
+
+def test_fit_recovers_the_model():
+    samples = []
+    for size in (1, 3, 8):
+        for tokens in (1, 2, 3):
+            for standard, other in ((E721, NFT_B), (E1155, NFT_B)):
+                items = [item(standard, NFT_A, i, i % tokens) for i in range(size)]
+                items += [item(standard, other, i, 0) for i in range(size // 2)]
+                samples.append((items, MODEL.estimate(items)))
+    mixed = [item(E721, NFT_A, 1), item(E1155, NFT_B, 2)]
+    samples.append((mixed, MODEL.estimate(mixed)))
+    assert fit(samples) == MODEL
+
+    with pytest.raises(SplitError):
+        fit([(items, gas) for items, gas in samples if items[0].nft_standard == E721])
+
+
+def test_split_keeps_groups_under_the_cap():
+    # the two collections interleaved, in two payment tokens
+    items = [item(E721 if i % 2 else E1155, NFT_A if i % 2 else NFT_B, i, i % 3) for i in range(40)]
+    cap = 1_000_000
+    plan = split(items, MODEL, cap)
+    assert sorted(i.args[2] for tx in plan.transactions for i in tx) == list(range(40))
+    assert all(gas <= cap for gas in plan.gas)
+    assert plan.gas == [MODEL.estimate(tx) for tx in plan.transactions]
+    assert plan.cost(2) == 2 * plan.total_gas
+    # each collection is cut into as few groups as the cap allows
+    for tx in plan.transactions:
+        assert features(tx)[1] + features(tx)[2] <= 2
+    assert len(plan.transactions) == len(split(list(reversed(items)), MODEL, cap).transactions)
+
+    lend_columns = plan.calls()[0]
+    assert len(lend_columns) == 8
+    assert len(lend_columns[0]) == len(plan.transactions[0])
+
+    # small groups share a transaction
+    small = [item(E721, NFT_A, 1), item(E1155, NFT_B, 2)]
+    assert len(split(small, MODEL, cap).transactions) == 1
+    with pytest.raises(SplitError):
+        split(small, MODEL, 100_000)
+
+
+def test_model_round_trip(tmp_path):
+    path = str(tmp_path / "model.json")
+    save_model(path, {"lend": MODEL, "rent": GasModel(base=1)})
+    assert load_model(path) == {"lend": MODEL, "rent": GasModel(base=1)}
@@ -0,0 +1,69 @@
+from brownie import accounts, chain
+
+from scripts.deploy_test import rent
+from scripts.keeper import claim_args, stop_lend_args
+from scripts.model import NFTStandard, PaymentToken, pack_price
+
+LENDER, RENTER = 2, 3
+E1155_FAUCET_AMOUNT = 10
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+
+def faucet(contracts):
+    return contracts["e1155"].faucet({"from": accounts[LENDER]}).events["TransferSingle"]["id"]
+
+
+def lend_ids(contracts, token_ids):
+    registry, mirror, nft = contracts["registry"], contracts["mirror"], contracts["e1155"]
+    nft.setApprovalForAll(registry.address, True, {"from": accounts[LENDER]})
+    count = len(token_ids)
+    txn = registry.lend(
+        [NFTStandard.E1155.value] * count,
+        [nft.address] * count,
+        token_ids,
+        [1] * count,
+        [1] * count,
+        [pack_price(1)] * count,
+        [PaymentToken.DAI.value] * count,
+        [False] * count,
+        {"from": accounts[LENDER]},
+    )
+    mirror.apply_events(txn.events)
+    return [mirror.lendings[event["lendingID"]] for event in txn.events["Lend"]]
+
+
+def test_stop_lend_sends_each_token_id_once(contracts):
+    nft = contracts["e1155"]
+    first, second = faucet(contracts), faucet(contracts)
+    # not sorted by token id: the same id still adds up into one entry
+    lendings = lend_ids(contracts, [first, second, first, first])
+    txn = contracts["registry"].stopLend(*stop_lend_args(lendings), {"from": accounts[LENDER]})
+    assert "TransferSingle" not in txn.events
+    assert len(txn.events["TransferBatch"]) == 1
+    batch = txn.events["TransferBatch"][0]
+    assert (batch["to"], list(batch["ids"]), list(batch["values"])) == (
+        accounts[LENDER],
+        [first, second],
+        [3, 1],
+    )
+    assert len(txn.events["StopLend"]) == 4
+    for token_id in [first, second]:
+        assert nft.balanceOf(accounts[LENDER], token_id) == E1155_FAUCET_AMOUNT
+
+
+def test_stop_rent_returns_a_token_id_in_a_single_transfer(contracts):
+    registry, nft = contracts["registry"], contracts["e1155"]
+    token_id = faucet(contracts)
+    lendings = lend_ids(contracts, [token_id] * 3)
+    rentings = rent(contracts, accounts[RENTER], lendings)
+    chain.sleep(100)
+    chain.mine()
+    txn = registry.stopRent(*claim_args(rentings), {"from": accounts[RENTER]})
+    assert "TransferBatch" not in txn.events
+    assert len(txn.events["TransferSingle"]) == 1
+    transfer = txn.events["TransferSingle"][0]
+    assert (transfer["to"], transfer["id"], transfer["value"]) == (accounts[LENDER], token_id, 3)
+    assert nft.balanceOf(accounts[LENDER], token_id) == E1155_FAUCET_AMOUNT
+    for lending in lendings:
+        lender = registry.getLending(lending.nft_address, lending.token_id, lending.lending_id)[1]
+        assert lender == ZERO_ADDRESS
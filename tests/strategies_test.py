@@ -0,0 +1,66 @@
+from hypothesis import find, given
+from hypothesis import strategies as st
+
+from scripts.mirror import RegistryMirror
+from scripts.model import NFTStandard
+from scripts.strategies import (
+    ActionItem,
+    columns,
+    durations,
+    lend_batches,
+    lend_items,
+    rent_amounts,
+    resolve,
+    weighted,
+)
+from scripts.validator import BatchValidator
+
+NFT = "0x0000000000000000000000000000000000000a00"
+
+
+def check_lend(item):
+    return BatchValidator(RegistryMirror(), {}).check_lend(
+        item.nft_standard,
+        item.lend_amount,
+        item.max_rent_duration,
+        item.daily_rent_price,
+        item.payment_token,
+    )
+
+
+@given(item=lend_items(edges=False, max_amount=10))
+def test_lend_items_without_edges_are_lendable(item):
+    assert check_lend(item) is None
+    if item.nft_standard == NFTStandard.E1155.value:
+        assert item.lend_amount <= 10
+
+
+def test_lend_items_reach_every_lend_revert():
+    for reason in [
+        "ReNFT::lend amount is zero",
+        "ReNFT::not uint16",
+        "ReNFT::duration is zero",
+        "ReNFT::rent price is zero",
+        "ReNFT::token is sentinel",
+        "ReNFT::lendAmount should be equal to 1",
+    ]:
+        find(lend_items(), lambda item, reason=reason: check_lend(item) == reason)
+
+
+@given(batch=lend_batches(max_size=8))
+def test_batches_are_never_empty(batch):
+    assert 1 <= len(batch) <= 8
+
+
+def test_weighted_skips_empty_buckets():
+    find(weighted((1, st.just(1)), (0, st.just(2)), (1, st.just(3))), lambda x: x == 3)
+    assert find(weighted((1, st.just(1)), (0, st.just(2))), lambda x: True) == 1
+    find(durations(), lambda x: x == 0)
+    find(rent_amounts(), lambda x: x > 10)
+
+
+def test_resolve_and_columns():
+    items = [ActionItem(pick=5, flip=False), ActionItem(pick=2, flip=True)]
+    assert resolve([], items) == []
+    assert resolve(["a", "b", "c"], items) == ["c", "c"]
+    assert columns([[0, NFT, 1], [1, NFT, 2]]) == [[0, 1], [NFT, NFT], [1, 2]]
@@ -0,0 +1,83 @@
+from scripts.mirror import RegistryMirror
+from scripts.model import SECONDS_IN_DAY, is_claimable, pack_price
+from scripts.timeline import ExpiryTimeline
+
+LENDER = "0x00000000000000000000000000000000000000a1"
+RENTER = "0x00000000000000000000000000000000000000b1"
+NFT = "0x0000000000000000000000000000000000000a00"
+T0 = 1_000_000
+
+
+def lend(mirror, lending_id):
+    mirror.apply(
+        "Lend",
+        {
+            "is721": False,
+            "lenderAddress": LENDER,
+            "nftAddress": NFT,
+            "tokenID": lending_id,
+            "lendingID": lending_id,
+            "maxRentDuration": 30,
+            "dailyRentPrice": pack_price(1),
+            "lendAmount": 10,
+            "paymentToken": 1,
+            "willAutoRenew": True,
+        },
+    )
+
+
+def rent(mirror, renting_id, rent_duration, rented_at):
+    mirror.apply(
+        "Rent",
+        {
+            "renterAddress": RENTER,
+            "lendingID": 1,
+            "rentingID": renting_id,
+            "rentAmount": 1,
+            "rentDuration": rent_duration,
+            "rentedAt": rented_at,
+        },
+    )
+
+
+def ids(rentings):
+    return [renting.renting_id for renting in rentings]
+
+
+def test_range_queries_follow_the_mirror():
+    mirror = RegistryMirror()
+    lend(mirror, 1)
+    rent(mirror, 1, 3, T0)
+    rent(mirror, 2, 1, T0 + 10)
+    timeline = ExpiryTimeline(mirror)
+    rent(mirror, 3, 1, T0)
+    rent(mirror, 4, 7, T0 + 5)
+
+    assert len(timeline) == 4
+    assert ids(timeline.between(0, 2 ** 64)) == [3, 2, 1, 4]
+    assert ids(timeline.between(T0 + SECONDS_IN_DAY, T0 + 3 * SECONDS_IN_DAY)) == [3, 2]
+    assert timeline.next_expiry(T0 + SECONDS_IN_DAY + 1) == T0 + SECONDS_IN_DAY + 10
+
+    # past the return date only strictly after it, as in isPastReturnDate
+    now = T0 + SECONDS_IN_DAY + 10
+    assert ids(timeline.expired(now)) == [3]
+    assert ids(timeline.expired(now)) == ids(r for r in mirror.rentings.values() if is_claimable(r, now))
+
+    mirror.apply("StopRent", {"rentingID": 3, "stoppedAt": T0 + 100})
+    mirror.apply("RentClaimed", {"rentingID": 1, "collectedAt": T0 + 4 * SECONDS_IN_DAY})
+    assert ids(timeline.between(0, 2 ** 64)) == [2, 4]
+    assert len(timeline) == 2
+
+
+def test_cursor_reports_each_expiry_once():
+    mirror = RegistryMirror()
+    lend(mirror, 1)
+    timeline = ExpiryTimeline(mirror)
+    cursor = timeline.cursor(T0)
+    for renting_id in range(1, 6):
+        rent(mirror, renting_id, renting_id, T0)
+
+    assert cursor.advance(T0 + SECONDS_IN_DAY) == []
+    assert ids(cursor.advance(T0 + 2 * SECONDS_IN_DAY + 1)) == [1, 2]
+    assert cursor.advance(T0 + 2 * SECONDS_IN_DAY + 1) == []
+    assert ids(cursor.advance(T0 + 10 * SECONDS_IN_DAY)) == [3, 4, 5]
@@ -0,0 +1,59 @@
+import pytest
+from brownie import E721, accounts, chain, web3
+
+from scripts.txpipeline import TxPipeline
+
+FAUCET_GAS = 200_000
+
+
+@pytest.fixture(scope="module")
+def signer():
+    signer = accounts.add()
+    accounts[0].transfer(signer, "10 ether")
+    return signer
+
+
+@pytest.fixture(scope="module")
+def e721():
+    return E721.deploy({"from": accounts[0]})
+
+
+@pytest.fixture
+def automine_off():
+    web3.provider.make_request("miner_stop", [])
+    yield
+    web3.provider.make_request("miner_start", [])
+
+
+def test_pipelines_without_waiting_for_blocks(signer, e721, automine_off):
+    with TxPipeline(web3, signer, poll_interval=0.05) as pipeline:
+        sent = [pipeline.submit_call(e721.faucet, gas=FAUCET_GAS) for _ in range(10)]
+        assert [tx.nonce for tx in sent] == list(range(sent[0].nonce, sent[0].nonce + 10))
+
+        assert pipeline.poll() == []
+        assert len(pipeline.pending) == 10
+
+        chain.mine()
+        stats = pipeline.wait(timeout=30)
+        assert stats.mined == 10
+        assert stats.reverted == 0
+        assert e721.balanceOf(signer) == 10
+        # all of them fit in the single block that was mined
+        assert len({tx.receipt["blockNumber"] for tx in pipeline.done}) == 1
+
+
+def test_bumps_gas_price_of_stuck_transactions(signer, e721, automine_off):
+    with TxPipeline(web3, signer, replace_after=0, poll_interval=0.05) as pipeline:
+        pending = pipeline.submit_call(e721.faucet, gas=FAUCET_GAS)
+        pipeline.poll()
+        pipeline.poll()
+        assert pending.replacements == 2
+        assert len(pending.hashes) == 3
+
+        chain.mine()
+        stats = pipeline.wait(timeout=30)
+        assert stats.mined == 1
+        assert stats.replaced == 2
+        # only one of the three transactions that share the nonce can be mined
+        assert e721.balanceOf(signer) == 1
+        assert pending.receipt["transactionHash"].hex().endswith(pending.hashes[-1][2:])
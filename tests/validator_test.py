@@ -0,0 +1,196 @@
+import pytest
+from brownie import accounts, chain
+from brownie.exceptions import VirtualMachineError
+from brownie.test import given
+from hypothesis import settings
+from hypothesis import strategies as st
+
+from scripts.deploy_test import BILLION, deploy, lend, rent
+from scripts.mirror import RegistryMirror
+from scripts.model import SECONDS_IN_DAY, NFTStandard, pack_price
+from scripts.validator import NFT_RETURN, REASONLESS, BatchValidator
+
+LENDER, RENTER, OTHER = 2, 3, 4
+# the outcome of a revert without a reason
+REVERTED = "reverted"
+
+
+@pytest.fixture(scope="module")
+def contracts():
+    contracts = deploy(accounts[0], accounts[1], accounts[0])
+    contracts["mirror"] = RegistryMirror(contracts["registry"].address)
+    return contracts
+
+
+@pytest.fixture(scope="module")
+def world(contracts):
+    """Two rentings past their return date, two within it, and NFTs left to lend."""
+    e721, e1155 = contracts["e721"], contracts["e1155"]
+    lendings = lend(contracts, accounts[LENDER], e721, 2, NFTStandard.E721.value)
+    lendings += lend(
+        contracts,
+        accounts[LENDER],
+        e1155,
+        2,
+        NFTStandard.E1155.value,
+        lend_amount=3,
+        max_rent_duration=3,
+        will_auto_renew=True,
+    )
+    rentings = rent(contracts, accounts[RENTER], [lendings[0], lendings[2]])
+    chain.sleep(2 * SECONDS_IN_DAY)
+    rentings += rent(contracts, accounts[RENTER], [lendings[1], lendings[3]])
+    chain.sleep(100)
+    chain.mine()
+
+    for token in contracts["payment_tokens"].values():
+        token.faucet({"from": accounts[OTHER]})
+        token.approve(contracts["registry"].address, BILLION, {"from": accounts[OTHER]})
+    free = {NFTStandard.E721.value: [], NFTStandard.E1155.value: []}
+    for _ in range(4):
+        free[NFTStandard.E721.value].append(
+            e721.faucet({"from": accounts[LENDER]}).events["Transfer"]["tokenId"]
+        )
+        free[NFTStandard.E1155.value].append(
+            e1155.faucet({"from": accounts[LENDER]}).events["TransferSingle"]["id"]
+        )
+    return {"lendings": lendings, "rentings": rentings, "free": free}
+
+
+def validator(contracts):
+    decimals = {ix: token.decimals() for ix, token in contracts["payment_tokens"].items()}
+    return BatchValidator(contracts["mirror"], decimals, rent_fee=contracts["registry"].rentFee())
+
+
+def outcome(method, args, sender):
+    try:
+        method.call(*args, {"from": sender})
+    except VirtualMachineError as exc:
+        return exc.revert_msg or REVERTED
+    return None
+
+
+def expected_outcome(validation):
+    reason = validation.revert_reason
+    return REVERTED if reason in REASONLESS else reason
+
+
+def flipped(nft_standard, flip):
+    return 1 - nft_standard if flip else nft_standard
+
+
+lend_items = st.lists(
+    st.tuples(
+        st.sampled_from([s.value for s in NFTStandard]),
+        st.integers(0, 3),
+        st.integers(0, 2),
+        st.sampled_from([0, pack_price(1), pack_price(0, 5)]),
+        st.integers(0, 3),
+        st.booleans(),
+    ),
+    min_size=0,
+    max_size=4,
+)
+rent_items = st.lists(
+    st.tuples(st.integers(0, 4), st.booleans(), st.integers(0, 4), st.integers(0, 4)),
+    min_size=0,
+    max_size=4,
+)
+end_items = st.lists(
+    st.tuples(st.integers(0, 3), st.integers(0, 4), st.booleans()), min_size=0, max_size=4
+)
+senders = st.sampled_from([LENDER, RENTER, OTHER])
+
+
+@given(items=lend_items)
+@settings(max_examples=50)
+def test_lend_parity(contracts, world, items):
+    nfts = {NFTStandard.E721.value: contracts["e721"], NFTStandard.E1155.value: contracts["e1155"]}
+    args = [[] for _ in range(8)]
+    for i, (nft_standard, amount, duration, price, token, renew) in enumerate(items):
+        item = [nft_standard, nfts[nft_standard].address, world["free"][nft_standard][i]]
+        for column, value in zip(args, item + [amount, duration, price, token, renew]):
+            column.append(value)
+    # the lender owns the free NFTs
+    expected = validator(contracts).lend(accounts[LENDER].address, *args)
+    assert outcome(contracts["registry"].lend, args, accounts[LENDER]) == expected_outcome(expected)
+
+
+@given(items=rent_items, sender=senders)
+@settings(max_examples=50)
+def test_rent_parity(contracts, world, items, sender):
+    lendings = world["lendings"]
+    args = [[] for _ in range(6)]
+    for ix, flip, duration, amount in items:
+        if ix == len(lendings):
+            # a lending that does not exist
+            item = [0, lendings[0].nft_address, lendings[0].token_id, 999]
+        else:
+            lending = lendings[ix]
+            item = [flipped(lending.nft_standard, flip), lending.nft_address, lending.token_id]
+            item.append(lending.lending_id)
+        for column, value in zip(args, item + [duration, amount]):
+            column.append(value)
+    funds = {
+        ix: (token.balanceOf(accounts[sender]), token.allowance(accounts[sender], contracts["registry"]))
+        for ix, token in contracts["payment_tokens"].items()
+    }
+    expected = validator(contracts).rent(accounts[sender].address, *args, funds=funds)
+    assert outcome(contracts["registry"].rent, args, accounts[sender]) == expected_outcome(expected)
+
+
+@given(items=end_items, sender=senders, claim=st.booleans())
+@settings(max_examples=50)
+def test_stop_rent_and_claim_parity(contracts, world, items, sender, claim):
+    lendings, rentings = world["lendings"], world["rentings"]
+    args = [[] for _ in range(5)]
+    for renting_ix, lending_ix, flip in items:
+        renting = rentings[renting_ix]
+        # the renting's own lending, or any of the lendings
+        lending_id = renting.lending_id
+        if lending_ix < len(lendings):
+            lending_id = lendings[lending_ix].lending_id
+        item = [flipped(renting.nft_standard, flip), renting.nft_address, renting.token_id]
+        for column, value in zip(args, item + [lending_id, renting.renting_id]):
+            column.append(value)
+    check = validator(contracts).claim_rent if claim else validator(contracts).stop_rent
+    method = contracts["registry"].claimRent if claim else contracts["registry"].stopRent
+    expected = check(accounts[sender].address, chain.time(), *args)
+    assert outcome(method, args, accounts[sender]) == expected_outcome(expected)
+
+
+def test_claim_with_the_other_standard(contracts, world):
+    # the first renting is of a 721 lending that does not auto renew, and is past its return date
+    claimed, pending = world["rentings"][0], world["rentings"][2]
+
+    def args(*rentings):
+        return [
+            [1 - renting.nft_standard for renting in rentings],
+            [renting.nft_address for renting in rentings],
+            [renting.token_id for renting in rentings],
+            [renting.lending_id for renting in rentings],
+            [renting.renting_id for renting in rentings],
+        ]
+
+    registry = contracts["registry"]
+    expected = validator(contracts).claim_rent(accounts[OTHER].address, chain.time(), *args(claimed))
+    assert expected.reasons == [NFT_RETURN]
+    assert outcome(registry.claimRent, args(claimed), accounts[OTHER]) == REVERTED
+    # the NFTs of a group are returned after its last item, which reverts first
+    expected = validator(contracts).claim_rent(accounts[OTHER].address, chain.time(), *args(claimed, pending))
+    assert expected.revert_reason == "ReNFT::return date not passed"
+    assert outcome(registry.claimRent, args(claimed, pending), accounts[OTHER]) == expected.revert_reason
+
+
+@given(items=end_items, sender=senders)
+@settings(max_examples=50)
+def test_stop_lend_parity(contracts, world, items, sender):
+    lendings = world["lendings"]
+    args = [[] for _ in range(4)]
+    for lending_ix, _, flip in items:
+        lending = lendings[lending_ix]
+        item = [flipped(lending.nft_standard, flip), lending.nft_address, lending.token_id]
+        for column, value in zip(args, item + [lending.lending_id]):
+            column.append(value)
+    expected = validator(contracts).stop_lend(accounts[sender].address, *args)
+    assert outcome(contracts["registry"].stopLend, args, accounts[sender]) == expected_outcome(expected)